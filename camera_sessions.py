@@ -0,0 +1,455 @@
+import sys
+import threading
+import time
+import logging
+import numpy as np
+from PIL import Image
+
+import constants
+
+'''
+    Camera session manager
+
+    One sensor configuration is kept for the primary (locate) stream. Other
+    clients - vision, raw, fence, calib - are served from the latest frame,
+    resampled, flipped and colour converted in software, rather than by
+    stopping, reconfiguring and restarting picamera2 for each of them.
+    Controls such as white balance and gains are applied to the running camera,
+    batched into a single set_controls call before the next capture.
+'''
+
+AWB_MODE_LIST = ["Auto", "Incandescant", "Tungsten",
+                 "Flourescent", "Indoor", "Daylight", "Cloudy", "Custom"]
+
+
+def parse_resolution(resolution):
+    '''
+        (width, height) from '800x600', a (width, height) tuple or a CamRes
+    '''
+    if isinstance(resolution, str):
+        width, height = resolution.split('x')
+        return int(width), int(height)
+    return int(resolution[0]), int(resolution[1])
+
+
+def yuv420_to_rgb(yuv_arr, height_px, width_px):
+    '''
+        full range BT.601 conversion of a picamera2 YUV420 array,
+        planes stacked vertically with rows padded to the stride
+    '''
+    stride_px = yuv_arr.shape[1]
+    y_plane = yuv_arr[:height_px, :width_px].astype(np.float32)
+    chroma_rows = height_px // 4
+    u_plane = yuv_arr[height_px:height_px + chroma_rows].reshape(height_px // 2, stride_px // 2)
+    v_plane = yuv_arr[height_px + chroma_rows:height_px + 2 * chroma_rows].reshape(height_px // 2, stride_px // 2)
+    # chroma is sub-sampled 2x2
+    u_plane = np.repeat(np.repeat(u_plane[:, :(width_px + 1) // 2], 2, axis=0), 2, axis=1)[:height_px, :width_px]
+    v_plane = np.repeat(np.repeat(v_plane[:, :(width_px + 1) // 2], 2, axis=0), 2, axis=1)[:height_px, :width_px]
+    u_plane = u_plane.astype(np.float32) - 128
+    v_plane = v_plane.astype(np.float32) - 128
+    rgb_arr = np.empty((height_px, width_px, 3), np.float32)
+    rgb_arr[..., 0] = y_plane + 1.402 * v_plane
+    rgb_arr[..., 1] = y_plane - 0.344136 * u_plane - 0.714136 * v_plane
+    rgb_arr[..., 2] = y_plane + 1.772 * u_plane
+    return rgb_arr.clip(0, 255).astype(np.uint8)
+
+
+def rgb_to_yuv420(rgb_arr):
+    '''
+        inverse of yuv420_to_rgb, as picamera2 lays out YUV420, for test frames
+    '''
+    height_px, width_px = rgb_arr.shape[:2]
+    rgb_arr = rgb_arr.astype(np.float32)
+    y_plane = 0.299 * rgb_arr[..., 0] + 0.587 * rgb_arr[..., 1] + 0.114 * rgb_arr[..., 2]
+    u_plane = 128 + (rgb_arr[..., 2] - y_plane) / 1.772
+    v_plane = 128 + (rgb_arr[..., 0] - y_plane) / 1.402
+    u_sub = u_plane.reshape(height_px // 2, 2, width_px // 2, 2).mean(axis=(1, 3))
+    v_sub = v_plane.reshape(height_px // 2, 2, width_px // 2, 2).mean(axis=(1, 3))
+    yuv_arr = np.vstack([
+        y_plane,
+        u_sub.reshape(height_px // 4, width_px),
+        v_sub.reshape(height_px // 4, width_px)
+    ])
+    return yuv_arr.round().clip(0, 255).astype(np.uint8)
+
+
+class SensorConfig():
+    '''
+        what the sensor is configured to deliver
+        only a change to one of these needs picamera2 stopped and restarted
+    '''
+
+    def __init__(self, width_px, height_px, fmt, hflip=False, vflip=False):
+        self.width_px = width_px
+        self.height_px = height_px
+        self.fmt = fmt
+        self.hflip = hflip
+        self.vflip = vflip
+
+    @property
+    def key(self):
+        return (self.width_px, self.height_px, self.fmt, self.hflip, self.vflip)
+
+    def __eq__(self, other):
+        return other is not None and self.key == other.key
+
+    def __repr__(self):
+        return 'SensorConfig {0}x{1} {2} hflip: {3} vflip: {4}'.format(*self.key)
+
+
+class CameraSessionManager():
+    '''
+        multiplexes client settings onto one picamera2 configuration
+        transform_class is libcamera's Transform for a Pi camera,
+        None for cameras that can't flip, e.g. usb, which also only deliver rgb
+    '''
+
+    def __init__(
+        self,
+        picam2,
+        transform_class=None,
+        native_fmt=None,
+        primary_client='locate',
+        max_frame_age_secs=constants.CAMERA_SESSION_FRAME_MAX_AGE_SECS,
+        logger=None
+    ):
+        self.picam2 = picam2
+        self.transform_class = transform_class
+        self.native_fmt = native_fmt
+        self.primary_client = primary_client
+        self.max_frame_age_secs = max_frame_age_secs
+        self.logger = logger if logger is not None else logging.getLogger('vision')
+        self.lock = threading.Lock()
+
+        self.sensor = None
+        self.applied_controls = {}
+        self.pending_controls = {}
+        self.latest_arr = None
+        self.latest_time = 0
+        self.stats = {
+            'captures': 0,
+            'reused': 0,
+            'reconfigurations': 0,
+            'control_updates': 0,
+            'resampled': 0,
+            'converted': 0,
+            'flipped': 0
+        }
+
+    @staticmethod
+    def requested(settings, fmt):
+        '''
+            what the client wants delivered
+        '''
+        width_px, height_px = parse_resolution(settings['resolution'])
+        return SensorConfig(width_px, height_px, fmt, bool(settings['hflip']), bool(settings['vflip']))
+
+    def sensor_for(self, wanted):
+        '''
+            the sensor configuration that would serve it natively
+        '''
+        if self.transform_class is None:
+            # flips and colour conversion will happen in software
+            return SensorConfig(wanted.width_px, wanted.height_px, self.native_fmt or 'rgb')
+        return SensorConfig(
+            wanted.width_px, wanted.height_px, self.native_fmt or wanted.fmt, wanted.hflip, wanted.vflip)
+
+    @staticmethod
+    def control_values(settings):
+        '''
+            picamera2 controls for white balance, as OpticalPi sets them
+        '''
+        controls = {}
+        awb_mode = settings['awb_mode'] if 'awb_mode' in settings else None
+        if awb_mode is None:
+            return controls
+        redgain = settings['redgain'] or 0.0
+        bluegain = settings['bluegain'] or 0.0
+        if awb_mode.lower() == 'off' and (redgain > 0 or bluegain > 0):
+            controls['ColourGains'] = (redgain, bluegain)
+            controls['AwbEnable'] = 0
+            controls['AwbMode'] = 0
+        elif awb_mode.lower() == 'off':
+            controls['AwbEnable'] = 0
+            controls['AwbMode'] = 0
+        else:
+            controls['AwbEnable'] = 1
+            controls['AwbMode'] = AWB_MODE_LIST.index(awb_mode) if awb_mode in AWB_MODE_LIST else 0
+        return controls
+
+    def request_controls(self, controls):
+        '''
+            queue controls that differ from those applied, to go in one batch
+        '''
+        for name, value in controls.items():
+            if self.applied_controls.get(name) != value:
+                self.pending_controls[name] = value
+
+    def flush_controls(self):
+        if len(self.pending_controls) > 0:
+            self.picam2.set_controls(dict(self.pending_controls))
+            self.applied_controls.update(self.pending_controls)
+            self.pending_controls.clear()
+            self.stats['control_updates'] += 1
+
+    def configure(self, sensor):
+        '''
+            the only path that stops and restarts the camera
+        '''
+        main = {'size': (sensor.width_px, sensor.height_px)}
+        config_kwargs = {'main': main}
+        if self.transform_class is not None:
+            main['format'] = 'YUV420' if sensor.fmt == 'yuv' else 'BGR888'
+            config_kwargs['transform'] = self.transform_class(hflip=sensor.hflip, vflip=sensor.vflip)
+            config_kwargs['buffer_count'] = 1  # must be one to restrict lag!
+        capture_config = self.picam2.create_still_configuration(**config_kwargs)
+        if self.transform_class is not None:
+            self.picam2.align_configuration(capture_config)
+        self.logger.info('camera session reconfiguring for {0}'.format(sensor))
+        self.picam2.stop()
+        self.picam2.configure(capture_config)
+        # controls set before start take effect from the first frame
+        self.pending_controls.update(self.applied_controls)
+        self.applied_controls = {}
+        self.flush_controls()
+        self.picam2.start()
+        self.sensor = sensor
+        self.latest_arr = None
+        self.stats['reconfigurations'] += 1
+
+    def capture(self, settings, fmt):
+        '''
+            a frame for the client in settings, in fmt ('yuv' is gray) at its resolution and flips
+        '''
+        with self.lock:
+            client = settings['client'] if 'client' in settings else None
+            wanted = self.requested(settings, fmt)
+            sensor = self.sensor_for(wanted)
+            self.request_controls(self.control_values(settings))
+            if self.sensor is None or (client == self.primary_client and sensor != self.sensor):
+                self.configure(sensor)
+            else:
+                self.flush_controls()
+
+            now = time.time()
+            fresh = self.latest_arr is not None and now - self.latest_time <= self.max_frame_age_secs
+            if client != self.primary_client and fresh:
+                self.stats['reused'] += 1
+            else:
+                self.latest_arr = self.picam2.capture_array()
+                self.latest_time = now
+                self.stats['captures'] += 1
+            return self.derive(self.latest_arr, wanted, fmt)
+
+    def derive(self, raw_arr, wanted, fmt):
+        '''
+            convert, flip and resample the sensor frame to what the client wanted
+            always returns an array the caller may write to, e.g. to annotate
+        '''
+        sensor = self.sensor
+        height_px, width_px = sensor.height_px, sensor.width_px
+        if sensor.fmt == 'yuv':
+            if fmt == 'rgb':
+                out_arr = yuv420_to_rgb(raw_arr, height_px, width_px)
+                self.stats['converted'] += 1
+            else:
+                out_arr = raw_arr[:height_px, :width_px]
+        else:
+            out_arr = raw_arr[:height_px, :width_px]
+            if fmt != 'rgb':
+                out_arr = np.dot(out_arr[..., :3], [0.2989, 0.5870, 0.1140]).astype(np.uint8)
+                self.stats['converted'] += 1
+
+        # undo or apply whatever flips the sensor transform doesn't match
+        hflip = wanted.hflip != sensor.hflip
+        vflip = wanted.vflip != sensor.vflip
+        if hflip:
+            out_arr = out_arr[:, ::-1]
+        if vflip:
+            out_arr = out_arr[::-1]
+        if hflip or vflip:
+            self.stats['flipped'] += 1
+
+        if (wanted.width_px, wanted.height_px) != (width_px, height_px):
+            out_arr = np.asarray(Image.fromarray(np.ascontiguousarray(out_arr)).resize(
+                (wanted.width_px, wanted.height_px), resample=Image.Resampling.BILINEAR))
+            self.stats['resampled'] += 1
+
+        if np.may_share_memory(out_arr, raw_arr) or not out_arr.flags.writeable:
+            out_arr = out_arr.copy()
+        return out_arr
+
+    def __repr__(self):
+        return 'CameraSessionManager {0} stats: {1}'.format(self.sensor, self.stats)
+
+
+class MockPicamera2():
+    '''
+        stands in for picamera2 off the Pi: records configuration and control calls
+        and renders a test card at the configured size and format
+    '''
+
+    class Controls():
+        pass
+
+    def __init__(self):
+        self.config = None
+        self.started = False
+        self.controls = MockPicamera2.Controls()
+        self.calls = {'configure': 0, 'start': 0, 'stop': 0, 'set_controls': 0, 'capture_array': 0}
+        self.control_values = {}
+        self.frame_count = 0
+
+    def create_still_configuration(self, main=None, transform=None, buffer_count=4):
+        return {'main': dict(main or {}), 'transform': transform, 'buffer_count': buffer_count}
+
+    def align_configuration(self, config):
+        width_px, height_px = config['main']['size']
+        config['main']['stride'] = (width_px + 31) // 32 * 32
+
+    def configure(self, config):
+        self.config = config
+        self.calls['configure'] += 1
+
+    def start(self):
+        self.started = True
+        self.calls['start'] += 1
+
+    def stop(self):
+        self.started = False
+        self.calls['stop'] += 1
+
+    def set_controls(self, controls):
+        self.control_values.update(controls)
+        self.calls['set_controls'] += 1
+
+    def capture_metadata(self):
+        return {'SensorTimestamp': int(time.monotonic() * 1E9), 'ExposureTime': 10000}
+
+    def test_card(self, width_px, height_px):
+        '''
+            colour gradients with a marker in the top left corner, so flips show
+        '''
+        yy, xx = np.mgrid[0:height_px, 0:width_px]
+        rgb_arr = np.empty((height_px, width_px, 3), np.uint8)
+        rgb_arr[..., 0] = 255 * xx // max(width_px - 1, 1)
+        rgb_arr[..., 1] = 255 * yy // max(height_px - 1, 1)
+        rgb_arr[..., 2] = (self.frame_count * 10) % 256
+        rgb_arr[:height_px // 8, :width_px // 8] = 255
+        return rgb_arr
+
+    def capture_array(self, _name='main'):
+        if not self.started:
+            raise RuntimeError('Camera must be started before capturing')
+        self.calls['capture_array'] += 1
+        self.frame_count += 1
+        main = self.config['main']
+        width_px, height_px = main['size']
+        rgb_arr = self.test_card(width_px, height_px)
+        transform = self.config['transform']
+        if transform is not None:
+            if transform.hflip:
+                rgb_arr = rgb_arr[:, ::-1]
+            if transform.vflip:
+                rgb_arr = rgb_arr[::-1]
+        if main.get('format') == 'YUV420':
+            yuv_arr = rgb_to_yuv420(rgb_arr)
+            stride_px = main.get('stride', width_px)
+            if stride_px > width_px:
+                # pad rows to the stride, as the isp does
+                padded_arr = np.zeros((yuv_arr.shape[0], stride_px), np.uint8)
+                padded_arr[:height_px, :width_px] = yuv_arr[:height_px]
+                chroma_arr = yuv_arr[height_px:].reshape(-1, width_px // 2)
+                padded_chroma = np.zeros((chroma_arr.shape[0], stride_px // 2), np.uint8)
+                padded_chroma[:, :width_px // 2] = chroma_arr
+                padded_arr[height_px:] = padded_chroma.reshape(-1, stride_px)
+                yuv_arr = padded_arr
+            return yuv_arr
+        return np.ascontiguousarray(rgb_arr)
+
+
+class MockTransform():
+    '''
+        libcamera.Transform look-alike
+    '''
+
+    def __init__(self, hflip=False, vflip=False):
+        self.hflip = hflip
+        self.vflip = vflip
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    from forms.settings import PiSettings
+
+    def client_settings(client, resolution, hflip=False, vflip=False, awb_mode='auto'):
+        settings = PiSettings()
+        settings['client'] = client
+        settings['resolution'] = resolution
+        settings['hflip'] = hflip
+        settings['vflip'] = vflip
+        settings['awb_mode'] = awb_mode
+        return settings
+
+    try:
+        mock_cam = MockPicamera2()
+        sessions = CameraSessionManager(mock_cam, transform_class=MockTransform)
+
+        locate = client_settings('locate', '1280x960', vflip=True)
+        frame = sessions.capture(locate, 'yuv')
+        assert frame.shape == (960, 1280), frame.shape
+        assert mock_cam.calls['configure'] == 1
+
+        # a ui user opens the vision page mid-mow, in colour at another size, unflipped
+        vision = client_settings('vision', '800x600', awb_mode='Daylight')
+        frame = sessions.capture(vision, 'rgb')
+        assert frame.shape == (600, 800, 3), frame.shape
+        # marker is top left once the sensor's vflip is undone
+        assert frame[:20, :20].min() > 200 and frame[-20:, :20].min() < 200
+        for client in ('raw', 'fence', 'calib', 'locate', 'vision', 'locate'):
+            sessions.capture(client_settings(client, '640x480' if client != 'locate' else '1280x960',
+                                             vflip=client == 'locate'), 'yuv')
+        print(sessions)
+        print('mock calls: {0}'.format(mock_cam.calls))
+        assert mock_cam.calls['configure'] == 1, 'secondary clients must not reconfigure the sensor'
+        assert mock_cam.calls['stop'] == 1
+
+        # white balance changes are batched into one set_controls on the running camera
+        before = mock_cam.calls['set_controls']
+        sessions.capture(client_settings('locate', '1280x960', vflip=True, awb_mode='off'), 'yuv')
+        assert mock_cam.calls['set_controls'] == before + 1 and mock_cam.calls['configure'] == 1
+        sessions.capture(client_settings('locate', '1280x960', vflip=True, awb_mode='off'), 'yuv')
+        assert mock_cam.calls['set_controls'] == before + 1
+
+        # the primary stream changing resolution does reconfigure, once
+        sessions.capture(client_settings('locate', '1024x768', vflip=True), 'yuv')
+        sessions.capture(client_settings('locate', '1024x768', vflip=True), 'yuv')
+        assert mock_cam.calls['configure'] == 2
+
+        # usb cameras flip and convert in software
+        usb_cam = MockPicamera2()
+        usb_sessions = CameraSessionManager(usb_cam, native_fmt='rgb')
+        gray = usb_sessions.capture(client_settings('locate', '640x480', hflip=True), 'yuv')
+        assert gray.shape == (480, 640) and gray[:20, -20:].min() > 200
+        print(usb_sessions)
+
+        # legacy per-client reconfiguration for comparison
+        legacy_cam = MockPicamera2()
+        last_key = None
+        for client, res in (('locate', '1280x960'), ('vision', '800x600'), ('raw', '640x480'),
+                            ('locate', '1280x960'), ('vision', '800x600'), ('locate', '1280x960')):
+            if (client, res) != last_key:
+                legacy_cam.stop()
+                legacy_cam.configure(legacy_cam.create_still_configuration(
+                    main={'size': parse_resolution(res), 'format': 'YUV420'}))
+                legacy_cam.start()
+                last_key = (client, res)
+            legacy_cam.capture_array()
+        print('legacy reconfigurations for the same 6 requests: {0}'.format(legacy_cam.calls['configure']))
+
+    except Exception as e:
+        err_line = sys.exc_info()[-1].tb_lineno
+        print('Error in camera_sessions tests: ' + str(e) + ' on line ' + str(err_line))
+        raise
@@ -1,16 +1,23 @@
 import sys
+import os
+import glob
+import json
 import platform
 import tempfile
 import time
 import logging
 import numpy as np
 import requests
+import requests.adapters
 from PIL import Image, ImageDraw
 
 import constants
 from forms.settings import VirtualSettings, PiSettings
+from frame_protocol import FrameProtocolException, decode_frames, roi_to_qs, viewport_to_qs
 from setting import IntSetting, FloatSetting
+from sim_clock import clock
 from utilities import await_elapsed
+from viewport import Viewport
 
 
 class BaseCamera():
@@ -160,7 +167,7 @@ class OpticalVirtual(BaseCamera):
         '''
         try:
 
-            start = time.time()
+            start = clock.time()
 
             if self.debug:
                 self.logger.debug(
@@ -212,7 +219,7 @@ class OpticalVirtual(BaseCamera):
             # annotation
             if self.annotate:
                 img_draw = ImageDraw.Draw(img)  # refresh
-                cur_time = time.time()
+                cur_time = clock.time()
                 now_fmtd = (
                     time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(cur_time)) +
                     '.{0:0>3}'.format(int((cur_time % 1) * 1000))
@@ -247,7 +254,7 @@ class OpticalVirtual(BaseCamera):
                     out_img.save(self.tmp + "/virtual_cam_debug_col.jpg")
 
             extra_delay_secs = await_elapsed(
-                time.time(), start + constants.THROTTLE_CAMERA_SNAP_SECS)  # blocks
+                clock.time(), start + constants.THROTTLE_CAMERA_SNAP_SECS)  # blocks
             if self.debug:
                 if extra_delay_secs > 0:
                     self.logger.debug(
@@ -255,7 +262,7 @@ class OpticalVirtual(BaseCamera):
                 else:
                     self.logger.debug(
                         'OpticalVirtual capture throttling not required')
-            end = time.time()
+            end = clock.time()
             elapsed = round(end - start, 3)  # seconds
             if self.debug:
                 self.logger.debug(
@@ -269,58 +276,181 @@ class OpticalVirtual(BaseCamera):
         return out_arr
 
 
+class ReplayCamera(BaseCamera):
+    '''
+        serves recorded frames, e.g. the raw-N.jpg archive, in index order
+        an optional raw-N.json sidecar holds the pose located for that frame
+    '''
+
+    def __init__(self, folder_path, pattern='raw-*.jpg', loop=True, preload=False, debug=False):
+        self.settings = VirtualSettings()
+        super().__init__()
+        self.revision = 'Replay Camera'
+        self.debug = debug
+        self.folder_path = folder_path
+        self.loop = loop
+        self.frame_paths = sorted(
+            glob.glob(os.path.join(folder_path, pattern)), key=self.frame_sort_key)
+        self.frame_cache = {}
+        self.frame_index = -1
+        self.frame_path = None
+        self.exhausted = False
+        if preload:
+            for frame_path in self.frame_paths:
+                self.frame_cache[frame_path] = self.load_frame(frame_path)
+        self.logger.debug('ReplayCamera {0} frames from {1}'.format(
+            len(self.frame_paths), folder_path))
+
+    @staticmethod
+    def frame_sort_key(frame_path):
+        '''
+            numeric order, so raw-10 follows raw-9
+        '''
+        digits = ''.join(ch for ch in os.path.basename(frame_path) if ch.isdigit())
+        return (int(digits) if digits else -1, frame_path)
+
+    @staticmethod
+    def load_frame(frame_path):
+        with Image.open(frame_path) as img:
+            return np.array(img)
+
+    def __len__(self):
+        return len(self.frame_paths)
+
+    @property
+    def frame_pose(self):
+        '''
+            the recorded pose for the current frame, or None
+        '''
+        pose_dict = None
+        if self.frame_path is not None:
+            pose_path = os.path.splitext(self.frame_path)[0] + '.json'
+            if os.path.exists(pose_path):
+                with open(pose_path) as pose_file:
+                    pose_dict = json.load(pose_file)
+        return pose_dict
+
+    def rewind(self):
+        self.frame_index = -1
+        self.frame_path = None
+        self.exhausted = False
+
+    def snap(self, fmt=None):
+        '''
+            return the next recorded frame, as grayscale unless rgb is requested
+        '''
+        out_arr = None
+        try:
+            if len(self.frame_paths) == 0 or (self.exhausted and not self.loop):
+                return None
+            self.frame_index += 1
+            if self.frame_index >= len(self.frame_paths):
+                if not self.loop:
+                    self.exhausted = True
+                    self.frame_path = None
+                    return None
+                self.frame_index = 0
+            self.frame_path = self.frame_paths[self.frame_index]
+            img_arr = self.frame_cache.get(self.frame_path)
+            if img_arr is None:
+                img_arr = self.load_frame(self.frame_path)
+
+            if fmt == 'rgb' and img_arr.ndim == 2:
+                out_arr = np.dstack((img_arr, img_arr, img_arr))
+            elif fmt != 'rgb' and img_arr.ndim == 3:
+                out_arr = np.array(Image.fromarray(img_arr).convert('L'))
+            else:
+                out_arr = img_arr.copy()
+
+            if self.debug:
+                self.logger.debug('ReplayCamera frame {0}: {1} {2}'.format(
+                    self.frame_index, self.frame_path, out_arr.shape))
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.logger.error(
+                'Error in ReplayCamera snap: {0} on line {1}'.format(e, err_line))
+
+        return out_arr
+
+
 class USBCamera(BaseCamera):
     pass
 
 
 class RemoteOpticalPi(BaseCamera):
 
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, codec=constants.REMOTE_FRAME_CODEC):
         self.settings = PiSettings()
         super().__init__()
         self.endpoint = endpoint
+        self.codec = codec
         self.revision = 'Remote Linux RPI'
+        self.last_header = None
+        self.last_lores = None
+
+        # persistent keep-alive session, reused across snaps
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=constants.REMOTE_FRAME_POOL_SIZE
+        )
+        self.session.mount('http://', adapter)
 
         self.logger.debug('in RemoteOpticalPi init')
 
+    def fetch_frames(self, extra_qs='', page='raw_img'):
+        '''
+            request framed arrays from the remote node
+            the body is read straight into a writable buffer,
+            which uncompressed arrays are decoded onto without copying
+            returns list of (array, header) and the response headers
+        '''
+        # obtain settings as a query string
+        qs = self.settings.get_qs()
+        # override settings default 'locate' client with 'remote'
+        url = 'http://{0}/{1}?fmt=frame&codec={2}&{3}&client=remote{4}'.format(
+            self.endpoint, page, self.codec, qs, extra_qs)
+        self.logger.debug(
+            'RemoteOpticalPi making raw_img request to: {0}'.format(url))
+
+        req_start = time.time()
+        resp = self.session.get(url, stream=True, timeout=constants.REMOTE_FRAME_TIMEOUT_SECS)
+        try:
+            resp.raise_for_status()
+            content_length = int(resp.headers.get('Content-Length', 0))
+            if content_length > 0:
+                body = bytearray(content_length)
+                body_view = memoryview(body)
+                received = 0
+                while received < content_length:
+                    num_bytes = resp.raw.readinto(body_view[received:])
+                    if not num_bytes:
+                        break
+                    received += num_bytes
+                if received < content_length:
+                    raise FrameProtocolException('Short read: {0} of {1} bytes'.format(
+                        received, content_length))
+            else:
+                body = bytearray(resp.content)
+        finally:
+            # return the connection to the pool
+            resp.raw.release_conn()
+        self.logger.debug('RemoteOpticalPi {0} bytes returned in {1:.3f} seconds'.format(
+            len(body), time.time() - req_start))
+        return decode_frames(body), resp.headers
+
     def snap(self, _fmt=None):
         self.logger.debug('Remote Optical Pi Snap...')
         '''
-            use the url to make a remote snap request
+            use the session to make a remote snap request
         '''
         img_arr = None
         try:
-            # obtain settings as a query string
-            qs = self.settings.get_qs()
-            # override settings default 'locate' client with 'remote'
-            url = 'http://{0}/raw_img?fmt=raw&{1}&client=remote'.format(
-                self.endpoint, qs)
-            self.logger.debug(
-                'RemoteOpticalPi making raw_img request to: {0}'.format(url))
-
-            img_width_px = int(self.settings.resolution.split('x')[0])
-            img_height_px = int(self.settings.resolution.split('x')[1])
-
-            req_start = time.time()
-            resp = requests.get(url, stream=True, timeout=45).raw
-            self.logger.debug('RemoteOpticalPi image returned in {0:.3f} seconds'.format(
-                time.time() - req_start))
-            img_arr_serial = np.asarray(bytearray(resp.read()), dtype="uint8")
-            self.logger.debug('RemoteOpticalPi img_arr_serial: {} w: {} h: {} w*h: {}'.format(
-                img_arr_serial.shape, 
-                img_width_px,
-                img_height_px,
-                (img_width_px * img_height_px))
-            )
-
-            # resize array
-            chans = img_arr_serial.shape[0] // (img_width_px * img_height_px)
-            if chans == 3:
-                img_arr = np.reshape(img_arr_serial.astype(
-                    np.uint8), (img_height_px, img_width_px, 3))
-            else:
-                img_arr = np.resize(
-                    img_arr_serial, (img_height_px, img_width_px)).astype(np.uint8)
+            frames, _headers = self.fetch_frames()
+            img_arr, self.last_header = frames[0]
+            self.logger.debug('RemoteOpticalPi frame: {0} captured {1:.3f} secs ago'.format(
+                img_arr.shape, time.time() - self.last_header.capture_time))
 
             if self.debug:
                 out_img = Image.fromarray(img_arr)
@@ -332,3 +462,77 @@ class RemoteOpticalPi(BaseCamera):
                 'Error in RemoteOpticalPi snap: {0} on line {1}'.format(e, err_line))
 
         return img_arr
+
+    def snap_roi(self, viewport, lores_factor=constants.REMOTE_FRAME_LORES_FACTOR):
+        '''
+            fetch the viewport at full resolution, plus the whole frame reduced by lores_factor
+            returns roi array, roi header, lores array, lores header
+        '''
+        roi_arr = roi_header = lores_arr = lores_header = None
+        try:
+            frames, _headers = self.fetch_frames('&roi={0}&lores={1}'.format(roi_to_qs(viewport), lores_factor))
+            roi_arr, roi_header = frames[0]
+            if len(frames) > 1:
+                lores_arr, lores_header = frames[1]
+            self.last_header = roi_header
+            self.last_lores = lores_arr
+            self.logger.debug('RemoteOpticalPi roi: {0} at {1} lores: {2}'.format(
+                roi_arr.shape,
+                (roi_header.origin_row, roi_header.origin_col),
+                None if lores_arr is None else lores_arr.shape))
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.logger.error(
+                'Error in RemoteOpticalPi snap_roi: {0} on line {1}'.format(e, err_line))
+
+        return roi_arr, roi_header, lores_arr, lores_header
+
+    def snap_prospects(
+        self,
+        fence_polygon_px,
+        viewport=None,
+        prospect=True,
+        zoom_scale_factor=4,
+        lores_factor=constants.REMOTE_FRAME_LORES_FACTOR,
+        index_prefix='edge'
+    ):
+        '''
+            have the remote node capture and prospect, returning just the candidates
+            if prospect is False the node crops to viewport without prospecting
+            returns viewports carrying their full-res sub_array, lores array, lores header
+        '''
+        prospect_vps = []
+        lores_arr = lores_header = None
+        try:
+            extra_qs = '&fence={0}&prospect={1}&zoom={2}&lores={3}'.format(
+                ','.join(str(int(v)) for v in fence_polygon_px),
+                1 if prospect else 0,
+                zoom_scale_factor,
+                lores_factor
+            )
+            if viewport is not None and not viewport.isnull:
+                extra_qs += '&viewport={0}'.format(viewport_to_qs(viewport))
+            frames, headers = self.fetch_frames(extra_qs, page='edge_prospects')
+            vp_specs = json.loads(headers.get('Content-Info-Viewports', '[]'))
+            for pid, (spec, (sub_arr, sub_header)) in enumerate(zip(vp_specs, frames)):
+                vp = Viewport.from_corners(
+                    tuple(spec[:2]), tuple(spec[2:]), index='{0}-{1}'.format(index_prefix, pid))
+                vp.sub_array = sub_arr
+                vp.capture_time = sub_header.capture_time
+                prospect_vps.append(vp)
+            if len(frames) > len(vp_specs):
+                lores_arr, lores_header = frames[-1]
+                self.last_header = lores_header
+                self.last_lores = lores_arr
+            self.logger.debug('RemoteOpticalPi edge prospects: {0} sub-arrays {1} lores: {2}'.format(
+                len(prospect_vps),
+                [vp.sub_array.shape for vp in prospect_vps],
+                None if lores_arr is None else lores_arr.shape))
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.logger.error(
+                'Error in RemoteOpticalPi snap_prospects: {0} on line {1}'.format(e, err_line))
+
+        return prospect_vps, lores_arr, lores_header
@@ -0,0 +1,444 @@
+'''
+    Closed loop simulation
+
+    Drives the virtual mower around the configured route with the configured
+    strategy, as the governor does, but on the stepped simulated clock, so
+    a whole itinerary runs as fast as the cpu allows. Poses come from the
+    virtual mower itself, or with --vision from rendering and locating each
+    frame through the locate pipeline.
+
+    Reports completion time, cut coverage of the fence and loop throughput.
+
+    With --heatmap, the strategy's decisions over the whole arena, on the
+    route's first path at the start heading, are evaluated as a batch of
+    hypothetical poses and saved as an image before the run.
+
+    python closed_loop_sim.py [--vision] [--mowers 1] [--max-mins 120] [--report sim.json] [--heatmap map.png]
+'''
+from argparse import ArgumentParser
+from math import radians, hypot
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+from shapely.geometry import LineString, Polygon
+
+import configurations
+import constants
+import metrics
+import poses
+from fleet import MowerContext, FleetLocator, estimate_landing_time
+from forms.rule import RuleScope
+from itinerary import Itinerary
+from locate_bench import LocateBenchHost, stage_summary, peak_rss_mb, \
+    locate_frame, render_pose_frame, render_poses_frame
+from odometry import Movement
+from rules_engine import RulesEngine
+from sim_clock import clock
+from snapshot import Snapshot
+from strategy_batch import grid_poses, heatmap_image
+from utilities import decode_telemetry
+from virtual import vmotion_lib, vmower
+from virtual.vfleet import VirtualFleet
+
+
+class ClosedLoopHost(LocateBenchHost):
+    '''
+        locate host plus the rules engine and an in-process virtual mower
+        commands are called directly rather than sent over udp
+    '''
+
+    def __init__(self, config, logger):
+        super().__init__(config, logger)
+        self.rules_engine = RulesEngine(
+            config['current.strategy'],
+            config['strategy.rules'],
+            config['strategy.terms'],
+            None,
+            self.data_mapper
+        )
+        self.itinerary = None
+        self.telem = {}
+        self.telemetry_updated = 0
+
+    def mower_cmd(self, cmd):
+        return vmower.process_cmd(cmd.lstrip('>'))
+
+    def fetch_telemetry(self):
+        self.telem = decode_telemetry(
+            self.config, self.mower_cmd('>get_telemetry()'), self.logger)
+        self.telemetry_updated = clock.time()
+
+    def mower_pose(self):
+        '''
+            the virtual mower's true pose
+        '''
+        x_m, y_m, t_deg = [float(v) for v in self.mower_cmd('>get_pose()').split(',')]
+        return poses.Pose(x_m, y_m, radians(t_deg), mapper=self.data_mapper)
+
+
+def fence_polygon_m(config):
+    return Polygon([
+        (pt.x * config['arena.width_m'] / 100, pt.y * config['arena.length_m'] / 100)
+        for pt in config['lawn.fence']
+    ])
+
+
+def coverage_pc(path_m, fence_m, swath_m):
+    '''
+        percentage of the fence area swept by a swath along the path
+    '''
+    if len(path_m) < 2 or fence_m.area == 0:
+        return 0.0
+    swept_m = LineString(path_m).buffer(swath_m / 2, cap_style=2)
+    return round(100 * swept_m.intersection(fence_m).area / fence_m.area, 2)
+
+
+def run_itinerary(
+    host,
+    route_m,
+    start_pose_m,
+    max_sim_secs=7200,
+    frame_secs=constants.THROTTLE_CAMERA_SNAP_SECS,
+    vision=False,
+    logger=None
+):
+    '''
+        the governor loop in lock step with the virtual mower
+        each pass locates, selects and executes a rule, then sleeps
+        one camera frame on the stepped clock, which moves the mower
+    '''
+    config = host.config
+    metrics.registry.reset()
+    clock.enable()
+    sim_start = clock.time()
+    wall_start = time.perf_counter()
+
+    vmotion_lib.init()
+    vmotion_lib.set_pose(
+        *start_pose_m, config['mower.axle_track_m'], config['mower.velocity_full_speed_mps'])
+    host.fetch_telemetry()
+    host.itinerary = Itinerary(host.mower_pose(), route_m, logger=logger)
+    host.rules_engine.route_started_time = host.rules_engine.stage_started_time = sim_start
+
+    stage_samples = {'prospect': [], 'probe': [], 'locate': [], 'loop': []}
+    path_m = []
+    stage_secs = []
+    position_errors = []
+    num_loops = num_commands = num_found = 0
+    landing_time = 0
+    last_pose = None
+
+    while not host.itinerary.is_complete and clock.time() - sim_start < max_sim_secs:
+        loop_start = time.perf_counter()
+        true_pose = host.mower_pose()
+        path_m.append((true_pose.arena.c_x_m, true_pose.arena.c_y_m))
+
+        if vision:
+            img_arr = np.asarray(render_pose_frame(host, true_pose))
+            pose, _tracked, _num_prospects = locate_frame(
+                host, img_arr, num_loops, last_pose, stage_samples, logger)
+            last_pose = pose
+        else:
+            pose = true_pose
+        if pose is not None:
+            num_found += 1
+            position_errors.append(hypot(
+                pose.arena.c_x_m - true_pose.arena.c_x_m, pose.arena.c_y_m - true_pose.arena.c_y_m))
+
+            snapshot = Snapshot(host.snapshot_buffer, num_loops % constants.MAX_SNAPSHOT_ID, logger)
+            snapshot._pose = pose
+            host.snapshot_buffer[snapshot.ssid] = snapshot
+            # context might need self-dependencies, so build twice
+            for _pass in range(2):
+                host.rules_engine.build_context(snapshot, host.itinerary, config, host.telem)
+
+            landed = landing_time - clock.time() <= 0
+            if landed and clock.time() - host.telemetry_updated > constants.MOWER_TELEMETRY_PERIOD_SECS:
+                host.fetch_telemetry()
+
+            scope = RuleScope.STATIONARY if landed else RuleScope.IN_FLIGHT
+            selected_rule = host.rules_engine.select(scope=scope)
+            if selected_rule is not None:
+                arrived = selected_rule.stage_complete
+                if selected_rule.is_executable:
+                    host.rules_engine.last_command = (
+                        selected_rule.left_speed_result,
+                        selected_rule.right_speed_result,
+                        selected_rule.duration_result
+                    )
+                    host.rules_engine.last_command_code = Movement.get_movement_code(
+                        selected_rule.left_speed_result,
+                        selected_rule.right_speed_result
+                    ).name
+                    host.mower_cmd(selected_rule.compile_cmd())
+                    num_commands += 1
+                    if selected_rule.auxiliary:
+                        host.fetch_telemetry()
+                    landing_time = estimate_landing_time(
+                        selected_rule, constants.LANDING_TIME_OVERHEAD_SECS)
+                if arrived:
+                    stage_secs.append(clock.time() - host.rules_engine.stage_started_time)
+                    host.itinerary.advance_pointer()
+                    host.rules_engine.stage_started_time = clock.time()
+
+        num_loops += 1
+        stage_samples['loop'].append(time.perf_counter() - loop_start)
+        # next camera frame, the mower moves meanwhile
+        clock.sleep(frame_secs)
+
+    completed = host.itinerary.is_complete
+    if completed:
+        host.mower_cmd('cutter(0, -1)')
+    sim_secs = clock.time() - sim_start
+    wall_secs = time.perf_counter() - wall_start
+    clock.disable()
+
+    stages = {name: stage_summary(samples) for name, samples in stage_samples.items() if len(samples) > 0}
+    for name, hist in metrics.registry.as_dict().items():
+        stages.setdefault(name, {
+            'count': hist['count'],
+            'mean_ms': round(hist['mean'] * 1000, 3),
+            'p50_ms': round(hist['p50'] * 1000, 3),
+            'p95_ms': round(hist['p95'] * 1000, 3),
+            'max_ms': round(hist['max'] * 1000, 3)
+        })
+    return {
+        'completed': completed,
+        'completion_secs': round(sim_secs, 2) if completed else None,
+        'simulated_secs': round(sim_secs, 2),
+        'wall_secs': round(wall_secs, 3),
+        'speed_up': round(sim_secs / wall_secs, 1) if wall_secs > 0 else None,
+        'destinations': {
+            'reached': len(stage_secs),
+            'total': host.itinerary.num_destinations,
+            'stage_secs': [round(s, 2) for s in stage_secs]
+        },
+        'loops': num_loops,
+        'loops_per_sec': round(num_loops / wall_secs, 1) if wall_secs > 0 else None,
+        'commands': num_commands,
+        'located_rate': round(num_found / num_loops, 4) if num_loops > 0 else 0.0,
+        'position_error_m': round(float(np.mean(position_errors)), 4) if len(position_errors) > 0 else None,
+        'path_m': round(LineString(path_m).length, 2) if len(path_m) > 1 else 0.0,
+        'coverage_pc': coverage_pc(path_m, fence_polygon_m(config), config['mower.body_width_m']),
+        'stages': stages,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def save_strategy_heatmap(host, route_m, start_pose_m, img_path, step_m=constants.STRATEGY_HEATMAP_STEP_M):
+    '''
+        what-if map of the rule selected at each pose over the arena,
+        on the route's first path at the start heading
+    '''
+    config = host.config
+    width_m, length_m = config['arena.width_m'], config['arena.length_m']
+    launch_pose = poses.Pose(start_pose_m[0], start_pose_m[1], radians(start_pose_m[2]), mapper=host.data_mapper)
+    itinerary = Itinerary(launch_pose, route_m, logger=host.logger)
+    grid, grid_shape = grid_poses(width_m, length_m, step_m, radians(start_pose_m[2]))
+    result = host.rules_engine.evaluate_batch(grid, itinerary, config, host.telem)
+    heatmap_image(result, grid_shape, (800, round(800 * length_m / width_m)), width_m, length_m,
+                  itinerary).save(img_path)
+    return result
+
+
+def run_fleet(
+    host,
+    route_m,
+    count,
+    max_sim_secs=7200,
+    frame_secs=constants.THROTTLE_CAMERA_SNAP_SECS,
+    vision=False,
+    logger=None
+):
+    '''
+        count virtual mowers sharing the route, each driving its own part of it from
+        a start spread across the arena, each with its own control context,
+        located together in one rendered frame
+    '''
+    config = host.config
+    metrics.registry.reset()
+    clock.enable()
+    sim_start = clock.time()
+    wall_start = time.perf_counter()
+
+    fleet = VirtualFleet(count)
+    fleet.init()
+
+    def mower_pose(i):
+        x_m, y_m, t_deg = [float(v) for v in fleet.process_cmd(i, 'get_pose()').split(',')]
+        return poses.Pose(x_m, y_m, radians(t_deg), mapper=host.data_mapper)
+
+    contexts = []
+    for i, part in enumerate(np.array_split(np.arange(len(route_m)), count)):
+        part_m = [route_m[k] for k in part]
+        start_m = (config['arena.width_m'] * (i + 1) / (count + 1), config['arena.length_m'] / 2)
+        fleet.motions[i].set_pose(
+            *start_m, 0, config['mower.axle_track_m'], config['mower.velocity_full_speed_mps'])
+        ctx = MowerContext(
+            '{0}-{1}'.format(config['current.mower'], i),
+            config,
+            host.data_mapper,
+            lambda cmd, i=i: fleet.process_cmd(i, cmd.lstrip('>')),
+            logger
+        )
+        ctx.fetch_telemetry()
+        ctx.itinerary = Itinerary(mower_pose(i), part_m, logger=logger)
+        ctx.rules_engine.route_started_time = ctx.rules_engine.stage_started_time = sim_start
+        ctx.seed(*start_m)
+        contexts.append(ctx)
+    locator = FleetLocator(host, contexts, logger=logger)
+
+    loop_samples = []
+    locate_samples = []
+    position_errors = {ctx.name: [] for ctx in contexts}
+    num_loops = 0
+    while not all(ctx.itinerary.is_complete for ctx in contexts) and clock.time() - sim_start < max_sim_secs:
+        loop_start = time.perf_counter()
+        true_poses = [mower_pose(i) for i in range(count)]
+        if vision:
+            # one frame holds every mower, and is located once for all of them
+            start = time.perf_counter()
+            img_arr = np.asarray(render_poses_frame(host, true_poses))
+            located = locator.locate(img_arr, num_loops)
+            locate_samples.append(time.perf_counter() - start)
+        else:
+            located = {ctx.name: true_pose for ctx, true_pose in zip(contexts, true_poses)}
+        for ctx, true_pose in zip(contexts, true_poses):
+            pose = located[ctx.name]
+            if ctx.itinerary.is_complete or pose is None:
+                continue
+            position_errors[ctx.name].append(hypot(
+                pose.arena.c_x_m - true_pose.arena.c_x_m, pose.arena.c_y_m - true_pose.arena.c_y_m))
+            ctx.govern(pose, num_loops)
+        num_loops += 1
+        loop_samples.append(time.perf_counter() - loop_start)
+        # next camera frame, the mowers move meanwhile
+        clock.sleep(frame_secs)
+
+    for i, ctx in enumerate(contexts):
+        if ctx.itinerary.is_complete:
+            fleet.process_cmd(i, 'cutter(0, -1)')
+    sim_secs = clock.time() - sim_start
+    wall_secs = time.perf_counter() - wall_start
+    clock.disable()
+
+    mowers = {}
+    for ctx in contexts:
+        errors = position_errors[ctx.name]
+        mowers[ctx.name] = {
+            'completed': ctx.itinerary.is_complete,
+            'destinations': '{0}/{1}'.format(ctx.stats['stages'], ctx.itinerary.num_destinations),
+            'commands': ctx.stats['commands'],
+            'position_error_m': round(float(np.mean(errors)), 4) if len(errors) > 0 else None,
+            # a pose far from its own mower has been assigned the wrong one
+            'misassigned': sum(1 for e in errors if e > constants.FLEET_ASSIGNMENT_GATE_M)
+        }
+    return {
+        'mowers': mowers,
+        'completed': all(m['completed'] for m in mowers.values()),
+        'simulated_secs': round(sim_secs, 2),
+        'wall_secs': round(wall_secs, 3),
+        'speed_up': round(sim_secs / wall_secs, 1) if wall_secs > 0 else None,
+        'loops': num_loops,
+        'loops_per_sec': round(num_loops / wall_secs, 1) if wall_secs > 0 else None,
+        'locator': locator.stats,
+        'stages': {name: stage_summary(samples) for name, samples in
+                   (('loop', loop_samples), ('locate', locate_samples)) if len(samples) > 0},
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Proxymow closed loop simulation')
+    parser.add_argument('--config', default='configs/config.xml')
+    parser.add_argument('--settings', default='configs/settings.yml')
+    parser.add_argument('--start', default=None, help='x_m,y_m,heading_deg - default arena centre')
+    parser.add_argument('--max-mins', type=float, default=120)
+    parser.add_argument('--frame-secs', type=float, default=constants.THROTTLE_CAMERA_SNAP_SECS)
+    parser.add_argument('--vision', action='store_true', help='locate rendered frames')
+    parser.add_argument('--mowers', type=int, default=1, help='virtual mowers sharing the route')
+    parser.add_argument('--report', default=None, help='json report path')
+    parser.add_argument('--heatmap', default=None, help='strategy decision heat-map image path')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sim_logger = logging.getLogger('locator')
+
+    configurations.Config.SAVE_PERIOD_SECS = 0
+    sim_config = configurations.Config(args.settings, args.config, readonly=True)
+    sim_host = ClosedLoopHost(sim_config, sim_logger)
+    if args.start is not None:
+        start_pose_m = [float(v) for v in args.start.split(',')]
+    else:
+        start_pose_m = [sim_config['arena.width_m'] / 2, sim_config['arena.length_m'] / 2, 0]
+
+    if args.heatmap is not None:
+        heatmap = save_strategy_heatmap(sim_host, sim_config['lawn.route'], start_pose_m, args.heatmap)
+        print('heatmap           {0} poses in {1:.1f}ms {2} written to {3}'.format(
+            len(heatmap), heatmap.secs * 1000, heatmap.counts(), args.heatmap))
+
+    if args.mowers > 1:
+        summary = run_fleet(
+            sim_host,
+            sim_config['lawn.route'],
+            args.mowers,
+            max_sim_secs=args.max_mins * 60,
+            frame_secs=args.frame_secs,
+            vision=args.vision,
+            logger=sim_logger
+        )
+        for key in ('completed', 'simulated_secs', 'wall_secs', 'speed_up', 'loops', 'loops_per_sec',
+                    'locator', 'peak_rss_mb'):
+            print('{0:<17} {1}'.format(key, summary[key]))
+        for name, stats in list(summary['mowers'].items()) + list(summary['stages'].items()):
+            print('{0:<17} {1}'.format(name, stats))
+        if args.report is not None:
+            with open(args.report, 'w') as report_file:
+                json.dump(summary, report_file, indent=2)
+        sys.exit(0)
+
+    summary = run_itinerary(
+        sim_host,
+        sim_config['lawn.route'],
+        start_pose_m,
+        max_sim_secs=args.max_mins * 60,
+        frame_secs=args.frame_secs,
+        vision=args.vision,
+        logger=sim_logger
+    )
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': {
+            'machine': platform.machine(),
+            'python': platform.python_version(),
+            'numpy': np.__version__
+        },
+        'inputs': {
+            'config': os.path.abspath(args.config),
+            'strategy': sim_config['current.strategy'],
+            'route_nodes': len(sim_config['lawn.route']),
+            'start': start_pose_m,
+            'frame_secs': args.frame_secs,
+            'vision': args.vision
+        }
+    }
+    report.update(summary)
+
+    for key in ('completed', 'completion_secs', 'simulated_secs', 'wall_secs', 'speed_up',
+                'loops', 'loops_per_sec', 'commands', 'located_rate', 'position_error_m',
+                'path_m', 'coverage_pc', 'peak_rss_mb'):
+        print('{0:<17} {1}'.format(key, summary[key]))
+    print('destinations      {0}'.format(summary['destinations']))
+    for name, stats in summary['stages'].items():
+        print('{0:<17} {1}'.format(name, stats))
+    if args.report is not None:
+        with open(args.report, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        print('report written to {0}'.format(args.report))
@@ -4,7 +4,6 @@ import os
 import sys
 from pathlib import Path
 import time
-import importlib.util
 import lxml.etree as ET
 from math import pi, acos
 import copy
@@ -14,7 +13,7 @@ import logging
 
 import constants
 from vis_lib import matrices_from_quad_points
-from utilities import route_pc_to_metres
+import route_planner
 from pxm_exceptions import *  # @UnusedWildImport
 from forms.morphable import Morphable
 from forms.rule import Rule
@@ -129,6 +128,9 @@ class Config():
             cur_mower = self.settings['mower']
             self.database['current.mower'] = cur_mower
 
+            # further mowers governed alongside the current mower, under the same camera
+            self.database['current.fleet'] = list(self.settings.get('fleet') or [])
+
             strategies_xpath = "navigation_strategies/strategy"
             strategy_nodes = self.cfg_root.findall(strategies_xpath)
             strategies = [node.attrib['name'] for node in strategy_nodes]
@@ -398,6 +400,22 @@ class Config():
             dev_endpoint_attr = dev_node.attrib["endpoint"] if 'endpoint' in dev_node.attrib else None
             self.database['device.endpoint'] = dev_endpoint_attr if dev_endpoint_attr is not None and dev_endpoint_attr != 'None' else None
 
+            # further cameras on the lawn, each with its own calibration quad
+            # dimensions default to the lawn's, as the device camera's calibration does
+            cameras = []
+            for cam_node in profile_node.findall('./cameras/camera'):
+                cam_calib_pts = sorted(cam_node.findall('point'), key=lambda pt: int(pt.attrib['index']))
+                cameras.append({
+                    'name': cam_node.attrib['name'],
+                    'endpoint': cam_node.attrib['endpoint'],
+                    'width_m': float(cam_node.attrib.get('width_m', lawn_width_m)),
+                    'length_m': float(cam_node.attrib.get('length_m', lawn_length_m)),
+                    'offset_x_m': float(cam_node.attrib.get('offset_x_m', 0.0)),
+                    'offset_y_m': float(cam_node.attrib.get('offset_y_m', 0.0)),
+                    'calib_pc_points': [[float(pt.attrib['x']), float(pt.attrib['y'])] for pt in cam_calib_pts]
+                })
+            self.database['cameras'] = cameras
+
             # camera optical properties
 
             # polymorphic camera optical properties
@@ -699,34 +717,16 @@ class Config():
                 cur_pattern is not None and 
                 cur_pattern != 'None'):
 
-                # from Current Pattern Name - obtain module_name
-                rel_pat_mod_name = cur_pattern.replace(' ', '_').lower()
-                try:
-                    file_path = os.path.join(
-                        abs_patt_path, rel_pat_mod_name) + '.py'
-                    module_name = rel_pat_mod_name
-                    spec = importlib.util.spec_from_file_location(
-                        module_name, file_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                except Exception as e1:
-                    err_line = sys.exc_info()[-1].tb_lineno
-                    self.logger.error(
-                        'Config Parse Error loading pattern plug-in: ' + str(e1) + ' on line ' + str(err_line))
-
-                pattern_logger = logging.getLogger('mow-patterns')
+                # planned once per pattern, fence, arena and cutter, then cached
+                planned = route_planner.planner.plan(
+                    cur_pattern, fence_points, arena_width_m, arena_length_m, cutter_dia_m, self.debug)
+                route_pc = planned.route_pc
+                route_m = planned.route_m
+                # make error message available
+                self.database['lawn.route-exception'] = planned.exception
 
-                try:
-                    route_pc = module.calculate_route(
-                        fence_points, arena_width_m, arena_length_m, cutter_dia_m, pattern_logger, self.debug)
-                    route_m = route_pc_to_metres(
-                        arena_width_m, arena_length_m, route_pc, min_internode_dist_m=constants.MINIMUM_INTER_NODE_DISTANCE_M)
-                    self.database['lawn.route-exception'] = ''
-                except Exception as cre:
-                    route_m = []
-                    route_pc = []
-                    # make error message available
-                    self.database['lawn.route-exception'] = str(cre)
+                # plan the other patterns in the background, ready for selection
+                route_planner.planner.precompute(fence_points, arena_width_m, arena_length_m, cutter_dia_m)
             else:
                 route_m = []
                 route_pc = []
@@ -10,6 +10,31 @@ LOG_MAX_BYTES = 10000000  # 10Mb
 '''
 LOG_BACKUP_COUNT = 12
 
+'''
+    LOG_ASYNC - loggers enqueue records for a writer thread per log file [True | False]
+'''
+LOG_ASYNC = True
+
+'''
+    LOG_QUEUE_SIZE - records queued per log file before further records are dropped and counted
+'''
+LOG_QUEUE_SIZE = 10000
+
+'''
+    LOG_BATCH_SIZE - most records a log writer handles between flushes
+'''
+LOG_BATCH_SIZE = 256
+
+'''
+    LOG_FLUSH_SECS - longest a written record waits in the file buffer before it is flushed
+'''
+LOG_FLUSH_SECS = 1.0
+
+'''
+    LOG_WRITE_BUFFER_BYTES - log file buffer, so records reach the SD card in large writes
+'''
+LOG_WRITE_BUFFER_BYTES = 65536
+
 '''
     RESOLUTIONS - pairs of 4:3 width, height pixel tuples
 '''
@@ -71,6 +96,21 @@ else:
 '''
 FENCE_MASKING = True
 
+'''
+    FENCE_MASK_SCALES - pyramid zoom factors whose fence masks are built when the fence changes
+'''
+FENCE_MASK_SCALES = (4,)
+
+'''
+    EDGE_PIPELINE - 'float32' fused blur+sobel with reusable scratch buffers, or 'skimage' for the float64 filters
+'''
+EDGE_PIPELINE = 'float32'
+
+'''
+    EDGE_SCRATCH_CACHE_SIZE - number of array shapes whose edge pipeline scratch buffers are retained per thread
+'''
+EDGE_SCRATCH_CACHE_SIZE = 8
+
 '''
     MAX_SNAPSHOT_ID - maximum snapshot id before rolling around
 '''
@@ -91,6 +131,41 @@ ARCHIVE_IMAGE_RATE_SECS = 10
 '''
 ARCHIVE_IMAGE_MAX_COUNT = 1000
 
+'''
+    FLIGHT_RECORDER_ENABLED - record frames, poses, commands and telemetry of each excursion to a ring file
+'''
+FLIGHT_RECORDER_ENABLED = True
+
+'''
+    FLIGHT_RECORDER_FILE_BYTES - size of each excursion's ring file, the oldest records are overwritten when full
+'''
+FLIGHT_RECORDER_FILE_BYTES = 32 * 1024 * 1024
+
+'''
+    FLIGHT_RECORDER_MAX_FILES - number of excursion ring files kept
+'''
+FLIGHT_RECORDER_MAX_FILES = 4
+
+'''
+    FLIGHT_RECORDER_QUEUE_SIZE - records waiting to be written, beyond which records are dropped
+'''
+FLIGHT_RECORDER_QUEUE_SIZE = 256
+
+'''
+    FLIGHT_RECORDER_FRAME_PERIOD_SECS - minimum interval between whole frames recorded, viewports are recorded every snapshot
+'''
+FLIGHT_RECORDER_FRAME_PERIOD_SECS = 2.0
+
+'''
+    FLIGHT_RECORDER_JPEG_QUALITY - compression quality of recorded frames and viewports
+'''
+FLIGHT_RECORDER_JPEG_QUALITY = 70
+
+'''
+    FLIGHT_RECORDER_SYNC_SECS - interval between flushes of the ring file to disk
+'''
+FLIGHT_RECORDER_SYNC_SECS = 5.0
+
 '''
     DEBUG_LOCATE_LEVEL - level at which to debug locating
     0 - no debugging
@@ -159,11 +234,22 @@ HIRES_CONTOUR_MINIMUM_POINT_COUNT = 35
 '''
 CONTOUR_POINT_COUNT_THRESHOLD = 0.175
 
+'''
+    CONTOUR_BACKEND - candidate contour extraction, 'marching' squares over the whole array
+                    - or 'components' to label, filter and trace only the surviving connected components
+'''
+CONTOUR_BACKEND = 'components'
+
 '''
     CONTOUR_TABLE_MAX_ROWS - maximum rows to display in table
 '''
 CONTOUR_TABLE_MAX_ROWS = 12
 
+'''
+    SNAPSHOT_DOCUMENT_COMPRESS_LEVEL - gzip level for the json documents published with each planned snapshot
+'''
+SNAPSHOT_DOCUMENT_COMPRESS_LEVEL = 6
+
 '''
     MOWER_TELEMETRY_PERIOD_SECS - period between requests for mower telemetry
 '''
@@ -215,6 +301,16 @@ ANIMAL_MIN_PT_COUNT = -1  # 150 looks reasonable, -1 to disable because it doesn
 '''
 MINIMUM_INTER_NODE_DISTANCE_M = 0.05
 
+'''
+    ROUTE_CACHE_SIZE - number of planned routes held by the route planner, all patterns for a few fences
+'''
+ROUTE_CACHE_SIZE = 48
+
+'''
+    ITINERARY_SPEED_WINDOW_SECS - period of recent progress along the route from which speed and ETA are estimated
+'''
+ITINERARY_SPEED_WINDOW_SECS = 20.0
+
 '''
     ESCALATION_ENABLED - [True | False]
 
@@ -242,6 +338,51 @@ WAIT_FOR_CAMERA_SECS = 0.0
 '''
 THROTTLE_CAMERA_SNAP_SECS = 0.75  # 1.5 to simulate usb speeds
 
+'''
+    CAMERA_SESSIONS - keep one picamera2 configuration for the locate stream and serve
+                    - other clients by resampling, flipping and colour converting in software [True | False]
+'''
+CAMERA_SESSIONS = True
+
+'''
+    CAMERA_SESSION_FRAME_MAX_AGE_SECS - age beyond which a secondary client's frame is captured afresh
+'''
+CAMERA_SESSION_FRAME_MAX_AGE_SECS = 1.0
+
+'''
+    MULTI_CAMERA_FUSION_RADIUS_M - detections from overlapping cameras this close to the most confident
+                                 - are averaged into the fused pose, weighted by confidence
+'''
+MULTI_CAMERA_FUSION_RADIUS_M = 0.15
+
+'''
+    MULTI_CAMERA_FOOTPRINT_MARGIN_M - a predicted pose this far inside a camera's footprint
+                                    - is prospected on that camera alone
+'''
+MULTI_CAMERA_FOOTPRINT_MARGIN_M = 0.3
+
+'''
+    FLEET_ASSIGNMENT_GATE_M - furthest a projection may be from a mower's predicted position to be assigned to it
+'''
+FLEET_ASSIGNMENT_GATE_M = 0.5
+
+'''
+    FLEET_SIGNATURE_WEIGHT_M - assignment cost, in metres, of a target span differing wholly from the mower's target length
+'''
+FLEET_SIGNATURE_WEIGHT_M = 0.5
+
+'''
+    FLEET_CANDIDATE_MERGE_M - projections closer than this are taken to be the same target
+'''
+FLEET_CANDIDATE_MERGE_M = 0.1
+
+'''
+    SIMULATED_CLOCK_RATE - run the virtual mower, virtual camera and governor on a simulated clock
+                         - this many times faster than real time, None for the wall clock
+                         - only meaningful with a virtual mower and camera
+'''
+SIMULATED_CLOCK_RATE = None
+
 '''
     RESET_LAST_VISITED_NODE_ON_PROFILE_CHANGE - Flag to indicate last visited node will be reset
 '''
@@ -271,4 +412,150 @@ DIGITAL_SHADOW_DELTA_INTENSITY = 0
 '''
     VISUAL_POSE_HISTORY - display kite tails
 '''
-VISUAL_POSE_HISTORY = True
\ No newline at end of file
+VISUAL_POSE_HISTORY = True
+'''
+    GRID_OVERLAY_CACHE_SIZE - number of pre-rasterised grid overlay layers retained
+'''
+GRID_OVERLAY_CACHE_SIZE = 8
+
+'''
+    SIGHTING_HISTORY_LENGTH - number of recent sightings retained per cluster
+'''
+SIGHTING_HISTORY_LENGTH = 32
+
+'''
+    SIGHTING_MAX_AGE_SECS - age beyond which unseen sighting clusters are evicted
+'''
+SIGHTING_MAX_AGE_SECS = 3600
+
+'''
+    SIGHTING_HALF_LIFE_SECS - half-life for decaying sighting cluster weights
+'''
+SIGHTING_HALF_LIFE_SECS = 600
+
+'''
+    SIGHTING_HOTSPOT_MIN_COUNT - sightings required before a cluster can be a hotspot
+'''
+SIGHTING_HOTSPOT_MIN_COUNT = 20
+
+'''
+    SIGHTING_HOTSPOT_MIN_SPAN_SECS - period a cluster must persist before it can be a hotspot
+'''
+SIGHTING_HOTSPOT_MIN_SPAN_SECS = 300
+
+'''
+    METRICS_ENABLED - record stage timing histograms [True | False]
+'''
+METRICS_ENABLED = True
+
+'''
+    METRICS_BUCKETS_SECS - upper bounds of the stage timing histogram buckets
+'''
+METRICS_BUCKETS_SECS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+'''
+    REMOTE_FRAME_CODEC - compression requested by a remote camera client [raw | zlib | png | jpeg]
+'''
+REMOTE_FRAME_CODEC = 'zlib'
+
+'''
+    REMOTE_FRAME_ZLIB_LEVEL - zlib compression level for lossless remote frames
+'''
+REMOTE_FRAME_ZLIB_LEVEL = 1
+
+'''
+    REMOTE_FRAME_JPEG_QUALITY - jpeg quality for lossy remote frames
+'''
+REMOTE_FRAME_JPEG_QUALITY = 90
+
+'''
+    REMOTE_FRAME_LORES_FACTOR - reduction of the full frame sent alongside a region of interest
+'''
+REMOTE_FRAME_LORES_FACTOR = 4
+
+'''
+    REMOTE_FRAME_POOL_SIZE - keep-alive connections held open to the remote camera
+'''
+REMOTE_FRAME_POOL_SIZE = 2
+
+'''
+    REMOTE_FRAME_TIMEOUT_SECS - connect and read timeouts for remote frame requests
+'''
+REMOTE_FRAME_TIMEOUT_SECS = (5, 45)
+
+'''
+    REMOTE_EDGE_PROSPECTING - let a remote camera node prospect and return just the candidate sub-arrays [True | False]
+'''
+REMOTE_EDGE_PROSPECTING = False
+
+'''
+    REPLAY_CAMERA_FOLDER - folder of recorded raw-N.jpg frames served in place of the camera (None to disable)
+'''
+REPLAY_CAMERA_FOLDER = None
+
+'''
+    STARTUP_BACKGROUND_INIT - serve the web interface first, building mappers, fence masks,
+                            - camera and rules engine in a background initialiser
+'''
+STARTUP_BACKGROUND_INIT = True
+
+'''
+    MAP_CACHE_MAX_FILES - number of populated mappers kept on disk, keyed by calibration, to load at startup
+'''
+MAP_CACHE_MAX_FILES = 8
+
+'''
+    RENDER_SCHEDULER_ENABLED - run web interface image renders on the render scheduler, away from the control loop
+'''
+RENDER_SCHEDULER_ENABLED = True
+
+'''
+    RENDER_THREADS - renders needing the server's state run on this many threads at once
+'''
+RENDER_THREADS = 1
+
+'''
+    RENDER_PROCESSES - renders of picklable inputs, e.g. excursion plots, run in this many worker processes
+                     - zero to run them on the render threads
+'''
+RENDER_PROCESSES = 1
+
+'''
+    RENDER_MAX_PENDING - renders waiting or running beyond which a request is served its last render, or refused
+'''
+RENDER_MAX_PENDING = 2
+
+'''
+    RENDER_DEADLINE_SECS - a render taking longer is served its last render, the new one cached when complete
+'''
+RENDER_DEADLINE_SECS = 3.0
+
+'''
+    RENDER_NICE - niceness added to render threads and processes
+'''
+RENDER_NICE = 10
+
+'''
+    RENDER_CACHE_SIZE - number of distinct requests whose last render is kept
+'''
+RENDER_CACHE_SIZE = 32
+
+'''
+    RENDER_JITTER_PROBE_PERIOD_SECS - wake period of the thread measuring control loop jitter
+'''
+RENDER_JITTER_PROBE_PERIOD_SECS = 0.01
+
+'''
+    IMAGE_SINK_WORKERS - threads encoding and saving archive and debug images away from the locate path
+'''
+IMAGE_SINK_WORKERS = 1
+
+'''
+    IMAGE_SINK_QUEUE_SIZE - images waiting to be saved, beyond which the oldest is dropped
+'''
+IMAGE_SINK_QUEUE_SIZE = 16
+
+'''
+    STRATEGY_HEATMAP_STEP_M - grid spacing of the poses at which a strategy's decisions are mapped
+'''
+STRATEGY_HEATMAP_STEP_M = 0.05
@@ -0,0 +1,182 @@
+import numpy as np
+from scipy import ndimage
+from skimage.measure import find_contours
+
+import constants
+
+'''
+    Candidate contour extraction backends
+
+    'marching' traces every iso-contour in the array with marching squares,
+    leaving the callers to discard the many small ones by point count.
+    'components' thresholds once, labels the connected components and uses
+    vectorised region statistics to drop those that cannot yield a contour
+    worth keeping, or that lie outside the fence, before tracing sub-pixel
+    contours over each survivor's bounding box alone.
+
+    Both return a list of (row, col) contours, as find_contours does.
+'''
+
+BACKENDS = ('marching', 'components')
+
+
+def max_contour_points(area_px):
+    '''
+        most points marching squares can trace around a component of area pixels,
+        one per boundary pixel edge, plus the repeated closing point
+    '''
+    return 4 * area_px + 1
+
+
+def component_contours(array, threshold, min_pt_count=0, mask_arr=None):
+    '''
+        sub-pixel contours of the connected components above threshold
+        whose point count could exceed min_pt_count and that overlap mask_arr, if given
+    '''
+    binary_arr = array > threshold
+    # label only the box holding pixels above threshold, usually a small part of a masked array,
+    # grown by a pixel so every component's tracing crop lies within it
+    above_rows = np.flatnonzero(binary_arr.any(axis=1))
+    if len(above_rows) == 0:
+        return []
+    above_cols = np.flatnonzero(binary_arr.any(axis=0))
+    rows, cols = array.shape[:2]
+    row_offset, col_offset = max(int(above_rows[0]) - 1, 0), max(int(above_cols[0]) - 1, 0)
+    label_box = (
+        slice(row_offset, min(int(above_rows[-1]) + 2, rows)),
+        slice(col_offset, min(int(above_cols[-1]) + 2, cols))
+    )
+    # marching squares keeps high regions 4-connected, as the default structure does
+    label_arr, num_labels = ndimage.label(binary_arr[label_box])
+    labels = np.arange(1, num_labels + 1)
+    areas = np.bincount(label_arr.ravel(), minlength=num_labels + 1)[1:]
+    keep = max_contour_points(areas) > min_pt_count
+    if mask_arr is not None and mask_arr.shape == array.shape:
+        keep &= ndimage.sum_labels(mask_arr[label_box], label_arr, labels) > 0
+
+    contours = []
+    source_arr = array[label_box]
+    box_rows, box_cols = label_arr.shape
+    bboxes = ndimage.find_objects(label_arr)
+    for label in labels[keep]:
+        # one pixel beyond the component, so contours close as they would
+        # and those touching the array border stay open
+        row_slice, col_slice = bboxes[label - 1]
+        r0, c0 = max(row_slice.start - 1, 0), max(col_slice.start - 1, 0)
+        r1, c1 = min(row_slice.stop + 1, box_rows), min(col_slice.stop + 1, box_cols)
+        # neighbouring components sharing the crop are zeroed, below threshold pixels are kept
+        # as the crossings interpolate towards them, so this component's contours are unchanged
+        crop_labels = label_arr[r0:r1, c0:c1]
+        component_arr = np.where(
+            (crop_labels == label) | (crop_labels == 0), source_arr[r0:r1, c0:c1], 0)
+        for c_arr in find_contours(component_arr, threshold):
+            c_arr += (row_offset + r0, col_offset + c0)
+            contours.append(c_arr)
+    return contours
+
+
+def find_candidate_contours(array, threshold, min_pt_count=0, mask_arr=None, backend=None):
+    '''
+        contours at threshold using the configured backend
+        min_pt_count and mask_arr are hints, the marching backend ignores them
+    '''
+    if backend is None:
+        backend = constants.CONTOUR_BACKEND
+    if backend == 'components':
+        return component_contours(array, threshold, min_pt_count, mask_arr)
+    return find_contours(array, threshold)
+
+
+def contour_margins(contours, shape):
+    '''
+        margins (top, left, bottom, right) and minimum edginess percentage
+        for every contour, from a single pass over the concatenated points
+    '''
+    if len(contours) == 0:
+        return [], []
+    points_arr = np.concatenate(contours)
+    starts = np.cumsum([0] + [len(c) for c in contours[:-1]])
+    top_left = np.minimum.reduceat(points_arr, starts, axis=0)
+    bottom_right = np.asarray(shape[:2], dtype=float) - np.maximum.reduceat(points_arr, starts, axis=0)
+    margins_arr = np.hstack([top_left, bottom_right])
+    # top, left, bottom, right relative to height, width, height, width
+    extents = np.array([shape[0], shape[1], shape[0], shape[1]], dtype=float)
+    edginess_arr = np.min(margins_arr / extents, axis=1) * 100
+    margins = [tuple(m) for m in margins_arr]
+    return margins, edginess_arr.tolist()
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+
+        python contour_candidates.py [frames folder]
+        compares the backends over replayed frames, or a synthetic session if none given
+    '''
+    import logging
+    import sys
+    import tempfile
+    import time
+
+    import configurations
+    from cameras import ReplayCamera
+    from locate_bench import LocateBenchHost, synthesise_session
+    from skimage import transform as tf
+    from viewport import Viewport
+    from vis_lib import get_contour_source_array
+
+    logging.basicConfig(level=logging.WARNING)
+    test_logger = logging.getLogger('locator')
+    configurations.Config.SAVE_PERIOD_SECS = 0
+    test_config = configurations.Config('configs/settings.yml', 'configs/config.xml', readonly=True)
+    host = LocateBenchHost(test_config, test_logger)
+
+    if len(sys.argv) > 1:
+        frames_path = sys.argv[1]
+    else:
+        frames_path = tempfile.mkdtemp(prefix='contour-candidates-')
+        synthesise_session(host, frames_path, 20)
+    camera = ReplayCamera(frames_path, loop=False, preload=True)
+
+    # the lo-res and hi-res contour source arrays the locate pipeline analyses
+    sources = []
+    for _frame in range(len(camera)):
+        img_arr = camera.snap('yuv')
+        lores_arr = tf.resize(img_arr, (img_arr.shape[0] // 4, img_arr.shape[1] // 4),
+                              preserve_range=True, anti_aliasing=True).astype(np.uint8)
+        sources.append(('lores', constants.LORES_CONTOUR_MINIMUM_POINT_COUNT, get_contour_source_array(
+            0, lores_arr, host.fence_masks, Viewport(), 4, 0, host.tmp_folder_path, None,
+            pre_filter=False, post_close=False)))
+        sources.append(('hires', constants.HIRES_CONTOUR_MINIMUM_POINT_COUNT, get_contour_source_array(
+            0, img_arr, host.fence_masks, Viewport(), 1, 0, host.tmp_folder_path, None)))
+
+    for scale in ('lores', 'hires'):
+        scale_sources = [s for s in sources if s[0] == scale]
+        kept = {}
+        for backend in BACKENDS:
+            start = time.perf_counter()
+            kept[backend] = []
+            num_traced = 0
+            for _scale, min_pt_count, arr in scale_sources:
+                contours = find_candidate_contours(arr, arr.max() / 2, min_pt_count, backend=backend)
+                contour_margins(contours, arr.shape)
+                num_traced += len(contours)
+                kept[backend].append(sorted(
+                    (len(c), tuple(np.round(c.sum(axis=0), 4))) for c in contours if len(c) > min_pt_count))
+            secs = time.perf_counter() - start
+            print('{0} {1:<10} {2:7.2f}ms/frame traced: {3:5d} kept: {4}'.format(
+                scale, backend, secs * 1000 / len(scale_sources), num_traced, sum(len(k) for k in kept[backend])))
+        print('{0} kept contours identical: {1}'.format(scale, kept['marching'] == kept['components']))
+        assert kept['marching'] == kept['components']
+
+    # margins agree with the per contour loop they replace
+    arr = sources[1][2]
+    contours = find_contours(arr, arr.max() / 2)
+    margins, edginess = contour_margins(contours, arr.shape)
+    for c_arr, margin, edge_pc in zip(contours, margins, edginess):
+        top_margin, left_margin = np.min(c_arr, axis=0)
+        bottom_margin, right_margin = arr.shape - np.max(c_arr, axis=0)
+        assert np.allclose(margin, (top_margin, left_margin, bottom_margin, right_margin))
+        assert np.isclose(edge_pc, min(left_margin / arr.shape[1], right_margin / arr.shape[1],
+                                       top_margin / arr.shape[0], bottom_margin / arr.shape[0]) * 100)
+    print('margins and edginess match for {0} contours'.format(len(contours)))
@@ -40,73 +40,31 @@ def overlay_contours(contours, draw, scale, fill_col, font=None):
 def dedupe_contour_list(cnts, idx=0, logger=None, debug=True):
     '''
         assumes cnts list is ordered outer to inner
-        removes inner contour(1):
-            if inside previous co-incident outer(0)
+        removes, in place, inner contour(1):
+            if its centroid is inside the bounding box of the previous retained outer(0)
+        iterative, so long lists do not exhaust the recursion limit
     '''
-    if idx >= len(cnts) - 1:
-        # finished
-        if logger and debug:
-            logger.debug('dedupe_contour_list finished idx: {0} cnts: {1}'.format(
-                idx, [len(c) for c in cnts]))
-        return
-    else:
-        if logger and debug:
-            logger.debug('dedupe_contour_list idx: {0} cnts: {1}'.format(
-                idx, [len(c) for c in cnts]))
+    while idx < len(cnts) - 1:
         outer = cnts[idx]
         inner = cnts[idx + 1]
-        outer_pnt_cnt = len(outer)
-        inner_pnt_cnt = len(inner)
-        if logger and debug:
-            logger.debug('dedupe_contour_list outer: {0} inner: {1}'.format(
-                outer_pnt_cnt, inner_pnt_cnt))
-        # inner.centre between outer.limits
         inner_centroid = np.mean(inner, axis=0)
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list inner centroid: {0}'.format(inner_centroid))
-        outer_centroid = np.mean(outer, axis=0)
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list outer centroid: {0}'.format(outer_centroid))
-        coincidence_u = np.linalg.norm(inner_centroid - outer_centroid)
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list coincidence: {0:.2f} units'.format(coincidence_u))
-        outer_diagonal_u = np.linalg.norm(
-            np.max(outer, axis=0) - np.min(outer, axis=0))
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list outer diagonal: {0:.2f} units'.format(outer_diagonal_u))
-        coincidence_ratio = coincidence_u / outer_diagonal_u
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list coincidence ratio: {0:.2f}'.format(coincidence_ratio))
-        coincident = coincidence_ratio < 0.1
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list coincident: {0}'.format(coincident))
         bbox_min = np.min(outer, axis=0)
         bbox_max = np.max(outer, axis=0)
         contained = np.all((bbox_min < inner_centroid) &
                            (inner_centroid < bbox_max))
-        if logger and debug:
-            logger.debug(
-                'dedupe_contour_list contained: {0}'.format(contained))
-        # if coincident:
         if contained:
             if logger and debug:
                 logger.debug(
-                    'dedupe_contour_list removing: {0}'.format(len(cnts[idx + 1])))
+                    'dedupe_contour_list removing: {0}'.format(len(inner)))
             cnts.pop(idx + 1)
             # keep same pointer
         else:
             # advance pointer
-            if logger and debug:
-                logger.debug(
-                    'dedupe_contour_list advancing pointer to: {0}'.format(idx + 1))
             idx += 1
-        dedupe_contour_list(cnts, idx, logger, debug)
+    if logger and debug:
+        logger.debug('dedupe_contour_list finished idx: {0} cnts: {1}'.format(
+            idx, [len(c) for c in cnts]))
+    return cnts
 
 
 def morph_contour_to_polygon(contour, num_vertices, max_iterations=10, debug=True, logger=None):
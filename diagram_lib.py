@@ -201,7 +201,10 @@ def plot_excursion(excursion_log_file_path, srid=1, erid=1, crid=1, arrow_length
                          ' on line ' + str(err_line))
     return img_buf
 
-def plot_contour_entry_as_projection(host, entry, hide_conf, logger):
+def plot_contour_entry_as_projection(entry, score_props, cont_px, hide_conf, logger):
+    '''
+        cont_px is the entry's contour in display image pixels, or None not to overlay it
+    '''
     try:
 
         # unpack entry
@@ -232,20 +235,15 @@ def plot_contour_entry_as_projection(host, entry, hide_conf, logger):
             logger=logger,
             debug=True
         )
-        tgt.assess(host.score_props)
+        tgt.assess(score_props)
 
         # overlay contour?
         disp_img = None
         try:
-            cont_px_xarr_yarr = np.round(host.data_mapper.reverse_coordinates(
-                dat_cnt_as_npa[:, 0], dat_cnt_as_npa[:, 1])).astype(int)
-            cont_px = np.dstack(np.flip(cont_px_xarr_yarr))[0] - (
-                host.viewport.origin[0] * host.config['optical.height'] / 100,
-                host.viewport.origin[1] * host.config['optical.width'] / 100
-            )
             disp_img = Image.fromarray(img_cnt_as_npa).convert('RGB')
-            disp_draw = ImageDraw.Draw(disp_img)
-            cl.overlay_contours([cont_px[::3]], disp_draw, (1, 1), 'orange', None)
+            if cont_px is not None:
+                disp_draw = ImageDraw.Draw(disp_img)
+                cl.overlay_contours([cont_px[::3]], disp_draw, (1, 1), 'orange', None)
         except Exception as ex1:
             err_line = sys.exc_info()[-1].tb_lineno
             if logger:
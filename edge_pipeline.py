@@ -0,0 +1,204 @@
+import threading
+import numpy as np
+from scipy import ndimage
+
+import constants
+from fixed_length_dict import FixedLengthDict
+
+'''
+    float32 edge pipeline for contour source arrays
+
+    The blur is folded into the separable sobel kernels, so a frame takes four
+    1d passes rather than two blur passes, a uint8 round trip and four sobel
+    passes, all in float32 rather than float64. A rectangular closing footprint
+    runs as separable max/min passes over shifted views. Intermediate arrays are scratch
+    buffers kept per shape and per thread and reused across frames; only the
+    output is freshly allocated, as callers keep it with the viewport.
+'''
+
+SOBEL_SMOOTH = np.array([1, 2, 1], np.float32) / 4
+SOBEL_EDGE = np.array([1, 0, -1], np.float32)
+
+
+def gaussian_kernel(sigma, truncate=4.0):
+    '''
+        normalised 1d gaussian weights, as scipy's gaussian_filter uses
+    '''
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    weights = np.exp(-0.5 * (x / sigma) ** 2)
+    return (weights / weights.sum()).astype(np.float32)
+
+
+class EdgeScratch():
+    '''
+        float32 working arrays for one shape
+    '''
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.pass_arr = np.empty(shape, np.float32)
+        self.gx_arr = np.empty(shape, np.float32)
+        self.gy_arr = np.empty(shape, np.float32)
+
+    @property
+    def nbytes(self):
+        return self.pass_arr.nbytes + self.gx_arr.nbytes + self.gy_arr.nbytes
+
+
+def rank_filter_axis(src_arr, dst_arr, radius, axis, op):
+    '''
+        flat 1d max/min over a window of 2 * radius + 1 along axis, clipped at the borders
+        (the same as reflecting, for a flat footprint), using shifted views rather than ndimage
+    '''
+    dst_arr[...] = src_arr
+    for offset in range(1, radius + 1):
+        lead = [slice(None)] * src_arr.ndim
+        lag = [slice(None)] * src_arr.ndim
+        lead[axis] = slice(offset, None)
+        lag[axis] = slice(None, -offset)
+        lead, lag = tuple(lead), tuple(lag)
+        op(dst_arr[lead], src_arr[lag], out=dst_arr[lead])
+        op(dst_arr[lag], src_arr[lead], out=dst_arr[lag])
+    return dst_arr
+
+
+class EdgePipeline():
+
+    def __init__(
+        self,
+        sigma=constants.BLUR_SIGMA,
+        footprint=constants.CLOSING_FOOTPRINT,
+        cache_size=constants.EDGE_SCRATCH_CACHE_SIZE
+    ):
+        self.footprint = None if footprint is None else np.asarray(footprint, bool)
+        # rectangular footprints are separable into 1d max/min passes
+        self.closing_radii = None
+        if self.footprint is not None and self.footprint.all() and all(n % 2 == 1 for n in self.footprint.shape):
+            self.closing_radii = tuple(n // 2 for n in self.footprint.shape)
+        self.cache_size = cache_size
+        self.local = threading.local()
+        # sobel kernels with and without the gaussian folded in
+        self.kernels = {False: (SOBEL_SMOOTH, SOBEL_EDGE)}
+        if sigma > 0:
+            blur = gaussian_kernel(sigma)
+            self.kernels[True] = (
+                np.convolve(blur, SOBEL_SMOOTH).astype(np.float32),
+                np.convolve(blur, SOBEL_EDGE).astype(np.float32)
+            )
+        else:
+            self.kernels[True] = self.kernels[False]
+        # sobel magnitude of a 0..1 image, as skimage scales it
+        self.magnitude_scale = np.float32(1 / (255 * np.sqrt(2)))
+
+    def scratch(self, shape):
+        buffers = getattr(self.local, 'buffers', None)
+        if buffers is None:
+            buffers = self.local.buffers = FixedLengthDict(self.cache_size)
+        shape = tuple(shape)
+        edge_scratch = buffers.get(shape)
+        if edge_scratch is None:
+            edge_scratch = EdgeScratch(shape)
+            buffers[shape] = edge_scratch
+        return edge_scratch
+
+    def run(self, img_arr, pre_filter=True, post_close=True):
+        '''
+            blurred sobel magnitude, optionally closed, of a 2d uint8 array
+            returns a new float32 array scaled 0..1
+        '''
+        smooth_kernel, edge_kernel = self.kernels[bool(pre_filter)]
+        edge_scratch = self.scratch(img_arr.shape)
+        pass_arr = edge_scratch.pass_arr
+        gx_arr = edge_scratch.gx_arr
+        gy_arr = edge_scratch.gy_arr
+
+        # edges across columns, smoothed down rows
+        ndimage.correlate1d(img_arr, smooth_kernel, axis=0, output=pass_arr, mode='reflect')
+        ndimage.correlate1d(pass_arr, edge_kernel, axis=1, output=gx_arr, mode='reflect')
+        # edges down rows, smoothed across columns
+        ndimage.correlate1d(img_arr, edge_kernel, axis=0, output=pass_arr, mode='reflect')
+        ndimage.correlate1d(pass_arr, smooth_kernel, axis=1, output=gy_arr, mode='reflect')
+
+        np.hypot(gx_arr, gy_arr, out=gx_arr)
+        gx_arr *= self.magnitude_scale
+
+        out_arr = np.empty(img_arr.shape, np.float32)
+        if post_close and self.closing_radii is not None:
+            # dilate then erode, ping-ponging through the scratch buffers
+            row_radius, col_radius = self.closing_radii
+            rank_filter_axis(gx_arr, pass_arr, row_radius, 0, np.maximum)
+            rank_filter_axis(pass_arr, gy_arr, col_radius, 1, np.maximum)
+            rank_filter_axis(gy_arr, pass_arr, row_radius, 0, np.minimum)
+            rank_filter_axis(pass_arr, out_arr, col_radius, 1, np.minimum)
+        elif post_close and self.footprint is not None:
+            ndimage.grey_dilation(gx_arr, footprint=self.footprint, output=pass_arr)
+            ndimage.grey_erosion(pass_arr, footprint=self.footprint, output=out_arr)
+        else:
+            out_arr[...] = gx_arr
+        return out_arr
+
+    @staticmethod
+    def apply_mask(src_arr, mask_arr, out_arr):
+        '''
+            src * mask written straight into out, no temporary
+        '''
+        return np.multiply(src_arr, mask_arr, out=out_arr)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import time
+    import tracemalloc
+    from skimage import filters
+    from skimage.measure import find_contours
+    from skimage.morphology import closing
+
+    def legacy(arr, mask_arr):
+        # the float64 path as it was
+        blurred_arr = filters.gaussian(arr, sigma=constants.BLUR_SIGMA, preserve_range=True).astype(np.uint8)
+        closed_arr = closing(filters.sobel(blurred_arr), constants.CLOSING_FOOTPRINT)
+        masked_arr = closed_arr * mask_arr
+        _img_arr = (masked_arr * 255).astype(np.uint8)  # PIL image, built even when not saved
+        return masked_arr
+
+    pipeline = EdgePipeline()
+
+    def fused(arr, mask_arr):
+        closed_arr = pipeline.run(arr)
+        return pipeline.apply_mask(closed_arr, mask_arr, closed_arr)
+
+    # 8MP test card: mower-like blobs on textured grass
+    rows, cols = 2464, 3280
+    rng = np.random.default_rng(5)
+    yy, xx = np.mgrid[0:rows, 0:cols]
+    img_arr = (90 + rng.normal(0, 6, (rows, cols))).clip(0, 255).astype(np.uint8)
+    for cy, cx in ((600, 900), (1500, 2400), (2000, 700)):
+        img_arr[(abs(yy - cy) < 60) & (abs(xx - cx) < 90)] = 230
+    mask_arr = (abs(xx - cols / 2) < cols * 0.45) & (abs(yy - rows / 2) < rows * 0.45)
+
+    results = {}
+    for name, fn in (('float64 skimage', legacy), ('float32 fused', fused)):
+        fn(img_arr, mask_arr)  # warm up scratch buffers
+        tracemalloc.start()
+        start = time.perf_counter()
+        out_arr = fn(img_arr, mask_arr)
+        secs = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = out_arr
+        print('{0:<16} {1:7.1f}ms  peak transient allocation {2:7.1f}MB  output {3} {4:.1f}MB'.format(
+            name, secs * 1000, peak / 1E6, out_arr.dtype, out_arr.nbytes / 1E6))
+
+    edge_scratch = pipeline.scratch(img_arr.shape)
+    print('float32 scratch buffers held across frames: {0:.1f}MB'.format(edge_scratch.nbytes / 1E6))
+
+    old_arr = results['float64 skimage']
+    new_arr = results['float32 fused']
+    print('max abs difference: {0:.4f} of max {1:.4f}'.format(
+        float(np.max(np.abs(old_arr - new_arr))), float(old_arr.max())))
+    for name, arr in results.items():
+        contours = [c for c in find_contours(arr, arr.max() / 2) if len(c) > constants.HIRES_CONTOUR_MINIMUM_POINT_COUNT]
+        print('{0:<16} contours: {1} sizes: {2}'.format(name, len(contours), sorted(len(c) for c in contours)))
@@ -0,0 +1,187 @@
+from math import ceil
+import numpy as np
+
+import constants
+
+'''
+    Fence masks and bounding boxes for each analysis scale, built once when the
+    fence or calibration changes, so the edge filters need only run over the
+    part of a frame or viewport that lies within the fence
+'''
+
+
+def filter_margin_px(pre_filter=True, post_close=True):
+    '''
+        pixels beyond a box that the blur, sobel and closing filters read,
+        so filtering a padded crop matches filtering the whole array
+    '''
+    margin = 1  # sobel
+    if pre_filter and constants.BLUR_SIGMA > 0:
+        margin += int(ceil(4.0 * constants.BLUR_SIGMA)) + 1  # gaussian truncates at 4 sigma
+    if post_close and constants.CLOSING_FOOTPRINT is not None:
+        margin += 2 * (max(np.shape(constants.CLOSING_FOOTPRINT)) // 2 + 1)  # dilate then erode
+    return margin
+
+
+def clip_slices(slices, shape):
+    return tuple(slice(min(max(s.start, 0), n), min(max(s.stop, 0), n)) for s, n in zip(slices, shape))
+
+
+def intersect_slices(a, b):
+    start = max(a.start, b.start)
+    return slice(start, max(min(a.stop, b.stop), start))
+
+
+class FenceMaskScale():
+    '''
+        boolean fence mask at one scale with its tight bounding box
+        and a summed area table to count fenced pixels in any rectangle
+    '''
+
+    def __init__(self, mask_arr):
+        self.mask_arr = np.ascontiguousarray(mask_arr, dtype=bool)
+        self.shape = self.mask_arr.shape
+        rows = np.flatnonzero(self.mask_arr.any(axis=1))
+        cols = np.flatnonzero(self.mask_arr.any(axis=0))
+        if len(rows) == 0:
+            self.bbox = None
+        else:
+            self.bbox = (slice(int(rows[0]), int(rows[-1]) + 1), slice(int(cols[0]), int(cols[-1]) + 1))
+        self.sat = np.zeros((self.shape[0] + 1, self.shape[1] + 1), np.int64)
+        np.cumsum(np.cumsum(self.mask_arr, axis=0, dtype=np.int64), axis=1, out=self.sat[1:, 1:])
+
+    def __repr__(self):
+        return 'FenceMaskScale {0} bbox: {1} fenced: {2}'.format(
+            self.shape, self.bbox, int(self.sat[-1, -1]))
+
+    def count(self, row_slice, col_slice):
+        '''
+            fenced pixels within the rectangle
+        '''
+        r0, r1 = row_slice.start, row_slice.stop
+        c0, c1 = col_slice.start, col_slice.stop
+        if r1 <= r0 or c1 <= c0:
+            return 0
+        return int(self.sat[r1, c1] - self.sat[r0, c1] - self.sat[r1, c0] + self.sat[r0, c0])
+
+    def box_within(self, row_slice, col_slice):
+        '''
+            the fence bbox clipped to a region, relative to that region
+            None if the region holds no fenced pixels
+        '''
+        if self.bbox is None or self.count(row_slice, col_slice) == 0:
+            return None
+        rows = intersect_slices(self.bbox[0], row_slice)
+        cols = intersect_slices(self.bbox[1], col_slice)
+        return (
+            slice(rows.start - row_slice.start, rows.stop - row_slice.start),
+            slice(cols.start - col_slice.start, cols.stop - col_slice.start)
+        )
+
+
+class FenceMasks():
+    '''
+        full resolution fence mask plus sub-sampled copies for the pyramid scales
+    '''
+
+    def __init__(self, fence_mask_arr, scales=constants.FENCE_MASK_SCALES):
+        self.scales = {1: FenceMaskScale(fence_mask_arr)}
+        for zoom_scale_factor in scales:
+            self.scale(zoom_scale_factor)
+
+    def __repr__(self):
+        return 'FenceMasks\n' + '\n'.join('\t{0}: {1}'.format(z, s) for z, s in self.scales.items())
+
+    @property
+    def full(self):
+        return self.scales[1]
+
+    def scale(self, zoom_scale_factor):
+        zoom_scale_factor = max(int(zoom_scale_factor), 1)
+        mask_scale = self.scales.get(zoom_scale_factor)
+        if mask_scale is None:
+            mask_scale = FenceMaskScale(
+                self.full.mask_arr[::zoom_scale_factor, ::zoom_scale_factor])
+            self.scales[zoom_scale_factor] = mask_scale
+        return mask_scale
+
+    def region(self, vp, zoom_scale_factor, shape):
+        '''
+            fence mask matching an analysis array of shape, and the fence box within it
+            the full scene uses the sub-sampled mask, viewports slice the full mask
+            mask is None if the shapes disagree, box is None if wholly outside the fence
+        '''
+        if vp.isnull:
+            mask_scale = self.scale(zoom_scale_factor)
+            region_slices = (slice(0, shape[0]), slice(0, shape[1]))
+        else:
+            mask_scale = self.full
+            region_slices = clip_slices(vp.slicer(mask_scale.shape), mask_scale.shape)
+        mask_arr = mask_scale.mask_arr[region_slices]
+        if mask_arr.shape != tuple(shape[:2]):
+            return None, None
+        return mask_arr, mask_scale.box_within(*region_slices)
+
+    def outside(self, vp):
+        '''
+            True if a viewport holds no fenced pixels
+        '''
+        if vp.isnull:
+            return self.full.bbox is None
+        return self.full.count(*clip_slices(vp.slicer(self.full.shape), self.full.shape)) == 0
+
+
+def padded_crop(box, shape, margin):
+    '''
+        box grown by margin within shape,
+        and the box relative to the grown crop
+    '''
+    crop = tuple(
+        slice(max(s.start - margin, 0), min(s.stop + margin, n)) for s, n in zip(box, shape[:2]))
+    inner = tuple(
+        slice(s.start - c.start, s.stop - c.start) for s, c in zip(box, crop))
+    return crop, inner
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import time
+    from skimage import filters
+    from skimage.morphology import closing
+    from viewport import Viewport
+
+    rows, cols = 1536, 2048
+    yy, xx = np.mgrid[0:rows, 0:cols]
+    # narrow lawn in a wide view
+    fence_arr = (abs(xx - 900) < 250) & (abs(yy - 800) < 500)
+    masks = FenceMasks(fence_arr)
+    print(masks)
+
+    rng = np.random.default_rng(3)
+    img_arr = rng.integers(0, 255, (rows, cols), dtype=np.uint8)
+
+    def whole(arr):
+        return closing(filters.sobel(filters.gaussian(
+            arr, sigma=constants.BLUR_SIGMA, preserve_range=True).astype(np.uint8)),
+            constants.CLOSING_FOOTPRINT)
+
+    start = time.perf_counter()
+    expected = whole(img_arr) * fence_arr
+    whole_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mask_arr, box = masks.region(Viewport(), 1, img_arr.shape)
+    crop, inner = padded_crop(box, img_arr.shape, filter_margin_px())
+    cropped = np.zeros(img_arr.shape)
+    cropped[box] = whole(img_arr[crop])[inner] * mask_arr[box]
+    crop_secs = time.perf_counter() - start
+    print('whole frame {0:.1f}ms fence crop {1:.1f}ms identical: {2}'.format(
+        whole_secs * 1000, crop_secs * 1000, np.array_equal(expected, cropped)))
+    assert np.array_equal(expected, cropped)
+
+    outside_vp = Viewport.from_corners((0, 80), (20, 99))
+    inside_vp = Viewport.from_corners((40, 40), (60, 50))
+    print('outside: {0} inside: {1}'.format(masks.outside(outside_vp), masks.outside(inside_vp)))
+    assert masks.outside(outside_vp) and not masks.outside(inside_vp)
@@ -1,4 +1,6 @@
+import threading
 from collections import UserDict
+from itertools import islice
 
 
 class FixedLengthDict(UserDict):
@@ -12,17 +14,25 @@ class FixedLengthDict(UserDict):
     def __setitem__(self, key, value):
         self.data[key] = value
         while len(self.data) > self.length:
-            min_key = list(self.data.keys())[0]
+            min_key = next(iter(self.data))
             self.data.pop(min_key)
 
+    def recent(self, index):
+        '''
+            value index places back from the newest, or None
+        '''
+        if index >= len(self.data):
+            return None
+        return self.data[next(islice(reversed(self.data), index, None))]
+
     def latest(self):
-        return None if len(self.data) == 0 else self.data[list(self.data.keys())[-1]]
+        return self.recent(0)
 
     def penultimate(self):
-        return None if len(self.data) <= 1 else self.data[list(self.data.keys())[-2]]
+        return self.recent(1)
 
     def antepenultimate(self):
-        return None if len(self.data) <= 2 else self.data[list(self.data.keys())[-3]]
+        return self.recent(2)
 
     def keys(self):
         return self.data.keys()
@@ -37,55 +47,248 @@ class FixedLengthDict(UserDict):
         return result
 
 
-class SnapshotBuffer(FixedLengthDict):
+class RingBuffer():
+    '''
+        fixed length, thread-safe ring buffer
+        O(1) access to the newest entries and O(1) lookup by key
+        replacing an existing key keeps its position
+    '''
+    def __init__(self, length):
+        self.length = length
+        self._lock = threading.RLock()
+        self.clear()
+
+    def __getstate__(self):
+        # the lock is not copied, snapshots refer to their buffer and are deep copied for scoring
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def clear(self):
+        with self._lock:
+            self._keys = [None] * self.length
+            self._values = [None] * self.length
+            self._slots = {}  # key => slot
+            self._head = -1  # slot of newest entry
+            self._count = 0
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._values[slot] = value
+            else:
+                self._head = (self._head + 1) % self.length
+                if self._count == self.length:
+                    # overwrite the oldest
+                    del self._slots[self._keys[self._head]]
+                else:
+                    self._count += 1
+                self._keys[self._head] = key
+                self._values[self._head] = value
+                self._slots[key] = self._head
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._values[self._slots[key]]
+
+    def get(self, key, default=None):
+        with self._lock:
+            slot = self._slots.get(key)
+            return default if slot is None else self._values[slot]
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __len__(self):
+        return self._count
+
+    def recent(self, index):
+        '''
+            value index places back from the newest, or None
+        '''
+        with self._lock:
+            if index >= self._count:
+                return None
+            return self._values[(self._head - index) % self.length]
+
+    def newest(self, k):
+        '''
+            consistent list of up to k values, newest first
+        '''
+        with self._lock:
+            return [self._values[(self._head - i) % self.length] for i in range(min(k, self._count))]
+
+    def latest(self):
+        return self.recent(0)
+
+    def penultimate(self):
+        return self.recent(1)
+
+    def antepenultimate(self):
+        return self.recent(2)
+
+    def items(self):
+        '''
+            list of key, value pairs, oldest first
+        '''
+        with self._lock:
+            slots = [(self._head - i) % self.length for i in range(self._count - 1, -1, -1)]
+            return [(self._keys[slot], self._values[slot]) for slot in slots]
+
+    def keys(self):
+        return [k for k, _v in self.items()]
+
+    def values(self):
+        return [v for _k, v in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __repr__(self):
+        result = ''
+        for k, v in self.items():
+            result += '{0}: => {1}\n'.format(
+                k,
+                v.as_public_dict()
+            )
+        return result
+
+
+class SnapshotBuffer(RingBuffer):
     '''
         buffer for Snapshots
     '''
 
     def latest_pose(self):
-        result = None
-        if self.latest() is not None:
-            result = self.latest()._pose
-        return result
+        return self.recent_pose(0)
 
     def penultimate_pose(self):
-        result = None
-        if self.penultimate() is not None:
-            result = self.penultimate()._pose
-        return result
+        return self.recent_pose(1)
 
     def antepenultimate_pose(self):
+        return self.recent_pose(2)
+
+    def recent_pose(self, index):
         result = None
-        if self.antepenultimate() is not None:
-            result = self.antepenultimate()._pose
+        ss = self.recent(index)
+        if ss is not None:
+            result = ss._pose
         return result
 
     def latest_extrap_pose(self):
-        result = None
-        if self.latest() is not None:
-            result = self.latest()._extrapolated_pose
-        return result
+        return self.recent_extrap_pose(0)
 
     def penultimate_extrap_pose(self):
+        return self.recent_extrap_pose(1)
+
+    def recent_extrap_pose(self, index):
         result = None
-        if self.penultimate() is not None:
-            result = self.penultimate()._extrapolated_pose
+        ss = self.recent(index)
+        if ss is not None:
+            result = ss._extrapolated_pose
         return result
 
     def latest_ssid(self):
+        return self.recent_ssid(0)
+
+    def penultimate_ssid(self):
+        return self.recent_ssid(1)
+
+    def recent_ssid(self, index):
         result = -1
-        if self.latest() is not None:
-            result = self.latest().ssid
+        ss = self.recent(index)
+        if ss is not None:
+            result = ss.ssid
         return result
 
-    def latest_pose_delta(self):
+    def pose_delta(self, index):
+        '''
+            difference between the poses index and index + 1 places back
+        '''
         delta_pose = None
-        if self.latest_pose() is not None and self.penultimate_pose() is not None:
-            delta_pose = self.latest_pose() - self.penultimate_pose()
+        recent = self.newest(index + 2)
+        if len(recent) == index + 2:
+            pose_finish = recent[index]._pose
+            pose_start = recent[index + 1]._pose
+            if pose_finish is not None and pose_start is not None:
+                delta_pose = pose_finish - pose_start
         return delta_pose
 
+    def latest_pose_delta(self):
+        return self.pose_delta(0)
+
     def penultimate_pose_delta(self):
-        delta_pose = None
-        if self.penultimate_pose() is not None and self.antepenultimate_pose() is not None:
-            delta_pose = self.penultimate_pose() - self.antepenultimate_pose()
-        return delta_pose
+        return self.pose_delta(1)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests - concurrent readers
+    '''
+    import time
+    from types import SimpleNamespace
+
+    buffer = SnapshotBuffer(4)
+    num_writes = 100000
+    errors = []
+    reads = [0]
+
+    def writer():
+        for i in range(num_writes):
+            ss = SimpleNamespace(ssid=i % 9999, _pose=float(i), _extrapolated_pose=None)
+            buffer[ss.ssid] = ss
+            # re-assignment keeps position
+            buffer[ss.ssid] = ss
+
+    def reader():
+        while writer_thread.is_alive():
+            try:
+                newest = buffer.newest(4)
+                ssids = [ss.ssid for ss in newest]
+                if any((a - b) % 9999 != 1 for a, b in zip(ssids, ssids[1:])):
+                    errors.append('out of order: {0}'.format(ssids))
+                delta = buffer.latest_pose_delta()
+                if delta is not None and delta != 1.0:
+                    errors.append('bad delta: {0}'.format(delta))
+                ssid = buffer.latest_ssid()
+                ss = buffer.get(ssid)
+                if ss is not None and ss.ssid != ssid:
+                    errors.append('bad lookup: {0}'.format(ssid))
+                if len(buffer.keys()) > 4:
+                    errors.append('overflow')
+                reads[0] += 1
+            except Exception as e:
+                errors.append(str(e))
+
+    start = time.time()
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for r in readers:
+        r.start()
+    writer_thread.join()
+    for r in readers:
+        r.join()
+    print('{0} writes {1} reads in {2:.2f} secs, {3} errors {4}'.format(
+        num_writes, reads[0], time.time() - start, len(errors), errors[:3]))
+    print('keys: {0} latest: {1} penultimate: {2}'.format(
+        buffer.keys(), buffer.latest().ssid, buffer.penultimate().ssid))
+
+    # a buffered snapshot, and so its buffer, deep copies as the scoring page copies it
+    import copy
+    from snapshot import Snapshot
+    snapshot_buffer = SnapshotBuffer(4)
+    for ssid in range(6):
+        snapshot = Snapshot(snapshot_buffer, ssid)
+        snapshot_buffer[snapshot.ssid] = snapshot
+    copied = copy.deepcopy(snapshot_buffer.latest())
+    assert copied.ssid == 5 and copied._container is not snapshot_buffer
+    assert copied._container.keys() == snapshot_buffer.keys() and copied._container.latest() is copied
+    copied._container[6] = Snapshot(copied._container, 6)
+    assert len(snapshot_buffer) == 4 and snapshot_buffer.latest_ssid() == 5
+    print('deep copied snapshot {0} with buffer {1}'.format(copied.ssid, copied._container.keys()))
@@ -0,0 +1,421 @@
+import copy
+import sys
+import time
+from collections import deque
+from math import hypot
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+import constants
+import poses
+from fixed_length_dict import SnapshotBuffer
+from forms.rule import RuleScope
+from odometry import Movement
+from rules_engine import RulesEngine
+from sim_clock import clock
+from snapshot import Snapshot
+from utilities import decode_telemetry
+from viewport import Viewport
+from vis_lib import get_prospect_list, probe_prospect_list
+
+'''
+    Several mowers on one lawn, under one camera
+
+    Each mower has a control context of its own - configuration, rules engine,
+    itinerary, telemetry, snapshot and motivate pose buffers - which the server's
+    governor drives in turn, the current mower's first. The mowers governed are
+    the current mower and those named in the fleet setting. Every frame is prospected once, for all of them: the
+    viewports of the mowers being tracked are probed together, with a sweep of
+    the whole frame only when a mower is untracked or lost. The projections
+    found are assigned to mowers by distance from each mower's predicted
+    position, and by target signature - how far the measured tip to tail span
+    is from the mower's own target length, so mowers with differing targets
+    are told apart even when their predictions are unknown.
+
+    Pose geometry is class-wide, so the mowers share a target design, and a
+    mower with an unknown position and the same target as another is only
+    distinguished once seeded, e.g. with its launch position.
+'''
+
+
+def mower_config(config, mower_name):
+    '''
+        read-only view of the configuration with mower_name as the current mower
+    '''
+    if config['current.mower'] == mower_name:
+        return config
+    view = copy.copy(config)
+    view.database = {}
+    view.settings = dict(config.settings, mower=mower_name)
+    view.readonly = True
+    view.parse()
+    return view
+
+
+def fleet_names(config):
+    '''
+        names of the mowers sharing the camera, the current mower's first
+        the current mower is named even when it is None, the others only when configured
+    '''
+    names = [config['current.mower']]
+    for name in config['current.fleet']:
+        if name in config['mowers'] and name not in names:
+            names.append(name)
+    return names
+
+
+def estimate_landing_time(rule, fixed_overhead):
+    '''
+        as the governor estimates it
+    '''
+    landing_time = clock.time()
+    if rule.duration_result is not None and not rule.stage_complete and not rule.auxiliary:
+        if rule.duration_result > 0:
+            landing_time = clock.time() + (rule.duration_result / 1000) + fixed_overhead
+    else:
+        landing_time = clock.time() + fixed_overhead
+    return landing_time
+
+
+class MowerContext():
+    '''
+        one mower's control state
+        mower_cmd(cmd) sends a command to the mower and returns its response
+    '''
+
+    def __init__(self, name, config, data_mapper, mower_cmd, logger=None, udp_socket=None):
+        self.name = name
+        self.config = config
+        self.mower_cmd = mower_cmd
+        self.logger = logger
+        self.rules_engine = RulesEngine(
+            config['current.strategy'],
+            config['strategy.rules'],
+            config['strategy.terms'],
+            udp_socket,
+            data_mapper
+        )
+        self.itinerary = None
+        self.telem = {}
+        self.telemetry_updated = 0
+        self.landing_time = 0
+        self.snapshot_buffer = SnapshotBuffer(4)
+        self.motivate_pose_buffer = deque([], 4)
+        self.target_length_m = config['mower.target_length_m']
+        self.last_pose = None
+        self.prior_pose = None
+        self.seed_position = None
+        self.stats = {'located': 0, 'missed': 0, 'commands': 0, 'stages': 0}
+        # the server's governor escalation and command history
+        self.rung_index = 0
+        self.is_escalating = False
+        self.next_escalation = 0
+        self.unacks = 0
+        self.cached_history_cmd = None
+
+    def __repr__(self):
+        return '{0} {1}'.format(self.name, self.stats)
+
+    def reconfigure(self, name, config, data_mapper, mower_cmd):
+        '''
+            a new configuration view and rules engine, as the strategy may differ,
+            keeping the command history, route start time and context
+        '''
+        prev_rules_engine = self.rules_engine
+        self.name = name
+        self.config = config
+        self.mower_cmd = mower_cmd
+        self.target_length_m = config['mower.target_length_m']
+        self.rules_engine = RulesEngine(
+            config['current.strategy'],
+            config['strategy.rules'],
+            config['strategy.terms'],
+            prev_rules_engine.udp_socket,
+            data_mapper
+        )
+        self.rules_engine.last_n_commands = prev_rules_engine.last_n_commands
+        self.rules_engine.last_n_comp_commands = prev_rules_engine.last_n_comp_commands
+        self.rules_engine.route_started_time = prev_rules_engine.route_started_time
+        self.rules_engine.context = prev_rules_engine.context
+        # escalation and landing start afresh, as the paused governor's do
+        self.rung_index = 0
+        self.is_escalating = False
+        self.next_escalation = 0
+        self.landing_time = 0
+
+    def seed(self, x_m, y_m):
+        '''
+            a known position, e.g. launch, to assign the first projection by
+        '''
+        self.seed_position = (x_m, y_m)
+
+    def predicted_position(self):
+        '''
+            arena position expected in the next frame, extrapolating the last move
+        '''
+        if self.last_pose is None:
+            return self.seed_position
+        x_m, y_m = self.last_pose.arena.c_x_m, self.last_pose.arena.c_y_m
+        if self.prior_pose is not None:
+            x_m += x_m - self.prior_pose.arena.c_x_m
+            y_m += y_m - self.prior_pose.arena.c_y_m
+        return x_m, y_m
+
+    def signature_cost(self, pose):
+        '''
+            relative difference of the measured target span from this mower's target
+        '''
+        if self.target_length_m <= 0:
+            return 0.0
+        return abs(float(pose.arena.span_m) - self.target_length_m) / self.target_length_m
+
+    def observe(self, pose):
+        if pose is not None:
+            self.stats['located'] += 1
+            self.prior_pose = self.last_pose
+            self.seed_position = None
+        else:
+            self.stats['missed'] += 1
+            self.prior_pose = None
+        self.last_pose = pose
+
+    def fetch_telemetry(self):
+        self.telem = decode_telemetry(self.config, self.mower_cmd('>get_telemetry()'), self.logger)
+        self.telemetry_updated = clock.time()
+
+    def govern(self, pose, sid):
+        '''
+            one pass of the governor for this mower: context, rule selection and command
+            returns True when the current stage is complete
+        '''
+        arrived = False
+        try:
+            snapshot = Snapshot(self.snapshot_buffer, sid % constants.MAX_SNAPSHOT_ID, self.logger)
+            snapshot._pose = pose
+            self.snapshot_buffer[snapshot.ssid] = snapshot
+            # context might need self-dependencies, so build twice
+            for _pass in range(2):
+                self.rules_engine.build_context(snapshot, self.itinerary, self.config, self.telem)
+
+            landed = self.landing_time - clock.time() <= 0
+            if landed and clock.time() - self.telemetry_updated > constants.MOWER_TELEMETRY_PERIOD_SECS:
+                self.fetch_telemetry()
+
+            scope = RuleScope.STATIONARY if landed else RuleScope.IN_FLIGHT
+            selected_rule = self.rules_engine.select(scope=scope)
+            if selected_rule is not None:
+                arrived = selected_rule.stage_complete
+                if selected_rule.is_executable:
+                    self.rules_engine.last_command = (
+                        selected_rule.left_speed_result,
+                        selected_rule.right_speed_result,
+                        selected_rule.duration_result
+                    )
+                    self.rules_engine.last_command_code = Movement.get_movement_code(
+                        selected_rule.left_speed_result,
+                        selected_rule.right_speed_result
+                    ).name
+                    self.mower_cmd(selected_rule.compile_cmd())
+                    self.motivate_pose_buffer.append(pose)
+                    self.stats['commands'] += 1
+                    if selected_rule.auxiliary:
+                        self.fetch_telemetry()
+                    self.landing_time = estimate_landing_time(
+                        selected_rule, constants.LANDING_TIME_OVERHEAD_SECS)
+                if arrived:
+                    self.stats['stages'] += 1
+                    self.itinerary.advance_pointer()
+                    self.rules_engine.stage_started_time = clock.time()
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            msg = 'Error in MowerContext govern {0}: {1} on line {2}'.format(self.name, e, err_line)
+            if self.logger is not None:
+                self.logger.error(msg)
+            else:
+                print(msg)
+        return arrived
+
+
+def merge_candidates(candidates, radius_m=constants.FLEET_CANDIDATE_MERGE_M):
+    '''
+        most confident of the (pose, conf_pc) candidates within radius of each other,
+        as overlapping viewports can find the same target twice
+    '''
+    kept = []
+    for pose, conf_pc in sorted(candidates, key=lambda c: c[1], reverse=True):
+        if all(hypot(pose.arena.c_x_m - k.arena.c_x_m, pose.arena.c_y_m - k.arena.c_y_m) > radius_m
+               for k, _conf in kept):
+            kept.append((pose, conf_pc))
+    return kept
+
+
+def assign_poses(contexts, candidate_poses, gate_m=constants.FLEET_ASSIGNMENT_GATE_M,
+                 signature_weight_m=constants.FLEET_SIGNATURE_WEIGHT_M):
+    '''
+        {context name: pose} for the assignment of candidate poses to mowers of least total cost
+        cost is the distance from the mower's predicted position, gated, or the gate itself
+        when it is unknown, plus the weighted target signature difference
+    '''
+    if len(contexts) == 0 or len(candidate_poses) == 0:
+        return {}
+    forbidden = 1e6
+    costs = np.full((len(contexts), len(candidate_poses)), forbidden)
+    for i, ctx in enumerate(contexts):
+        position = ctx.predicted_position()
+        for j, pose in enumerate(candidate_poses):
+            if position is None:
+                distance_m = gate_m
+            else:
+                distance_m = hypot(pose.arena.c_x_m - position[0], pose.arena.c_y_m - position[1])
+                if distance_m > gate_m:
+                    continue
+            costs[i, j] = distance_m + signature_weight_m * ctx.signature_cost(pose)
+    rows, cols = linear_sum_assignment(costs)
+    return {contexts[i].name: candidate_poses[j] for i, j in zip(rows, cols) if costs[i, j] < forbidden}
+
+
+class FleetLocator():
+    '''
+        locates every mower in one frame from one camera host
+    '''
+
+    def __init__(self, host, contexts, tracking=True, logger=None):
+        self.host = host
+        self.contexts = contexts
+        self.tracking = tracking
+        self.logger = logger
+        self.stats = {'frames': 0, 'prospected': 0, 'sweeps': 0, 'assigned': 0, 'probe_secs': 0.0}
+        # (viewports, probe result) of the latest frame's probes
+        self.probes = []
+
+    def candidates(self, img_arr, sid, viewports):
+        '''
+            (pose, conf_pc) of every valid projection in the viewports
+        '''
+        start = time.perf_counter()
+        probe_result = probe_prospect_list(self.host, sid, viewports, img_arr, 0, 0, self.logger)
+        self.stats['probe_secs'] += time.perf_counter() - start
+        if probe_result is None:
+            return []
+        self.probes.append((viewports, probe_result))
+        candidates = []
+        for projection in probe_result[3]:
+            if projection.valid:
+                pose = poses.Pose.from_tip_tail(
+                    projection.v1, projection.tail, projection.heading, ssid=sid, mapper=self.host.data_mapper)
+                if pose is not None:
+                    candidates.append((pose, projection.conf_pc))
+        return candidates
+
+    def prospects(self, img_arr, sid):
+        self.stats['prospected'] += 1
+        vp_prospect_list = get_prospect_list(
+            self.host, img_arr, 4, Viewport(), 0, 0, self.logger, '{0}A'.format(sid)) or []
+        for vp in vp_prospect_list:
+            vp.index = vp.index.replace('A', 'B')
+        return vp_prospect_list
+
+    def locate(self, img_arr, sid):
+        '''
+            {context name: pose or None} for one frame
+        '''
+        self.stats['frames'] += 1
+        self.probes = []
+        viewports = []
+        untracked = []
+        for ctx in self.contexts:
+            viewport = None
+            if self.tracking and ctx.last_pose is not None:
+                viewport = Viewport.from_pose(ctx.last_pose, img_arr.shape, '{0}{1}B'.format(ctx.name, sid))
+            if viewport is not None:
+                viewport.resize(constants.RESIZE_POSE_TO_VIEWPORT)
+                viewports.append(viewport)
+            else:
+                untracked.append(ctx)
+        prospected = len(untracked) > 0
+        if prospected:
+            viewports += self.prospects(img_arr, sid)
+        candidates = merge_candidates(self.candidates(img_arr, sid, viewports))
+        assigned = assign_poses(self.contexts, [pose for pose, _conf in candidates])
+
+        lost = [ctx for ctx in self.contexts if ctx.name not in assigned]
+        if len(lost) > 0 and not prospected:
+            # a tracked mower has left its viewport - sweep the frame for the lost ones
+            self.stats['sweeps'] += 1
+            found = merge_candidates(candidates + self.candidates(img_arr, sid, self.prospects(img_arr, sid)))
+            unassigned = [pose for pose, _conf in found if all(
+                hypot(pose.arena.c_x_m - taken.arena.c_x_m, pose.arena.c_y_m - taken.arena.c_y_m) >
+                constants.FLEET_CANDIDATE_MERGE_M for taken in assigned.values())]
+            assigned.update(assign_poses(lost, unassigned))
+
+        self.stats['assigned'] += len(assigned)
+        located = {}
+        for ctx in self.contexts:
+            pose = assigned.get(ctx.name)
+            ctx.observe(pose)
+            located[ctx.name] = pose
+        return located
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+
+        two mowers with one camera, located together, then the current mower's context reconfigured
+    '''
+    import logging
+    from math import radians
+
+    import configurations
+    from locate_bench import LocateBenchHost, render_poses_frame
+
+    logging.basicConfig(level=logging.WARNING)
+    test_logger = logging.getLogger('locator')
+    configurations.Config.SAVE_PERIOD_SECS = 0
+    test_config = configurations.Config('configs/settings.yml', 'configs/config.xml', readonly=True)
+    test_host = LocateBenchHost(test_config, test_logger)
+
+    # the current mower first, unconfigured fleet mowers left out
+    current_name = test_config['current.mower']
+    test_config.database['current.fleet'] = [current_name, 'absent', 'second']
+    test_config.database['mowers'] = test_config['mowers'] + ['second']
+    assert fleet_names(test_config) == [current_name, 'second'], fleet_names(test_config)
+
+    test_contexts = [
+        MowerContext(name, test_config, test_host.data_mapper, lambda cmd: None, test_logger)
+        for name in fleet_names(test_config)
+    ]
+    true_poses = [
+        poses.Pose(1.5, 1.5, radians(30), mapper=test_host.data_mapper),
+        poses.Pose(3.5, 2.5, radians(200), mapper=test_host.data_mapper)
+    ]
+    for test_ctx, true_pose in zip(test_contexts, true_poses):
+        test_ctx.seed(true_pose.arena.c_x_m, true_pose.arena.c_y_m)
+    test_locator = FleetLocator(test_host, test_contexts, logger=test_logger)
+    test_frame = np.asarray(render_poses_frame(test_host, true_poses))
+    for test_sid in range(3):
+        test_located = test_locator.locate(test_frame, test_sid)
+        for test_ctx, true_pose in zip(test_contexts, true_poses):
+            test_pose = test_located[test_ctx.name]
+            assert test_pose is not None, (test_sid, test_ctx.name)
+            error_m = hypot(test_pose.arena.c_x_m - true_pose.arena.c_x_m, test_pose.arena.c_y_m - true_pose.arena.c_y_m)
+            assert error_m < 0.1, (test_sid, test_ctx.name, error_m)
+        # a frame's probes are kept for its snapshot
+        assert len(test_locator.probes) > 0
+    # prospected once, then tracked in the viewports of the last poses
+    assert test_locator.stats['prospected'] == 1, test_locator.stats
+    assert len(test_locator.probes[0][0]) == len(test_contexts), test_locator.probes[0][0]
+    print(test_locator.stats, test_contexts)
+
+    # reconfiguring keeps the command history, but escalation starts afresh
+    test_ctx = test_contexts[0]
+    test_ctx.rules_engine.last_n_commands.append('test command')
+    test_ctx.rules_engine.route_started_time = 123
+    test_ctx.is_escalating = True
+    test_ctx.rung_index = 2
+    test_ctx.reconfigure(test_ctx.name, test_config, test_host.data_mapper, lambda cmd: None)
+    assert list(test_ctx.rules_engine.last_n_commands) == ['test command']
+    assert test_ctx.rules_engine.route_started_time == 123
+    assert not test_ctx.is_escalating and test_ctx.rung_index == 0
+    print('fleet tests passed')
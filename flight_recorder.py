@@ -0,0 +1,535 @@
+import glob
+import io
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+import constants
+from snapshot_documents import json_safe
+
+'''
+    Flight recorder
+
+    An always-on record of each excursion: analysis frames, the viewports probed,
+    snapshot metadata, the rule and command chosen and telemetry, each stamped
+    with monotonic and wall clock times. Records go to a fixed-size ring file,
+    memory-mapped, so the oldest records are overwritten once it is full and
+    disk usage is bounded by the file size times the number of files kept.
+
+    The governor only enqueues references; encoding and writing happen in the
+    recorder's thread, and when its queue is full records are dropped and counted
+    rather than the caller waiting.
+
+    python flight_recorder.py info <ring file>
+    python flight_recorder.py export <ring file> <folder>   (frames as raw-N.jpg/json for ReplayCamera)
+    python flight_recorder.py replay <ring file> [--step]
+'''
+
+# record kinds
+WRAP = 0
+FRAME = 1
+VIEWPORT = 2
+SNAPSHOT = 3
+COMMAND = 4
+TELEMETRY = 5
+NOTE = 6
+KIND_NAMES = {FRAME: 'frame', VIEWPORT: 'viewport', SNAPSHOT: 'snapshot',
+              COMMAND: 'command', TELEMETRY: 'telemetry', NOTE: 'note'}
+
+MAGIC = b'PXMFLREC'
+VERSION = 1
+# magic, version, header size, capacity, head, tail, next sequence, record count, created
+HEADER = struct.Struct('<8sIIQQQQQd')
+HEADER_SIZE = 64
+# total length, kind, meta length, sequence, monotonic secs, wall secs
+RECORD = struct.Struct('<IB3xIQdd')
+ALIGNMENT = 8
+
+Record = namedtuple('Record', 'kind seq mono_secs wall_secs meta blob')
+
+
+def aligned(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class RingFile():
+    '''
+        fixed-size memory-mapped file of variable length records
+        written at the head, overwriting the oldest at the tail once full
+    '''
+
+    def __init__(self, path, capacity=None):
+        self.path = path
+        if capacity is not None:
+            # a new ring, the file allocated up front
+            capacity = aligned(capacity)
+            with open(path, 'wb') as ring_file:
+                ring_file.truncate(HEADER_SIZE + capacity)
+            self.file = open(path, 'r+b')
+            self.mm = mmap.mmap(self.file.fileno(), HEADER_SIZE + capacity)
+            self.capacity = capacity
+            self.head = self.tail = 0
+            self.next_seq = 0
+            self.count = 0
+            self.created = time.time()
+            self.write_header()
+        else:
+            self.file = open(path, 'rb')
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _header_size, self.capacity, self.head, self.tail, self.next_seq, \
+                self.count, self.created = HEADER.unpack_from(self.mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('{0} is not a flight recording'.format(path))
+
+    def write_header(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, HEADER_SIZE, self.capacity, self.head, self.tail,
+                         self.next_seq, self.count, self.created)
+
+    def wrapped(self, offset):
+        '''
+            the offset of the record at offset, at the start if the ring wrapped there
+        '''
+        if self.capacity - offset < RECORD.size:
+            return 0
+        if struct.unpack_from('<I', self.mm, HEADER_SIZE + offset)[0] == 0:
+            return 0
+        return offset
+
+    def release(self, start, end):
+        '''
+            drop the oldest records while the tail lies within [start, end)
+        '''
+        while self.count > 0:
+            self.tail = self.wrapped(self.tail)
+            if not start <= self.tail < end:
+                break
+            length = struct.unpack_from('<I', self.mm, HEADER_SIZE + self.tail)[0]
+            self.tail += length
+            self.count -= 1
+        if self.count == 0:
+            self.tail = self.head
+
+    def append(self, kind, mono_secs, wall_secs, meta_bytes, blob=b''):
+        length = aligned(RECORD.size + len(meta_bytes) + len(blob))
+        if length > self.capacity:
+            return False
+        if self.head + length > self.capacity:
+            # no room before the end, mark the wrap and start again from the beginning
+            if self.capacity - self.head >= 4:
+                self.release(self.head, self.head + 4)
+                struct.pack_into('<I', self.mm, HEADER_SIZE + self.head, 0)
+            self.head = 0
+        self.release(self.head, self.head + length)
+        offset = HEADER_SIZE + self.head
+        RECORD.pack_into(self.mm, offset, length, kind, len(meta_bytes), self.next_seq, mono_secs, wall_secs)
+        offset += RECORD.size
+        self.mm[offset:offset + len(meta_bytes)] = meta_bytes
+        offset += len(meta_bytes)
+        self.mm[offset:offset + len(blob)] = blob
+        self.head += length
+        self.next_seq += 1
+        self.count += 1
+        self.write_header()
+        return True
+
+    def records(self):
+        '''
+            the records held, oldest first
+        '''
+        offset = self.tail
+        for _n in range(self.count):
+            offset = self.wrapped(offset)
+            length, kind, meta_len, seq, mono_secs, wall_secs = RECORD.unpack_from(self.mm, HEADER_SIZE + offset)
+            start = HEADER_SIZE + offset + RECORD.size
+            meta = json.loads(bytes(self.mm[start:start + meta_len]).decode('utf8'))
+            blob_len = meta.get('blob_len', 0)
+            blob = bytes(self.mm[start + meta_len:start + meta_len + blob_len])
+            yield Record(kind, seq, mono_secs, wall_secs, meta, blob)
+            offset += length
+
+    @property
+    def used_bytes(self):
+        if self.count == 0:
+            return 0
+        return (self.head - self.tail) % self.capacity or self.capacity
+
+    def flush(self):
+        if self.mm.closed is False and self.file.mode != 'rb':
+            self.mm.flush()
+
+    def close(self):
+        if not self.mm.closed:
+            self.flush()
+            self.mm.close()
+        self.file.close()
+
+
+def encode_image(img_arr, quality):
+    img_buffer = io.BytesIO()
+    Image.fromarray(img_arr).save(img_buffer, format='JPEG', quality=quality)
+    return img_buffer.getvalue()
+
+
+def pose_meta(pose):
+    '''
+        the pose as ReplayCamera's raw-N.json sidecar holds it, None if not found
+    '''
+    if pose is None or pose.arena is None or pose.arena.c_x_m is None:
+        return None
+    return {
+        'x_m': round(float(pose.arena.c_x_m), 4),
+        'y_m': round(float(pose.arena.c_y_m), 4),
+        'heading_deg': round(float(np.degrees(pose.arena.t_rad)), 2)
+    }
+
+
+class FlightRecorder(threading.Thread):
+    '''
+        background writer of one ring file per session, e.g. per excursion,
+        keeping the most recent max_files sessions
+    '''
+    STOP = None
+
+    def __init__(
+        self,
+        folder_path,
+        enabled=constants.FLIGHT_RECORDER_ENABLED,
+        file_bytes=constants.FLIGHT_RECORDER_FILE_BYTES,
+        max_files=constants.FLIGHT_RECORDER_MAX_FILES,
+        queue_size=constants.FLIGHT_RECORDER_QUEUE_SIZE,
+        frame_period_secs=constants.FLIGHT_RECORDER_FRAME_PERIOD_SECS,
+        jpeg_quality=constants.FLIGHT_RECORDER_JPEG_QUALITY,
+        logger=None
+    ):
+        super().__init__(name='flight-recorder', daemon=True)
+        self.folder_path = folder_path
+        self.enabled = enabled
+        self.file_bytes = file_bytes
+        self.max_files = max_files
+        self.frame_period_secs = frame_period_secs
+        self.jpeg_quality = jpeg_quality
+        self.logger = logger
+        self.record_queue = queue.Queue(queue_size)
+        self.ring = None
+        self.last_frame_secs = -frame_period_secs
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.written_bytes = 0
+        if enabled:
+            os.makedirs(folder_path, exist_ok=True)
+            self.start()
+
+    def enqueue(self, item):
+        if not self.enabled:
+            return False
+        try:
+            self.record_queue.put_nowait(item)
+            self.queued += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def open_session(self, name):
+        '''
+            record to a new ring file from here on
+        '''
+        self.enqueue(('session', name))
+
+    def record(self, kind, meta, img_arr=None):
+        '''
+            queue a record, img_arr is encoded in the recorder's thread
+        '''
+        return self.enqueue((kind, time.monotonic(), time.time(), meta, img_arr))
+
+    def record_frame(self, sid, img_arr):
+        '''
+            the whole analysis frame, at most once per frame period
+        '''
+        now = time.monotonic()
+        if now - self.last_frame_secs < self.frame_period_secs:
+            return False
+        self.last_frame_secs = now
+        return self.record(FRAME, {'ssid': sid}, img_arr)
+
+    def record_viewports(self, sid, viewports):
+        for vp in viewports:
+            sub_array = getattr(vp, 'display_sub_array', None)
+            if sub_array is not None:
+                self.record(VIEWPORT, {'ssid': sid, 'index': vp.index, 'origin_pc': list(vp.origin),
+                                       'extent_pc': [vp.height, vp.width]}, sub_array)
+
+    def record_snapshot(self, sid, pose, **meta):
+        meta.update({'ssid': sid, 'pose': pose_meta(pose)})
+        return self.record(SNAPSHOT, meta)
+
+    def record_command(self, sid, rule_name, cmd, **meta):
+        meta.update({'ssid': sid, 'rule': rule_name, 'cmd': cmd})
+        return self.record(COMMAND, meta)
+
+    def record_telemetry(self, telem):
+        return self.record(TELEMETRY, {'telem': telem})
+
+    def prune(self):
+        '''
+            keep the newest max_files sessions
+        '''
+        ring_paths = sorted(glob.glob(os.path.join(self.folder_path, '*.ring')), key=os.path.getmtime)
+        for ring_path in ring_paths[:max(len(ring_paths) - self.max_files, 0)]:
+            os.remove(ring_path)
+
+    def switch(self, name):
+        if self.ring is not None:
+            self.ring.close()
+        ring_path = os.path.join(self.folder_path, '{0}.ring'.format(name))
+        self.ring = RingFile(ring_path, self.file_bytes)
+        self.prune()
+
+    def write(self, item):
+        kind, mono_secs, wall_secs, meta, img_arr = item
+        blob = b''
+        if img_arr is not None:
+            blob = encode_image(img_arr, self.jpeg_quality)
+            meta['blob_len'] = len(blob)
+        meta_bytes = json.dumps(json_safe(meta)).encode('utf8')
+        if self.ring is None:
+            self.switch('session-{0}'.format(time.strftime('%Y%m%d-%H%M%S')))
+        if self.ring.append(kind, mono_secs, wall_secs, meta_bytes, blob):
+            self.written += 1
+            self.written_bytes += RECORD.size + len(meta_bytes) + len(blob)
+
+    def run(self):
+        last_sync = time.monotonic()
+        while True:
+            try:
+                item = self.record_queue.get(timeout=constants.FLIGHT_RECORDER_SYNC_SECS)
+            except queue.Empty:
+                item = ()
+            try:
+                if item is self.STOP:
+                    break
+                if len(item) == 2:
+                    self.switch(item[1])
+                elif len(item) > 0:
+                    self.write(item)
+                if self.ring is not None and time.monotonic() - last_sync > constants.FLIGHT_RECORDER_SYNC_SECS:
+                    self.ring.flush()
+                    last_sync = time.monotonic()
+            except Exception as e:
+                err_line = sys.exc_info()[-1].tb_lineno
+                msg = 'Error in FlightRecorder: ' + str(e) + ' on line ' + str(err_line)
+                if self.logger is not None:
+                    self.logger.error(msg)
+                else:
+                    print(msg)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def stop(self, timeout_secs=5.0):
+        '''
+            write out what is queued and close the ring file
+        '''
+        if self.enabled and self.is_alive():
+            try:
+                self.record_queue.put(self.STOP, timeout=timeout_secs)
+            except queue.Full:
+                pass
+            self.join(timeout_secs)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'queued': self.queued,
+            'dropped': self.dropped,
+            'written': self.written,
+            'written_bytes': self.written_bytes,
+            'backlog': self.record_queue.qsize(),
+            'file': self.ring.path if self.ring is not None else None
+        }
+
+
+Step = namedtuple('Step', 'ssid mono_secs snapshot frame viewports commands telemetry')
+
+
+class FlightSession():
+    '''
+        a recorded session, read back for export and replay
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        ring = RingFile(path)
+        try:
+            self.capacity = ring.capacity
+            self.used_bytes = ring.used_bytes
+            self.records = list(ring.records())
+        finally:
+            ring.close()
+
+    def summary(self):
+        kinds = {}
+        for record in self.records:
+            name = KIND_NAMES.get(record.kind, str(record.kind))
+            kinds[name] = kinds.get(name, 0) + 1
+        secs = self.records[-1].mono_secs - self.records[0].mono_secs if len(self.records) > 1 else 0
+        return {
+            'path': self.path,
+            'records': len(self.records),
+            'kinds': kinds,
+            'first_seq': self.records[0].seq if len(self.records) > 0 else None,
+            'duration_secs': round(secs, 2),
+            'used_bytes': self.used_bytes,
+            'capacity': self.capacity
+        }
+
+    def steps(self):
+        '''
+            the records gathered per snapshot, in order
+            telemetry is given to the next snapshot
+        '''
+        step = None
+        telemetry = []
+        for record in self.records:
+            if record.kind == TELEMETRY:
+                telemetry.append(record.meta['telem'])
+                continue
+            sid = record.meta.get('ssid')
+            if step is None or sid != step.ssid:
+                if step is not None:
+                    yield step
+                step = Step(sid, record.mono_secs, None, None, [], [], telemetry)
+                telemetry = []
+            if record.kind == SNAPSHOT:
+                step = step._replace(snapshot=record.meta)
+            elif record.kind == FRAME:
+                step = step._replace(frame=record.blob)
+            elif record.kind == VIEWPORT:
+                step.viewports.append((record.meta, record.blob))
+            elif record.kind == COMMAND:
+                step.commands.append(record.meta)
+        if step is not None:
+            yield step
+
+    def export(self, folder_path):
+        '''
+            frames as raw-N.jpg with raw-N.json poses, which ReplayCamera and locate_bench
+            replay, viewports as vp-N-index.jpg, and every other record as events.jsonl
+        '''
+        os.makedirs(folder_path, exist_ok=True)
+        num_frames = 0
+        with open(os.path.join(folder_path, 'events.jsonl'), 'w') as events_file:
+            for n, step in enumerate(self.steps()):
+                if step.frame is not None:
+                    with open(os.path.join(folder_path, 'raw-{0}.jpg'.format(n)), 'wb') as frame_file:
+                        frame_file.write(step.frame)
+                    with open(os.path.join(folder_path, 'raw-{0}.json'.format(n)), 'w') as pose_file:
+                        json.dump(step.snapshot['pose'] if step.snapshot is not None else None, pose_file)
+                    num_frames += 1
+                for vp_meta, vp_blob in step.viewports:
+                    with open(os.path.join(folder_path, 'vp-{0}-{1}.jpg'.format(n, vp_meta['index'])), 'wb') as vp_file:
+                        vp_file.write(vp_blob)
+                events_file.write(json.dumps({
+                    'step': n,
+                    'ssid': step.ssid,
+                    'mono_secs': round(step.mono_secs, 3),
+                    'snapshot': step.snapshot,
+                    'frame': 'raw-{0}.jpg'.format(n) if step.frame is not None else None,
+                    'viewports': [vp_meta['index'] for vp_meta, _blob in step.viewports],
+                    'commands': step.commands,
+                    'telemetry': step.telemetry
+                }) + '\n')
+        return num_frames
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Proxymow flight recorder')
+    parser.add_argument('action', nargs='?', choices=['info', 'export', 'replay', 'test'], default='test')
+    parser.add_argument('ring', nargs='?')
+    parser.add_argument('folder', nargs='?')
+    parser.add_argument('--step', action='store_true', help='wait for enter between snapshots')
+    args = parser.parse_args()
+
+    if args.action == 'info':
+        print(json.dumps(FlightSession(args.ring).summary(), indent=2))
+    elif args.action == 'export':
+        session = FlightSession(args.ring)
+        print('{0} frames exported to {1}'.format(session.export(args.folder), args.folder))
+    elif args.action == 'replay':
+        session = FlightSession(args.ring)
+        start_secs = session.records[0].mono_secs if len(session.records) > 0 else 0
+        for step in session.steps():
+            pose = step.snapshot['pose'] if step.snapshot is not None else None
+            print('{0:9.2f}s ssid {1:>5} pose {2} frame {3} viewports {4} commands {5} telemetry {6}'.format(
+                step.mono_secs - start_secs, str(step.ssid), pose, step.frame is not None,
+                len(step.viewports), [c['cmd'] for c in step.commands], len(step.telemetry)))
+            if args.step:
+                input()
+    else:
+        '''
+            Class Tests
+        '''
+        import tempfile
+        from types import SimpleNamespace
+
+        # the ring keeps the newest records and wraps cleanly
+        tmp_folder = tempfile.mkdtemp(prefix='flight-')
+        ring = RingFile(os.path.join(tmp_folder, 'unit.ring'), 4096)
+        for n in range(500):
+            ring.append(SNAPSHOT, n, n, json.dumps({'n': n, 'pad': 'x' * (n % 37)}).encode('utf8'))
+        kept = [r.meta['n'] for r in ring.records()]
+        assert kept == list(range(500 - len(kept), 500)) and ring.used_bytes <= ring.capacity
+        ring.close()
+        reread = [r.meta['n'] for r in RingFile(os.path.join(tmp_folder, 'unit.ring')).records()]
+        assert reread == kept
+        print('ring of 4096 bytes holds the newest {0} of 500 records'.format(len(kept)))
+
+        # a locate loop's worth of records, timing what the governor pays
+        rng = np.random.default_rng(2)
+        frame = (rng.integers(0, 40, (1088, 1456)) + 96).astype(np.uint8)
+        recorder = FlightRecorder(tmp_folder, file_bytes=8 * 1024 * 1024, max_files=2, frame_period_secs=0.1)
+        recorder.open_session('excursion-1')
+        call_secs = []
+        for sid in range(300):
+            viewport = SimpleNamespace(index='{0}B'.format(sid), origin=(40.0, 40.0), height=10.0, width=10.0,
+                                       display_sub_array=frame[400:520, 500:650])
+            pose = SimpleNamespace(arena=SimpleNamespace(c_x_m=1.0 + sid / 100, c_y_m=2.0, t_rad=0.5))
+            start = time.perf_counter()
+            recorder.record_frame(sid, frame)
+            recorder.record_viewports(sid, [viewport])
+            recorder.record_snapshot(sid, pose, conf_pc=80.0)
+            recorder.record_command(sid, 'Drive', 'sweep(50,50,500)')
+            if sid % 20 == 0:
+                recorder.record_telemetry({'cutter1': 1, 'sensors': {'battery': 12.1}})
+            call_secs.append(time.perf_counter() - start)
+            time.sleep(0.01)
+        recorder.open_session('excursion-2')
+        recorder.record_snapshot(0, None)
+        recorder.stop()
+        print('governor cost per snapshot mean {0:.3f}ms max {1:.3f}ms, stats {2}'.format(
+            np.mean(call_secs) * 1000, np.max(call_secs) * 1000, recorder.stats()))
+
+        session = FlightSession(os.path.join(tmp_folder, 'excursion-1.ring'))
+        print(session.summary())
+        steps = list(session.steps())
+        assert steps[-1].snapshot['pose']['x_m'] == 3.99 and steps[-1].commands[0]['cmd'] == 'sweep(50,50,500)'
+        num_frames = session.export(os.path.join(tmp_folder, 'export'))
+        from cameras import ReplayCamera
+        camera = ReplayCamera(os.path.join(tmp_folder, 'export'), loop=False)
+        print('{0} frames exported, {1} replayable'.format(num_frames, len(camera)))
+        assert len(camera) == num_frames > 0
+        # the second session survives, pruning keeps two
+        assert sorted(os.path.basename(p) for p in glob.glob(os.path.join(tmp_folder, '*.ring'))) == \
+            ['excursion-1.ring', 'excursion-2.ring']
@@ -0,0 +1,274 @@
+import io
+import struct
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+import constants
+
+'''
+    Compact binary framing for image arrays passed from a camera node to the server
+
+    Each frame is a fixed little-endian header followed by its payload:
+
+        magic, version, codec, dtype, ndim,
+        shape (rows, cols, chans),
+        capture timestamp,
+        roi origin (row, col) and full frame size (rows, cols) in pixels,
+        scale (full frame pixels per frame pixel),
+        payload length
+
+    Several frames may be concatenated in one response, e.g. a full resolution
+    region of interest followed by a low resolution copy of the whole frame.
+'''
+
+FRAME_MAGIC = b'PXMF'
+FRAME_VERSION = 1
+HEADER_FORMAT = '<4sBBBBIIIdIIIIfI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_JPEG = 2
+CODEC_PNG = 3
+CODECS = {'raw': CODEC_RAW, 'zlib': CODEC_ZLIB, 'jpeg': CODEC_JPEG, 'png': CODEC_PNG}
+LOSSLESS_CODECS = (CODEC_RAW, CODEC_ZLIB, CODEC_PNG)
+
+DTYPES = (np.dtype(np.uint8), np.dtype(np.uint16), np.dtype(np.float32))
+
+FrameHeader = namedtuple('FrameHeader', [
+    'magic', 'version', 'codec', 'dtype', 'ndim',
+    'rows', 'cols', 'chans',
+    'capture_time',
+    'origin_row', 'origin_col', 'full_rows', 'full_cols',
+    'scale',
+    'payload_len'
+])
+
+
+class FrameProtocolException(Exception):
+    pass
+
+
+def codec_code(codec):
+    '''
+        accept a codec name or code
+    '''
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise FrameProtocolException('Unknown frame codec: {0}'.format(codec))
+        return CODECS[codec]
+    return int(codec)
+
+
+def roi_from_qs(roi_str, shape):
+    '''
+        'top,left,bottom,right' in percent => (row slice, col slice) in pixels
+        as used by the Viewport class
+    '''
+    top_pc, left_pc, bottom_pc, right_pc = [float(v) for v in roi_str.split(',')]
+    rows, cols = shape[:2]
+    top = max(int(top_pc * rows / 100), 0)
+    left = max(int(left_pc * cols / 100), 0)
+    bottom = min(int(np.ceil(bottom_pc * rows / 100)), rows)
+    right = min(int(np.ceil(right_pc * cols / 100)), cols)
+    return slice(top, max(bottom, top)), slice(left, max(right, left))
+
+
+def roi_to_qs(viewport):
+    '''
+        Viewport => 'top,left,bottom,right' in percent
+    '''
+    row_slice, col_slice = viewport.slicer_info
+    return '{0},{1},{2},{3}'.format(row_slice.start, col_slice.start, row_slice.stop, col_slice.stop)
+
+
+def viewport_to_qs(viewport):
+    '''
+        Viewport => exact 'top,left,bottom,right' percentages
+        so both nodes slice identical sub-arrays
+    '''
+    top, left = viewport.origin
+    bottom, right = viewport.bottom_right
+    return ','.join(repr(float(v)) for v in (top, left, bottom, right))
+
+
+def viewport_from_qs(viewport_str):
+    '''
+        'top,left,bottom,right' percentages => origin and diagonal corners
+    '''
+    top, left, bottom, right = [float(v) for v in viewport_str.split(',')]
+    return (top, left), (bottom, right)
+
+
+def encode_frame(
+    img_arr,
+    codec=CODEC_RAW,
+    capture_time=None,
+    origin=(0, 0),
+    full_shape=None,
+    scale=1.0,
+    quality=constants.REMOTE_FRAME_JPEG_QUALITY,
+    level=constants.REMOTE_FRAME_ZLIB_LEVEL
+):
+    '''
+        header + payload as bytes
+        lossy/image codecs only apply to 8 bit frames, others fall back to zlib
+    '''
+    codec = codec_code(codec)
+    img_arr = np.ascontiguousarray(img_arr)
+    if img_arr.dtype not in DTYPES:
+        img_arr = img_arr.astype(np.uint8)
+    if img_arr.ndim not in (2, 3):
+        raise FrameProtocolException('Frames must be 2 or 3 dimensional, not {0}'.format(img_arr.ndim))
+    if codec in (CODEC_JPEG, CODEC_PNG) and img_arr.dtype != np.uint8:
+        codec = CODEC_ZLIB
+    if capture_time is None:
+        capture_time = time.time()
+    if full_shape is None:
+        full_shape = img_arr.shape
+
+    if codec == CODEC_RAW:
+        payload = img_arr.data
+    elif codec == CODEC_ZLIB:
+        payload = zlib.compress(img_arr.data, level)
+    else:
+        buffer = io.BytesIO()
+        if codec == CODEC_JPEG:
+            Image.fromarray(img_arr).save(buffer, 'jpeg', quality=quality)
+        else:
+            Image.fromarray(img_arr).save(buffer, 'png', compress_level=1)
+        payload = buffer.getbuffer()
+
+    rows, cols = img_arr.shape[:2]
+    chans = img_arr.shape[2] if img_arr.ndim == 3 else 1
+    header = struct.pack(
+        HEADER_FORMAT,
+        FRAME_MAGIC,
+        FRAME_VERSION,
+        codec,
+        DTYPES.index(img_arr.dtype),
+        img_arr.ndim,
+        rows,
+        cols,
+        chans,
+        capture_time,
+        origin[0],
+        origin[1],
+        full_shape[0],
+        full_shape[1],
+        scale,
+        len(payload) if codec != CODEC_RAW else img_arr.nbytes
+    )
+    return b''.join((header, payload))
+
+
+def encode_frames(frames):
+    '''
+        concatenate encoded frames into a single response body
+    '''
+    return b''.join(frames)
+
+
+def read_header(buf, offset=0):
+    header = FrameHeader(*struct.unpack_from(HEADER_FORMAT, buf, offset))
+    if header.magic != FRAME_MAGIC:
+        raise FrameProtocolException('Bad frame magic: {0}'.format(header.magic))
+    if header.version != FRAME_VERSION:
+        raise FrameProtocolException('Unsupported frame version: {0}'.format(header.version))
+    return header
+
+
+def decode_frame(buf, offset=0):
+    '''
+        decode the frame starting at offset
+        raw frames are views onto buf, so writable if buf is a bytearray
+        returns array, header and the offset of the following frame
+    '''
+    header = read_header(buf, offset)
+    start = offset + HEADER_SIZE
+    end = start + header.payload_len
+    if end > len(buf):
+        raise FrameProtocolException('Truncated frame: {0} of {1} bytes'.format(
+            len(buf) - start, header.payload_len))
+    dtype = DTYPES[header.dtype]
+    shape = (header.rows, header.cols, header.chans) if header.ndim == 3 else (header.rows, header.cols)
+
+    if header.codec == CODEC_RAW:
+        img_arr = np.frombuffer(buf, dtype=dtype, count=int(np.prod(shape)), offset=start).reshape(shape)
+    elif header.codec == CODEC_ZLIB:
+        img_arr = np.frombuffer(
+            bytearray(zlib.decompress(memoryview(buf)[start:end])), dtype=dtype).reshape(shape)
+    elif header.codec in (CODEC_JPEG, CODEC_PNG):
+        with Image.open(io.BytesIO(memoryview(buf)[start:end])) as img:
+            img_arr = np.array(img)
+        img_arr = img_arr.reshape(shape)
+    else:
+        raise FrameProtocolException('Unknown frame codec: {0}'.format(header.codec))
+
+    return img_arr, header, end
+
+
+def decode_frames(buf):
+    '''
+        decode all the frames in a response body
+        returns list of (array, header)
+    '''
+    frames = []
+    offset = 0
+    while offset + HEADER_SIZE <= len(buf):
+        img_arr, header, offset = decode_frame(buf, offset)
+        frames.append((img_arr, header))
+    return frames
+
+
+def reduce_frame(img_arr, factor):
+    '''
+        box-filtered low resolution copy of a frame
+    '''
+    if factor <= 1:
+        return img_arr
+    return np.asarray(Image.fromarray(img_arr).reduce(int(factor)))
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    rng = np.random.default_rng(1)
+    # smooth-ish test card with noise so compression figures are plausible
+    yy, xx = np.mgrid[0:1536, 0:2048]
+    gray = ((np.sin(xx / 60.0) + np.cos(yy / 45.0)) * 60 + 128 + rng.normal(0, 4, xx.shape)).clip(0, 255).astype(np.uint8)
+    colour = np.dstack([gray, np.roll(gray, 7, axis=1), np.roll(gray, 11, axis=0)])
+
+    for test_arr in (gray, colour):
+        for codec in ('raw', 'zlib', 'png', 'jpeg'):
+            start = time.perf_counter()
+            body = encode_frame(test_arr, codec)
+            enc_secs = time.perf_counter() - start
+            start = time.perf_counter()
+            out_arr, hdr, _next = decode_frame(bytearray(body))
+            dec_secs = time.perf_counter() - start
+            exact = np.array_equal(out_arr, test_arr)
+            print('{0:<5} {1:<14} {2:>9} bytes ({3:5.1f}%) enc {4:6.1f}ms dec {5:6.1f}ms exact: {6} writable: {7}'.format(
+                codec, str(test_arr.shape), len(body), 100 * len(body) / test_arr.nbytes,
+                1000 * enc_secs, 1000 * dec_secs, exact, out_arr.flags.writeable))
+            if CODECS[codec] in LOSSLESS_CODECS:
+                assert exact
+
+    # roi at full resolution plus a quarter resolution full frame
+    row_slice, col_slice = roi_from_qs('40,30,60,55', gray.shape)
+    roi_arr = gray[row_slice, col_slice]
+    lores_arr = reduce_frame(gray, 4)
+    body = encode_frames([
+        encode_frame(roi_arr, 'zlib', origin=(row_slice.start, col_slice.start), full_shape=gray.shape),
+        encode_frame(lores_arr, 'jpeg', full_shape=gray.shape, scale=4.0)
+    ])
+    frames = decode_frames(body)
+    for arr, hdr in frames:
+        print(arr.shape, hdr.codec, (hdr.origin_row, hdr.origin_col), (hdr.full_rows, hdr.full_cols), hdr.scale)
+    assert np.array_equal(frames[0][0], roi_arr)
+    print('roi + lores: {0} bytes vs {1} bytes full frame raw'.format(len(body), gray.nbytes))
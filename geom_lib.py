@@ -1,9 +1,11 @@
 import sys
 from math import sqrt, pi, sin, cos, atan2, acos, degrees, ceil
-from shapely.geometry import LineString
-from shapely.geometry import Polygon
 import numpy as np
 
+from startup import deferred_import
+
+shapely_geometry = deferred_import('shapely.geometry')
+
 
 def get_angle_between_cartesian_points(tail_x, tail_y, tip_x, tip_y, default=None):
     # calculate the angle between 2 world points
@@ -113,9 +115,9 @@ def polygon_centroid(polygon_pts):
     try:
         if len(polygon_pts) > 0:
             if isinstance(polygon_pts, np.ndarray):
-                polygon = Polygon(polygon_pts)
+                polygon = shapely_geometry.Polygon(polygon_pts)
             else:
-                polygon = Polygon(polygon_pts)
+                polygon = shapely_geometry.Polygon(polygon_pts)
             centroid = polygon.centroid
     except Exception as e:
         err_line = sys.exc_info()[-1].tb_lineno
@@ -126,7 +128,7 @@ def polygon_centroid(polygon_pts):
 
 def midpoint(lineStartX, lineStartY, lineEndX, lineEndY):
     result = {}
-    line = LineString([(lineStartX, lineStartY), (lineEndX, lineEndY)])
+    line = shapely_geometry.LineString([(lineStartX, lineStartY), (lineEndX, lineEndY)])
     mid_pt = line.interpolate(0.5, normalized=True)
     result['x'] = mid_pt.x
     result['y'] = mid_pt.y
@@ -0,0 +1,226 @@
+import sys
+import threading
+import numpy as np
+from PIL import Image
+
+import constants
+from dashed_image_draw import DashedImageDraw
+from fixed_length_dict import FixedLengthDict
+from mapper import DataMapper
+from vis_lib import matrices_from_quad_points, grid_intersections_camera
+
+
+class GridLayer():
+    '''
+        rasterised grid for a single calibration/resolution/undistort combination
+    '''
+
+    def __init__(self, cache_key, mask_img, intersections):
+        self.cache_key = cache_key
+        self.mask_img = mask_img  # 'L' image, 255 where grid is drawn
+        self.mask_array = np.asarray(mask_img, bool)
+        self.intersections = intersections
+
+    def __repr__(self):
+        return '{0} {1}x{2} marked: {3}'.format(
+            self.cache_key,
+            self.mask_img.size[0],
+            self.mask_img.size[1],
+            np.count_nonzero(self.mask_array)
+        )
+
+
+class GridOverlay():
+    '''
+        caches calibration matrices and pre-rasterised grid masks
+        so that applying the grid to a frame is a single composite
+    '''
+
+    def __init__(self, logger=None, cache_size=constants.GRID_OVERLAY_CACHE_SIZE):
+        self.logger = logger
+        self.layers = FixedLengthDict(cache_size)
+        self.matrices = FixedLengthDict(cache_size)
+        self.data_mapper = DataMapper(logger=logger, populate=False)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        '''
+            drop every layer and matrix, e.g. when the calibration changes
+        '''
+        with self._lock:
+            self.layers.clear()
+            self.matrices.clear()
+
+    @staticmethod
+    def calibration_key(config, lawn_width_m, lawn_length_m, border_m, img_width_px, img_height_px):
+        calib_pc_points = tuple((p.x, p.y) for p in config['lawn.calib'])
+        return (
+            calib_pc_points,
+            config['calib.width_m'],
+            config['calib.length_m'],
+            config['calib.offset_x_m'],
+            config['calib.offset_y_m'],
+            config['lawn.border_m'],
+            lawn_width_m,
+            lawn_length_m,
+            border_m,
+            img_width_px,
+            img_height_px
+        )
+
+    def get_arena_matrix(self, config, calib_key, lawn_width_m, lawn_length_m, img_width_px, img_height_px):
+        '''
+            pixel to arena metres matrix, derived once per calibration
+        '''
+        arena_matrix = self.matrices.get(calib_key)
+        if arena_matrix is None:
+            calib_pc_points = [list(p) for p in calib_key[0]]
+            _M, _N, arena_matrix, _K = matrices_from_quad_points(
+                calib_pc_points,
+                config['calib.width_m'],
+                config['calib.length_m'],
+                config['calib.offset_x_m'],
+                config['calib.offset_y_m'],
+                lawn_width_m,
+                lawn_length_m,
+                config['lawn.border_m'],
+                img_height_px,
+                img_width_px,
+                logger=self.logger,
+                debug=False
+            )
+            self.matrices[calib_key] = arena_matrix
+        return arena_matrix
+
+    def get_layer(
+        self,
+        config,
+        cam_settings,
+        lawn_width_m,
+        lawn_length_m,
+        border_m,
+        just_periphery=True,
+        timesheet=None
+    ):
+        '''
+            obtain the rasterised grid layer, building it on a cache miss
+        '''
+        layer = None
+        try:
+            img_width_px = int(cam_settings['resolution'].split('x')[0])
+            img_height_px = int(cam_settings['resolution'].split('x')[1])
+            strength = cam_settings['undistort_strength']
+            zoom = cam_settings['undistort_zoom']
+            calib_key = self.calibration_key(
+                config, lawn_width_m, lawn_length_m, border_m, img_width_px, img_height_px)
+            layer_key = (calib_key, strength, zoom, just_periphery)
+
+            with self._lock:
+                layer = self.layers.get(layer_key)
+                if layer is not None:
+                    self.hits += 1
+                    if timesheet is not None:
+                        timesheet.add('grid layer cache hit')
+                    return layer
+
+                self.misses += 1
+                arena_matrix = self.get_arena_matrix(
+                    config, calib_key, lawn_width_m, lawn_length_m, img_width_px, img_height_px)
+                if timesheet is not None:
+                    timesheet.add('grid arena matrix obtained')
+
+                self.data_mapper.populate(
+                    ["unbarrel_inv", "transform"],
+                    img_width_px,
+                    img_height_px,
+                    matrix=arena_matrix,
+                    strength=strength,
+                    zoom=zoom
+                )
+                if timesheet is not None:
+                    timesheet.add('grid data mapper populated')
+
+                # obtain grid intersection coordinates
+                cam_c_px = grid_intersections_camera(
+                    lawn_width_m, lawn_length_m, border_m, self.data_mapper, logger=self.logger, debug=False)
+                if timesheet is not None:
+                    timesheet.add('grid intersections calculated')
+
+                mask_img = Image.new('L', (img_width_px, img_height_px), 0)
+                mask_draw = DashedImageDraw(mask_img)
+                dash_spec = (8, 8)
+                # draw horizontals
+                for row in [cam_c_px[0], cam_c_px[-1]] if just_periphery else cam_c_px:
+                    mask_draw.dashed_line(row, dash=dash_spec, fill=255, width=1)
+                # draw verticals
+                cam_c_px_tp = np.transpose(cam_c_px, (1, 0, 2))
+                for row in [cam_c_px_tp[0], cam_c_px_tp[-1]] if just_periphery else cam_c_px_tp:
+                    mask_draw.dashed_line(row, dash=dash_spec, fill=255, width=1)
+                if timesheet is not None:
+                    timesheet.add('grid layer rasterised')
+
+                layer = GridLayer(
+                    'grid-{0}x{1}-{2}-{3}-{4}'.format(
+                        img_width_px, img_height_px, strength, zoom, 'periphery' if just_periphery else 'full'),
+                    mask_img,
+                    cam_c_px
+                )
+                self.layers[layer_key] = layer
+                if self.logger:
+                    self.logger.debug('GridOverlay built layer {0}'.format(layer))
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            msg = 'Error in GridOverlay.get_layer: ' + \
+                str(e) + ' on line ' + str(err_line)
+            if self.logger:
+                self.logger.error(msg)
+            else:
+                print(msg)
+
+        return layer
+
+    def apply(self, img, layer, fill_col):
+        '''
+            composite the grid onto a PIL image in place
+        '''
+        if layer is not None:
+            if img.size != layer.mask_img.size:
+                mask_img = layer.mask_img.resize(img.size, resample=Image.Resampling.NEAREST)
+            else:
+                mask_img = layer.mask_img
+            img.paste(fill_col, (0, 0) + img.size, mask_img)
+        return img
+
+    def __repr__(self):
+        return 'GridOverlay layers: {0} hits: {1} misses: {2}'.format(
+            len(self.layers), self.hits, self.misses)
+
+
+if __name__ == '__main__':
+
+    print('Class Tests...')
+    from types import SimpleNamespace
+    import time
+
+    config = {
+        'lawn.calib': [SimpleNamespace(x=x, y=y) for (x, y) in [(10, 10), (10, 90), (90, 90), (90, 10)]],
+        'calib.width_m': 3.0,
+        'calib.length_m': 3.0,
+        'calib.offset_x_m': 0.0,
+        'calib.offset_y_m': 0.0,
+        'lawn.border_m': 0.5
+    }
+    cam_settings = {'resolution': '640x480', 'undistort_strength': 0.0, 'undistort_zoom': 1.0}
+    go = GridOverlay()
+    for i in range(3):
+        start = time.time()
+        lyr = go.get_layer(config, cam_settings, 3.0, 3.0, 0.5, just_periphery=False)
+        frame = Image.new('L', (640, 480), 64)
+        go.apply(frame, lyr, 'white')
+        print('pass {0} in {1:.4f} secs {2}'.format(i, time.time() - start, lyr))
+    print(go)
+    go.clear()
+    assert len(go.layers) == 0 and len(go.matrices) == 0
@@ -0,0 +1,211 @@
+import io
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+import constants
+from render_scheduler import lower_thread_priority
+
+'''
+    Image sink
+
+    Archive and debug images are encoded and saved by worker threads rather
+    than in the locate path. Jobs hold a reference to the array, or to an image
+    already drawn, and any conversion - scaling an edge array to bytes, the
+    JPEG encoding and optimisation, a matplotlib render - happens in the
+    worker. The queue is bounded: when it is full the oldest job is dropped
+    and counted, so a burst of debug images costs memory that is bounded and
+    never blocks the caller.
+
+    Arrays passed must not be written to afterwards, copy any that are scratch
+    buffers.
+'''
+
+
+class ImageJob():
+
+    def __init__(self, kind, path, source, prepare=None, save_kwargs=None):
+        self.kind = kind
+        self.path = path
+        self.source = source  # array, PIL image or callable returning either or a buffer
+        self.prepare = prepare  # applied to an array source in the worker
+        self.save_kwargs = save_kwargs if save_kwargs is not None else {}
+        self.queued = time.perf_counter()
+
+    def image(self):
+        source = self.source() if callable(self.source) else self.source
+        if isinstance(source, np.ndarray):
+            if self.prepare is not None:
+                source = self.prepare(source)
+            source = Image.fromarray(source)
+        elif isinstance(source, io.BytesIO):
+            source.seek(0)
+            source = Image.open(source)
+        if self.path.lower().endswith('.jpg') and source.mode not in ('RGB', 'L'):
+            source = source.convert('RGB')
+        return source
+
+    def write(self):
+        self.image().save(self.path, **self.save_kwargs)
+
+
+class ImageSink():
+    '''
+        bounded drop-oldest queue of image saves served by worker threads
+    '''
+
+    def __init__(self, workers=constants.IMAGE_SINK_WORKERS, queue_size=constants.IMAGE_SINK_QUEUE_SIZE,
+                 nice=constants.RENDER_NICE, logger=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.nice = nice
+        self.logger = logger
+        self.jobs = deque()
+        self._cond = threading.Condition()
+        self.threads = []
+        self.busy = 0
+        self.running = True
+        self.counts = {}
+        self.peak_backlog = 0
+        self.write_secs = 0.0
+        self.wait_secs = 0.0
+
+    def count(self, kind, outcome):
+        kind_counts = self.counts.setdefault(kind, {'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0})
+        kind_counts[outcome] += 1
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.serve, name='image-sink-{0}'.format(i), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, job):
+        with self._cond:
+            if len(self.threads) == 0:
+                self.start()
+            if len(self.jobs) >= self.queue_size:
+                dropped = self.jobs.popleft()
+                self.count(dropped.kind, 'dropped')
+            self.jobs.append(job)
+            self.count(job.kind, 'queued')
+            self.peak_backlog = max(self.peak_backlog, len(self.jobs))
+            self._cond.notify()
+
+    def save(self, path, source, kind='debug', prepare=None, **save_kwargs):
+        '''
+            save source - an array, PIL image, or callable returning either or a buffer - to path
+            prepare(array) runs in the worker, e.g. scaling an edge array to bytes
+        '''
+        self.put(ImageJob(kind, path, source, prepare, save_kwargs))
+
+    def serve(self):
+        lower_thread_priority(self.nice)
+        while True:
+            with self._cond:
+                while self.running and len(self.jobs) == 0:
+                    self._cond.wait()
+                if not self.running and len(self.jobs) == 0:
+                    break
+                job = self.jobs.popleft()
+                self.busy += 1
+            start = time.perf_counter()
+            outcome = 'written'
+            try:
+                job.write()
+            except Exception as e:
+                outcome = 'failed'
+                err_line = sys.exc_info()[-1].tb_lineno
+                msg = 'Error in ImageSink writing {0}: {1} on line {2}'.format(job.path, e, err_line)
+                if self.logger is not None:
+                    self.logger.error(msg)
+                else:
+                    print(msg)
+            with self._cond:
+                self.busy -= 1
+                self.count(job.kind, outcome)
+                self.write_secs += time.perf_counter() - start
+                self.wait_secs += start - job.queued
+                self._cond.notify_all()
+
+    def flush(self, timeout_secs=None):
+        '''
+            wait until every queued job is written, False on timeout
+        '''
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self.jobs) == 0 and self.busy == 0, timeout_secs)
+
+    def stop(self, timeout_secs=5.0):
+        self.flush(timeout_secs)
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout_secs)
+        self.threads = []
+        self.running = True
+
+    def stats(self):
+        with self._cond:
+            written = sum(c['written'] for c in self.counts.values())
+            return {
+                'kinds': {kind: dict(kind_counts) for kind, kind_counts in self.counts.items()},
+                'backlog': len(self.jobs),
+                'peak_backlog': self.peak_backlog,
+                'mean_write_ms': round(self.write_secs / written * 1000, 2) if written > 0 else None,
+                'mean_wait_ms': round(self.wait_secs / written * 1000, 2) if written > 0 else None
+            }
+
+
+# process-wide sink
+sink = ImageSink()
+
+
+def scale_to_bytes(arr):
+    '''
+        prepare a 0..1 edge array for saving
+    '''
+    return (arr * 255).astype(np.uint8)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import os
+    import tempfile
+
+    tmp_folder = tempfile.mkdtemp(prefix='sink-')
+    rng = np.random.default_rng(3)
+    frame = (rng.integers(0, 60, (1088, 1456)) + 80).astype(np.uint8)
+    edges = frame / 255.0
+
+    # what the locate path paid before, saving inline
+    start = time.perf_counter()
+    for n in range(5):
+        Image.fromarray(frame).save(os.path.join(tmp_folder, 'inline-{0}.jpg'.format(n)),
+                                    optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+    inline_ms = (time.perf_counter() - start) / 5 * 1000
+
+    test_sink = ImageSink(workers=1, queue_size=4)
+    call_secs = []
+    for n in range(12):
+        start = time.perf_counter()
+        test_sink.save(os.path.join(tmp_folder, 'raw-{0}.jpg'.format(n)), frame, kind='archive',
+                       optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+        test_sink.save(os.path.join(tmp_folder, 'edges-{0}.jpg'.format(n)), edges,
+                       prepare=scale_to_bytes)
+        call_secs.append(time.perf_counter() - start)
+    assert test_sink.flush(30)
+    stats = test_sink.stats()
+    print('inline save {0:.2f}ms, queued save {1:.3f}ms per frame, {2}'.format(
+        inline_ms, np.mean(call_secs) * 1000, stats))
+    kinds = stats['kinds']
+    assert sum(k['written'] + k['dropped'] for k in kinds.values()) == 24 and stats['peak_backlog'] <= 4
+    # the newest survive a burst
+    assert os.path.exists(os.path.join(tmp_folder, 'raw-11.jpg'))
+    test_sink.stop()
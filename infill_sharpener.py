@@ -4,7 +4,6 @@ from datetime import datetime
 import numpy as np
 from scipy.spatial import ConvexHull
 from math import degrees
-import matplotlib.patches as mpatches
 import pprint
 
 import constants
@@ -12,6 +11,10 @@ import geom_lib
 import contour_lib as cl
 from resourcesheet import Timesheet
 import utilities
+from startup import deferred_import
+
+mpatches = deferred_import('matplotlib.patches')
+
 
 class Projection():
     '''
@@ -1,13 +1,22 @@
 import sys
-from types import SimpleNamespace
-from collections import namedtuple
+from collections import namedtuple, deque
 import numpy as np
 
 from destination import Destination, Attitude
+import constants
 
 Progress = namedtuple(
     'Progress', 'completed_m completed_pc outstanding_m outstanding_pc', defaults=(-1, -1, -1, -1))
 
+RouteProgress = namedtuple(
+    'RouteProgress', 'completed_m completed_pc remaining_m speed_mps eta_secs', defaults=(-1, -1, -1, -1, -1))
+
+NearestSegment = namedtuple('NearestSegment', 'dest_index distance_m along_m', defaults=(-1, -1, -1))
+
+# the missing end of a path, shared as it is immutable
+UnsetDestination = namedtuple('UnsetDestination', 'target_x target_y attitude')
+NO_DESTINATION = UnsetDestination(None, None, Attitude.DEFAULT)
+
 
 class Itinerary(object):
     '''
@@ -29,6 +38,8 @@ class Itinerary(object):
         self.plan_only = plan_only
         self.logger = logger
         self.dest_ptr = 0  # kicks things off
+        self._geometry = None  # path node arrays, built when first needed
+        self._samples = deque()  # (secs, completed_m) recent route progress
 
         self.launch_dest = None
         if launch_pose is not None:
@@ -65,6 +76,7 @@ class Itinerary(object):
 
     def add_destination(self, x, y, att=Attitude.DEFAULT):
         self.destinations.append(Destination(x, y, att))
+        self._geometry = None
 
     def add_destinations(self, dest_list):
         for d in dest_list:
@@ -93,10 +105,7 @@ class Itinerary(object):
             D partial path (d[-1])..(-1, -1)
             E path runs from (d[ptr-1]..d[ptr])
         '''
-        def_dict = {'target_x': None, 'target_y': None,
-                    'attitude': Attitude.DEFAULT}
-        start = SimpleNamespace(**def_dict)
-        finish = SimpleNamespace(**def_dict)
+        start = finish = NO_DESTINATION
         if self.dest_ptr < 0:
             pass  # no valid path
         if self.dest_ptr == 0 and len(self.destinations) > 0 and self.launch_dest is not None:
@@ -112,33 +121,78 @@ class Itinerary(object):
             finish = self.destinations[self.dest_ptr]
         return start, finish
 
+    @property
+    def geometry(self):
+        '''
+            the path nodes, launch first if known, as arrays of
+                nodes (n, 2), segment vectors (n - 1, 2), segment lengths,
+                and cumulative distance to each node
+            rebuilt only when destinations are added
+        '''
+        if self._geometry is None:
+            path_nodes = ([self.launch_dest] if self.launch_dest is not None else []) + self.destinations
+            nodes = np.array([(np.nan if d.target_x is None else d.target_x,
+                               np.nan if d.target_y is None else d.target_y) for d in path_nodes],
+                             dtype=float).reshape(-1, 2)
+            vectors = np.diff(nodes, axis=0)
+            lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+            cumulative = np.concatenate(([0.0], np.cumsum(np.nan_to_num(lengths))))
+            self._geometry = (nodes, vectors, lengths, cumulative)
+        return self._geometry
+
+    @property
+    def node_offset(self):
+        # destination index => path node index
+        return 1 if self.launch_dest is not None else 0
+
+    @property
+    def segment(self):
+        '''
+            index of the current path in the segment arrays, -1 if there is no whole path
+        '''
+        seg = self.dest_ptr + self.node_offset - 1
+        if self.dest_ptr < 0 or seg < 0 or seg >= len(self.geometry[2]):
+            return -1
+        return seg
+
+    @property
+    def route_length_m(self):
+        return float(self.geometry[3][-1]) if len(self.geometry[3]) > 0 else 0.0
+
+    def path_coordinates(self):
+        '''
+            start and finish of the current path, each (x, y) or None
+        '''
+        nodes = self.geometry[0]
+        start = finish = None
+        if self.dest_ptr >= 0 and len(self.destinations) > 0:
+            start_node = self.dest_ptr + self.node_offset - 1
+            if 0 <= start_node < len(nodes):
+                start = nodes[start_node]
+            if start_node + 1 < len(nodes):
+                finish = nodes[start_node + 1]
+        return start, finish
+
     @property
     def current_path_length(self):
-        try:
-            x1_m, y1_m, x2_m, y2_m = self.get_current_path()[:4]
-            if None in (x1_m, y1_m, x2_m, y2_m):
-                cpl = -1
-            else:
-                cpl = np.hypot(x2_m - x1_m, y2_m - y1_m)
-        except Exception:
-            cpl = -1
-        return cpl
+        seg = self.segment
+        if seg < 0:
+            return -1
+        cpl = float(self.geometry[2][seg])
+        return cpl if cpl == cpl else -1  # nan when a node is undefined
 
     def progress(self, cur_pos):
 
         result = Progress(-1, -1, -1, -1)
         try:
             cur_path_length_m = self.current_path_length
-            start_x_m, start_y_m, finish_x_m, finish_y_m = self.get_current_path()[
-                :4]
-            if start_x_m is not None and start_y_m is not None:
-                completed_distance_m = np.hypot(
-                    cur_pos[0] - start_x_m, cur_pos[1] - start_y_m)
+            start, finish = self.path_coordinates()
+            if start is not None:
+                completed_distance_m = float(np.hypot(cur_pos[0] - start[0], cur_pos[1] - start[1]))
             else:
                 completed_distance_m = -1
-            if finish_x_m is not None and finish_y_m is not None:
-                outstanding_distance_m = np.hypot(
-                    finish_x_m - cur_pos[0], finish_y_m - cur_pos[1])
+            if finish is not None:
+                outstanding_distance_m = float(np.hypot(finish[0] - cur_pos[0], finish[1] - cur_pos[1]))
             else:
                 outstanding_distance_m = -1
             result = Progress(
@@ -157,3 +211,188 @@ class Itinerary(object):
                       ' on line ' + str(err_line))
 
         return result
+
+    def stray(self, cur_pos):
+        '''
+            signed perpendicular distance from the current path, as geom_lib.distance_to_line
+        '''
+        seg = self.segment
+        if seg < 0:
+            return 0
+        nodes, vectors, lengths, _cumulative = self.geometry
+        if not lengths[seg] > 0:
+            return 0
+        (vx, vy), (x1, y1) = vectors[seg], nodes[seg]
+        return float((vx * (cur_pos[1] - y1) - (cur_pos[0] - x1) * vy) / lengths[seg])
+
+    def completed_distance(self, cur_pos):
+        '''
+            distance along the whole route to cur_pos projected onto the current path
+        '''
+        nodes, vectors, lengths, cumulative = self.geometry
+        if len(cumulative) < 2:
+            return 0.0
+        if self.dest_ptr + self.node_offset >= len(nodes):
+            return float(cumulative[-1])
+        seg = self.segment
+        if seg < 0 or not lengths[seg] > 0:
+            return float(cumulative[max(seg, 0)])
+        (vx, vy), (x1, y1) = vectors[seg], nodes[seg]
+        along = ((cur_pos[0] - x1) * vx + (cur_pos[1] - y1) * vy) / lengths[seg]
+        return float(cumulative[seg] + min(max(along, 0.0), lengths[seg]))
+
+    def completed_distances(self, positions):
+        '''
+            completed_distance for each of an (n, 2) array of positions
+        '''
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        nodes, vectors, lengths, cumulative = self.geometry
+        if len(cumulative) < 2:
+            return np.zeros(len(positions))
+        if self.dest_ptr + self.node_offset >= len(nodes):
+            return np.full(len(positions), float(cumulative[-1]))
+        seg = self.segment
+        if seg < 0 or not lengths[seg] > 0:
+            return np.full(len(positions), float(cumulative[max(seg, 0)]))
+        along = (positions - nodes[seg]) @ vectors[seg] / lengths[seg]
+        return cumulative[seg] + np.clip(along, 0.0, lengths[seg])
+
+    def route_progress(self, cur_pos, secs=None, window_secs=constants.ITINERARY_SPEED_WINDOW_SECS):
+        '''
+            whole-route progress, with speed and ETA from progress over the recent window
+            one sample is kept per secs, so the context may be built more than once per snapshot
+        '''
+        result = RouteProgress()
+        try:
+            total_m = self.route_length_m
+            completed_m = self.completed_distance(cur_pos)
+            remaining_m = total_m - completed_m
+            completed_pc = round(completed_m * 100 / total_m, 1) if total_m > 0 else -1
+            speed_mps = eta_secs = -1
+            if secs is not None:
+                if len(self._samples) > 0 and self._samples[-1][0] == secs:
+                    self._samples.pop()
+                self._samples.append((secs, completed_m))
+                while len(self._samples) > 2 and secs - self._samples[0][0] > window_secs:
+                    self._samples.popleft()
+                elapsed_secs = secs - self._samples[0][0]
+                if elapsed_secs > 0:
+                    speed_mps = (completed_m - self._samples[0][1]) / elapsed_secs
+                    if speed_mps > 0:
+                        eta_secs = remaining_m / speed_mps
+            result = RouteProgress(completed_m, completed_pc, remaining_m, speed_mps, eta_secs)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            if self.logger:
+                self.logger.error('Error in route_progress: ' +
+                                  str(e) + ' on line ' + str(err_line))
+            else:
+                print('Error in route_progress: ' + str(e) +
+                      ' on line ' + str(err_line))
+
+        return result
+
+    def nearest_segment(self, cur_pos):
+        '''
+            the path nearest to cur_pos, by the destination it leads to,
+            with the distance from it and the distance along the route to the nearest point
+        '''
+        nodes, vectors, lengths, cumulative = self.geometry
+        if len(lengths) == 0:
+            return NearestSegment()
+        valid = np.isfinite(lengths)
+        if not np.any(valid):
+            return NearestSegment()
+        nodes, vectors, lengths, starts_m = nodes[:-1][valid], vectors[valid], lengths[valid], cumulative[:-1][valid]
+        seg_ids = np.flatnonzero(valid)
+        offsets = np.asarray(cur_pos, dtype=float) - nodes
+        along = np.einsum('ij,ij->i', offsets, vectors)
+        along = np.divide(along, lengths, out=np.zeros_like(along), where=lengths > 0)
+        along = np.clip(along, 0, lengths)
+        unit = np.divide(vectors, lengths[:, None], out=np.zeros_like(vectors), where=lengths[:, None] > 0)
+        distances = np.hypot(*(offsets - unit * along[:, None]).T)
+        nearest = int(np.argmin(distances))
+        return NearestSegment(
+            int(seg_ids[nearest]) + 1 - self.node_offset,
+            float(distances[nearest]),
+            float(starts_m[nearest] + along[nearest])
+        )
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import time
+    from types import SimpleNamespace
+    from geom_lib import distance_to_line
+
+    launch = SimpleNamespace(arena=SimpleNamespace(c_x_m=0.5, c_y_m=0.5))
+    rng = np.random.default_rng(5)
+    route = [(float(x), float(y)) for x, y in np.round(rng.uniform(0, 6, (2000, 2)), 3)]
+    itinerary = Itinerary(launch, route)
+    itinerary.dest_ptr = 700
+    (x1, y1), (x2, y2) = itinerary.path_coordinates()
+    pos = (x1 + 0.3 * (x2 - x1) + 0.05, y1 + 0.3 * (y2 - y1))
+
+    # the current path as get_current_path reports it
+    assert (x1, y1, x2, y2) == itinerary.get_current_path()[:4]
+    assert abs(itinerary.stray(pos) - distance_to_line(pos[0], pos[1], x1, y1, x2, y2)) < 1e-9
+    nearest = itinerary.nearest_segment(pos)
+    print('progress', itinerary.progress(pos))
+    print('nearest', nearest, 'current destination', itinerary.dest_ptr)
+
+    def segment_distance(p, a, b):
+        ax, ay, bx, by = a[0], a[1], b[0], b[1]
+        l2 = (bx - ax) ** 2 + (by - ay) ** 2
+        t = 0 if l2 == 0 else max(0, min(1, ((p[0] - ax) * (bx - ax) + (p[1] - ay) * (by - ay)) / l2))
+        return np.hypot(p[0] - ax - t * (bx - ax), p[1] - ay - t * (by - ay))
+
+    path = [(launch.arena.c_x_m, launch.arena.c_y_m)] + route
+    loop_best = min(range(len(route)), key=lambda i: segment_distance(pos, path[i], path[i + 1]))
+    assert nearest.dest_index == loop_best
+
+    # mower driving along the route at 0.2 m/s from the current path
+    completed_m = itinerary.completed_distance(pos)
+    for n in range(10):
+        secs = 1000.0 + n
+        along_m = completed_m + 0.2 * n
+        seg = int(np.searchsorted(itinerary.geometry[3], along_m, side='right')) - 1
+        itinerary.dest_ptr = seg + 1 - itinerary.node_offset
+        nodes, vectors, lengths, cumulative = itinerary.geometry
+        drive_pos = nodes[seg] + vectors[seg] * (along_m - cumulative[seg]) / lengths[seg]
+        route_progress = itinerary.route_progress(drive_pos, secs)
+        # context is built twice per snapshot
+        route_progress = itinerary.route_progress(drive_pos, secs)
+    print('route', route_progress)
+    assert abs(route_progress.speed_mps - 0.2) < 1e-6
+    assert abs(route_progress.eta_secs - route_progress.remaining_m / 0.2) < 1e-3
+
+    num_calls = 20000
+    start = time.perf_counter()
+    for _n in range(num_calls):
+        itinerary.progress(pos)
+        itinerary.current_path_length
+        itinerary.stray(pos)
+    fast_secs = (time.perf_counter() - start) / num_calls
+    start = time.perf_counter()
+    for _n in range(100):
+        itinerary.nearest_segment(pos)
+    nearest_secs = (time.perf_counter() - start) / 100
+    start = time.perf_counter()
+    for _n in range(10):
+        min(range(len(route)), key=lambda i: segment_distance(pos, path[i], path[i + 1]))
+    loop_secs = (time.perf_counter() - start) / 10
+    print('progress+length+stray {0:.1f}us, nearest of {1} segments {2:.3f}ms vs loop {3:.1f}ms'.format(
+        fast_secs * 1e6, len(route), nearest_secs * 1000, loop_secs * 1000))
+
+    # path ends through the itinerary's life, without a launch pose
+    itinerary = Itinerary(None, [(1, 1), (2, 1), (2, 2)])
+    assert itinerary.get_current_path()[:4] == (1, 1, 2, 1) and itinerary.current_path_length == 1
+    itinerary.dest_ptr = 0
+    assert itinerary.get_current_path()[:4] == (None, None, 1, 1) and itinerary.current_path_length == -1
+    assert itinerary.route_progress((1, 1)).completed_m == 0
+    itinerary.dest_ptr = 3
+    assert itinerary.get_current_path()[:4] == (2, 2, None, None) and itinerary.is_complete
+    assert itinerary.route_progress((2, 2)) == RouteProgress(2.0, 100.0, 0.0, -1, -1)
+    print('path ends ok')
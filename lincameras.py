@@ -6,6 +6,7 @@ from libcamera import Transform  # @UnresolvedImport
 from pprint import pformat
 
 import constants
+from camera_sessions import CameraSessionManager, AWB_MODE_LIST
 from cameras import BaseCamera, USBCamera
 from forms.settings import LusbSettings, PiSettings
 import vis_lib
@@ -43,6 +44,9 @@ class OpticalLusb(USBCamera):
         self.hflip = False
         self.vflip = False
         self.picam2 = picam2
+        # usb cameras can't transform and only deliver rgb
+        self.sessions = CameraSessionManager(
+            picam2, native_fmt='rgb', logger=logger) if constants.CAMERA_SESSIONS else None
 
     @property
     def resolution(self):
@@ -118,7 +122,11 @@ class OpticalLusb(USBCamera):
             try:
                 start = time.time()
 
-                if local_config_string != self.local_config_string:
+                if self.sessions is not None:
+                    # flipped and converted for this client by the session manager
+                    pc2_cap_arr = self.sessions.capture(self.settings, fmt)
+                    timesheet.add('session array captured')
+                elif local_config_string != self.local_config_string:
 
                     # Take image in requested format
                     capture_config = self.picam2.create_still_configuration(
@@ -188,27 +196,28 @@ class OpticalLusb(USBCamera):
                             pc2_cap_arr.dtype
                         ))
 
-                # usb cameras can't do transforms
-                if self.hflip and not self.vflip:
-                    pc2_cap_arr = np.fliplr(pc2_cap_arr)
-                    timesheet.add('hflip')
+                if self.sessions is None:
+                    # usb cameras can't do transforms
+                    if self.hflip and not self.vflip:
+                        pc2_cap_arr = np.fliplr(pc2_cap_arr)
+                        timesheet.add('hflip')
 
-                if self.vflip and not self.hflip:
-                    pc2_cap_arr = np.flipud(pc2_cap_arr)
-                    timesheet.add('vflip')
+                    if self.vflip and not self.hflip:
+                        pc2_cap_arr = np.flipud(pc2_cap_arr)
+                        timesheet.add('vflip')
 
-                if self.vflip and self.hflip:
-                    pc2_cap_arr = np.fliplr(np.flipud(pc2_cap_arr))
-                    timesheet.add('h and v flip')
+                    if self.vflip and self.hflip:
+                        pc2_cap_arr = np.fliplr(np.flipud(pc2_cap_arr))
+                        timesheet.add('h and v flip')
 
-                # usb cameras only support rgb, not yuv
-                if fmt == 'rgb':
-                    pc2_cap_arr = pc2_cap_arr.astype(np.uint8)
-                    timesheet.add('array converted to uint8')
-                else:
-                    pc2_cap_arr = vis_lib.rgb_to_gray(
-                        pc2_cap_arr).astype(np.uint8)
-                    timesheet.add('array converted to grayscale')
+                    # usb cameras only support rgb, not yuv
+                    if fmt == 'rgb':
+                        pc2_cap_arr = pc2_cap_arr.astype(np.uint8)
+                        timesheet.add('array converted to uint8')
+                    else:
+                        pc2_cap_arr = vis_lib.rgb_to_gray(
+                            pc2_cap_arr).astype(np.uint8)
+                        timesheet.add('array converted to grayscale')
 
                 # annotation
                 if self.annotate:
@@ -318,8 +327,7 @@ class OpticalLusb(USBCamera):
 
 class OpticalPi(BaseCamera):
 
-    awb_mode_list = ["Auto", "Incandescant", "Tungsten",
-                     "Flourescent", "Indoor", "Daylight", "Cloudy", "Custom"]
+    awb_mode_list = AWB_MODE_LIST
 
     def __init__(self, picam2, device_index=0, debug=False, logger=None):
         try:
@@ -342,6 +350,8 @@ class OpticalPi(BaseCamera):
             # set automatic white balance
             self.awb_mode = 'off'
             self.picam2 = picam2  # Picamera2()
+            self.sessions = CameraSessionManager(
+                picam2, transform_class=Transform, logger=logger) if constants.CAMERA_SESSIONS else None
 
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -453,7 +463,10 @@ class OpticalPi(BaseCamera):
             try:
                 start = time.time()
 
-                if local_config_string != self.local_config_string:
+                if self.sessions is not None:
+                    # one sensor configuration, resampled for this client by the session manager
+                    pc2_cap_arr = self.sessions.capture(self.settings, fmt)
+                elif local_config_string != self.local_config_string:
 
                     # Take image in requested format
                     trfrm = Transform(hflip=self.hflip, vflip=self.vflip)
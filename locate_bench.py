@@ -0,0 +1,411 @@
+'''
+    Offline locate benchmark
+
+    Replays recorded frames (raw-N.jpg with optional raw-N.json poses) through
+    get_prospect_list and probe_prospect_list with a fixed configuration,
+    calibration and fence, and writes a machine-readable report so
+    releases can be compared like for like.
+
+    python locate_bench.py <frames folder> [--report report.json] [--label v1.2]
+    python locate_bench.py <empty folder> --synthesise 50   (virtual mower session)
+'''
+from argparse import ArgumentParser
+from collections import deque
+from math import radians, degrees, hypot
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import psutil
+from matplotlib.font_manager import findfont, FontProperties
+from PIL import Image
+
+import configurations
+import constants
+import metrics
+import poses
+from cameras import ReplayCamera
+from dashed_image_draw import DashedImageDraw
+from fence_masks import FenceMasks
+from fixed_length_dict import SnapshotBuffer
+from geom_lib import diff_angles
+from mapper import DataMapper
+from utilities import get_score_props
+from viewport import Viewport
+from vis_lib import get_polygons_from_pc, get_fence_mask_surface, \
+    get_prospect_list, probe_prospect_list
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+
+class LocateBenchHost():
+    '''
+        the parts of the server read by the locate pipeline,
+        built headlessly from a configuration as re_init does
+        arena_matrix overrides the configured calibration, e.g. for a further camera,
+        and init_poses=False leaves the shared pose geometry alone
+    '''
+
+    def __init__(self, config, logger, arena_matrix=None, init_poses=True):
+        self.config = config
+        self.logger = logger
+        self.tmp_folder_path = tempfile.gettempdir() + os.path.sep
+        self.font_path = findfont(FontProperties(family=['sans-serif']))
+        self.drive = {'state': '', 'path': None}
+        self.drive_pause = False
+        self.contours_buffer = deque([], 100)
+        self.snapshot_buffer = SnapshotBuffer(4)
+        self.extrapolation_incidents = 0
+        self.score_props = get_score_props(config)
+
+        arena_width_m = config['arena.width_m']
+        arena_length_m = config['arena.length_m']
+        self.img_arr_cols = config['optical.width']
+        self.img_arr_rows = config['optical.height']
+
+        self.data_mapper = DataMapper(logger=logger, populate=False)
+        self.data_mapper.populate(
+            ["unbarrel_inv", "transform"],
+            self.img_arr_cols,
+            self.img_arr_rows,
+            matrix=config['calib.arena_matrix'] if arena_matrix is None else arena_matrix,
+            strength=config['optical.undistort_strength'],
+            zoom=config['optical.undistort_zoom']
+        )
+
+        if init_poses:
+            if config['current.mower'] in config['mowers']:
+                poses.Pose.init(
+                    config,
+                    config['mower.target_width_m'],
+                    config['mower.target_length_m'],
+                    config['mower.target_radius_m'],
+                    config['mower.target_offset_pc'],
+                    config['mower.axle_track_m'],
+                    config['mower.body_width_m'],
+                    config['mower.body_length_m'],
+                    arena_width_m,
+                    arena_length_m,
+                    self.img_arr_cols,
+                    self.img_arr_rows,
+                    self.data_mapper,
+                    logger
+                )
+            else:
+                # dummy values to keep things rolling
+                poses.Pose.init(
+                    config, 0, 0.2, 0, 50, 0.15, 0, 0, arena_width_m, arena_length_m,
+                    self.img_arr_cols, self.img_arr_rows, self.data_mapper, logger
+                )
+
+        _outer_darkzone_polygon_m, self.outer_darkzone_polygon_px = get_polygons_from_pc(
+            config['lawn.fence'],
+            arena_width_m,
+            arena_length_m,
+            constants.DARK_ZONE_FENCE_BUFFER_PERCENT,
+            constants.DARK_ZONE_MIN_SEGMENT_PERCENT,
+            data_mapper=self.data_mapper,
+            logger=logger
+        )
+        self.fence_mask_img = get_fence_mask_surface(
+            self.img_arr_cols,
+            self.img_arr_rows,
+            self.outer_darkzone_polygon_px,
+            None,
+            logger=logger
+        )
+        self.fence_masks = FenceMasks(np.asarray(self.fence_mask_img, bool))
+
+    @property
+    def shape(self):
+        return (self.img_arr_rows, self.img_arr_cols)
+
+
+def stage_summary(samples):
+    '''
+        latency distribution of a list of durations in seconds, as milliseconds
+    '''
+    if len(samples) == 0:
+        return {'count': 0}
+    samples_ms = np.array(samples) * 1000
+    return {
+        'count': len(samples),
+        'mean_ms': round(float(np.mean(samples_ms)), 3),
+        'min_ms': round(float(np.min(samples_ms)), 3),
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 3),
+        'max_ms': round(float(np.max(samples_ms)), 3)
+    }
+
+
+def peak_rss_mb():
+    '''
+        peak resident set size of this process
+    '''
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on linux, bytes on mac
+        return round(max_rss / (1E6 if sys.platform == 'darwin' else 1E3), 1)
+    return round(psutil.Process().memory_info().peak_wset / 1E6, 1)
+
+
+def locate_frame(host, img_arr, sid, last_pose, stage_samples, logger=None):
+    '''
+        one pass of the locate pipeline, reusing the last pose's viewport if given
+        returns the pose or None, whether it tracked and the number of prospects
+    '''
+    locate_start = time.perf_counter()
+    viewport = None
+    if last_pose is not None:
+        viewport = Viewport.from_pose(last_pose, img_arr.shape, '{0}B'.format(sid))
+        if viewport is not None:
+            viewport.resize(constants.RESIZE_POSE_TO_VIEWPORT)
+    if viewport is not None:
+        vp_prospect_list = [viewport]
+    else:
+        start = time.perf_counter()
+        vp_prospect_list = get_prospect_list(
+            host, img_arr, 4, Viewport(), 0, 0, logger, '{0}A'.format(sid)) or []
+        stage_samples['prospect'].append(time.perf_counter() - start)
+        for vp in vp_prospect_list:
+            vp.index = vp.index.replace('A', 'B')
+    start = time.perf_counter()
+    probe_result = probe_prospect_list(
+        host, sid, vp_prospect_list, img_arr, 0, 0, logger)
+    stage_samples['probe'].append(time.perf_counter() - start)
+    stage_samples['locate'].append(time.perf_counter() - locate_start)
+
+    pose = probe_result[4] if probe_result is not None else None
+    return pose, viewport is not None, len(vp_prospect_list)
+
+
+def run_benchmark(host, camera, max_frames=None, tracking=True, warmup=1, logger=None):
+    '''
+        drive the locate pipeline over every replayed frame
+        tracking reuses the previous pose's viewport, as get_locate_snapshot does
+    '''
+    metrics.registry.reset()
+    stage_samples = {'prospect': [], 'probe': [], 'locate': []}
+    frame_records = []
+    last_pose = None
+    num_frames = len(camera) if max_frames is None else min(max_frames, len(camera))
+    camera.rewind()
+    for frame_num in range(-warmup, num_frames):
+        if frame_num == 0:
+            # discard warm-up costs e.g. imports and caches
+            metrics.registry.reset()
+            for samples in stage_samples.values():
+                samples.clear()
+            camera.rewind()
+            last_pose = None
+        img_arr = camera.snap('yuv')
+        if img_arr is None:
+            break
+        if img_arr.shape != host.shape:
+            img_arr = np.array(Image.fromarray(img_arr).resize(
+                (host.img_arr_cols, host.img_arr_rows)))
+        sid = max(frame_num, 0)
+
+        pose, tracked, num_prospects = locate_frame(
+            host, img_arr, sid, last_pose if tracking else None, stage_samples, logger)
+        last_pose = pose
+        if frame_num < 0:
+            continue
+
+        record = {
+            'frame': os.path.basename(camera.frame_path),
+            'tracking': tracked,
+            'prospects': num_prospects,
+            'found': pose is not None,
+            'locate_ms': round(stage_samples['locate'][-1] * 1000, 3)
+        }
+        if pose is not None:
+            record['x_m'] = round(pose.arena.c_x_m, 4)
+            record['y_m'] = round(pose.arena.c_y_m, 4)
+            record['heading_deg'] = round(degrees(pose.arena.t_rad), 2)
+        recorded = camera.frame_pose
+        if recorded is not None and pose is not None:
+            record['position_error_m'] = round(hypot(
+                pose.arena.c_x_m - recorded['x_m'], pose.arena.c_y_m - recorded['y_m']), 4)
+            record['heading_error_deg'] = round(abs(degrees(diff_angles(
+                pose.arena.t_rad, radians(recorded['heading_deg'])))), 2)
+        record['recorded'] = recorded
+        frame_records.append(record)
+
+    return summarise(stage_samples, frame_records)
+
+
+def summarise(stage_samples, frame_records):
+    stages = {name: stage_summary(samples) for name, samples in stage_samples.items()}
+    # finer grained stages recorded by the pipeline itself
+    for name, hist in metrics.registry.as_dict().items():
+        stages.setdefault(name, {
+            'count': hist['count'],
+            'mean_ms': round(hist['mean'] * 1000, 3),
+            'p50_ms': round(hist['p50'] * 1000, 3),
+            'p95_ms': round(hist['p95'] * 1000, 3),
+            'max_ms': round(hist['max'] * 1000, 3)
+        })
+
+    num_frames = len(frame_records)
+    num_found = sum(1 for r in frame_records if r['found'])
+    with_recorded = [r for r in frame_records if r['recorded'] is not None]
+    # frames where the recording located the mower
+    expected = [r for r in with_recorded if r['recorded']]
+    position_errors = [r['position_error_m'] for r in frame_records if 'position_error_m' in r]
+    heading_errors = [r['heading_error_deg'] for r in frame_records if 'heading_error_deg' in r]
+
+    def error_summary(errors):
+        if len(errors) == 0:
+            return None
+        return {
+            'mean': round(float(np.mean(errors)), 4),
+            'p50': round(float(np.percentile(errors, 50)), 4),
+            'p95': round(float(np.percentile(errors, 95)), 4),
+            'max': round(float(np.max(errors)), 4)
+        }
+
+    return {
+        'frames': num_frames,
+        'stages': stages,
+        'detection': {
+            'found': num_found,
+            'rate': round(num_found / num_frames, 4) if num_frames > 0 else 0.0,
+            'recorded_present': len(expected),
+            'recall': round(
+                sum(1 for r in expected if r['found']) / len(expected), 4) if len(expected) > 0 else None,
+            'spurious': sum(1 for r in with_recorded if r['found'] and not r['recorded'])
+        },
+        'pose_error': {
+            'position_m': error_summary(position_errors),
+            'heading_deg': error_summary(heading_errors)
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'frame_records': frame_records
+    }
+
+
+def render_pose_frame(host, p):
+    '''
+        grey frame with the mower body and target drawn at pose p,
+        as the virtual camera overlay would
+    '''
+    return render_poses_frame(host, [p])
+
+
+def render_poses_frame(host, pose_list):
+    '''
+        grey frame with a mower body and target drawn at each pose
+    '''
+    img = Image.new('L', (host.img_arr_cols, host.img_arr_rows), 96)
+    img_draw = DashedImageDraw(img)
+    for p in pose_list:
+        if 'corners_px' in vars(p.cam):
+            img_draw.polygon(p.cam.corners_px, fill=40)
+            img_draw.polygon([
+                p.cam.tp12_x_px, p.cam.tp12_y_px, p.cam.m12_x_px, p.cam.m12_y_px,
+                p.cam.tp21_x_px, p.cam.tp21_y_px, p.cam.tp23_x_px, p.cam.tp23_y_px,
+                p.cam.m23_x_px, p.cam.m23_y_px, p.cam.tp32_x_px, p.cam.tp32_y_px,
+                p.cam.tp31_x_px, p.cam.tp31_y_px, p.cam.m31_x_px, p.cam.m31_y_px,
+                p.cam.tp13_x_px, p.cam.tp13_y_px
+            ], fill=255, outline=255)
+    return img
+
+
+def synthesise_session(host, folder_path, count, seed=1):
+    '''
+        render virtual mower frames along a random walk within the lawn,
+        each with its pose sidecar, as the virtual camera overlay would
+    '''
+    rng = random.Random(seed)
+    lawn_width_m = host.config['lawn.width_m']
+    lawn_length_m = host.config['lawn.length_m']
+    min_x_m = host.config['arena.width_m'] / 2 - 0.3 * lawn_width_m
+    min_y_m = host.config['arena.length_m'] / 2 - 0.3 * lawn_length_m
+    max_x_m = min_x_m + 0.6 * lawn_width_m
+    max_y_m = min_y_m + 0.6 * lawn_length_m
+    x_m = (min_x_m + max_x_m) / 2
+    y_m = (min_y_m + max_y_m) / 2
+    heading_deg = rng.uniform(0, 360)
+    os.makedirs(folder_path, exist_ok=True)
+    for n in range(count):
+        heading_deg = (heading_deg + rng.uniform(-20, 20)) % 360
+        step_m = rng.uniform(0.02, 0.1)
+        x_m = min(max(x_m + step_m * np.cos(radians(heading_deg)), min_x_m), max_x_m)
+        y_m = min(max(y_m + step_m * np.sin(radians(heading_deg)), min_y_m), max_y_m)
+        p = poses.Pose(x_m, y_m, radians(heading_deg), mapper=host.data_mapper)
+        img = render_pose_frame(host, p)
+        img.save(os.path.join(folder_path, 'raw-{0}.jpg'.format(n)), quality=constants.DEBUG_IMAGE_QUALITY)
+        with open(os.path.join(folder_path, 'raw-{0}.json'.format(n)), 'w') as pose_file:
+            json.dump({'x_m': round(x_m, 4), 'y_m': round(y_m, 4), 'heading_deg': round(heading_deg, 2)}, pose_file)
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Proxymow offline locate benchmark')
+    parser.add_argument('frames', help='folder of raw-N.jpg frames')
+    parser.add_argument('--config', default='configs/config.xml')
+    parser.add_argument('--settings', default='configs/settings.yml')
+    parser.add_argument('--report', default=None, help='json report path')
+    parser.add_argument('--label', default='', help='release label recorded in the report')
+    parser.add_argument('--frames-max', type=int, default=None)
+    parser.add_argument('--no-tracking', action='store_true', help='prospect every frame')
+    parser.add_argument('--synthesise', type=int, default=0, help='first render n virtual frames')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    bench_logger = logging.getLogger('locator')
+
+    configurations.Config.SAVE_PERIOD_SECS = 0
+    bench_config = configurations.Config(args.settings, args.config, readonly=True)
+    bench_host = LocateBenchHost(bench_config, bench_logger)
+    if args.synthesise > 0:
+        synthesise_session(bench_host, args.frames, args.synthesise)
+
+    replay_camera = ReplayCamera(args.frames, loop=False, preload=True)
+    start = time.time()
+    summary = run_benchmark(
+        bench_host,
+        replay_camera,
+        max_frames=args.frames_max,
+        tracking=not args.no_tracking,
+        logger=bench_logger
+    )
+    report = {
+        'label': args.label,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'elapsed_secs': round(time.time() - start, 3),
+        'platform': {
+            'machine': platform.machine(),
+            'python': platform.python_version(),
+            'numpy': np.__version__
+        },
+        'inputs': {
+            'frames': os.path.abspath(args.frames),
+            'config': os.path.abspath(args.config),
+            'resolution': '{0}x{1}'.format(bench_host.img_arr_cols, bench_host.img_arr_rows),
+            'tracking': not args.no_tracking
+        }
+    }
+    report.update(summary)
+
+    for name, stats in report['stages'].items():
+        print('{0:<12} {1}'.format(name, stats))
+    print('detection:', report['detection'])
+    print('pose error:', report['pose_error'])
+    print('peak rss: {0} MB'.format(report['peak_rss_mb']))
+    if args.report is not None:
+        with open(args.report, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        print('report written to', args.report)
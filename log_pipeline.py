@@ -0,0 +1,347 @@
+import queue
+import sys
+import threading
+import time
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+import constants
+
+'''
+    Non-blocking logging pipeline
+
+    Loggers enqueue records on a bounded queue and return straight away; one
+    writer thread per log file drains its queue in batches, writes through a
+    large file buffer and flushes once per batch or flush period, so the SD card
+    sees a few large writes rather than one per record. When a queue is full
+    the record is dropped and counted, so a slow card can never stall the
+    locate or despatch threads.
+
+    LazyMessage defers building an expensive message until a handler is
+    actually going to emit the record.
+'''
+
+
+class LazyMessage():
+    '''
+        log message formatted only when emitted
+        callable arguments, e.g. get_mem_stats, are only called then too
+
+        logger.debug(LazyMessage('buffer: {0}', lambda: str(buffer)))
+    '''
+    __slots__ = ('fmt', 'args', 'kwargs')
+
+    def __init__(self, fmt, *args, **kwargs):
+        self.fmt = fmt
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        try:
+            args = [a() if callable(a) else a for a in self.args]
+            kwargs = {k: (v() if callable(v) else v) for k, v in self.kwargs.items()}
+            return self.fmt.format(*args, **kwargs)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            return 'Error in LazyMessage: ' + str(e) + ' on line ' + str(err_line) + ' formatting ' + str(self.fmt)
+
+    def __add__(self, other):
+        return LazyMessage('{0}{1}', self, other)
+
+    def __radd__(self, other):
+        return LazyMessage('{0}{1}', other, self)
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    '''
+        rotating file handler that leaves flushing to its writer,
+        writing through a large buffer so records are coalesced
+    '''
+
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None,
+                 buffer_bytes=constants.LOG_WRITE_BUFFER_BYTES):
+        self.buffer_bytes = buffer_bytes
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay=True)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_bytes, encoding=self.encoding)
+
+    def flush(self):
+        # called after every record by StreamHandler.emit
+        pass
+
+    def flush_batch(self):
+        self.acquire()
+        try:
+            if self.stream is not None and hasattr(self.stream, 'flush'):
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class DroppingQueueHandler(QueueHandler):
+    '''
+        enqueues without blocking, counting the records dropped when full
+        the message is resolved here, as the objects it refers to may change,
+        but the line is formatted by the writer
+    '''
+
+    def __init__(self, record_queue, target):
+        super().__init__(record_queue)
+        self.target = target
+        self.queued = 0
+        self.dropped = 0
+
+    @property
+    def baseFilename(self):
+        return self.target.baseFilename
+
+    def doRollover(self):
+        '''
+            rotate the file once the writer reaches the records queued so far
+        '''
+        try:
+            self.queue.put(LogWriter.ROLLOVER, timeout=constants.LOG_FLUSH_SECS)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(threading.Thread):
+    '''
+        drains one queue into one handler, flushing per batch or flush period
+    '''
+    STOP = None
+    ROLLOVER = 'rollover'
+
+    def __init__(self, name, record_queue, handler,
+                 batch_size=constants.LOG_BATCH_SIZE, flush_secs=constants.LOG_FLUSH_SECS):
+        super().__init__(name='log-' + name, daemon=True)
+        self.record_queue = record_queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.flush_secs = flush_secs
+        self.written = 0
+        self.batches = 0
+        self.flushes = 0
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def flush(self):
+        if self.pending > 0:
+            try:
+                if hasattr(self.handler, 'flush_batch'):
+                    self.handler.flush_batch()
+                else:
+                    self.handler.flush()
+                self.flushes += 1
+            except Exception as e:
+                err_line = sys.exc_info()[-1].tb_lineno
+                print('Error in LogWriter flush: ' + str(e) + ' on line ' + str(err_line))
+            self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def run(self):
+        running = True
+        while running:
+            try:
+                # wake to flush a part batch once the flush period is up
+                timeout = None
+                if self.pending > 0:
+                    timeout = max(self.last_flush + self.flush_secs - time.monotonic(), 0)
+                record = self.record_queue.get(timeout=timeout)
+            except queue.Empty:
+                self.flush()
+                continue
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.record_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is self.STOP:
+                    running = False
+                    break
+                if record is self.ROLLOVER:
+                    self.flush()
+                    self.handler.doRollover()
+                    continue
+                try:
+                    self.handler.handle(record)
+                    self.written += 1
+                    self.pending += 1
+                except Exception:
+                    self.handler.handleError(record)
+            self.batches += 1
+            if not running or self.pending >= self.batch_size or \
+                    time.monotonic() - self.last_flush >= self.flush_secs:
+                self.flush()
+        self.flush()
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'batches': self.batches,
+            'flushes': self.flushes,
+            'backlog': self.record_queue.qsize()
+        }
+
+
+class LogPipeline():
+    '''
+        queue handlers and writer threads for a set of loggers
+    '''
+
+    def __init__(self, enabled=constants.LOG_ASYNC, queue_size=constants.LOG_QUEUE_SIZE):
+        self.enabled = enabled
+        self.queue_size = queue_size
+        self.routes = {}  # logger name: (queue handler, writer)
+        self._lock = threading.Lock()
+
+    def attach(self, logger, handler):
+        '''
+            route logger's records to handler, through a queue and writer if enabled
+        '''
+        if not self.enabled:
+            logger.addHandler(handler)
+            return handler
+        with self._lock:
+            record_queue = queue.Queue(self.queue_size)
+            queue_handler = DroppingQueueHandler(record_queue, handler)
+            writer = LogWriter(logger.name, record_queue, handler)
+            writer.start()
+            logger.addHandler(queue_handler)
+            self.routes[logger.name] = (queue_handler, writer)
+        return queue_handler
+
+    @property
+    def dropped(self):
+        return sum(qh.dropped for qh, _w in self.routes.values())
+
+    def stats(self):
+        stats = {}
+        for name, (queue_handler, writer) in self.routes.items():
+            stats[name] = {'queued': queue_handler.queued, 'dropped': queue_handler.dropped}
+            stats[name].update(writer.stats())
+        return stats
+
+    def stop(self, timeout_secs=5.0):
+        '''
+            write out what is queued and stop the writers
+        '''
+        with self._lock:
+            for _name, (queue_handler, writer) in self.routes.items():
+                try:
+                    queue_handler.queue.put(LogWriter.STOP, timeout=timeout_secs)
+                except queue.Full:
+                    pass
+            for _name, (_queue_handler, writer) in self.routes.items():
+                writer.join(timeout_secs)
+                writer.handler.close()
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import io
+    import os
+    import tempfile
+
+    class SlowCardHandler(BatchedRotatingFileHandler):
+        '''
+            an SD card that takes a while over every write
+        '''
+
+        def emit(self, record):
+            time.sleep(0.0005)
+            super().emit(record)
+
+    tmp_folder = tempfile.mkdtemp(prefix='log-pipeline-')
+    formatter = logging.Formatter(
+        "%(asctime)s.%(msecs)03d %(levelname)s %(module)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    def producer(logger, count):
+        start = time.perf_counter()
+        worst = 0.0
+        for n in range(count):
+            call_start = time.perf_counter()
+            logger.info('record {0} {1}'.format(n, 'x' * 80))
+            worst = max(worst, time.perf_counter() - call_start)
+        return time.perf_counter() - start, worst
+
+    for label, enabled in (('synchronous', False), ('queued', True)):
+        pipeline = LogPipeline(enabled=enabled, queue_size=2000)
+        test_logger = logging.getLogger('test-' + label)
+        test_logger.propagate = False
+        test_logger.setLevel(logging.INFO)
+        file_path = os.path.join(tmp_folder, label + '.log')
+        if enabled:
+            file_handler = SlowCardHandler(file_path, maxBytes=constants.LOG_MAX_BYTES, backupCount=1)
+        else:
+            file_handler = RotatingFileHandler(file_path, maxBytes=constants.LOG_MAX_BYTES, backupCount=1)
+            file_handler.emit = (lambda emit: lambda r: (time.sleep(0.0005), emit(r)))(file_handler.emit)
+        file_handler.setFormatter(formatter)
+        pipeline.attach(test_logger, file_handler)
+        secs, worst = producer(test_logger, 5000)
+        pipeline.stop()
+        if not enabled:
+            file_handler.close()
+        with open(file_path) as log_file:
+            num_lines = sum(1 for _line in log_file)
+        print('{0:<12} 5000 records in {1:7.1f}ms, worst call {2:6.3f}ms, lines written {3}, stats {4}'.format(
+            label, secs * 1000, worst * 1000, num_lines, pipeline.stats()))
+        if enabled:
+            stats = pipeline.stats()['test-' + label]
+            assert stats['written'] + stats['dropped'] == 5000 == num_lines + stats['dropped']
+
+    # rotation is queued behind the records already logged
+    pipeline = LogPipeline(enabled=True)
+    rotating_logger = logging.getLogger('test-rotating')
+    rotating_logger.propagate = False
+    rotating_logger.setLevel(logging.INFO)
+    file_path = os.path.join(tmp_folder, 'rotating.log')
+    pipeline.attach(rotating_logger, BatchedRotatingFileHandler(file_path, backupCount=1))
+    rotating_logger.info('first run')
+    rotating_logger.handlers[0].doRollover()
+    rotating_logger.info('second run')
+    pipeline.stop()
+    with open(file_path) as log_file, open(file_path + '.1') as backup_file:
+        assert log_file.read() == 'second run\n' and backup_file.read() == 'first run\n'
+    print('rollover ordered with records, current file {0}'.format(rotating_logger.handlers[0].baseFilename))
+
+    # lazy messages are only built when emitted
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return 'expensive'
+
+    lazy_logger = logging.getLogger('test-lazy')
+    lazy_logger.propagate = False
+    lazy_logger.setLevel(logging.WARNING)
+    lazy_logger.addHandler(logging.StreamHandler(io.StringIO()))
+    for _n in range(1000):
+        lazy_logger.debug(LazyMessage('state {0}', expensive))
+    lazy_logger.warning(LazyMessage('state {0}', expensive))
+    print('lazy message built {0} times for 1 of 1001 records emitted'.format(len(calls)))
+    assert len(calls) == 1
@@ -1,10 +1,72 @@
 import sys
+import os
+import glob
+import hashlib
+import pickle
 import numpy as np
 from skimage import transform
 from scipy import interpolate
 from skimage import transform as tf
 import time
 
+import constants
+
+
+class MapCache():
+    '''
+        populated maps saved to a folder, keyed by the settings they were built from,
+        so that a restart with an unchanged calibration loads rather than rebuilds them
+    '''
+
+    def __init__(self, folder_path, max_files=constants.MAP_CACHE_MAX_FILES, logger=None):
+        self.folder_path = folder_path
+        self.max_files = max_files
+        self.logger = logger
+        os.makedirs(folder_path, exist_ok=True)
+
+    @staticmethod
+    def key(*settings):
+        '''
+            stable across processes, unlike hash()
+        '''
+        settings = [np.asarray(s).tolist() if isinstance(s, np.ndarray) else s for s in settings]
+        return hashlib.blake2b(repr(settings).encode('utf8'), digest_size=16).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder_path, 'map-{0}.pkl'.format(key))
+
+    def load(self, key):
+        '''
+            dict of the cached attributes, None if not cached
+        '''
+        try:
+            with open(self.path(key), 'rb') as cache_file:
+                return pickle.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            msg = 'Error in MapCache load: ' + str(e) + ' on line ' + str(err_line)
+            if self.logger:
+                self.logger.warning(msg)
+            return None
+
+    def save(self, key, attributes):
+        try:
+            tmp_path = self.path(key) + '.tmp'
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump(attributes, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+            # keep the most recently saved
+            cache_paths = sorted(glob.glob(os.path.join(self.folder_path, 'map-*.pkl')), key=os.path.getmtime)
+            for cache_path in cache_paths[:max(len(cache_paths) - self.max_files, 0)]:
+                os.remove(cache_path)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            msg = 'Error in MapCache save: ' + str(e) + ' on line ' + str(err_line)
+            if self.logger:
+                self.logger.warning(msg)
+
 
 class Mapper(object):
     '''
@@ -19,11 +81,13 @@ class Mapper(object):
                  strength,
                  zoom,
                  datatype=np.int16,
-                 logger=None
+                 logger=None,
+                 map_cache=None
                  ):
         '''
         Constructor
         '''
+        self.map_cache = map_cache
         self.pipeline = pipeline
         self.matrix = matrix
         self.map_arr_cols = map_arr_cols
@@ -34,6 +98,29 @@ class Mapper(object):
         self.datatype = datatype
         self.logger = logger
 
+    def disk_cache_key(self, *extra):
+        return MapCache.key(type(self).__name__, self.pipeline, self.map_arr_cols, self.map_arr_rows,
+                            self.matrix, self.strength, self.zoom, *extra)
+
+    def load_cached(self, disk_key):
+        '''
+            restore the map attributes from the map cache, True if cached
+        '''
+        if self.map_cache is None:
+            return False
+        attributes = self.map_cache.load(disk_key)
+        if attributes is None:
+            return False
+        for name, value in attributes.items():
+            setattr(self, name, value)
+        if self.logger:
+            self.logger.info('{0}, map loaded from cache'.format(type(self).__name__))
+        return True
+
+    def save_cached(self, disk_key, names):
+        if self.map_cache is not None:
+            self.map_cache.save(disk_key, {name: getattr(self, name) for name in names})
+
     def build_non_invertible_interpolator(self):
         extrap = 200
         px = np.linspace(-extrap, self.map_arr_cols + extrap - 1, num=20)
@@ -158,13 +245,14 @@ class ImageMapper(Mapper):
                  zoom=1.0,
                  datatype=np.int16,
                  logger=None,
-                 populate=True
+                 populate=True,
+                 map_cache=None
                  ):
         '''
         Constructor
         '''
         super().__init__(map_arr_cols, map_arr_rows, pipeline,
-                         matrix, strength, zoom, datatype, logger)
+                         matrix, strength, zoom, datatype, logger, map_cache)
         self.cache_key_tmplt = '{0}-{1}-{2}-{3}-{4}'
 
         if populate:
@@ -221,10 +309,13 @@ class ImageMapper(Mapper):
             self.correction_radius = np.hypot(
                 self.map_arr_cols, self.map_arr_rows) / self.strength
 
-            # create interpolator for non-invertable function
-            super().build_non_invertible_interpolator()
+            disk_key = self.disk_cache_key(self.datatype.__name__)
+            if not self.load_cached(disk_key):
+                # create interpolator for non-invertable function
+                super().build_non_invertible_interpolator()
 
-            self._map = self.build_map()
+                self._map = self.build_map()
+                self.save_cached(disk_key, ['unb_itp_x', 'unb_itp_y', '_map'])
 
             # re-create unique key for these settings
             self.cache_key = self.cache_key_tmplt.format(
@@ -261,7 +352,8 @@ class ImageMapper(Mapper):
 
         return out_arr
 
-    def warp_colour(self, img_arr, coord_map, preserve_scale=True, preserve_datatype=True):
+    @staticmethod
+    def warp_colour(img_arr, coord_map, preserve_scale=True, preserve_datatype=True):
         if coord_map is None:
             out_arr = img_arr
         else:
@@ -307,13 +399,14 @@ class DataMapper(Mapper):
                  num_samp_per_dim=100,
                  interp_extrap=50,
                  logger=None,
-                 populate=True
+                 populate=True,
+                 map_cache=None
                  ):
         '''
         Constructor
         '''
         super().__init__(map_arr_cols, map_arr_rows, pipeline,
-                         matrix, strength, zoom, datatype, logger)
+                         matrix, strength, zoom, datatype, logger, map_cache)
         self.num_samp_per_dim = num_samp_per_dim
         self.interp_extrap = interp_extrap
         self.cache_key_tmplt = '{0}-{1}-{2}-{3}-{4}'
@@ -375,40 +468,43 @@ class DataMapper(Mapper):
             if self.logger:
                 self.logger.info(msg)
 
-            build_start = time.time()
-
-            # create interpolator for non-invertable function
-            self.build_non_invertible_interpolator()
-
-            # create interpolators
-            px = np.linspace(-self.interp_extrap, self.map_arr_cols +
-                             self.interp_extrap - 1, num=self.num_samp_per_dim)
-            py = np.linspace(-self.interp_extrap, self.map_arr_rows +
-                             self.interp_extrap - 1, num=self.num_samp_per_dim)
-            xg, yg = np.meshgrid(px, py)
-            xgf, ygf = xg.flatten(), yg.flatten()
-            xy_pts = np.column_stack([xgf, ygf])
-
-            values = self.get_coordinates(xy_pts)
-            x_values = values[:, 0]
-            y_values = values[:, 1]
-
-            self.rev_itp_x = interpolate.LinearNDInterpolator(
-                (x_values, y_values), xgf, fill_value=-1)
-            self.rev_itp_y = interpolate.LinearNDInterpolator(
-                (x_values, y_values), ygf, fill_value=-1)
-
-            map_size = (self.num_samp_per_dim + (2 * self.interp_extrap)) ** 2
-            msg = 'DataMapper, created map, grid {0} size: {1:.1f} KB [{2:.2f}, {3:.2f}, {4:.2f}, {5:.2f}] in {6:.3f} secs'.format(
-                (self.num_samp_per_dim, self.num_samp_per_dim),
-                map_size * sys.getsizeof(self.datatype.__call__()) / 1e3,
-                min(y_values),
-                min(x_values),
-                max(y_values),
-                max(x_values),
-                time.time() - build_start)
-            if self.logger:
-                self.logger.info(msg)
+            disk_key = self.disk_cache_key(self.num_samp_per_dim, self.interp_extrap)
+            if not self.load_cached(disk_key):
+                build_start = time.time()
+
+                # create interpolator for non-invertable function
+                self.build_non_invertible_interpolator()
+
+                # create interpolators
+                px = np.linspace(-self.interp_extrap, self.map_arr_cols +
+                                 self.interp_extrap - 1, num=self.num_samp_per_dim)
+                py = np.linspace(-self.interp_extrap, self.map_arr_rows +
+                                 self.interp_extrap - 1, num=self.num_samp_per_dim)
+                xg, yg = np.meshgrid(px, py)
+                xgf, ygf = xg.flatten(), yg.flatten()
+                xy_pts = np.column_stack([xgf, ygf])
+
+                values = self.get_coordinates(xy_pts)
+                x_values = values[:, 0]
+                y_values = values[:, 1]
+
+                self.rev_itp_x = interpolate.LinearNDInterpolator(
+                    (x_values, y_values), xgf, fill_value=-1)
+                self.rev_itp_y = interpolate.LinearNDInterpolator(
+                    (x_values, y_values), ygf, fill_value=-1)
+
+                map_size = (self.num_samp_per_dim + (2 * self.interp_extrap)) ** 2
+                msg = 'DataMapper, created map, grid {0} size: {1:.1f} KB [{2:.2f}, {3:.2f}, {4:.2f}, {5:.2f}] in {6:.3f} secs'.format(
+                    (self.num_samp_per_dim, self.num_samp_per_dim),
+                    map_size * sys.getsizeof(self.datatype.__call__()) / 1e3,
+                    min(y_values),
+                    min(x_values),
+                    max(y_values),
+                    max(x_values),
+                    time.time() - build_start)
+                if self.logger:
+                    self.logger.info(msg)
+                self.save_cached(disk_key, ['unb_itp_x', 'unb_itp_y', 'rev_itp_x', 'rev_itp_y'])
 
             # re-create unique key for these settings
             self.cache_key = self.cache_key_tmplt.format(
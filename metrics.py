@@ -0,0 +1,285 @@
+import sys
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+import constants
+
+
+class StageHistogram():
+    '''
+        Fixed-bucket histogram of stage durations in seconds
+        updated without a lock: each stage is mostly timed from one thread, and
+        should two threads observe it at the same instant a count may be lost
+    '''
+    __slots__ = ('name', 'buckets', 'counts', 'count', 'sum', 'min', 'max', 'last')
+
+    def __init__(self, name, buckets=constants.METRICS_BUCKETS_SECS):
+        self.name = name
+        self.buckets = tuple(buckets)  # upper bounds, ascending
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)  # final bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, secs):
+        self.counts[bisect_left(self.buckets, secs)] += 1
+        self.count += 1
+        self.sum += secs
+        self.last = secs
+        if secs > self.max:
+            self.max = secs
+        if secs < self.min:
+            self.min = secs
+
+    def percentile(self, q):
+        '''
+            estimate quantile q (0..1) by interpolating within its bucket
+        '''
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= target and bucket_count > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                fraction = (target - cumulative) / bucket_count
+                return lower + (max(upper - lower, 0.0) * fraction)
+            cumulative += bucket_count
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count > 0 else 0.0,
+            'min': round(self.min, 6) if self.count > 0 else 0.0,
+            'max': round(self.max, 6),
+            'last': round(self.last, 6),
+            'p50': round(self.percentile(0.50), 6),
+            'p95': round(self.percentile(0.95), 6),
+            'p99': round(self.percentile(0.99), 6)
+        }
+
+
+class StageTimer():
+    '''
+        context manager timing a single pass through a stage
+    '''
+    __slots__ = ('hist', 'start')
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *_exc):
+        self.hist.observe(perf_counter() - self.start)
+        return False
+
+
+class NullTimer():
+    '''
+        context manager used when metrics are disabled
+    '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        return False
+
+
+class Metrics():
+    '''
+        Registry of stage histograms
+        exported as prometheus text or json
+    '''
+
+    def __init__(self, prefix='proxymow', enabled=constants.METRICS_ENABLED):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._null_timer = NullTimer()
+
+    def histogram(self, stage):
+        '''
+            the stage's histogram, created under the lock on first use only
+        '''
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.get(stage)
+                if hist is None:
+                    hist = self.histograms[stage] = StageHistogram(stage)
+        return hist
+
+    def observe(self, stage, secs):
+        if not self.enabled:
+            return
+        self.histogram(stage).observe(secs)
+
+    def stage(self, stage):
+        return StageTimer(self.histogram(stage)) if self.enabled else self._null_timer
+
+    def timed(self, stage):
+        '''
+            decorator - time every call of the wrapped function
+            whether to is decided when decorated, a disabled registry returns the function itself
+        '''
+        def decorator(func):
+            if not self.enabled:
+                return func
+            hist = self.histogram(stage)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    hist.observe(perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        '''
+            empty every histogram, in place as decorated functions hold theirs
+        '''
+        with self._lock:
+            for hist in self.histograms.values():
+                hist.reset()
+
+    def as_dict(self):
+        with self._lock:
+            return {name: hist.as_dict() for name, hist in self.histograms.items() if hist.count > 0}
+
+    def as_prometheus(self):
+        lines = []
+        try:
+            metric = '{0}_stage_seconds'.format(self.prefix)
+            lines.append('# HELP {0} Duration of processing stages in seconds'.format(metric))
+            lines.append('# TYPE {0} histogram'.format(metric))
+            quantiles = []
+            with self._lock:
+                for name, hist in self.histograms.items():
+                    cumulative = 0
+                    for upper, bucket_count in zip(hist.buckets, hist.counts):
+                        cumulative += bucket_count
+                        lines.append('{0}_bucket{{stage="{1}",le="{2}"}} {3}'.format(
+                            metric, name, upper, cumulative))
+                    lines.append('{0}_bucket{{stage="{1}",le="+Inf"}} {2}'.format(
+                        metric, name, hist.count))
+                    lines.append('{0}_sum{{stage="{1}"}} {2:.6f}'.format(metric, name, hist.sum))
+                    lines.append('{0}_count{{stage="{1}"}} {2}'.format(metric, name, hist.count))
+                    for q in (0.5, 0.95, 0.99):
+                        quantiles.append((name, q, hist.percentile(q)))
+            q_metric = '{0}_stage_quantile_seconds'.format(self.prefix)
+            lines.append('# HELP {0} Estimated stage duration quantiles in seconds'.format(q_metric))
+            lines.append('# TYPE {0} gauge'.format(q_metric))
+            for name, q, value in quantiles:
+                lines.append('{0}{{stage="{1}",quantile="{2}"}} {3:.6f}'.format(
+                    q_metric, name, q, value))
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            print('Error in Metrics.as_prometheus: ' + str(e) + ' on line ' + str(err_line))
+        return '\n'.join(lines) + '\n'
+
+
+# process-wide registry
+registry = Metrics()
+
+
+def observe(stage, secs):
+    registry.observe(stage, secs)
+
+
+def stage(name):
+    return registry.stage(name)
+
+
+def timed(name):
+    return registry.timed(name)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import random
+    import time
+
+    for _ in range(1000):
+        observe('capture', random.uniform(0.05, 0.3))
+    with stage('nav_plan'):
+        time.sleep(0.01)
+
+    @timed('render')
+    def render():
+        time.sleep(0.002)
+    render()
+
+    print(registry.as_prometheus())
+    print(registry.as_dict())
+
+    # cost of a checkpoint
+    n = 100000
+    start = perf_counter()
+    for _ in range(n):
+        observe('bench', 0.001)
+    print('observe: {0:.3f} usecs'.format(1E6 * (perf_counter() - start) / n))
+    start = perf_counter()
+    for _ in range(n):
+        with stage('bench'):
+            pass
+    print('stage: {0:.3f} usecs'.format(1E6 * (perf_counter() - start) / n))
+    registry.enabled = False
+    start = perf_counter()
+    for _ in range(n):
+        with stage('bench'):
+            pass
+    print('disabled stage: {0:.3f} usecs'.format(1E6 * (perf_counter() - start) / n))
+
+    def bench():
+        pass
+    assert timed('bench_timed')(bench) is bench  # decorated while disabled, so not wrapped
+    assert 'bench_timed' not in registry.as_dict()
+    registry.enabled = True
+    start = perf_counter()
+    for _ in range(n):
+        bench()
+    print('untimed call: {0:.3f} usecs'.format(1E6 * (perf_counter() - start) / n))
+    timed_bench = timed('bench_timed')(bench)
+    start = perf_counter()
+    for _ in range(n):
+        timed_bench()
+    print('timed call: {0:.3f} usecs'.format(1E6 * (perf_counter() - start) / n))
+    assert registry.as_dict()['bench_timed']['count'] == n
+
+    # observed from several threads at once, with histograms being created as they go
+    registry.reset()
+    assert registry.as_dict() == {}
+
+    def observe_all(thread_index):
+        for i in range(10000):
+            observe('thread_{0}'.format(i % 10), 0.001 * thread_index)
+    threads = [threading.Thread(target=observe_all, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stages = registry.as_dict()
+    assert len(stages) == 10 and all(hist['max'] == 0.003 for hist in stages.values())
+    print('threaded observe counts: {0}'.format(sum(hist['count'] for hist in stages.values())))
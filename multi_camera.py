@@ -0,0 +1,518 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from math import atan2, hypot
+
+import numpy as np
+from shapely.geometry import Point as ShapelyPoint, Polygon, box
+
+import constants
+import poses
+from locate_bench import LocateBenchHost
+from viewport import Viewport
+from vis_lib import matrices_from_quad_points, get_prospect_list, probe_prospect_list
+
+'''
+    Multi-camera arena
+
+    Each camera has its own calibration quad, and so its own arena matrix,
+    data mapper, fence mask and footprint - the part of the arena it sees.
+    Every camera's locate pipeline runs in a worker of its own and the detections
+    are fused into one arena pose: the most confident, averaged with any agreeing
+    detection from an overlapping camera. While the mower is being tracked, only
+    the camera whose footprint holds the predicted pose is prospected; the others
+    are swept when it is lost.
+'''
+
+
+class CameraCalibration():
+    '''
+        calibration quad of one camera: the image percentages of the calibration
+        net corners (cartesian left bottom, left top, right top, right bottom),
+        the net dimensions and its offset from the lawn origin
+    '''
+
+    def __init__(self, name, calib_pc_points, calib_width_m, calib_length_m, offset_x_m=0.0, offset_y_m=0.0):
+        self.name = name
+        self.calib_pc_points = [[float(x), float(y)] for x, y in calib_pc_points]
+        self.calib_width_m = calib_width_m
+        self.calib_length_m = calib_length_m
+        self.offset_x_m = offset_x_m
+        self.offset_y_m = offset_y_m
+
+    @classmethod
+    def from_config(cls, config, name='primary'):
+        '''
+            the configured camera's calibration
+        '''
+        return cls(
+            name,
+            [[p.x, p.y] for p in config['lawn.calib']],
+            config['calib.width_m'],
+            config['calib.length_m'],
+            config['calib.offset_x_m'],
+            config['calib.offset_y_m']
+        )
+
+    @classmethod
+    def from_camera_config(cls, camera_config):
+        '''
+            the calibration of one of the configuration's cameras
+        '''
+        return cls(
+            camera_config['name'],
+            camera_config['calib_pc_points'],
+            camera_config['width_m'],
+            camera_config['length_m'],
+            camera_config['offset_x_m'],
+            camera_config['offset_y_m']
+        )
+
+    def arena_matrix(self, config, logger=None):
+        '''
+            the matrix mapping this camera's pixels to arena metres, as configurations derives it
+        '''
+        _M, _N, L, _K = matrices_from_quad_points(
+            self.calib_pc_points,
+            self.calib_width_m,
+            self.calib_length_m,
+            self.offset_x_m,
+            self.offset_y_m,
+            config['lawn.width_m'],
+            config['lawn.length_m'],
+            config['lawn.border_m'],
+            config['optical.height'],
+            config['optical.width'],
+            logger=logger
+        )
+        return L
+
+    def __repr__(self):
+        return '{0} {1}x{2}m at ({3}, {4})'.format(
+            self.name, self.calib_width_m, self.calib_length_m, self.offset_x_m, self.offset_y_m)
+
+
+def camera_footprint(host, samples_per_edge=16):
+    '''
+        the arena seen by the host's camera, from its image border mapped into arena metres
+        the border is sampled along each edge as lens distortion bends it
+    '''
+    cols, rows = host.config['optical.width'] - 1, host.config['optical.height'] - 1
+    steps = np.linspace(0, 1, samples_per_edge, endpoint=False)
+    border_px = np.vstack([
+        np.column_stack([steps * cols, np.zeros_like(steps)]),
+        np.column_stack([np.full_like(steps, cols), steps * rows]),
+        np.column_stack([(1 - steps) * cols, np.full_like(steps, rows)]),
+        np.column_stack([np.zeros_like(steps), (1 - steps) * rows])
+    ])
+    border_m = host.data_mapper.get_coordinates(border_px)
+    arena = box(0, 0, host.config['arena.width_m'], host.config['arena.length_m'])
+    return Polygon(border_m).buffer(0).intersection(arena)
+
+
+class CameraNode(LocateBenchHost):
+    '''
+        the locate host of one camera, with its own mapper and fence mask
+        the shared pose geometry is left to the primary host
+    '''
+
+    def __init__(self, config, calibration, logger, camera=None, samples_per_edge=16):
+        super().__init__(config, logger, arena_matrix=calibration.arena_matrix(config, logger), init_poses=False)
+        self.name = calibration.name
+        self.calibration = calibration
+        self.camera = camera
+        self.locate = None
+        self.footprint = camera_footprint(self, samples_per_edge)
+        self.prospect_footprint = self.footprint.buffer(-constants.MULTI_CAMERA_FOOTPRINT_MARGIN_M)
+
+    def perspective(self, pose):
+        '''
+            pose as this camera sees it
+        '''
+        return poses.Pose(pose.arena.c_x_m, pose.arena.c_y_m, pose.arena.t_rad,
+                          ssid=pose.ssid, mapper=self.data_mapper)
+
+    def __repr__(self):
+        return '{0} footprint {1:.2f}m2'.format(self.name, self.footprint.area)
+
+
+class HostCameraNode():
+    '''
+        the node of a camera whose locate host is already built, e.g. the server's own camera,
+        sharing the host's mapper rather than building another
+        locate(frame, sid, track_pose, **context) is the host's own locate pipeline,
+        returning pose, confidence and whether it tracked
+    '''
+
+    def __init__(self, name, host, camera=None, locate=None, samples_per_edge=16):
+        self.name = name
+        self.host = host
+        self.camera = camera
+        self.locate = locate
+        self.footprint = camera_footprint(host, samples_per_edge)
+        self.prospect_footprint = self.footprint.buffer(-constants.MULTI_CAMERA_FOOTPRINT_MARGIN_M)
+
+    @property
+    def data_mapper(self):
+        return self.host.data_mapper
+
+    def perspective(self, pose):
+        return poses.Pose(pose.arena.c_x_m, pose.arena.c_y_m, pose.arena.t_rad,
+                          ssid=pose.ssid, mapper=self.data_mapper)
+
+    def __repr__(self):
+        return '{0} footprint {1:.2f}m2'.format(self.name, self.footprint.area)
+
+
+class CameraDetection():
+    '''
+        one camera's result for a frame
+    '''
+
+    def __init__(self, node, pose=None, conf_pc=0.0, tracked=False, secs=0.0):
+        self.node = node
+        self.pose = pose
+        self.conf_pc = conf_pc
+        self.tracked = tracked
+        self.secs = secs
+
+    @property
+    def found(self):
+        return self.pose is not None
+
+    def __repr__(self):
+        return '{0} {1} conf: {2:.1f}% {3:.1f}ms'.format(
+            self.node.name, self.pose.as_concise_str() if self.found else 'not found',
+            self.conf_pc, self.secs * 1000)
+
+
+def fuse_detections(detections, radius_m=constants.MULTI_CAMERA_FUSION_RADIUS_M):
+    '''
+        a single arena pose from the cameras' detections: the most confident,
+        or, where overlapping cameras agree within radius_m,
+        their confidence weighted mean position and circular mean heading
+    '''
+    found = [d for d in detections if d.found]
+    if len(found) == 0:
+        return None
+    best = max(found, key=lambda d: d.conf_pc)
+    agreeing = [d for d in found if hypot(
+        d.pose.arena.c_x_m - best.pose.arena.c_x_m,
+        d.pose.arena.c_y_m - best.pose.arena.c_y_m) <= radius_m]
+    if len(agreeing) == 1:
+        return best.pose
+    weights = np.array([max(d.conf_pc, 1E-3) for d in agreeing])
+    x_m = np.average([d.pose.arena.c_x_m for d in agreeing], weights=weights)
+    y_m = np.average([d.pose.arena.c_y_m for d in agreeing], weights=weights)
+    t_rads = np.array([d.pose.arena.t_rad for d in agreeing])
+    t_rad = atan2(np.sum(weights * np.sin(t_rads)), np.sum(weights * np.cos(t_rads))) % (2 * np.pi)
+    fused_pose = poses.Pose(x_m, y_m, t_rad, ssid=best.pose.ssid, mapper=best.node.data_mapper)
+    fused_pose.arena.span_m = np.average([d.pose.arena.span_m for d in agreeing], weights=weights)
+    fused_pose.origination = poses.PoseOrigination.DETECTED
+    return fused_pose
+
+
+class MultiCameraLocator():
+    '''
+        locates the mower across several cameras, each in its own worker
+    '''
+
+    def __init__(self, nodes, tracking=True, logger=None):
+        self.nodes = nodes
+        self.tracking = tracking
+        self.logger = logger
+        # one worker per camera, so each keeps its own scratch buffers warm
+        self.workers = {
+            node.name: ThreadPoolExecutor(max_workers=1, thread_name_prefix='locate-' + node.name)
+            for node in nodes
+        }
+        self.last_pose = None
+        self.prior_pose = None
+        self.stats = {'frames': 0, 'found': 0, 'single_camera': 0, 'sweeps': 0, 'fused': 0, 'prospected': 0}
+
+    def predicted_position(self):
+        '''
+            arena position expected in the next frame, extrapolating the last move
+        '''
+        if self.last_pose is None:
+            return None
+        x_m, y_m = self.last_pose.arena.c_x_m, self.last_pose.arena.c_y_m
+        if self.prior_pose is not None:
+            x_m += x_m - self.prior_pose.arena.c_x_m
+            y_m += y_m - self.prior_pose.arena.c_y_m
+        return x_m, y_m
+
+    def select_nodes(self, position):
+        '''
+            the cameras to prospect for a predicted position, all of them if unknown
+        '''
+        if position is None:
+            return list(self.nodes)
+        pt = ShapelyPoint(position)
+        # well inside a camera's view, the one it is deepest within
+        inside = [node for node in self.nodes if node.prospect_footprint.contains(pt)]
+        if len(inside) > 0:
+            return [max(inside, key=lambda node: node.footprint.exterior.distance(pt))]
+        # towards the edges, any camera that sees it
+        selected = [node for node in self.nodes if node.footprint.contains(pt)]
+        return selected if len(selected) > 0 else list(self.nodes)
+
+    def locate_node(self, node, img_arr, sid, track_pose=None, **context):
+        '''
+            one camera's locate pipeline, tracking the viewport of track_pose if given
+            a node with a locate pipeline of its own is handed the frame and context
+        '''
+        start = time.perf_counter()
+        try:
+            if node.locate is not None:
+                pose, conf_pc, tracked = node.locate(img_arr, sid, track_pose, **context)
+                return CameraDetection(node, pose, conf_pc, tracked, time.perf_counter() - start)
+            if img_arr is None:
+                return CameraDetection(node, secs=time.perf_counter() - start)
+            viewport = None
+            if track_pose is not None:
+                viewport = Viewport.from_pose(
+                    node.perspective(track_pose), img_arr.shape, '{0}{1}B'.format(node.name, sid))
+                if viewport is not None:
+                    viewport.resize(constants.RESIZE_POSE_TO_VIEWPORT)
+            if viewport is not None:
+                vp_prospect_list = [viewport]
+            else:
+                vp_prospect_list = get_prospect_list(
+                    node, img_arr, 4, Viewport(), 0, 0, self.logger, '{0}{1}A'.format(node.name, sid)) or []
+                for vp in vp_prospect_list:
+                    vp.index = vp.index.replace('A', 'B')
+            probe_result = probe_prospect_list(node, sid, vp_prospect_list, img_arr, 0, 0, self.logger)
+            pose, conf_pc = None, 0.0
+            if probe_result is not None and probe_result[4] is not None:
+                pose = probe_result[4]
+                if len(probe_result[3]) > 0:
+                    conf_pc = probe_result[3][0].conf_pc
+            return CameraDetection(node, pose, conf_pc, viewport is not None, time.perf_counter() - start)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            msg = 'Error in MultiCameraLocator locate_node {0}: {1} on line {2}'.format(node.name, e, err_line)
+            if self.logger is not None:
+                self.logger.error(msg)
+            else:
+                print(msg)
+            return CameraDetection(node, secs=time.perf_counter() - start)
+
+    def run_nodes(self, nodes, capture, sid, track_pose=None, context=None):
+        '''
+            capture and locate on each camera in parallel
+            a single camera on the calling thread
+        '''
+        context = context or {}
+        if len(nodes) == 1:
+            return [self.locate_node(nodes[0], capture(nodes[0]), sid, track_pose, **context)]
+        futures = [
+            self.workers[node.name].submit(
+                lambda n: self.locate_node(n, capture(n), sid, track_pose, **context), node)
+            for node in nodes
+        ]
+        return [f.result() for f in futures]
+
+    def locate(self, capture, sid, **context):
+        '''
+            fused arena pose for one frame, or None, and the per camera detections
+            capture(node) returns that camera's image array, and is only called
+            for the cameras prospected
+            context is passed on to the nodes with a locate pipeline of their own
+        '''
+        self.stats['frames'] += 1
+        selected = self.select_nodes(self.predicted_position())
+        track_pose = self.last_pose if self.tracking else None
+        detections = self.run_nodes(selected, capture, sid, track_pose, context)
+        self.stats['prospected'] += len(selected)
+        if not any(d.found for d in detections) and (track_pose is not None or len(selected) < len(self.nodes)):
+            # lost - sweep every camera
+            self.stats['sweeps'] += 1
+            detections += self.run_nodes(self.nodes, capture, sid, context=context)
+            self.stats['prospected'] += len(self.nodes)
+        elif len(selected) == 1:
+            self.stats['single_camera'] += 1
+
+        pose = fuse_detections(detections)
+        if pose is not None:
+            self.stats['found'] += 1
+            if sum(1 for d in detections if d.found) > 1:
+                self.stats['fused'] += 1
+            self.prior_pose = self.last_pose
+        else:
+            self.prior_pose = None
+        self.last_pose = pose
+        return pose, detections
+
+    def reset(self):
+        self.last_pose = None
+        self.prior_pose = None
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+
+        two virtual cameras, each seeing a little over half the lawn,
+        follow a mower driving back and forth across their overlap
+    '''
+    import logging
+    import os
+    from math import cos, sin, pi
+
+    import configurations
+    from geom_lib import diff_angles
+    from locate_bench import render_pose_frame
+
+    logging.basicConfig(level=logging.WARNING)
+    test_logger = logging.getLogger('locator')
+    configurations.Config.SAVE_PERIOD_SECS = 0
+    test_config = configurations.Config('configs/settings.yml', 'configs/config.xml', readonly=True)
+    # the primary host sets the pose geometry shared by all cameras
+    primary_host = LocateBenchHost(test_config, test_logger)
+
+    lawn_width_m = test_config['lawn.width_m']
+    lawn_length_m = test_config['lawn.length_m']
+    half_width_m = lawn_width_m / 2
+    test_nodes = [
+        CameraNode(test_config, CameraCalibration(
+            'west', [[4, 5], [6, 95], [94, 93], [96, 6]],
+            half_width_m, lawn_length_m), test_logger),
+        CameraNode(test_config, CameraCalibration(
+            'east', [[5, 6], [6, 94], [95, 95], [94, 4]],
+            half_width_m, lawn_length_m, offset_x_m=half_width_m), test_logger)
+    ]
+    for test_node in test_nodes:
+        print(test_node, 'arena x {0:.2f}..{2:.2f}m y {1:.2f}..{3:.2f}m'.format(*test_node.footprint.bounds))
+    overlap = test_nodes[0].footprint.intersection(test_nodes[1].footprint)
+    print('overlap x {0:.2f}..{2:.2f}m'.format(*overlap.bounds))
+
+    # back and forth across the fenced lawn, through the overlap
+    fence_m = test_config['lawn.fence.metres']
+    fence_min_x_m = min(f[0] for f in fence_m) + 0.3
+    fence_max_x_m = max(f[0] for f in fence_m) - 0.3
+    fence_mid_y_m = (min(f[1] for f in fence_m) + max(f[1] for f in fence_m)) / 2
+    route = []
+    num_frames = 60
+    for n in range(num_frames):
+        phase = 2 * pi * n / num_frames
+        x_m = (fence_min_x_m + fence_max_x_m) / 2 + (fence_max_x_m - fence_min_x_m) / 2 * cos(phase)
+        y_m = fence_mid_y_m + 0.6 * sin(2 * phase)
+        route.append((x_m, y_m))
+    route_poses = []
+    for n, (x_m, y_m) in enumerate(route):
+        nx_m, ny_m = route[(n + 1) % len(route)]
+        route_poses.append((x_m, y_m, atan2(ny_m - y_m, nx_m - x_m) % (2 * pi)))
+
+    # each camera's frames, as its virtual camera with the mower overlaid would render them
+    frames = {
+        test_node.name: [
+            np.array(render_pose_frame(test_node, poses.Pose(x_m, y_m, t_rad, mapper=test_node.data_mapper)))
+            for x_m, y_m, t_rad in route_poses
+        ]
+        for test_node in test_nodes
+    }
+
+    for tracking in (False, True):
+        locator = MultiCameraLocator(test_nodes, tracking=tracking, logger=test_logger)
+        position_errors, heading_errors, secs = [], [], []
+        for frame_num, (x_m, y_m, t_rad) in enumerate(route_poses):
+            start = time.perf_counter()
+            fused, frame_detections = locator.locate(
+                lambda node, n=frame_num: frames[node.name][n], frame_num)
+            secs.append(time.perf_counter() - start)
+            if fused is not None:
+                position_errors.append(hypot(fused.arena.c_x_m - x_m, fused.arena.c_y_m - y_m))
+                heading_errors.append(abs(diff_angles(fused.arena.t_rad, t_rad)))
+        locator.close()
+        stats = locator.stats
+        print('tracking: {0} detection: {1}/{2} fused: {3} single camera frames: {4} sweeps: {5} '
+              'cameras prospected per frame: {6:.2f}'.format(
+                  tracking, stats['found'], stats['frames'], stats['fused'], stats['single_camera'],
+                  stats['sweeps'], stats['prospected'] / stats['frames']))
+        print('    position error mean: {0:.4f}m max: {1:.4f}m heading error mean: {2:.2f}deg '
+              'locate mean: {3:.1f}ms'.format(
+                  np.mean(position_errors), np.max(position_errors),
+                  np.degrees(np.mean(heading_errors)), np.mean(secs) * 1000))
+        assert stats['found'] == stats['frames']
+
+    # poses both cameras see, fused against the most confident alone
+    locator = MultiCameraLocator(test_nodes, tracking=False, logger=test_logger)
+    fused_errors, best_errors = [], []
+    for frame_num, (x_m, y_m, t_rad) in enumerate(route_poses):
+        if not overlap.contains(ShapelyPoint(x_m, y_m)):
+            continue
+        frame_detections = locator.run_nodes(test_nodes, lambda node, n=frame_num: frames[node.name][n], frame_num)
+        found = [d for d in frame_detections if d.found]
+        if len(found) < 2:
+            continue
+        fused = fuse_detections(frame_detections)
+        best = max(found, key=lambda d: d.conf_pc).pose
+        fused_errors.append(hypot(fused.arena.c_x_m - x_m, fused.arena.c_y_m - y_m))
+        best_errors.append(hypot(best.arena.c_x_m - x_m, best.arena.c_y_m - y_m))
+    print('overlap frames seen by both cameras: {0} position error mean fused: {1:.4f}m best camera: {2:.4f}m'.format(
+        len(fused_errors), np.mean(fused_errors), np.mean(best_errors)))
+
+    # parallel workers against one after the other, every camera prospected
+    for label, locate_all in (
+        ('sequential', lambda n: [locator.locate_node(node, frames[node.name][n], n) for node in test_nodes]),
+        ('parallel', lambda n: locator.run_nodes(test_nodes, lambda node: frames[node.name][n], n))
+    ):
+        locate_all(0)
+        start = time.perf_counter()
+        for frame_num in range(len(route_poses)):
+            locate_all(frame_num)
+        print('{0:<10} all cameras {1:.1f}ms/frame'.format(
+            label, (time.perf_counter() - start) * 1000 / len(route_poses)))
+    locator.close()
+
+    # cameras configured in the profile, the device camera's node located by its host's own pipeline
+    import tempfile
+    import threading
+    config_text = open('configs/config.xml').read().replace('<cameras />', (
+        '<cameras><camera name="east" endpoint="192.0.2.1:8080" width_m="{0}" length_m="{1}" offset_x_m="{0}">'
+        '<point index="2" x="95" y="95" /><point index="0" x="5" y="6" /><point index="1" x="6" y="94" />'
+        '<point index="3" x="94" y="4" /></camera></cameras>').format(half_width_m, lawn_length_m))
+    with tempfile.NamedTemporaryFile('w', suffix='.xml', delete=False) as config_file:
+        config_file.write(config_text)
+    cameras_config = configurations.Config('configs/settings.yml', config_file.name, readonly=True)
+    os.remove(config_file.name)
+    camera_configs = cameras_config['cameras']
+    assert [c['name'] for c in camera_configs] == ['east']
+    assert camera_configs[0]['calib_pc_points'] == [[5, 6], [6, 94], [95, 95], [94, 4]]
+    east_calibration = CameraCalibration.from_camera_config(camera_configs[0])
+    assert np.allclose(east_calibration.arena_matrix(cameras_config), test_nodes[1].calibration.arena_matrix(test_config))
+
+    # the west camera as a host would locate it, through its own pipeline
+    host_threads = set()
+
+    def host_locate(frame, sid, track_pose, frame_num=None):
+        host_threads.add(threading.current_thread().name)
+        assert frame_num == sid
+        detection = locator.locate_node(test_nodes[0], frame, sid, track_pose)
+        return detection.pose, detection.conf_pc, detection.tracked
+
+    host_node = HostCameraNode('west', test_nodes[0], locate=host_locate)
+    assert host_node.footprint.equals(test_nodes[0].footprint)
+    locator = MultiCameraLocator([test_nodes[0]], tracking=False, logger=test_logger)
+    for camera_nodes, label in (([host_node], 'host camera alone'), ([host_node, test_nodes[1]], 'host and east')):
+        host_locator = MultiCameraLocator(camera_nodes, tracking=len(camera_nodes) > 1, logger=test_logger)
+        host_threads.clear()
+        for frame_num, (x_m, y_m, t_rad) in enumerate(route_poses):
+            fused, frame_detections = host_locator.locate(
+                lambda node, n=frame_num: frames[node.name][n], frame_num, frame_num=frame_num)
+        host_locator.close()
+        stats = host_locator.stats
+        print('{0:<18} detection: {1}/{2} sweeps: {3} host pipeline threads: {4}'.format(
+            label, stats['found'], stats['frames'], stats['sweeps'], sorted(host_threads)))
+        if len(camera_nodes) == 1:
+            # a single camera is located on the calling thread, as before there were several
+            assert host_threads == {threading.current_thread().name}
+            assert stats['found'] >= stats['frames'] // 2
+        else:
+            assert stats['found'] == stats['frames']
+    locator.close()
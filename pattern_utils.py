@@ -1,6 +1,5 @@
 import sys
 import numpy as np
-from math import ceil
 
 
 def densify(route, max_dist, logger=None, debug=False):
@@ -8,39 +7,38 @@ def densify(route, max_dist, logger=None, debug=False):
         Ensure all sequential pairs of points in route
             are at most max_dist apart, by adding intermediates
     '''
+    dense_route_coords = []
     try:
 
         if debug and logger is not None:
             logger.debug('route points: {0}'.format(route))
 
-        dense_route_coords = []
-        starts = [(fp[0], fp[1]) for fp in route[:-1]]
-        finishes = [(fp[0], fp[1]) for fp in route[1:]]
-        for lid in range(len(starts)):
-            start = starts[lid]
-            finish = finishes[lid]
-            dist_pc = np.hypot(finish[0] - start[0], finish[1] - start[1])
-            num_waypoints = ceil(dist_pc / max_dist)
-            if debug and logger is not None:
+        route_arr = np.array([(fp[0], fp[1]) for fp in route], dtype=float)
+        starts = route_arr[:-1]
+        deltas = route_arr[1:] - starts
+        dists = np.hypot(deltas[:, 0], deltas[:, 1])
+        num_waypoints = np.ceil(dists / max_dist).astype(int)
+        if debug and logger is not None:
+            for lid in range(len(starts)):
                 logger.debug('{0}-{1} start: ({2:.2f},{3:.2f}) finish: ({4:.2f}, {5:.2f}) dist: {6:.2f}% num_waypoints: {7}'.format(
                     lid,
                     lid + 1,
-                    *start,
-                    *finish,
-                    dist_pc,
-                    num_waypoints
+                    *route_arr[lid],
+                    *route_arr[lid + 1],
+                    dists[lid],
+                    num_waypoints[lid]
                 )
                 )
-            xs = np.linspace(start[0], finish[0],
-                             num_waypoints, endpoint=False)
-            ys = np.linspace(start[1], finish[1],
-                             num_waypoints, endpoint=False)
-            dense_line_points = np.round(
-                np.dstack((xs.flatten(), ys.flatten()))[0], 3).tolist()
 
-            dense_route_coords.extend(dense_line_points)
+        # every leg's waypoints at once, k steps of delta / n along from its start, as linspace does
+        leg_ids = np.repeat(np.arange(len(starts)), num_waypoints)
+        first_ids = np.cumsum(num_waypoints) - num_waypoints
+        ks = np.arange(len(leg_ids)) - np.repeat(first_ids, num_waypoints)
+        steps = deltas[leg_ids] / num_waypoints[leg_ids, np.newaxis]
+        dense_arr = ks[:, np.newaxis] * steps + starts[leg_ids]
+        dense_route_coords = np.round(dense_arr, 3).tolist()
 
-        dense_route_coords.append(finishes[-1])
+        dense_route_coords.append((route[-1][0], route[-1][1]))
 
     except Exception as e:
         err_line = sys.exc_info()[-1].tb_lineno
@@ -11,7 +11,7 @@ def calculate_route(fence_points_pc, arena_width_m, arena_length_m, cutter_dia_m
     try:
 
         route_pc = ever_decreasing_polygons.calculate_route(
-            fence_points_pc, arena_width_m, arena_length_m, cutter_dia_m, calc_rte_debug)
+            fence_points_pc, arena_width_m, arena_length_m, cutter_dia_m, logger, calc_rte_debug)
         # max distance between nodes
         dense_route_pc = densify(route_pc, max_seg_pc, logger)
 
@@ -2,7 +2,7 @@ import sys
 from types import SimpleNamespace
 import copy
 import numpy as np
-from math import sin, cos, degrees, isnan
+from math import sin, cos, degrees
 import time
 from enum import Enum, auto
 
@@ -29,6 +29,8 @@ class Pose():
     class Perspective(SimpleNamespace):
         pass
 
+    __slots__ = ('t_zero', 'ssid', 'arena', 'plan', 'cam', 'location_key', 'origination')
+
     tip_offset_ym = -1
     tail_offset_ym = -1
     target_width_m = -1
@@ -88,16 +90,35 @@ class Pose():
         cls.mapper = mapper
         cls.logger = logger
 
+    # class dimensions set by init, all a plan perspective needs
+    geometry_names = (
+        'target_width_m', 'target_length_m', 'target_radius_m', 'target_offset_pc', 'axle_track_m',
+        'tip_offset_ym', 'tail_offset_ym', 'body_width_m', 'body_length_m',
+        'arena_width_m', 'arena_length_m', 'image_width_px', 'image_height_px'
+    )
+
+    @classmethod
+    def geometry(cls):
+        '''
+            the class dimensions, picklable, for another process to init_geometry from
+        '''
+        return {name: getattr(cls, name, None) for name in cls.geometry_names}
+
+    @classmethod
+    def init_geometry(cls, geometry):
+        '''
+            set the class dimensions from geometry, in a process where init has not run
+        '''
+        for name, value in geometry.items():
+            setattr(cls, name, value)
+
     # Main Constructor
-    def __init__(self, cx_m=-1, cy_m=-1, t_rad=-1, ssid=-1, nose_tilt_rad=0, mapper=None):
+    def __init__(self, cx_m=-1, cy_m=-1, t_rad=-1, ssid=-1, nose_tilt_rad=0, mapper=None, camera=True):
 
         try:
             self.t_zero = time.time()
             self.ssid = ssid
-
-            if mapper is None:
-                if 'mapper' in vars(self):
-                    mapper = self.mapper
+            self.cam = None
 
             # create the arena perspective [m]
             self.arena = self.create_arena_perspective(
@@ -112,7 +133,9 @@ class Pose():
             self.plan = self.create_plan_perspective(self.arena)
 
             # create the camera perspective [px]
-            self.cam = self.create_camera_perspective()
+            # batch constructors defer this so all poses share one mapping
+            if camera:
+                self.cam = self.create_camera_perspective(mapper)
 
             self.location_key = self.as_key()
             self.origination = PoseOrigination.DEFINED
@@ -126,9 +149,24 @@ class Pose():
             except Exception:
                 print(msg)
 
+    # Batch Constructor
+    @classmethod
+    def from_batch(cls, pose_specs, ssid=-1, mapper=None):
+        '''
+            construct many poses from (cx_m, cy_m, t_rad) tuples
+            camera perspectives are derived with a single reverse mapping
+        '''
+        pose_list = [cls(cx_m, cy_m, t_rad, ssid=ssid, camera=False)
+                     for (cx_m, cy_m, t_rad) in pose_specs]
+        cams = cls.create_camera_perspectives(
+            [p.arena for p in pose_list], mapper)
+        for p, cam in zip(pose_list, cams):
+            p.cam = cam
+        return pose_list
+
     # Alternative Constructor
     @classmethod
-    def from_tip_tail(cls, tip_m, tail_m, t_rad=-1, ssid=-1):  # @UnusedVariable
+    def from_tip_tail(cls, tip_m, tail_m, t_rad=-1, ssid=-1, mapper=None):  # @UnusedVariable
 
         try:
             # calculate offset centre from tip and tail
@@ -138,7 +176,7 @@ class Pose():
             if t_rad is None or t_rad == -1:
                 t_rad = geom_lib.get_angle_between_cartesian_points(
                     tail_m[0], tail_m[1], tip_m[0], tip_m[1], 0)
-            pose_inst = cls(cx_m=cxm, cy_m=cym, t_rad=t_rad, ssid=ssid)
+            pose_inst = cls(cx_m=cxm, cy_m=cym, t_rad=t_rad, ssid=ssid, mapper=mapper)
             # update the measured span as main constructor applies configured dimensions
             pose_inst.arena.span_m = np.hypot(
                 tip_m[0] - tail_m[0], tip_m[1] - tail_m[1])
@@ -335,6 +373,54 @@ class Pose():
 
         return arena
 
+    @staticmethod
+    def gather_points(arena):
+        '''
+            collect arena xy pairs and xy lists into a single (N, 2) array
+            along with the layout needed to scatter them back
+        '''
+        layout = []
+        pts = []
+        arena_descriptors = vars(arena)
+        for desc_key, desc_val in arena_descriptors.items():
+            if desc_key.endswith('_x_m') and isinstance(desc_val, float):
+                matched_y_key = desc_key.replace('_x_m', '_y_m')
+                matched_y_val = arena_descriptors.get(matched_y_key)
+                if matched_y_val is not None:
+                    layout.append((desc_key, matched_y_key, 1))
+                    pts.append((desc_val, matched_y_val))
+            elif desc_key.endswith('_m') and isinstance(desc_val, list):
+                layout.append((desc_key, None, len(desc_val) // 2))
+                pts.extend(zip(desc_val[::2], desc_val[1::2]))
+        return layout, np.array(pts, dtype=float).reshape(-1, 2)
+
+    @staticmethod
+    def scatter_points(perspective, layout, pts_px, flat_lists=True):
+        '''
+            set rounded pixel points on a perspective, following a gathered layout
+            points that could not be mapped (nan) are not set
+        '''
+        valid = np.isfinite(pts_px).all(axis=1)
+        pts_int = np.zeros(pts_px.shape, dtype=int)
+        pts_int[valid] = np.round(pts_px[valid]).astype(int)
+        i = 0
+        for desc_key, matched_y_key, count in layout:
+            if matched_y_key is not None:
+                if valid[i]:
+                    setattr(perspective, desc_key.replace(
+                        '_x_m', '_x_px'), int(pts_int[i, 0]))
+                    setattr(perspective, matched_y_key.replace(
+                        '_y_m', '_y_px'), int(pts_int[i, 1]))
+            elif valid[i:i + count].all():
+                block = pts_int[i:i + count]
+                tgt_desc_key = desc_key.replace('_m', '_px')
+                if flat_lists:
+                    setattr(perspective, tgt_desc_key, block.flatten().tolist())
+                else:
+                    setattr(perspective, tgt_desc_key,
+                            [tuple(pt) for pt in block.tolist()])
+            i += count
+
     def create_plan_perspective(self, arena):
         '''
             scale cartesian metres => non-cartesian pixels
@@ -346,54 +432,13 @@ class Pose():
             x_scale = self.image_width_px / self.arena_width_m
             y_scale = self.image_height_px / self.arena_length_m
 
-            # loop through all arena points and transform them
-            arena_descriptors = vars(self.arena)
-
-            for desc_key in [k for k in arena_descriptors if k.endswith('_m')]:
-                desc_val = arena_descriptors[desc_key]
-
-                if isinstance(desc_val, float) and not isnan(desc_val):
-                    # simple values
-                    # we need to find xy coordinate pairs!
-                    try:
-                        if desc_key.endswith('_x_m'):
-                            matched_y_key = desc_key.replace('_x_m', '_y_m')
-                            matched_y_val = arena_descriptors[matched_y_key]
-                            x_pt_px = round(desc_val * x_scale)
-                            y_pt_px = round(
-                                self.image_height_px - (matched_y_val * y_scale))
-                            x_desc_key = desc_key.replace('_x_m', '_x_px')
-                            y_desc_key = matched_y_key.replace('_y_m', '_y_px')
-                            setattr(plan, x_desc_key, x_pt_px)
-                            setattr(plan, y_desc_key, y_pt_px)
-                    except Exception as e2:
-                        err_line = sys.exc_info()[-1].tb_lineno
-                        msg = 'Pose Error: unable to scale salient property: {0} {1} on line {2}'.format(
-                            desc_key, e2, err_line)
-                        if self.logger:
-                            self.logger.error(msg)
-                        else:
-                            print(msg)
-                elif isinstance(desc_val, list):
-                    try:
-                        # list of values x, y, x, y, etc.
-                        tgt_desc_key = desc_key.replace('_m', '_px')
-                        x_pts_px = [round(ptx * x_scale)
-                                    for ptx in desc_val[::2]]
-                        y_pts_px = [round(self.image_height_px - (pty * y_scale))
-                                    for pty in desc_val[1::2]]
-                        setattr(plan, tgt_desc_key, list(
-                            zip(x_pts_px, y_pts_px)))
-                    except Exception as e3:
-                        err_line = sys.exc_info()[-1].tb_lineno
-                        msg = 'Pose Error: unable to scale list: {0} {1} on line {2}'.format(
-                            desc_key, e3, err_line)
-                        if self.logger:
-                            self.logger.error(msg)
-                        else:
-                            print(msg)
-                elif isinstance(desc_val, np.ndarray):
-                    pass
+            # gather all arena points and scale them together
+            layout, pts_m = self.gather_points(arena)
+            pts_px = np.column_stack((
+                pts_m[:, 0] * x_scale,
+                self.image_height_px - (pts_m[:, 1] * y_scale)
+            ))
+            self.scatter_points(plan, layout, pts_px, flat_lists=False)
 
             plan.t_rad = arena.t_rad
             plan.t_deg = arena.t_deg
@@ -409,98 +454,80 @@ class Pose():
 
         return plan
 
-    def create_camera_perspective(self):
+    def create_camera_perspective(self, mapper=None):
         '''
             scale metres => distorted, warped pixels
         '''
-        cam = None
+        return self.create_camera_perspectives([self.arena], mapper)[0]
+
+    @classmethod
+    def create_camera_perspectives(cls, arenas, mapper=None):
+        '''
+            scale metres => distorted, warped pixels
+            for many arena perspectives using a single reverse mapping
+        '''
+        if mapper is None:
+            mapper = cls.mapper
+
+        # no mapper - no camera perspective!
+        cams = [None] * len(arenas)
         try:
 
             # use inverse matrix transform to derive img coordinates
-            if self.mapper is not None:
-
-                # no mapper - no camera perspective!
-                cam = self.Perspective()
-
-                # loop through all arena points and transform them
-                arena_descriptors = vars(self.arena)
-
-                for desc_key in [k for k in arena_descriptors if k.endswith('_m')]:
-                    desc_val = arena_descriptors[desc_key]
-
-                    if isinstance(desc_val, float):
-                        # simple values
-                        # we need to find xy coordinate pairs!
-                        if desc_key.endswith('_x_m'):
-                            try:
-                                cam_coords = None
-                                matched_y_key = desc_key.replace(
-                                    '_x_m', '_y_m')
-                                matched_y_val = arena_descriptors[matched_y_key]
-                                if matched_y_val is not None:
-                                    cam_coords = self.mapper.reverse_coordinates(
-                                        desc_val, matched_y_val)
-                                    if cam_coords is not None:
-                                        pt_px = np.round(
-                                            cam_coords).astype(int)
-                                        x_desc_key = desc_key.replace(
-                                            '_x_m', '_x_px')
-                                        y_desc_key = matched_y_key.replace(
-                                            '_y_m', '_y_px')
-                                        setattr(cam, x_desc_key, pt_px[0])
-                                        setattr(cam, y_desc_key, pt_px[1])
-                            except Exception as e1:
-                                err_line = sys.exc_info()[-1].tb_lineno
-                                msg = 'Pose Error: unable to create the camera perspective {} for ({}, {}) => ({}) on line {} mapper {}'.format(
-                                    e1,
-                                    desc_val,
-                                    matched_y_val,
-                                    cam_coords,
-                                    err_line,
-                                    self.mapper
-                                )
-                                try:
-                                    self.logger.error(msg)
-                                except Exception:
-                                    print(msg)
-                    elif isinstance(desc_val, list):
-                        # list of values x, y, x, y, etc.
-                        tgt_desc_key = desc_key.replace('_m', '_px')
-                        cam_coords = self.mapper.reverse_coordinates(
-                            desc_val[::2], desc_val[1::2])
-                        if cam_coords is not None:
-                            pts_px = np.round(cam_coords).astype(int)
-                            setattr(cam, tgt_desc_key, np.column_stack(
-                                pts_px).flatten().tolist())
-                    elif isinstance(desc_val, np.ndarray):
-                        # array of values - assume contour format r, c
-                        tgt_desc_key = desc_key.replace('_m', '_px')
-                        cam_coords = self.mapper.reverse_coordinates(
-                            desc_val[:, 1], desc_val[:, 0])
-                        if cam_coords is not None:
-                            pts_px = np.round(cam_coords).astype(int)
-                            setattr(cam, tgt_desc_key, np.dstack(pts_px)[0])
+            if mapper is not None:
+
+                cams = [cls.Perspective() for _ in arenas]
+
+                # gather all arena points into a single array
+                layouts = []
+                blocks = []
+                for arena in arenas:
+                    layout, pts_m = cls.gather_points(arena)
+                    layouts.append(layout)
+                    blocks.append(pts_m)
+                all_pts_m = np.concatenate(blocks) if len(
+                    blocks) > 0 else np.empty((0, 2))
+
+                cam_coords = None
+                if len(all_pts_m) > 0:
+                    cam_coords = mapper.reverse_coordinates(
+                        all_pts_m[:, 0], all_pts_m[:, 1])
+
+                if cam_coords is not None:
+                    all_pts_px = np.column_stack(cam_coords).astype(float)
+                    if cls.logger and not np.isfinite(all_pts_px).all():
+                        cls.logger.warning(
+                            'Pose Warning: {0} arena points could not be mapped to the camera perspective'.format(
+                                np.count_nonzero(~np.isfinite(all_pts_px).all(axis=1))))
+
+                    # scatter back into each camera perspective
+                    offset = 0
+                    for cam, layout, pts_m in zip(cams, layouts, blocks):
+                        cls.scatter_points(
+                            cam, layout, all_pts_px[offset:offset + len(pts_m)])
+                        offset += len(pts_m)
 
                 # new theta
-                if ('tail_x_px' in vars(cam) and
-                    'tail_y_px' in vars(cam) and
-                    'tip_x_px' in vars(cam) and
-                        'tip_y_px' in vars(cam)):
-                    cam.t_rad = geom_lib.get_angle_between_points(
-                        cam.tail_x_px, cam.tail_y_px, cam.tip_x_px, cam.tip_y_px)
-                    cam.t_deg = degrees(
-                        cam.t_rad) if cam.t_rad is not None else -1
+                for cam in cams:
+                    if ('tail_x_px' in vars(cam) and
+                        'tail_y_px' in vars(cam) and
+                        'tip_x_px' in vars(cam) and
+                            'tip_y_px' in vars(cam)):
+                        cam.t_rad = geom_lib.get_angle_between_points(
+                            cam.tail_x_px, cam.tail_y_px, cam.tip_x_px, cam.tip_y_px)
+                        cam.t_deg = degrees(
+                            cam.t_rad) if cam.t_rad is not None else -1
 
         except Exception as e2:
             err_line = sys.exc_info()[-1].tb_lineno
             msg = 'Pose Error: unable to create the camera perspective "' + \
                 str(e2) + '" on line ' + str(err_line)
             try:
-                self.logger.error(msg)
+                cls.logger.error(msg)
             except Exception:
                 print(msg)
 
-        return cam
+        return cams
 
     def copy(self):
         # return a copy of this object
@@ -592,9 +619,9 @@ class Pose():
 
         result = ''
         try:
-            result += 'Origination: {0}'.format(self.origination.name if 'origination' in vars(
-                self) and self.origination is not None else 'Unknown')
-            if 'arena' in vars(self):
+            result += 'Origination: {0}'.format(self.origination.name if getattr(
+                self, 'origination', None) is not None else 'Unknown')
+            if hasattr(self, 'arena'):
                 result += '\nArena ({0}m, {1}m) {2} deg'.format(
                     round(self.arena.c_x_m, 2),
                     round(self.arena.c_y_m, 2),
@@ -604,7 +631,7 @@ class Pose():
                 result += ' vertices: {0}m'.format(
                     [round(v, 2) for v in self.arena.vertices_m]
                 )
-            if 'plan' in vars(self):
+            if hasattr(self, 'plan'):
                 result += '\nPlan ({0}px, {1}px) {2} deg'.format(
                     round(self.plan.c_x_px, 2),
                     round(self.plan.c_y_px, 2),
@@ -614,7 +641,7 @@ class Pose():
                 result += ' vertices: {0}px'.format(
                     self.plan.vertices_px
                 )
-            if 'cam' in vars(self) and 'c_x_px' in vars(self.cam) and 'c_y_px' in vars(self.cam):
+            if getattr(self, 'cam', None) is not None and 'c_x_px' in vars(self.cam) and 'c_y_px' in vars(self.cam):
                 result += '\nCam ({0:.0f}px, {1:.0f}px) {2} deg'.format(
                     self.cam.c_x_px,
                     self.cam.c_y_px,
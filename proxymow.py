@@ -7,6 +7,7 @@ from pathlib import Path
 import glob
 import json
 import cherrypy
+from cherrypy._cprequest import Response
 from jinja2 import Environment, FileSystemLoader
 import random
 import io
@@ -21,7 +22,7 @@ from time import sleep
 from math import radians, degrees, sin, cos
 import numpy as np
 from copy import deepcopy
-from matplotlib.font_manager import findfont, FontProperties
+from functools import wraps
 try:
     from picamera2 import Picamera2  # @UnresolvedImport
 except ModuleNotFoundError:
@@ -40,41 +41,120 @@ from collections import deque, namedtuple
 import more_itertools
 import lxml.etree as ET
 import traceback
-import mariadb
-import markdown
 
 import utilities
 import constants
+from metrics import registry as stage_metrics
+from log_pipeline import LogPipeline, LazyMessage, BatchedRotatingFileHandler
+from flight_recorder import FlightRecorder
+from render_scheduler import RenderScheduler, RenderShed, call_render
+import render_lib
+from image_sink import sink as image_sink
+from snapshot_documents import PublishedDocument, MetadataDocuments, dumps_safe
 from cameras import RemoteOpticalPi
 from odometry import Movement
 from dashed_image_draw import DashedImageDraw
 import configurations
 from vis_lib import get_fence_mask_surface, \
-    grid_intersections_camera, get_polygons_from_pc, matrices_from_quad_points, \
+    get_polygons_from_pc, \
     get_prospect_list, probe_prospect_list, render_contour_row, lores_contours
-from geom_lib import annot_arrow, annot_axle, distance_to_line, diff_angles
+from geom_lib import diff_angles
 from utilities import trace_rules, trace_command, trace_location, \
     despatch_to_mower_udp, \
     fetch_telemetry, \
     LOCATION_CSV_HEADER, \
-    get_mem_stats
-from diagram_lib import plot_excursion, plot_contour_entry_as_projection, \
-    plot_projection_img
-from rules_engine import RulesEngine
+    get_mem_stats, get_score_props
+import strategy_batch
 import poses
 import tmplt_utils
 from snapshot import Snapshot, SnapshotGrowth
 from virtual import vmower
-from mapper import ImageMapper, DataMapper
+from mapper import ImageMapper, DataMapper, MapCache
 from timesheet import Timesheet
+from sim_clock import clock
 from pxm_exceptions import *  # @UnusedWildImport
 from itinerary import Itinerary
-from fixed_length_dict import SnapshotBuffer
-from cameras import OpticalVirtual
+from fixed_length_dict import FixedLengthDict
+from cameras import OpticalVirtual, ReplayCamera
 from viewport import Viewport
+from fence_masks import FenceMasks
 from forms.morphable import Morphable
 from forms.rule import RuleScope
 from sightings_manager import SightingsManager
+from grid_overlay import GridOverlay
+from frame_protocol import encode_frame, encode_frames, reduce_frame, roi_from_qs, viewport_from_qs
+from startup import timeline, deferred_import, BackgroundInitialiser
+
+# imported on first use, off the startup path
+diagram_lib = deferred_import('diagram_lib')
+multi_camera = deferred_import('multi_camera')
+fleet = deferred_import('fleet')
+markdown = deferred_import('markdown')
+mariadb = deferred_import('mariadb')
+
+timeline.mark('server modules imported')
+
+
+def requires_initialised(func):
+    '''
+        refuse the exposed method with 503 until the background initialiser is ready,
+        as it relies on the camera, fence masks, rules engine or workers that build
+    '''
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self.initialised:
+            cherrypy.response.status = 503
+            cherrypy.response.headers['Retry-After'] = '1'
+            return None
+        return func(self, *args, **kwargs)
+    return wrapper
+
+
+def mower_state(name):
+    '''
+        the current mower's control state, held by its fleet context, or None until re_init builds it
+    '''
+    def get(self):
+        return getattr(self.mower_context, name, None)
+
+    def set(self, value):
+        setattr(self.mower_context, name, value)
+    return property(get, set)
+
+
+def scheduled_render(name):
+    '''
+        run the exposed method on the server's render scheduler rather than the web server's thread,
+        with the request, and the response status and headers it sets, carried across
+        the cache busting ts parameter is not part of the request's key
+        a render missing its deadline with no earlier render to serve is refused with 503
+    '''
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not constants.RENDER_SCHEDULER_ENABLED:
+                return func(self, *args, **kwargs)
+            request = cherrypy.serving.request
+
+            def render():
+                cherrypy.serving.load(request, Response())
+                body = func(self, *args, **kwargs)
+                return body, cherrypy.serving.response.status, dict(cherrypy.serving.response.headers)
+
+            key = (name, args, tuple(sorted((k, str(v)) for k, v in kwargs.items() if k != 'ts')))
+            try:
+                body, status, headers = self.render_scheduler.render(key, render)
+            except RenderShed as e:
+                self.log_warning('scheduled_render: ' + str(e))
+                cherrypy.response.status = 503
+                cherrypy.response.headers['Retry-After'] = '1'
+                return None
+            if status:
+                cherrypy.response.status = status
+            cherrypy.response.headers.update(headers)
+            return body
+        return wrapper
+    return decorator
 
 
 class MowerProxy():
@@ -110,11 +190,22 @@ class ProxymowServer(object):
     linux = (platform.system() == 'Linux')
 
     tmp_folder_path = tempfile.gettempdir() + os.path.sep
-    font_path = findfont(FontProperties(family=['sans-serif']))
+    _font_path = None
 
     LOG_MAX_BYTES = constants.LOG_MAX_BYTES
     LOG_BACKUP_COUNT = constants.LOG_BACKUP_COUNT
 
+    # json documents serialised once per planned snapshot
+    SNAPSHOT_DOCUMENTS = ('contours', 'strategy', 'metadata')
+
+    # the endpoints serve and instruct the current mower
+    rules_engine = mower_state('rules_engine')
+    itinerary = mower_state('itinerary')
+    telem = mower_state('telem')
+    telemetry_updated = mower_state('telemetry_updated')
+    snapshot_buffer = mower_state('snapshot_buffer')
+    motivate_pose_buffer = mower_state('motivate_pose_buffer')
+
     def __init__(self, args):
         self.debug = args.debug
         self.log_level = logging.DEBUG if self.debug else logging.WARNING
@@ -150,6 +241,8 @@ class ProxymowServer(object):
             os.makedirs(self.calib_folder_path_name)
         self.calib_img_name = (
             work_folder_path / 'calib' / 'calib-{}.jpg').resolve().__str__()
+        self.map_cache_folder_path_name = (
+            work_folder_path / 'maps').resolve().__str__()
         self.tmplt_path_name = (
             app_root_path / 'templates').resolve().__str__()
         self.env = Environment(loader=FileSystemLoader(self.tmplt_path_name))
@@ -176,128 +269,163 @@ class ProxymowServer(object):
         contours_log_file_name = (
             (log_folder_path / 'contours.dat').resolve()).__str__()
 
+        # records are queued for a writer thread per log file
+        self.log_pipeline = LogPipeline()
+        file_handler_class = BatchedRotatingFileHandler if self.log_pipeline.enabled else RotatingFileHandler
+        cherrypy.engine.subscribe('stop', self.log_pipeline.stop)
+
+        # frames, poses, commands and telemetry of each excursion
+        self.flight_recorder = FlightRecorder(
+            (work_folder_path / 'flight').resolve().__str__(), logger=logging.getLogger('pxm'))
+        cherrypy.engine.subscribe('stop', self.flight_recorder.stop)
+
+        # ui renders, bounded and off the control loop's threads
+        self.render_scheduler = RenderScheduler(logger=logging.getLogger('pxm'))
+        self.render_scheduler.start_probe()
+        cherrypy.engine.subscribe('stop', self.render_scheduler.stop)
+
+        # archive and debug images saved off the locate path
+        image_sink.logger = logging.getLogger('pxm')
+        cherrypy.engine.subscribe('stop', image_sink.stop)
+
         # main log
         self.pxm_logger = logging.getLogger('pxm')
         # create handler
-        log_handler = RotatingFileHandler(
+        log_handler = file_handler_class(
             pxm_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         log_handler.setFormatter(log_formatter)
-        self.pxm_logger.addHandler(log_handler)
+        self.log_pipeline.attach(self.pxm_logger, log_handler)
         self.pxm_logger.setLevel(self.log_level)
 
         # settings log
         self.settings_log = logging.getLogger('settings')
         # create handler
-        settings_log_handler = RotatingFileHandler(
+        settings_log_handler = file_handler_class(
             settings_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         settings_log_handler.setFormatter(log_formatter)
-        self.settings_log.addHandler(settings_log_handler)
+        self.log_pipeline.attach(self.settings_log, settings_log_handler)
         self.settings_log.setLevel(self.log_level)
 
         # comms log
         comms_logger = logging.getLogger('comms')
         # create handler
-        comms_log_handler = RotatingFileHandler(
+        comms_log_handler = file_handler_class(
             comms_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         comms_log_handler.setFormatter(log_formatter)
-        comms_logger.addHandler(comms_log_handler)
+        self.log_pipeline.attach(comms_logger, comms_log_handler)
         comms_logger.setLevel(self.log_level)
 
         # vision log
         self.vision_logger = logging.getLogger('vision')
         # create handler
-        vision_log_handler = RotatingFileHandler(
+        vision_log_handler = file_handler_class(
             vision_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         vision_log_handler.setFormatter(log_formatter)
-        self.vision_logger.addHandler(vision_log_handler)
+        self.log_pipeline.attach(self.vision_logger, vision_log_handler)
         self.vision_logger.setLevel(self.log_level)
 
         # locator log
         locator_logger = logging.getLogger('locator')
         # create handler
-        locator_log_handler = RotatingFileHandler(
+        locator_log_handler = file_handler_class(
             locator_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         locator_log_handler.setFormatter(log_formatter)
-        locator_logger.addHandler(locator_log_handler)
+        self.log_pipeline.attach(locator_logger, locator_log_handler)
         locator_logger.setLevel(self.log_level)
 
         # navigation log
         navigation_logger = logging.getLogger('navigation')
         # create handler
-        navigation_log_handler = RotatingFileHandler(
+        navigation_log_handler = file_handler_class(
             navigation_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         navigation_log_handler.setFormatter(log_formatter)
-        navigation_logger.addHandler(navigation_log_handler)
+        self.log_pipeline.attach(navigation_logger, navigation_log_handler)
         navigation_logger.setLevel(self.log_level)
 
         # last commands log
         last_cmds_logger = logging.getLogger('last-cmds')
         # create handler
-        last_cmds_log_handler = RotatingFileHandler(
+        last_cmds_log_handler = file_handler_class(
             last_cmds_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         last_cmds_log_handler.setFormatter(log_formatter)
-        last_cmds_logger.addHandler(last_cmds_log_handler)
+        self.log_pipeline.attach(last_cmds_logger, last_cmds_log_handler)
         last_cmds_logger.setLevel(self.log_level)
 
         # mow patterns log
         pattern_logger = logging.getLogger('mow-patterns')
         # create handler
-        pattern_log_handler = RotatingFileHandler(
+        pattern_log_handler = file_handler_class(
             patterns_log_file_name, maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUP_COUNT)
         # add formatter to handler
         pattern_log_handler.setFormatter(log_formatter)
-        pattern_logger.addHandler(pattern_log_handler)
+        self.log_pipeline.attach(pattern_logger, pattern_log_handler)
         pattern_logger.setLevel(self.log_level)
 
         # excursion log
         excursion_logger = logging.getLogger('excursion')
         # create handler
-        excursion_log_handler = RotatingFileHandler(
+        excursion_log_handler = file_handler_class(
             excursion_log_file_name,
             maxBytes=self.LOG_MAX_BYTES,
             backupCount=self.LOG_BACKUP_COUNT
         )
         # add formatter to handler
         excursion_log_handler.setFormatter(data_log_formatter)
-        excursion_logger.addHandler(excursion_log_handler)
+        self.log_pipeline.attach(excursion_logger, excursion_log_handler)
         excursion_logger.setLevel(logging.ERROR)  # initially logs nothing
 
         # contours log
         contour_logger = logging.getLogger('contours')
         # create handler
-        contour_log_handler = RotatingFileHandler(
+        contour_log_handler = file_handler_class(
             contours_log_file_name,
             maxBytes=self.LOG_MAX_BYTES * 2,
             backupCount=self.LOG_BACKUP_COUNT
         )
         # add formatter to handler
         contour_log_handler.setFormatter(data_log_formatter)
-        contour_logger.addHandler(contour_log_handler)
+        self.log_pipeline.attach(contour_logger, contour_log_handler)
         contour_logger.setLevel(logging.ERROR)  # initially logs nothing
 
         self.contours_buffer = deque([], 100)
+        self.metadata_documents = MetadataDocuments()
         arch_file_lst = os.listdir(self.image_folder_path_name)
         num_files = len(arch_file_lst)
         self.archive_image_count = (
             num_files + 1) % constants.ARCHIVE_IMAGE_MAX_COUNT
 
+        self.startup_timeline_path_name = (log_folder_path / 'startup.json').resolve().__str__()
+
         self.pxm_logger.info('server initialisation started...')
         self.initialise()
+        timeline.mark('server constructed')
+
+    @property
+    def font_path(self):
+        '''
+            sans-serif font file, found with matplotlib on first use
+        '''
+        if ProxymowServer._font_path is None:
+            from matplotlib.font_manager import findfont, FontProperties
+            # a plain str, as it is passed to the render processes
+            ProxymowServer._font_path = str(findfont(FontProperties(family=['sans-serif'])))
+        return ProxymowServer._font_path
 
     def initialise(self):
 
         try:
 
             self.log('initialise started...')
-            self.config = configurations.Config(
-                self.settings_file_path_name, self.config_file_path_name, debug=self.debug, callback=self.re_init)
+            with timeline.span('configuration loaded'):
+                self.config = configurations.Config(
+                    self.settings_file_path_name, self.config_file_path_name, debug=self.debug, callback=self.re_init)
             self.log(str(self.config))
             self.db_connection = None
             self.envir = {}
@@ -307,7 +435,6 @@ class ProxymowServer(object):
             self.drive_cancel = False
             self.drive['path'] = None
             self.reset_index = 0
-            self.itinerary = None
             self.total_destinations = 0
             self.pose = None
             self.cmds = []
@@ -316,10 +443,7 @@ class ProxymowServer(object):
             self.udp_socket2 = socket.socket(
                 socket.AF_INET, socket.SOCK_DGRAM)  # Mower Proxy
             self.udp_socket2.settimeout(4)
-            self.unacks = 0
-            self.telemetry_updated = 0  # force immediate update
             self.when_checked = 0  # force
-            self.telem = {}
             self.cutter1_state = False
             self.cutter2_state = False
             self.calib_image_array_cache = {}
@@ -355,27 +479,33 @@ class ProxymowServer(object):
             self.extrapolation_incidents = 0
             self.sightings_mgr = SightingsManager(0.1) # 0.1m threshold 
 
-            # create unpopulated mappers
+            # create unpopulated mappers, populated maps are kept on disk for the next start
             self.log('init about to create mappers...', True)  # log memory
+            map_cache = MapCache(self.map_cache_folder_path_name, logger=self.pxm_logger)
             self.distort_mapper = ImageMapper(
-                logger=self.pxm_logger, populate=False)
+                logger=self.pxm_logger, populate=False, map_cache=map_cache)
             self.undistort_unwarp_mapper = ImageMapper(
-                logger=self.pxm_logger, populate=False)
+                logger=self.pxm_logger, populate=False, map_cache=map_cache)
             self.undistort_mapper = ImageMapper(
-                logger=self.pxm_logger, populate=False)
+                logger=self.pxm_logger, populate=False, map_cache=map_cache)
             self.unwarp_mapper = ImageMapper(
-                logger=self.pxm_logger, populate=False)
+                logger=self.pxm_logger, populate=False, map_cache=map_cache)
             self.data_mapper = DataMapper(
-                logger=self.pxm_logger, populate=False)
-            self.grid_data_mapper = DataMapper(
-                logger=self.pxm_logger, populate=False)
-            self.rules_engine = None
+                logger=self.pxm_logger, populate=False, map_cache=map_cache)
+            self.grid_overlay = GridOverlay(logger=self.pxm_logger)
+            # fence masks supplied by the server when acting as an edge camera node
+            self.edge_fence_masks = FixedLengthDict(2)
+            # built by re_init in the background initialiser
+            self.camera = None
+            self.camera_locator = None
+            self.fence_masks = None
             self.cached_scoring_snapshot = None
             self.cached_scoring_props = {}
-            self.re_init(True)  # re-initialise artefacts
 
-            self.snapshot_buffer = SnapshotBuffer(4)
-            self.motivate_pose_buffer = deque([], 4)
+            # a control context per mower, the current mower's and any fleet's, built by re_init
+            self.mower_contexts = {}
+            self.mower_context = None
+            self.fleet_locator = None
 
             self.prev_trace_locations = deque([])
 
@@ -390,6 +520,45 @@ class ProxymowServer(object):
             self.camera_snap_queue = queue.Queue(maxsize=-1)
             self.camera_raw_queue = queue.Queue(maxsize=-1)
 
+            # accelerate the virtual mower, camera and governor together?
+            if constants.SIMULATED_CLOCK_RATE is not None:
+                clock.enable(rate=constants.SIMULATED_CLOCK_RATE)
+                self.log('Simulated clock enabled: {0}'.format(clock))
+
+            # create mower proxy
+            self.shared = MowerProxy(self.config, self.udp_socket2)
+
+            # artefacts and worker threads, built while the web interface is answering
+            self.initialiser = BackgroundInitialiser(
+                [
+                    ('artefacts initialised', lambda: self.re_init(True)),
+                    ('workers started', self.start_workers)
+                ],
+                self.pxm_logger,
+                self.startup_timeline_path_name
+            )
+            if constants.STARTUP_BACKGROUND_INIT:
+                self.initialiser.start()
+            else:
+                self.initialiser.run()
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in pxm initialisation: ' +
+                           str(e) + ' on line ' + str(err_line))
+
+    @property
+    def initialised(self):
+        '''
+            the background initialiser has built the artefacts and started the workers
+        '''
+        return 'initialiser' in vars(self) and self.initialiser.state == 'ready'
+
+    def start_workers(self):
+        '''
+            virtual mower, camera worker and governor threads
+        '''
+        try:
             # create and start virtual mower thread
             self.vm_thread = Thread(target=self.virtual_mower)
             self.vm_thread.daemon = True
@@ -397,9 +566,6 @@ class ProxymowServer(object):
 
             sleep(2.0)  # allow time for virtual mower to start
 
-            # create mower proxy
-            self.shared = MowerProxy(self.config, self.udp_socket2)
-
             # create and start camera worker thread
             self.camera_worker = Thread(target=self.process_image)
             self.camera_worker.daemon = True
@@ -416,7 +582,7 @@ class ProxymowServer(object):
 
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
-            self.log_error('Error in pxm initialisation: ' +
+            self.log_error('Error in pxm start_workers: ' +
                            str(e) + ' on line ' + str(err_line))
 
     def re_init(self, first_time=False):
@@ -436,10 +602,11 @@ class ProxymowServer(object):
             strength = self.config['optical.undistort_strength']
             zoom = self.config['optical.undistort_zoom']
 
-            # temporary pause for governor
+            # temporary pause for governor, not yet running the first time
             self.log('re_init pausing governor...')
             self.run_governor = False
-            sleep(2)
+            if not first_time:
+                sleep(2)
 
             self.log('re_init about to clear mappers...', True)  # log memory
             self.distort_mapper.clear()
@@ -447,6 +614,8 @@ class ProxymowServer(object):
             self.undistort_mapper.clear()
             self.unwarp_mapper.clear()
             self.data_mapper.clear()
+            # grid layers for the previous calibration would not be asked for again
+            self.grid_overlay.clear()
             self.log('re_init about to garbage collect...', True)  # log memory
             gc.collect()
             self.log('re_init about to populate mappers...', True)  # log memory
@@ -559,7 +728,11 @@ class ProxymowServer(object):
                         'No Linux RPI camera Available in pxm re_init: ' + str(ce2) + ' on line ' + str(err_line))
             else:
                 from wincameras import OpticalWusb
-            if self.config['device.channel'] == 'VirtualSettings':
+            if constants.REPLAY_CAMERA_FOLDER is not None:
+                # recorded frames, for reproducible locate measurements
+                self.camera = ReplayCamera(constants.REPLAY_CAMERA_FOLDER, debug=self.debug)
+                self.log('ReplayCamera created with {0} frames'.format(len(self.camera)))
+            elif self.config['device.channel'] == 'VirtualSettings':
                 self.camera = OpticalVirtual(
                     lawn_bounds_pc,
                     vlawn_bollards_pc,
@@ -608,63 +781,14 @@ class ProxymowServer(object):
                 raise Exception('No Camera Selected')
 
             # strategy now based on mower/lawn combination which may change
-            # however, we want to preserve the last n cmds & start time...
-            if 'rules_engine' in vars(self) and self.rules_engine is not None:
-                prev_last_n_cmds = self.rules_engine.last_n_commands
-                prev_last_n_comp_cmds = self.rules_engine.last_n_comp_commands
-                prev_route_started_time = self.rules_engine.route_started_time
-                prev_context = self.rules_engine.context
-            else:
-                prev_last_n_cmds = None
-                prev_last_n_comp_cmds = None
-                prev_route_started_time = -1
-                prev_context = {}
-
-            self.rules_engine = RulesEngine(
-                self.config['current.strategy'],
-                self.config['strategy.rules'],
-                self.config['strategy.terms'],
-                self.udp_socket,
-                self.data_mapper
-            )
-
-            if prev_last_n_cmds is not None:
-                self.rules_engine.last_n_commands = prev_last_n_cmds
-                self.rules_engine.last_n_comp_commands = prev_last_n_comp_cmds
-                self.rules_engine.route_started_time = prev_route_started_time
-                self.rules_engine.context = prev_context
+            # however, each mower's last n cmds & start time are preserved by its context...
+            self.build_mower_contexts()
 
             # update location props
             self.location_props['not_found_count'] = 0
 
             # scoring properties
-            self.score_props = {}
-            scaled_names = ['span', 'area']
-            scaled_property_names = ['lower', 'scale', 'upper', 'maxscore']
-            measure_names = ['isoscelicity', 'solidity', 'fitness']
-            meas_property_names = ['lower', 'setpoint', 'upper', 'maxscore']
-            for name in scaled_names:
-                prop_list = []
-                for propname in scaled_property_names:
-                    if propname == 'scale':
-                        # scale appropriate real-world measurement from config
-                        scale_factor = self.config['{}.{}'.format(
-                            name, propname)]
-                        if name == 'span':
-                            configured_val = self.config['mower.target_length_m']
-                        elif name == 'area':
-                            configured_val = self.config['mower.target_area_m2']
-                        prop_list.append(configured_val * scale_factor)
-                    else:
-                        prop_list.append(
-                            self.config['{}.{}'.format(name, propname)])
-                self.score_props[name] = tuple(prop_list)
-            for name in measure_names:
-                prop_list = []
-                for propname in meas_property_names:
-                    prop_list.append(
-                        self.config['{}.{}'.format(name, propname)])
-                self.score_props[name] = tuple(prop_list)
+            self.score_props = get_score_props(self.config)
 
             # fence polygons
             fence_polygon_percent = self.config['lawn.fence']
@@ -706,6 +830,8 @@ class ProxymowServer(object):
             self.log('fence masks constructed')
 
             self.fence_mask_array = np.asarray(self.fence_mask_img, bool)
+            self.fence_masks = FenceMasks(self.fence_mask_array)
+            self.log(str(self.fence_masks))
             self.fence_mask_display_array = np.asarray(
                 self.fence_mask_display_img, bool)
             if constants.DEBUG_SAVE_IMAGE_LEVEL > 0:
@@ -717,6 +843,23 @@ class ProxymowServer(object):
             # create viewport for windowing
             self.viewport = Viewport()
 
+            # a locate node per camera, the device camera's first, located through its own pipeline
+            if self.camera_locator is not None:
+                self.camera_locator.close()
+            locator_logger = logging.getLogger('locator')
+            camera_nodes = [multi_camera.HostCameraNode('primary', self, self.camera, locate=self.locate_frame)]
+            for camera_config in self.config['cameras']:
+                camera_nodes.append(multi_camera.CameraNode(
+                    self.config,
+                    multi_camera.CameraCalibration.from_camera_config(camera_config),
+                    locator_logger,
+                    camera=RemoteOpticalPi(camera_config['endpoint'])
+                ))
+            # the device camera alone tracks its own viewport, growing it while the target is lost
+            self.camera_locator = multi_camera.MultiCameraLocator(
+                camera_nodes, tracking=len(camera_nodes) > 1, logger=locator_logger)
+            self.log('re_init camera nodes: {0}'.format(camera_nodes))
+
             # reset last visited node?
             if constants.RESET_LAST_VISITED_NODE_ON_PROFILE_CHANGE:
                 self.config['_current.last_visited_route_node'] = None
@@ -735,6 +878,55 @@ class ProxymowServer(object):
             self.log_error('Error in pxm re_init: ' +
                            str(e) + ' on line ' + str(err_line))
 
+    def build_mower_contexts(self):
+        '''
+            a control context per mower under the camera, the current mower's first
+            contexts are kept through a re-configuration, and the current mower's passes to a newly
+            selected mower without one, so a single mower's history survives being re-selected
+        '''
+        names = fleet.fleet_names(self.config)
+        previous = dict(self.mower_contexts)
+        if (names[0] not in previous and
+            self.mower_context is not None and
+                self.mower_context.name not in names):
+            previous[names[0]] = previous.pop(self.mower_context.name)
+        contexts = {}
+        for name in names:
+            mower_config = fleet.mower_config(self.config, name)
+            mower_cmd = self.mower_cmd(mower_config)
+            ctx = previous.get(name)
+            if ctx is None:
+                ctx = fleet.MowerContext(
+                    name, mower_config, self.data_mapper, mower_cmd, logger=self.pxm_logger, udp_socket=self.udp_socket)
+            else:
+                ctx.reconfigure(name, mower_config, self.data_mapper, mower_cmd)
+            contexts[name] = ctx
+        self.mower_contexts = contexts
+        self.mower_context = contexts[names[0]]
+
+        # mowers sharing the camera are located together, each frame prospected once
+        governed = self.governed_contexts()
+        if len(governed) > 1:
+            self.fleet_locator = fleet.FleetLocator(self, governed, logger=logging.getLogger('locator'))
+        else:
+            self.fleet_locator = None
+        self.log('re_init mower contexts: {0}'.format(list(contexts.values())))
+
+    def governed_contexts(self):
+        '''
+            contexts of the configured mowers, the current mower's first
+        '''
+        return [ctx for ctx in self.mower_contexts.values() if ctx.name in self.config['mowers']]
+
+    def mower_cmd(self, mower_config):
+        '''
+            despatches a command to the configured mower and returns its response
+        '''
+        def despatch(cmd):
+            return despatch_to_mower_udp(
+                cmd, self.udp_socket, mower_config['mower.ip'], mower_config['mower.port'], max_attempts=1)
+        return despatch
+
     def handle_GET(self, *_args, key):
         cherrypy.response.headers['Access-Control-Allow-Origin'] = '*'
         if key == '*':
@@ -1249,13 +1441,14 @@ class ProxymowServer(object):
                             'process_image get from raw queue released...')
                         self.log('process_image Processing Raw Image...')
                         disp_array = None
+                        capture_time = clock.time()
                         try:
                             disp_array = self.get_raw_image(cam_settings)
                         except Exception as e:
                             self.log_error(
                                 'process_image get_raw_image error:' + str(e))
                         self.log('process_image get_raw_image complete')
-                        self.camera_raw_queue.put(disp_array)
+                        self.camera_raw_queue.put((disp_array, capture_time))
                     elif cam_settings['queue'] == 'locate':
                         self.log(
                             'process_image get from locate queue released...')
@@ -1269,7 +1462,21 @@ class ProxymowServer(object):
                                 'process_image get_chan_arrays error:' + str(e))
                         self.log('process_image get_chan_arrays complete')
                         self.camera_locate_queue.put(
-                            (analysis_array, disp_array))
+                            (analysis_array, disp_array, None))
+                    elif cam_settings['queue'] == 'edge':
+                        self.log(
+                            'process_image get from edge queue released...')
+                        self.log('process_image Obtaining Edge Arrays...')
+                        try:
+                            analysis_array, disp_array, edge_viewports = self.get_edge_arrays(
+                                cam_settings)
+                        except Exception as e:
+                            analysis_array = disp_array = edge_viewports = None
+                            self.log_error(
+                                'process_image get_edge_arrays error:' + str(e))
+                        self.log('process_image get_edge_arrays complete')
+                        self.camera_locate_queue.put(
+                            (analysis_array, disp_array, edge_viewports))
                     elif cam_settings['queue'] == 'vision':
                         self.log(
                             'process_image get from vision queue released...')
@@ -1303,7 +1510,9 @@ class ProxymowServer(object):
         self.log('Process image thread loop terminated')
 
     def buffer_locate_snapshot(self):
-
+        '''
+            locates every governed mower in the latest frame and plans from each mower's snapshot
+        '''
         try:
 
             logger = logging.getLogger('locator')
@@ -1312,31 +1521,39 @@ class ProxymowServer(object):
             locate_timesheet = Timesheet('locate')
 
             # do the heavy lifting of locating the target
+            located = {}
             locate_snapshot = self.get_locate_snapshot(
-                logger, locate_timesheet)
-            motivate_pose = self.motivate_pose_buffer[-1] if len(
-                self.motivate_pose_buffer) > 0 else None
-
-            # do planning?
-            if self.rules_engine is not None:
-                self.nav_plan(locate_snapshot, motivate_pose,
+                logger, locate_timesheet, located)
+
+            # the current mower's snapshot, and the rest of the fleet's located in the same frame
+            snapshots = [(self.mower_context, locate_snapshot)]
+            for name, pose in located.get('fleet', {}).items():
+                ctx = self.mower_contexts[name]
+                if ctx is not self.mower_context:
+                    fleet_snapshot = Snapshot(ctx.snapshot_buffer, locate_snapshot.ssid, logger)
+                    fleet_snapshot.set_pose(pose)
+                    snapshots.append((ctx, fleet_snapshot))
+
+            for ctx, snapshot in snapshots:
+                motivate_pose = ctx.motivate_pose_buffer[-1] if len(
+                    ctx.motivate_pose_buffer) > 0 else None
+
+                # do planning
+                self.nav_plan(ctx, snapshot, motivate_pose,
                               logger, locate_timesheet)
 
                 # add snapshot to buffer
-                self.snapshot_buffer[locate_snapshot.ssid] = locate_snapshot
+                ctx.snapshot_buffer[snapshot.ssid] = snapshot
 
-                msg = 'Locate Snapshots:\n'
-                for ssk in self.snapshot_buffer:
-                    ss = self.snapshot_buffer[ssk]
-                    msg += '\t{0} {1} {2} |{3}|\n'.format(
+                logger.debug(LazyMessage('Locate Snapshots {0}:\n{1}', ctx.name, lambda ctx=ctx: ''.join(
+                    '\t{0} {1} {2} |{3}|\n'.format(
                         ssk,
                         ss.ssid,
                         ss._pose.as_concise_str() if ss._pose is not None else 'None',
                         ss._extrapolated_pose.as_concise_str() if ss._extrapolated_pose is not None else 'None'
-                    )
-                logger.debug(msg)
+                    ) for ssk, ss in ctx.snapshot_buffer.items())))
 
-            logger.debug(str(locate_timesheet))
+            logger.debug(LazyMessage('{0}', locate_timesheet))
 
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -1345,7 +1562,7 @@ class ProxymowServer(object):
 
     def estimate_landing_time(self, rule, fixed_overhead=0.8):
         # employ fixed overhead? i.e. time taken to transmit the command and ramp velocity
-        landing_time = time.time()
+        landing_time = clock.time()
         try:
             if (rule.duration_result is not None and
                 not rule.stage_complete and
@@ -1353,13 +1570,13 @@ class ProxymowServer(object):
                 if rule.duration_result > 0:
                     # duration-based delay + fixed overhead?
                     dur_delay = (rule.duration_result / 1000) + fixed_overhead
-                    landing_time = time.time() + dur_delay
+                    landing_time = clock.time() + dur_delay
                 else:
                     pass
                 # allow the current command landing time to reign
             else:
                 dur_delay = fixed_overhead
-                landing_time = time.time() + dur_delay
+                landing_time = clock.time() + dur_delay
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
             self.pxm_logger.error(
@@ -1367,20 +1584,20 @@ class ProxymowServer(object):
 
         return landing_time
 
-    def get_current_command(self, rule, pose, ssid, in_flight, cmd_resp, is_frozen=None, is_static=None):
+    def get_current_command(self, itinerary, rule, pose, ssid, in_flight, cmd_resp, is_frozen=None, is_static=None):
 
         try:
 
             # cmd for last n commands
             try:
                 # fetch Progress named tuple
-                progress = self.itinerary.progress(
+                progress = itinerary.progress(
                     (pose.arena.c_x_m, pose.arena.c_y_m))
                 prog_compl_pc = max(0, progress.completed_pc)
             except Exception:
                 prog_compl_pc = 0
-            if self.itinerary is not None and not self.itinerary.is_complete and pose is not None:
-                tgt_dest = self.itinerary.get_path_ends()[1]
+            if itinerary is not None and not itinerary.is_complete and pose is not None:
+                tgt_dest = itinerary.get_path_ends()[1]
                 tgt_str = '({1:.2f}, {2:.2f}) {0:.0f}%'.format(
                     prog_compl_pc, tgt_dest.target_x, tgt_dest.target_y)
                 delta_x = tgt_dest.target_x - pose.arena.c_x_m
@@ -1432,9 +1649,9 @@ class ProxymowServer(object):
             self.log_error('Error in get_compressed_command: ' +
                            str(e) + ' on line ' + str(err_line))
 
-    def log_aug_cur_cmd(self, rule, in_flight, cmd_resp, is_frozen=None, is_static=None):
+    def log_aug_cur_cmd(self, ctx, rule, in_flight, cmd_resp, is_frozen=None, is_static=None):
         '''
-            cache and log command if is_frozen is None, else augment last entry
+            cache and log the mower's command if is_frozen is None, else augment last entry
         '''
         LastCommandData = namedtuple(
             'LastCommandData', 'Rule, Pose, SSID, InFlight, CmdResp')
@@ -1442,48 +1659,56 @@ class ProxymowServer(object):
         try:
             if is_frozen is None:
                 # cache and log
-                pose = self.snapshot_buffer.latest_pose()
-                ssid = self.snapshot_buffer.latest_ssid()
-                self.cached_history_cmd = LastCommandData(
+                pose = ctx.snapshot_buffer.latest_pose()
+                ssid = ctx.snapshot_buffer.latest_ssid()
+                ctx.cached_history_cmd = LastCommandData(
                     deepcopy(rule), pose, ssid, in_flight, cmd_resp)
                 cmd_text = self.get_current_command(
-                    rule, pose, ssid, in_flight, cmd_resp)
+                    ctx.itinerary, rule, pose, ssid, in_flight, cmd_resp)
                 trace_rules(cmd_text)
-                self.rules_engine.last_n_commands.append(cmd_text)
-                self.rules_engine.lclogger.info(cmd_text)
+                ctx.rules_engine.last_n_commands.append(cmd_text)
+                ctx.rules_engine.lclogger.info(cmd_text)
+                if ctx is self.mower_context:
+                    self.flight_recorder.record_command(
+                        ssid, rule.name, rule.compile_cmd() if rule.is_executable else None,
+                        in_flight=in_flight, response=cmd_resp)
                 # compress cmd for mobile history
                 comp_cmd_text = self.get_compressed_command(
                     rule, pose, in_flight, cmd_resp)
-                self.rules_engine.last_n_comp_commands.append(comp_cmd_text)
+                ctx.rules_engine.last_n_comp_commands.append(comp_cmd_text)
             else:
                 # augment history command with updated state?
-                if len(self.rules_engine.last_n_commands) > 0 and 'cached_history_cmd' in vars(self) and self.cached_history_cmd is not None:
-                    hist_cmd = self.rules_engine.last_n_commands[-1]
+                if len(ctx.rules_engine.last_n_commands) > 0 and ctx.cached_history_cmd is not None:
+                    hist_cmd = ctx.rules_engine.last_n_commands[-1]
                     (rule, pose, ssid, in_flight,
-                     cmd_resp) = self.cached_history_cmd
+                     cmd_resp) = ctx.cached_history_cmd
                     if rule.is_executable and 'Route Elapsed' not in hist_cmd:
                         cmd_text = self.get_current_command(
-                            rule, pose, ssid, in_flight, cmd_resp, is_frozen, is_static)
+                            ctx.itinerary, rule, pose, ssid, in_flight, cmd_resp, is_frozen, is_static)
                         trace_rules(cmd_text)
-                        self.rules_engine.last_n_commands[-1] = cmd_text
-                        self.rules_engine.lclogger.info(cmd_text)
+                        ctx.rules_engine.last_n_commands[-1] = cmd_text
+                        ctx.rules_engine.lclogger.info(cmd_text)
                         # compress cmd for mobile history
                         comp_cmd_text = self.get_compressed_command(
                             rule, pose, in_flight, cmd_resp)
-                        self.rules_engine.last_n_comp_commands[-1] = comp_cmd_text
-                    self.cached_history_cmd = None  # only one augmentation allowed
+                        ctx.rules_engine.last_n_comp_commands[-1] = comp_cmd_text
+                    ctx.cached_history_cmd = None  # only one augmentation allowed
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
             self.log_error('Error in log_aug_cur_cmd: ' +
                            str(e) + ' on line ' + str(err_line))
 
-    def process_arrival(self):
+    def process_arrival(self, ctx):
+        '''
+            advances the mower's itinerary, the drive and route settings following the current mower
+        '''
+        current = ctx is self.mower_context
         try:
             # calculate route elapsed time
-            if self.rules_engine.route_started_time == -1:
+            if ctx.rules_engine.route_started_time == -1:
                 route_elapsed_time = 0
             else:
-                route_elapsed_time = time.time() - self.rules_engine.route_started_time
+                route_elapsed_time = clock.time() - ctx.rules_engine.route_started_time
                 elapsed_mins, elapsed_secs = divmod(route_elapsed_time, 60)
                 elapsed_hrs, elapsed_mins = divmod(elapsed_mins, 60)
                 msg = '{} Route Elapsed {:d}:{:02d}:{:02d}'.format(
@@ -1494,24 +1719,24 @@ class ProxymowServer(object):
                 trace_rules(msg)
                 self.log_debug(msg)
                 cmd_text = datetime.datetime.now().strftime("%H:%M:%S") + ' ' + msg
-                self.rules_engine.last_n_commands.append(cmd_text)
-                self.rules_engine.last_n_comp_commands.append(cmd_text)
-                self.rules_engine.lclogger.info(cmd_text)
+                ctx.rules_engine.last_n_commands.append(cmd_text)
+                ctx.rules_engine.last_n_comp_commands.append(cmd_text)
+                ctx.rules_engine.lclogger.info(cmd_text)
             # update last visited node - using non-committing prefix
-            if self.drive['path'] == 'Route':
+            if current and self.drive['path'] == 'Route':
                 # position()
-                self.config['_current.last_visited_route_node'] = self.itinerary.dest_ptr
-            if not self.drive_cancel:
+                self.config['_current.last_visited_route_node'] = ctx.itinerary.dest_ptr
+            if current and not self.drive_cancel:
                 self.drive["state"] = 'Reached Destination!'
             # move on to next node...
-            if self.itinerary is not None:
-                self.itinerary.advance_pointer()
-                if self.itinerary.is_complete:
+            if ctx.itinerary is not None:
+                ctx.itinerary.advance_pointer()
+                if ctx.itinerary.is_complete:
                     # calculate route elapsed time
-                    if self.rules_engine.route_started_time == -1:
+                    if ctx.rules_engine.route_started_time == -1:
                         route_elapsed_time = 0
                     else:
-                        route_elapsed_time = time.time() - self.rules_engine.route_started_time
+                        route_elapsed_time = clock.time() - ctx.rules_engine.route_started_time
                         elapsed_mins, elapsed_secs = divmod(route_elapsed_time, 60)
                         elapsed_hrs, elapsed_mins = divmod(elapsed_mins, 60)
                         msg = '{} Route Completed in {:d}:{:02d}:{:02d}'.format(
@@ -1522,17 +1747,23 @@ class ProxymowServer(object):
                         trace_rules(msg)
                         self.log_debug(msg)
                         cmd_text = datetime.datetime.now().strftime("%H:%M:%S") + ' ' + msg
-                        self.rules_engine.last_n_commands.append(cmd_text)
-                        self.rules_engine.last_n_comp_commands.append(cmd_text)
-                        self.rules_engine.lclogger.info(cmd_text)
-                    if self.telem is not None and self.telem != {}:
+                        ctx.rules_engine.last_n_commands.append(cmd_text)
+                        ctx.rules_engine.last_n_comp_commands.append(cmd_text)
+                        ctx.rules_engine.lclogger.info(cmd_text)
+                    if ctx.telem is not None and ctx.telem != {}:
                         direct_drive_disable_cutters = 'cutter(0, -1)'
                         self.log(
-                            'action completed destination list - turning cutters off...')
-                        self.cmds.append(
-                            'direct-drive={0}'.format(direct_drive_disable_cutters))
-                        self.process_instructions()
-                        self.telem = fetch_telemetry(self.config, self.udp_socket)
+                            'action completed destination list - turning {0} cutters off...'.format(ctx.name))
+                        if current:
+                            self.cmds.append(
+                                'direct-drive={0}'.format(direct_drive_disable_cutters))
+                            self.process_instructions()
+                        else:
+                            ctx.mower_cmd(direct_drive_disable_cutters)
+                        ctx.telem = fetch_telemetry(ctx.config, self.udp_socket)
+                    if not current:
+                        # a fleet mower stays selected, idle at its last destination
+                        return
                     if self.drive['path'] == 'Route':
                         self.config['_current.last_visited_route_node'] = None
                     # set mower to None - save battery!
@@ -1546,13 +1777,13 @@ class ProxymowServer(object):
             self.log_error('Error in process arrival: ' +
                            str(e) + ' on line ' + str(err_line))
 
-    def log_arrival(self, pose):
+    def log_arrival(self, ctx, pose):
 
         try:
-            if self.itinerary is not None:
-                dest_cnt = self.itinerary.outstanding
-                total_destinations = self.itinerary.num_destinations
-                tgt_point = self.itinerary.get_current_path()[2:4]
+            if ctx.itinerary is not None:
+                dest_cnt = ctx.itinerary.outstanding
+                total_destinations = ctx.itinerary.num_destinations
+                tgt_point = ctx.itinerary.get_current_path()[2:4]
                 if not all(tgt_point):
                     tgt_point = (0, 0)
             else:
@@ -1560,8 +1791,8 @@ class ProxymowServer(object):
                 total_destinations = 0
                 tgt_point = (0, 0)
 
-            if pose is not None and self.itinerary is not None:
-                progress = self.itinerary.progress(
+            if pose is not None and ctx.itinerary is not None:
+                progress = ctx.itinerary.progress(
                     (pose.arena.c_x_m, pose.arena.c_y_m))
                 prog_compl_pc = max(0, progress.completed_pc)
                 pose_str = '{0:.0f}@({1:.2f}, {2:.2f})'.format(
@@ -1572,10 +1803,10 @@ class ProxymowServer(object):
             self.log_debug('progress completed: {} target point: {}'.format(prog_compl_pc, tgt_point))
             tgt_str = '({1:.2f}, {2:.2f}) {0:.0f}%'.format(
                 prog_compl_pc, *tgt_point)
-            if self.rules_engine.stage_started_time == -1:
+            if ctx.rules_engine.stage_started_time == -1:
                 stage_completed_time = 0
             else:
-                stage_completed_time = time.time() - self.rules_engine.stage_started_time
+                stage_completed_time = clock.time() - ctx.rules_engine.stage_started_time
             msg = '{} {}=>{}   Stage {} of {} Completed in {:.0f} seconds'.format(
                 '     ',
                 pose_str,
@@ -1586,15 +1817,15 @@ class ProxymowServer(object):
             trace_rules(msg)
             self.log_debug(msg)
             cmd_text = datetime.datetime.now().strftime("%H:%M:%S") + ' ' + msg
-            self.rules_engine.last_n_commands.append(cmd_text)
-            self.rules_engine.lclogger.info(cmd_text)
+            ctx.rules_engine.last_n_commands.append(cmd_text)
+            ctx.rules_engine.lclogger.info(cmd_text)
             # compressed version
             msg = '{} Stage {} of {} Completed'.format(
                 pose_str,
                 total_destinations - dest_cnt + 1,
                 total_destinations)
             cmd_text = datetime.datetime.now().strftime(":%S") + ' ' + msg
-            self.rules_engine.last_n_comp_commands.append(cmd_text)
+            ctx.rules_engine.last_n_comp_commands.append(cmd_text)
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
             self.log_error('Error in log_arrival: ' +
@@ -1663,16 +1894,16 @@ class ProxymowServer(object):
             )
         return is_frozen
 
-    def detect_stasis(self):
+    def detect_stasis(self, snapshot_buffer):
         is_static = False
-        latest_delta = self.snapshot_buffer.latest_pose_delta()
+        latest_delta = snapshot_buffer.latest_pose_delta()
         if latest_delta is not None:
             latest_linear_displacement, latest_angular_displacement_rad = latest_delta
             latest_unmoved = latest_linear_displacement < constants.FROZEN_DISTANCE_THRESHOLD_METRES
             latest_angular_displacement_deg = abs(
                 degrees(latest_angular_displacement_rad))
             latest_unturned = latest_angular_displacement_deg < constants.FROZEN_ANGLE_THRESHOLD_DEGREES
-            penult_delta = self.snapshot_buffer.penultimate_pose_delta()
+            penult_delta = snapshot_buffer.penultimate_pose_delta()
             if penult_delta is not None:
                 penult_linear_displacement, penult_angular_displacement_rad = penult_delta
                 penult_unmoved = penult_linear_displacement < constants.FROZEN_DISTANCE_THRESHOLD_METRES
@@ -1689,221 +1920,248 @@ class ProxymowServer(object):
 
     def governor(self):
         '''
-            main loop that governs locating, planning and executing
+            main loop that governs locating, planning and executing, for each mower under the camera
         '''
         while True:
             logger = self.pxm_logger
-            rung_index = 0
-            landing_time = 0  # kick-start
-            is_escalating = False
-            next_escalation = 0
             while self.run_governor:
 
                 try:
-                    no_mower = self.config['current.mower'] is None or self.config['current.mower'] == 'None'
-                    if no_mower and ('log_no_mower' not in vars(self) or time.time() > self.log_no_mower):
+                    governed = self.governed_contexts()
+                    no_mower = len(governed) == 0
+                    if no_mower and ('log_no_mower' not in vars(self) or clock.time() > self.log_no_mower):
                         logger.info('In locator current mower: ' +
                                     str(self.config['current.mower']))
-                        self.log_no_mower = time.time() + 300  # only log every 5 minutes
+                        self.log_no_mower = clock.time() + 300  # only log every 5 minutes
                     # if there is no mower selected we want to preserve resources for remote access!
                     if no_mower:
                         self.drive["state"] = 'Dormant'
                     else:
+                        # obtain latest poses, every mower's from the same frame
+                        self.buffer_locate_snapshot()
 
-                        # initialise run elapsed time
-                        start_time = time.time()
+                        for ctx in governed:
+                            self.govern_mower(ctx, logger)
 
-                        timesheet = Timesheet('governor')
-                        operation_active = True
+                except Exception as e:
+                    err_line = sys.exc_info()[-1].tb_lineno
+                    logger.error('Error in pxm governor: ' +
+                                 str(e) + ' on line ' + str(err_line))
+            clock.sleep(4)
 
-                        # obtain latest pose
-                        self.buffer_locate_snapshot()
-                        timesheet.add('snapshot buffered')
-
-                        # assess progress using motivate pose
-                        is_frozen = self.detect_frozen(
-                            self.motivate_pose_buffer)
-                        logger.info(
-                            'Governor Frozen detection: {}'.format(is_frozen))
-                        timesheet.add('frozen progress detected')
-
-                        is_static = self.detect_stasis()
-                        timesheet.add('stasis progress detected')
-
-                        # determine landed state from estimated landing time
-                        est_time_to_arrival = landing_time - time.time()
-                        landed = est_time_to_arrival <= 0
-
-                        if landed:
-                            if self.rules_engine is not None and not self.drive_pause and self.drive['path'] is not None:
-                                self.log_aug_cur_cmd(
-                                    None, None, None, is_frozen, is_static)
-
-                            # call mower for telemetry?
-                            no_mower = self.config['current.mower'] is None or self.config['current.mower'] == 'None'
-                            telem_demanded = time.time() - self.telemetry_updated > constants.MOWER_TELEMETRY_PERIOD_SECS
-                            if not no_mower and telem_demanded:
-                                logger.info(
-                                    'Fetching Telemetry: period exceeded, governor predicts landed')
-                                self.telem = fetch_telemetry(
-                                    self.config, self.udp_socket)
-                                self.telemetry_updated = time.time()
-                                timesheet.add('telemetry fetched')
-
-                        if constants.ESCALATION_ENABLED:
-                            if (is_frozen and
-                                (not is_escalating or time.time() > next_escalation) and
-                                not self.drive_pause and
-                                self.telem is not None and
-                                    len(self.telem.keys()) > 0):
-                                logger.info(
-                                    'Governor: frozen assessment entered state Frozen, escalating...')
-                                # try escalation?
-                                rung_index = min(rung_index + 1, constants.NUM_ESCALATION_RUNGS)
-                                is_escalating = True
-                                next_escalation = time.time() + 15
-                                msg = 'Escalating to rung {}'.format(
-                                    rung_index
-                                )
-                                self.drive["state"] = msg
-                                logger.info(
-                                    'Governor: escalation status {}...'.format(msg))
-                                sleep(5)  # pause to smooth intervention
-                            elif is_escalating and not is_static:
-                                # cancel escalation
-                                logger.info(
-                                    'Governor: frozen assessment Cancelling Escalation')
-                                self.drive["state"] = 'Cancelling Escalation'
-                                sleep(0)
-                                rung_index = 0
-                                is_escalating = False
-                            elif is_escalating:
-                                # escalation underway
-                                logger.info(
-                                    'Governor: frozen assessment escalation in progress rung {}...'.format(rung_index))
-                            else:
-                                # no escalation
-                                logger.info(
-                                    'Governor: frozen assessment escalation not required')
+    def govern_mower(self, ctx, logger):
+        '''
+            one pass of the governor for a mower: progress, escalation, rule selection and command
+            the drive state and published documents follow the current mower
+        '''
+        current = ctx is self.mower_context
+        try:
+            # initialise run elapsed time
+            start_time = clock.time()
+
+            timesheet = Timesheet('governor {0}'.format(ctx.name))
+            operation_active = True
+
+            # assess progress using motivate pose
+            is_frozen = self.detect_frozen(
+                ctx.motivate_pose_buffer)
+            logger.info(
+                'Governor {} Frozen detection: {}'.format(ctx.name, is_frozen))
+            timesheet.add('frozen progress detected')
+
+            is_static = self.detect_stasis(ctx.snapshot_buffer)
+            timesheet.add('stasis progress detected')
+
+            # determine landed state from estimated landing time
+            est_time_to_arrival = ctx.landing_time - clock.time()
+            landed = est_time_to_arrival <= 0
+
+            # a fleet mower is driving while it has an itinerary
+            driving = self.drive['path'] is not None if current else ctx.itinerary is not None
+
+            if landed:
+                if not self.drive_pause and driving:
+                    self.log_aug_cur_cmd(
+                        ctx, None, None, None, is_frozen, is_static)
+
+                # call mower for telemetry?
+                telem_demanded = clock.time() - ctx.telemetry_updated > constants.MOWER_TELEMETRY_PERIOD_SECS
+                if telem_demanded:
+                    logger.info(
+                        'Fetching Telemetry {}: period exceeded, governor predicts landed'.format(ctx.name))
+                    ctx.telem = fetch_telemetry(
+                        ctx.config, self.udp_socket)
+                    ctx.telemetry_updated = clock.time()
+                    if current:
+                        self.flight_recorder.record_telemetry(ctx.telem)
+                    timesheet.add('telemetry fetched')
+
+            if constants.ESCALATION_ENABLED:
+                if (is_frozen and
+                    (not ctx.is_escalating or clock.time() > ctx.next_escalation) and
+                    not self.drive_pause and
+                    ctx.telem is not None and
+                        len(ctx.telem.keys()) > 0):
+                    logger.info(
+                        'Governor {}: frozen assessment entered state Frozen, escalating...'.format(ctx.name))
+                    # try escalation?
+                    ctx.rung_index = min(ctx.rung_index + 1, constants.NUM_ESCALATION_RUNGS)
+                    ctx.is_escalating = True
+                    ctx.next_escalation = clock.time() + 15
+                    msg = 'Escalating to rung {}'.format(
+                        ctx.rung_index
+                    )
+                    if current:
+                        self.drive["state"] = msg
+                    logger.info(
+                        'Governor {}: escalation status {}...'.format(ctx.name, msg))
+                    clock.sleep(5)  # pause to smooth intervention
+                elif ctx.is_escalating and not is_static:
+                    # cancel escalation
+                    logger.info(
+                        'Governor {}: frozen assessment Cancelling Escalation'.format(ctx.name))
+                    if current:
+                        self.drive["state"] = 'Cancelling Escalation'
+                    clock.sleep(0)
+                    ctx.rung_index = 0
+                    ctx.is_escalating = False
+                elif ctx.is_escalating:
+                    # escalation underway
+                    logger.info(
+                        'Governor {}: frozen assessment escalation in progress rung {}...'.format(ctx.name, ctx.rung_index))
+                else:
+                    # no escalation
+                    logger.info(
+                        'Governor {}: frozen assessment escalation not required'.format(ctx.name))
+
+            if ctx.snapshot_buffer.latest_pose() is None:
+                logger.info('Governor channel {}: No Pose'.format(ctx.name))
+            elif ctx.telem == {}:
+                logger.info('Governor channel {}: No Telemetry'.format(ctx.name))
+            else:
+                # select rule
+                with stage_metrics.stage('select'):
+                    if landed:
+                        selected_rule = ctx.rules_engine.select(
+                            scope=RuleScope.STATIONARY,
+                            trace=operation_active
+                        )
+                    elif not ctx.is_escalating:
+                        selected_rule = ctx.rules_engine.select(
+                            scope=RuleScope.IN_FLIGHT,
+                            trace=operation_active
+                        )
+                    else:
+                        selected_rule = None
+
+                if selected_rule is not None:
+
+                    arrived = selected_rule.stage_complete  # prime for processing
 
-                        if self.snapshot_buffer.latest_pose() is None:
-                            logger.info('Governor channel: No Pose')
-                        elif self.telem == {}:
-                            logger.info('Governor channel: No Telemetry')
+                    if selected_rule.is_executable:
+
+                        # apply escalation?
+                        selected_rule._rung_index = min(
+                            ctx.rung_index, selected_rule.num_rungs)
+
+                        timesheet.add('rule selected')
+
+                        if self.drive_pause and not self.drive_step and not selected_rule.auxiliary:
+                            if current:
+                                self.drive["state"] = 'Pausing Drive...'
+                        elif ctx.itinerary is not None and ctx.itinerary.plan_only:
+                            if current:
+                                self.drive["state"] = 'Planning...'
                         else:
-                            # select rule
-                            if landed:
-                                selected_rule = self.rules_engine.select(
-                                    scope=RuleScope.STATIONARY,
-                                    trace=operation_active
-                                )
-                            elif not is_escalating:
-                                selected_rule = self.rules_engine.select(
-                                    scope=RuleScope.IN_FLIGHT,
-                                    trace=operation_active
+                            # queue starting pose
+                            ctx.motivate_pose_buffer.append(
+                                ctx.snapshot_buffer.latest_pose())
+
+                            ctx.rules_engine.last_command = (
+                                selected_rule.left_speed_result, selected_rule.right_speed_result, selected_rule.duration_result)
+                            ctx.rules_engine.last_command_code = Movement.get_movement_code(
+                                selected_rule.left_speed_result,
+                                selected_rule.right_speed_result
+                            ).name
+
+                            # execute command
+                            timesheet.add(
+                                'transmitting selected rule command...')
+                            arrived, resp = selected_rule.execute(
+                                ctx.config, self.udp_socket, True)  # trace
+                            logger.info(
+                                'Governor {} rule {} [{}] executed arrived: {} response: {}'.format(
+                                    ctx.name,
+                                    selected_rule.cmd,
+                                    ctx.snapshot_buffer.latest_ssid(),
+                                    arrived,
+                                    resp)
                                 )
+                            timesheet.add(
+                                'selected rule command acknowledged')
+
+                            # expecting an ACK response - but may get None...
+                            if resp is None:
+                                ctx.unacks += 1
+                                if ctx.unacks > 3:
+                                    # update telemetry, which will halt escalation
+                                    ctx.telem = {}
+                                    logger.info(
+                                        'Governor {} rule unacknowledged: updating telemetry status'.format(ctx.name))
                             else:
-                                selected_rule = None
-
-                            if selected_rule is not None:
-
-                                arrived = selected_rule.stage_complete  # prime for processing
-
-                                if selected_rule.is_executable:
-
-                                    # apply escalation?
-                                    selected_rule._rung_index = min(
-                                        rung_index, selected_rule.num_rungs)
-
-                                    timesheet.add('rule selected')
-
-                                    if self.drive_pause and not self.drive_step and not selected_rule.auxiliary:
-                                        self.drive["state"] = 'Pausing Drive...'
-                                    elif self.itinerary is not None and self.itinerary.plan_only:
-                                        self.drive["state"] = 'Planning...'
-                                    else:
-                                        # queue starting pose
-                                        self.motivate_pose_buffer.append(
-                                            self.snapshot_buffer.latest_pose())
-
-                                        self.rules_engine.last_command = (
-                                            selected_rule.left_speed_result, selected_rule.right_speed_result, selected_rule.duration_result)
-                                        self.rules_engine.last_command_code = Movement.get_movement_code(
-                                            selected_rule.left_speed_result,
-                                            selected_rule.right_speed_result
-                                        ).name
-
-                                        # execute command
-                                        timesheet.add(
-                                            'transmitting selected rule command...')
-                                        arrived, resp = selected_rule.execute(
-                                            self.config, self.udp_socket, True)  # trace
-                                        logger.info(
-                                            'Governor rule {} [{}] executed arrived: {} response: {}'.format(
-                                                selected_rule.cmd,
-                                                self.snapshot_buffer.latest_ssid(),
-                                                arrived,
-                                                resp)
-                                            )
-                                        timesheet.add(
-                                            'selected rule command acknowledged')
-
-                                        # expecting an ACK response - but may get None...
-                                        if resp is None:
-                                            self.unacks += 1
-                                            if self.unacks > 3:
-                                                # update telemetry, which will halt escalation
-                                                self.telem = {}
-                                                logger.info(
-                                                    'Governor rule unacknowledged: updating telemetry status')
-                                        else:
-                                            self.unacks = 0
-
-                                        # if command is auxiliary - hasten telemetry refresh
-                                        if selected_rule.auxiliary:
-                                            logger.info(
-                                                'Governor rule auxiliary: hastening telemetry refresh')
-                                            self.telem = fetch_telemetry(
-                                                self.config, self.udp_socket)
-                                            self.telemetry_updated = time.time()
-
-                                        # calculate estimated landing time
-                                        landing_time = self.estimate_landing_time(
-                                            selected_rule, constants.LANDING_TIME_OVERHEAD_SECS)
-                                        timesheet.add('landing time estimated')
-
-                                        self.log_aug_cur_cmd(
-                                            selected_rule, selected_rule.scope == RuleScope.IN_FLIGHT.value, resp)
-                                        timesheet.add('rule logged')
-
-                                if arrived:
-                                    self.log_arrival(
-                                        self.snapshot_buffer.latest_pose())
-                                    timesheet.add('arrival logged')
-                                    self.process_arrival()
-                                    self.rules_engine.stage_started_time = time.time()  # re-init
-                                    timesheet.add('arrival processed')
-
-                                self.drive_step = False
-
-                        # commit snapshot
-                        cur_snapshot = self.snapshot_buffer.latest()
-                        if cur_snapshot is not None:
-                            cur_snapshot._rules = copy.deepcopy(
-                                self.rules_engine.rules)
-                            cur_snapshot._growth = SnapshotGrowth.PLANNED
-
-                            # update frame time
-                            cur_snapshot.run_elapsed_secs = time.time() - start_time
-                        timesheet.add('locate snapshot committed')
-
-                        self.log_debug(timesheet)
+                                ctx.unacks = 0
 
-                except Exception as e:
-                    err_line = sys.exc_info()[-1].tb_lineno
-                    logger.error('Error in pxm governor: ' +
-                                 str(e) + ' on line ' + str(err_line))
-            sleep(4)
+                            # if command is auxiliary - hasten telemetry refresh
+                            if selected_rule.auxiliary:
+                                logger.info(
+                                    'Governor {} rule auxiliary: hastening telemetry refresh'.format(ctx.name))
+                                ctx.telem = fetch_telemetry(
+                                    ctx.config, self.udp_socket)
+                                ctx.telemetry_updated = clock.time()
+                                if current:
+                                    self.flight_recorder.record_telemetry(ctx.telem)
+
+                            # calculate estimated landing time
+                            ctx.landing_time = self.estimate_landing_time(
+                                selected_rule, constants.LANDING_TIME_OVERHEAD_SECS)
+                            timesheet.add('landing time estimated')
+
+                            self.log_aug_cur_cmd(
+                                ctx, selected_rule, selected_rule.scope == RuleScope.IN_FLIGHT.value, resp)
+                            timesheet.add('rule logged')
+
+                    if arrived:
+                        self.log_arrival(
+                            ctx, ctx.snapshot_buffer.latest_pose())
+                        timesheet.add('arrival logged')
+                        self.process_arrival(ctx)
+                        ctx.rules_engine.stage_started_time = clock.time()  # re-init
+                        timesheet.add('arrival processed')
+
+                    if current:
+                        self.drive_step = False
+
+            # commit snapshot
+            cur_snapshot = ctx.snapshot_buffer.latest()
+            if cur_snapshot is not None:
+                cur_snapshot._rules = copy.deepcopy(
+                    ctx.rules_engine.rules)
+                cur_snapshot._growth = SnapshotGrowth.PLANNED
+
+                # update frame time
+                cur_snapshot.run_elapsed_secs = clock.time() - start_time
+            timesheet.add('locate snapshot committed')
+
+            if cur_snapshot is not None and current:
+                self.publish_snapshot_documents(cur_snapshot)
+                timesheet.add('snapshot documents published')
+
+            self.log_debug(timesheet)
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            logger.error('Error in pxm governor {}: {} on line {}'.format(
+                ctx.name, e, err_line))
 
     def compile_location_stats(self, logger, pose):
         location_stat_count = 0
@@ -1946,7 +2204,134 @@ class ProxymowServer(object):
 
         return location_stat_count, location_quality
 
-    def get_locate_snapshot(self, logger, timesheet=Timesheet()):
+    def archive_pose(self, archive_index, pose):
+        '''
+            write the located pose as a raw-N.json sidecar, None if not found
+        '''
+        try:
+            pose_dict = None
+            if pose is not None and pose.arena is not None and pose.arena.c_x_m is not None:
+                pose_dict = {
+                    'x_m': round(pose.arena.c_x_m, 4),
+                    'y_m': round(pose.arena.c_y_m, 4),
+                    'heading_deg': round(degrees(pose.arena.t_rad), 2)
+                }
+            pose_path = self.image_folder_path_name + os.path.sep + 'raw-{0}.json'.format(archive_index)
+            with open(pose_path, 'w') as pose_file:
+                json.dump(pose_dict, pose_file)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in archive_pose: ' +
+                           str(e) + ' on line ' + str(err_line))
+
+    def locate_viewport(self, shape, sid, logger):
+        '''
+            expanded viewport around the latest pose, or None if prospecting is needed
+            while the target is lost, the search viewport grows until it reaches the edge
+        '''
+        tracking_vp = None
+
+        # get latest snapshot for pose and windowing calculations
+        latest_snapshot = self.snapshot_buffer.latest()
+
+        if (latest_snapshot is not None and latest_snapshot._pose is not None):
+            # viewport from pose
+            hsid = '{0}B'.format(sid)
+            p = latest_snapshot._pose
+
+            # tightly around target...
+            self.viewport = Viewport.from_pose(p, shape, hsid)
+
+            # expanded viewport from pose
+            if self.viewport is not None:
+                self.viewport.resize(constants.RESIZE_POSE_TO_VIEWPORT)
+                logger.info('pxm locate getting expanded viewport from latest pose: {0}'.format(
+                    self.viewport))
+            else:
+                self.viewport = Viewport()  # Null Viewport
+                logger.info(
+                    'pxm locate could not get expanded viewport from latest pose - using Null viewport')
+
+            tracking_vp = self.viewport
+        else:
+            if self.viewport is None:
+                self.viewport = Viewport()  # Null Viewport
+            elif not self.viewport.isnull:
+                if self.viewport.origin > (0, 0) and self.viewport.bottom_right < (100, 100):
+                    self.viewport.resize(1.2)
+                    logger.info('pxm locate expanded viewport looking for escaped target: {0}'.format(
+                        self.viewport))
+                    # add delay to smooth process...
+                    sleep(1)
+                else:
+                    # null the viewport - reached edge...
+                    self.viewport = Viewport()  # Null Viewport
+                    logger.info('pxm locate viewport grown to reach edge - reset')
+
+        return tracking_vp
+
+    def get_edge_arrays(self, cam_settings):
+        '''
+            capture via a remote camera node that prospects on our behalf
+            returns lo-res analysis array, display array and viewports carrying full-res sub-arrays
+        '''
+        timesheet = Timesheet('Get Edge Arrays')
+        analysis_chan_array = None
+        display_array = None
+        edge_viewports = None
+        try:
+            trace, changed = self.camera.apply_settings(cam_settings)
+            timesheet.add('settings applied to camera')
+            self.log('get_edge_arrays apply to camera changed {0} trace:\n{1}'.format(
+                changed, trace))
+
+            viewport = cam_settings['edge_viewport']
+            prospect = cam_settings['edge_prospect']
+            edge_viewports, lores_arr, _lores_header = self.camera.snap_prospects(
+                self.outer_darkzone_polygon_px,
+                viewport=viewport,
+                prospect=prospect,
+                lores_factor=cam_settings['edge_lores_factor'],
+                index_prefix=cam_settings['edge_index']
+            )
+            timesheet.add('edge prospects returned')
+
+            if lores_arr is None:
+                edge_viewports = None
+                self.log('get_edge_arrays capture empty', incl_mem_stats=True)
+            else:
+                if not prospect and len(edge_viewports) > 0:
+                    # keep the tracking viewport, with its sub-array
+                    viewport.sub_array = edge_viewports[0].sub_array
+                    edge_viewports = [viewport]
+
+                if lores_arr.ndim == 3:
+                    analysis_chan_array = np.array(Image.fromarray(lores_arr).convert('L'))
+                else:
+                    analysis_chan_array = lores_arr
+
+                display_width = self.config['optical.display_width']
+                display_height = self.config['optical.display_height']
+                if lores_arr.shape[:2] != (display_height, display_width):
+                    display_array = np.array(Image.fromarray(lores_arr).resize(
+                        (display_width, display_height), resample=Image.Resampling.LANCZOS))
+                else:
+                    display_array = lores_arr
+                timesheet.add('display array prepared')
+
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in get_edge_arrays: ' +
+                           str(e) + ' on line ' + str(err_line))
+
+        self.log_debug(str(timesheet))
+        return analysis_chan_array, display_array, edge_viewports
+
+    def get_locate_snapshot(self, logger, timesheet=Timesheet(), located=None):
+        '''
+            the current mower's snapshot of the latest frame
+            located receives what the pose is recorded with, and the poses of a fleet located together
+        '''
 
         self.log('In locate ' + str('-' * 80))
 
@@ -1954,9 +2339,6 @@ class ProxymowServer(object):
         debug_image_level = constants.DEBUG_SAVE_IMAGE_LEVEL
         # Number of generations of images for debugging
         debug_image_gens = constants.DEBUG_SAVE_IMAGE_GENERATIONS
-        debug_level = constants.DEBUG_LOCATE_LEVEL
-        # Exclude targets beyond fence plus border
-        fence_masking = constants.FENCE_MASKING
         try:
             # create skeleton snapshot so we get an ssid
             locate_snapshot = Snapshot(self.snapshot_buffer, logger=logger)
@@ -1964,226 +2346,40 @@ class ProxymowServer(object):
 
             if 'camera' in vars(self):
 
-                # obtain the configured camera settings
-                cam_settings = self.camera.settings.clone(self.config)
-
-                # add queue and client details
-                cam_settings['queue'] = 'locate'
-                cam_settings['client'] = 'locate'
-                logger.info('locate camera settings: ' + str(cam_settings))
-
-                cam_settings['virtual_mower'] = self.config['mower.type'] in ['virtual', 'hybrid']
-
-                # queue request for camera
-                logger.info('pxm locate placing request on queue...')
-                timesheet.add('queueing camera request')
-                self.camera_request_queue.put(cam_settings)
-                logger.info('pxm locate getting image from queue (blocks)...')
-                analysis_array, img_array = self.camera_locate_queue.get(
-                    timeout=30)
-                if analysis_array is None:
-                    timesheet.add('camera request complete but failed')
-                else:
-                    timesheet.add('camera request complete')
-
-                    check_due = (
-                        (time.time() - self.when_checked) > constants.ARCHIVE_IMAGE_RATE_SECS)
-                    periodic_img_due = debug_image_level > 0 and check_due
-                    archive_image_due = self.drive['path'] is not None and not self.drive_pause and check_due
-                    if constants.ARCHIVE_IMAGE_RATE_SECS > 0 and (periodic_img_due or archive_image_due):
-                        # update check thresholds due
-                        if check_due:
-                            self.when_checked = time.time()
-                        raw_img = Image.fromarray(analysis_array)
-                        disp_img = Image.fromarray(img_array)
-                        if periodic_img_due:
-                            raw_img.save(self.tmp_folder_path + os.path.sep + 'raw.jpg',
-                                         optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
-                        if archive_image_due:
-                            # add to archive? will only archive images during excursions...
-                            raw_img.save(self.image_folder_path_name + os.path.sep + 'raw-{0}.jpg'.format(
-                                self.archive_image_count), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
-                            disp_img.save(self.image_folder_path_name + os.path.sep + 'disp-{0}.jpg'.format(
-                                self.archive_image_count), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
-                            self.archive_image_count = (
-                                self.archive_image_count + 1) % constants.ARCHIVE_IMAGE_MAX_COUNT
-                        timesheet.add('raw image archived')
-
-                    if constants.ANIMAL_MIN_PT_COUNT > 0 and self.drive['path'] is not None and self.drive['path'] != 'Single' and not self.drive_pause:
-                        animals = lores_contours(
-                            analysis_array, min_pt_count=constants.ANIMAL_MIN_PT_COUNT, debug=True, logger=logger)
-                        timesheet.add(
-                            '{} animals counted'.format(len(animals)))
-
-                        if len(animals) > 0:
-                            logger.info('pxm locate spotted animal(s)')
-                            msg = 'Pausing/Cutter Off for Animals'
-                            self.rules_engine.last_n_commands.append(msg)
-                            self.rules_engine.last_n_comp_commands.append(msg)
-                            self.rules_engine.lclogger.info(msg)
-
-                            if self.telem is not None and self.telem != {}:
-                                try:
-                                    cutter1_state = self.telem['cutter1']
-                                    cutter2_state = self.telem['cutter2']
-                                except Exception:
-                                    cutter1_state = cutter2_state = False
-
-                                logger.info('animals cutter states: {} {}'.format(
-                                    cutter1_state, cutter2_state))
-
-                                # turn off cutters anyway
-                                direct_drive_disable_cutters = 'cutter(0, -1)'
-                                logger.info('animals - turning off cutters...')
-                                self.cmds.append(
-                                    'direct-drive={0}'.format(direct_drive_disable_cutters))
-                                self.process_instructions()
-                            self.drive_pause = True
-                            self.drive["state"] = 'Animals!'
-
-                    # get latest snapshot for pose and windowing calculations
-                    latest_snapshot = self.snapshot_buffer.latest()
-
-                    if (latest_snapshot is not None and latest_snapshot._pose is not None):
-                        # viewport from pose
-                        hsid = '{0}B'.format(sid)
-                        zoom_scale_factor = 1
-                        p = latest_snapshot._pose
-
-                        # tightly around target...
-                        self.viewport = Viewport.from_pose(
-                            p, analysis_array.shape, hsid)
-
-                        # expanded viewport from pose
-                        if self.viewport is not None:
-                            self.viewport.resize(constants.RESIZE_POSE_TO_VIEWPORT)
-                            logger.info('pxm locate getting expanded viewport from latest pose: {0}'.format(
-                                self.viewport))
-                        else:
-                            self.viewport = Viewport()  # Null Viewport
-                            logger.info(
-                                'pxm locate could not get expanded viewport from latest pose - using Null viewport')
-
-                        vp_prospect_list = [self.viewport]
-                        timesheet.add('viewport prepared')
-                    else:
-                        if self.viewport is None:
-                            self.viewport = Viewport()  # Null Viewport
-                        elif not self.viewport.isnull:
-                            if self.viewport.origin > (0, 0) and self.viewport.bottom_right < (100, 100):
-                                self.viewport.resize(1.2)
-                                logger.info('pxm locate expanded viewport looking for escaped target: {0}'.format(
-                                    self.viewport))
-                                # add delay to smooth process... 
-                                sleep(1)
-                            else:
-                                # null the viewport - reached edge...
-                                self.viewport = Viewport()  # Null Viewport
-                                logger.info('pxm locate viewport grown to reach edge - reset')
-
-                        zoom_scale_factor = 4
-                        lsid = '{0}A'.format(sid)
-
-                        # now find prospects...
-                        vp_prospect_list = get_prospect_list(
-                            self,
-                            analysis_array,
-                            zoom_scale_factor,
-                            self.viewport,
-                            debug_image_level,
-                            debug_level,
-                            logger,
-                            lsid
-                        )
-                        # advance id marker from lo-res [A] to hi-res [B]
-                        for vp in vp_prospect_list:
-                            vp.index = vp.index.replace('A', 'B')
+                # each camera's frame located and the detections fused, a single camera being the device's alone
+                located = {} if located is None else located
+                pose, detections = self.camera_locator.locate(
+                    lambda node: self.capture_frame(node, sid, logger, timesheet),
+                    sid,
+                    locate_snapshot=locate_snapshot,
+                    located=located,
+                    logger=logger,
+                    timesheet=timesheet
+                )
+                if len(self.camera_locator.nodes) > 1:
+                    logger.info('pxm locate camera detections: {0}'.format(detections))
+                    if pose is not None:
+                        # viewports, plans and the arena image are all in the device camera's perspective
+                        pose = self.camera_locator.nodes[0].perspective(pose)
+                    timesheet.add('detections fused')
 
-                        logger.info(
-                            'pxm locate getting mask from default all - null viewport')
-                        timesheet.add('get prospect list')
+                if located.get('captured', False) or pose is not None:
 
-                    # now we can probe the prospects in full res looking for the target...
-                    prospect_viewports, all_contours, filtered_contour_index, filtered_projections, pose = probe_prospect_list(
-                        self,
-                        sid,
-                        vp_prospect_list,
-                        analysis_array,
-                        debug_image_level,
-                        debug_level,
-                        logger
-                    )
-                    timesheet.add('probe prospect list')
+                    self.flight_recorder.record_snapshot(
+                        sid, pose, prospects=located.get('prospects', 0), edge=located.get('edge', False))
 
                     # update pose statistics
                     location_stat_count, location_quality = self.compile_location_stats(
                         logger, pose)
                     timesheet.add('pose stats')
 
-                    # images
-                    if fence_masking:
-                        fence_masked_img_arr = (
-                            img_array.T * self.fence_mask_display_array.T).T  # colour
-                    else:
-                        fence_masked_img_arr = img_array
-                    locate_snapshot._fence_masked_img_arr = fence_masked_img_arr
-
-                    # manually reconstruct full array
-                    contour_bg_arr = fence_masked_img_arr
-                    locate_snapshot._source_img_arr = contour_bg_arr
-                    locate_snapshot._prospect_viewports = prospect_viewports
-                    locate_snapshot._growth = SnapshotGrowth.IMAGED
-                    timesheet.add('images snapshotted')
-
-                    # contours
-                    locate_snapshot._contours = all_contours
-                    locate_snapshot._fltrd_contour_index = filtered_contour_index
-                    
-                    # projections
-                    locate_snapshot._fltrd_projections = filtered_projections
-
-                    # log filtered projections
-                    for p, proj in enumerate(filtered_projections):
-                        logger.debug('Filtered Projection {}.{} {:.0f}@({:.3f}, {:.3f}), {}%'.format(
-                            proj.ssid,
-                            p,
-                            degrees(proj.heading),
-                            proj.cx,
-                            proj.cy,
-                            proj.conf_pc
-                            )
-                        )  
-                        
-                    # record extraneous sightings
-                    for p, proj in enumerate(filtered_projections):
-                        logger.debug('All Sightings {}.{} {:.0f}@({:.3f}, {:.3f}), {}%'.format(
-                            proj.ssid,
-                            p,
-                            degrees(proj.heading),
-                            proj.cx,
-                            proj.cy,
-                            proj.conf_pc
-                            )
-                        )  
-                        self.sightings_mgr.add((proj.cx, proj.cy, degrees(proj.heading)))    
-                        logger.debug(self.sightings_mgr)                  
-
-                    # best projection confidence
-                    locate_snapshot.best_proj_conf_pc = filtered_projections[0].conf_pc if len(
-                        filtered_projections) > 0 else 0
-                    locate_snapshot.best_proj_found = (len(filtered_projections) > 0 and
-                        filtered_projections[0].conf_pc > constants.SCORE_THRESHOLD)
+                    # record the located pose beside the archived frame, for replay
+                    if located.get('archived_index') is not None:
+                        self.archive_pose(located['archived_index'], pose)
 
                     # statistics
                     locate_snapshot.loc_stat_count = location_stat_count
                     locate_snapshot.loc_quality = location_quality
-                    locate_snapshot.extrapolation_incidents = self.extrapolation_incidents
-
-                    # contour count
-                    locate_snapshot.fltrd_count = len(filtered_contour_index)
-                    locate_snapshot.cont_count = len(all_contours)
-
-                    timesheet.add('json snapshotted')
 
                     # augment information sent as headers
 
@@ -2220,14 +2416,293 @@ class ProxymowServer(object):
         # end of locate
         return locate_snapshot
 
+    def capture_frame(self, node, sid, logger, timesheet=Timesheet()):
+        '''
+            a frame from the node's camera
+            the device camera's through the camera worker, with the edge viewport chosen first when
+            a remote node prospects, a further camera's snapped directly and analysed in grey
+        '''
+        if node.locate is None:
+            img_arr = node.camera.snap()
+            if img_arr is not None and img_arr.ndim == 3:
+                img_arr = np.array(Image.fromarray(img_arr).convert('L'))
+            timesheet.add('{0} camera snapped'.format(node.name))
+            return img_arr
+
+        # obtain the configured camera settings
+        cam_settings = self.camera.settings.clone(self.config)
+
+        # add queue and client details
+        cam_settings['queue'] = 'locate'
+        cam_settings['client'] = 'locate'
+        logger.info('locate camera settings: ' + str(cam_settings))
+
+        cam_settings['virtual_mower'] = self.config['mower.type'] in ['virtual', 'hybrid']
+
+        # let a remote camera node prospect, unless a virtual mower is to be overlaid
+        # or a fleet is located in the whole frame
+        edge_prospecting = (
+            constants.REMOTE_EDGE_PROSPECTING and
+            isinstance(self.camera, RemoteOpticalPi) and
+            not cam_settings['virtual_mower'] and
+            self.fleet_locator is None
+        )
+        full_shape = None
+        analysis_scale = 1
+        tracked = False
+        if edge_prospecting:
+            img_width_px, img_height_px = [int(d) for d in cam_settings['resolution'].split('x')]
+            full_shape = (img_height_px, img_width_px)
+            analysis_scale = max(int(self.config['optical.analysis_display_ratio']), 1)
+            # the viewport is chosen before capture so the node knows what to return
+            tracking_vp = self.locate_viewport(full_shape, sid, logger)
+            cam_settings['queue'] = 'edge'
+            cam_settings['edge_viewport'] = self.viewport
+            cam_settings['edge_prospect'] = tracking_vp is None
+            tracked = tracking_vp is not None
+            cam_settings['edge_index'] = '{0}B'.format(sid)
+            cam_settings['edge_lores_factor'] = analysis_scale
+            timesheet.add('edge viewport prepared')
+
+        # queue request for camera
+        logger.info('pxm locate placing request on queue...')
+        timesheet.add('queueing camera request')
+        with stage_metrics.stage('capture'):
+            self.camera_request_queue.put(cam_settings)
+            logger.info('pxm locate getting image from queue (blocks)...')
+            analysis_array, img_array, edge_viewports = self.camera_locate_queue.get(
+                timeout=30)
+        return analysis_array, img_array, edge_viewports, full_shape, analysis_scale, tracked
+
+    def locate_frame(self, frame, sid, _track_pose, locate_snapshot, located, logger, timesheet=Timesheet()):
+        '''
+            the device camera's locate pipeline, the primary camera node's
+            the frame's images, contours and projections are added to locate_snapshot,
+            and what the fused pose is recorded with to located
+            tracks the viewport of the latest snapshot's pose rather than the locator's track_pose,
+            so a lost target's viewport can grow
+            returns pose, confidence and whether it tracked
+        '''
+        # Save images for debugging - slows things down
+        debug_image_level = constants.DEBUG_SAVE_IMAGE_LEVEL
+        debug_level = constants.DEBUG_LOCATE_LEVEL
+        # Exclude targets beyond fence plus border
+        fence_masking = constants.FENCE_MASKING
+
+        analysis_array, img_array, edge_viewports, full_shape, analysis_scale, tracked = frame
+        if analysis_array is None:
+            timesheet.add('camera request complete but failed')
+            return None, 0, False
+        timesheet.add('camera request complete')
+        located['captured'] = True
+
+        archived_index = None
+        check_due = (
+            (time.time() - self.when_checked) > constants.ARCHIVE_IMAGE_RATE_SECS)
+        periodic_img_due = debug_image_level > 0 and check_due
+        archive_image_due = self.drive['path'] is not None and not self.drive_pause and check_due
+        if constants.ARCHIVE_IMAGE_RATE_SECS > 0 and (periodic_img_due or archive_image_due):
+            # update check thresholds due
+            if check_due:
+                self.when_checked = time.time()
+            # frames are new arrays per capture, so the image sink can hold them as they are
+            if periodic_img_due:
+                image_sink.save(self.tmp_folder_path + os.path.sep + 'raw.jpg', analysis_array,
+                                optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+            if archive_image_due:
+                # add to archive? will only archive images during excursions...
+                image_sink.save(self.image_folder_path_name + os.path.sep + 'raw-{0}.jpg'.format(
+                    self.archive_image_count), analysis_array, kind='archive',
+                    optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                image_sink.save(self.image_folder_path_name + os.path.sep + 'disp-{0}.jpg'.format(
+                    self.archive_image_count), img_array, kind='archive',
+                    optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                archived_index = self.archive_image_count
+                self.archive_image_count = (
+                    self.archive_image_count + 1) % constants.ARCHIVE_IMAGE_MAX_COUNT
+            timesheet.add('raw image archived')
+
+        if constants.ANIMAL_MIN_PT_COUNT > 0 and self.drive['path'] is not None and self.drive['path'] != 'Single' and not self.drive_pause:
+            animals = lores_contours(
+                analysis_array,
+                zoom_scale_factor=max(4 // analysis_scale, 1),
+                min_pt_count=constants.ANIMAL_MIN_PT_COUNT,
+                debug=True,
+                logger=logger
+            )
+            timesheet.add(
+                '{} animals counted'.format(len(animals)))
+
+            if len(animals) > 0:
+                logger.info('pxm locate spotted animal(s)')
+                msg = 'Pausing/Cutter Off for Animals'
+                self.rules_engine.last_n_commands.append(msg)
+                self.rules_engine.last_n_comp_commands.append(msg)
+                self.rules_engine.lclogger.info(msg)
+
+                if self.telem is not None and self.telem != {}:
+                    try:
+                        cutter1_state = self.telem['cutter1']
+                        cutter2_state = self.telem['cutter2']
+                    except Exception:
+                        cutter1_state = cutter2_state = False
+
+                    logger.info('animals cutter states: {} {}'.format(
+                        cutter1_state, cutter2_state))
+
+                    # turn off cutters anyway
+                    direct_drive_disable_cutters = 'cutter(0, -1)'
+                    logger.info('animals - turning off cutters...')
+                    self.cmds.append(
+                        'direct-drive={0}'.format(direct_drive_disable_cutters))
+                    self.process_instructions()
+                self.drive_pause = True
+                self.drive["state"] = 'Animals!'
+
+        if edge_viewports is None and self.fleet_locator is not None:
+            # every governed mower is located in the frame, each tracked from its own last pose
+            tracked = self.mower_context.last_pose is not None
+            with stage_metrics.stage('probe'):
+                located['fleet'] = self.fleet_locator.locate(analysis_array, sid)
+            pose = located['fleet'].get(self.mower_context.name)
+            # the snapshot shows the first probe, of the tracked viewports and any prospects
+            if len(self.fleet_locator.probes) > 0:
+                vp_prospect_list, probe_result = self.fleet_locator.probes[0]
+            else:
+                vp_prospect_list, probe_result = [], ([], [], [], [], None)
+            prospect_viewports, all_contours, filtered_contour_index, filtered_projections, _probe_pose = probe_result
+            timesheet.add('fleet located')
+        else:
+            if edge_viewports is not None:
+                # the camera node has already prospected and cropped
+                vp_prospect_list = edge_viewports
+                timesheet.add('edge prospects received')
+            else:
+                tracking_vp = self.locate_viewport(analysis_array.shape, sid, logger)
+                tracked = tracking_vp is not None
+                if tracking_vp is not None:
+                    vp_prospect_list = [tracking_vp]
+                    timesheet.add('viewport prepared')
+                else:
+                    zoom_scale_factor = 4
+                    lsid = '{0}A'.format(sid)
+
+                    # now find prospects...
+                    with stage_metrics.stage('prospect'):
+                        vp_prospect_list = get_prospect_list(
+                            self,
+                            analysis_array,
+                            zoom_scale_factor,
+                            self.viewport,
+                            debug_image_level,
+                            debug_level,
+                            logger,
+                            lsid
+                        )
+                    # advance id marker from lo-res [A] to hi-res [B]
+                    for vp in vp_prospect_list:
+                        vp.index = vp.index.replace('A', 'B')
+
+                    logger.info(
+                        'pxm locate getting mask from default all - null viewport')
+                    timesheet.add('get prospect list')
+
+            # now we can probe the prospects in full res looking for the target...
+            with stage_metrics.stage('probe'):
+                prospect_viewports, all_contours, filtered_contour_index, filtered_projections, pose = probe_prospect_list(
+                    self,
+                    sid,
+                    vp_prospect_list,
+                    analysis_array if edge_viewports is None else None,
+                    debug_image_level,
+                    debug_level,
+                    logger,
+                    full_shape=full_shape
+                )
+            timesheet.add('probe prospect list')
+
+        # flight recorder only queues references, encoding happens in its thread
+        if analysis_array is not None:
+            self.flight_recorder.record_frame(sid, analysis_array)
+        self.flight_recorder.record_viewports(sid, prospect_viewports or [])
+
+        # the snapshot, pose statistics and archive are recorded with the fused pose
+        located['prospects'] = len(vp_prospect_list)
+        located['edge'] = edge_viewports is not None
+        located['archived_index'] = archived_index
+
+        # images
+        if fence_masking:
+            fence_masked_img_arr = (
+                img_array.T * self.fence_mask_display_array.T).T  # colour
+        else:
+            fence_masked_img_arr = img_array
+        locate_snapshot._fence_masked_img_arr = fence_masked_img_arr
+
+        # manually reconstruct full array
+        contour_bg_arr = fence_masked_img_arr
+        locate_snapshot._source_img_arr = contour_bg_arr
+        locate_snapshot._prospect_viewports = prospect_viewports
+        locate_snapshot._growth = SnapshotGrowth.IMAGED
+        timesheet.add('images snapshotted')
+
+        # contours
+        locate_snapshot._contours = all_contours
+        locate_snapshot._fltrd_contour_index = filtered_contour_index
+
+        # projections
+        locate_snapshot._fltrd_projections = filtered_projections
+
+        # log filtered projections
+        for p, proj in enumerate(filtered_projections):
+            logger.debug('Filtered Projection {}.{} {:.0f}@({:.3f}, {:.3f}), {}%'.format(
+                proj.ssid,
+                p,
+                degrees(proj.heading),
+                proj.cx,
+                proj.cy,
+                proj.conf_pc
+                )
+            )  
+
+        # record extraneous sightings
+        for p, proj in enumerate(filtered_projections):
+            logger.debug('All Sightings {}.{} {:.0f}@({:.3f}, {:.3f}), {}%'.format(
+                proj.ssid,
+                p,
+                degrees(proj.heading),
+                proj.cx,
+                proj.cy,
+                proj.conf_pc
+                )
+            )  
+            self.sightings_mgr.add((proj.cx, proj.cy, degrees(proj.heading)))    
+            logger.debug(self.sightings_mgr)                  
+
+        # best projection confidence
+        locate_snapshot.best_proj_conf_pc = filtered_projections[0].conf_pc if len(
+            filtered_projections) > 0 else 0
+        locate_snapshot.best_proj_found = (len(filtered_projections) > 0 and
+            filtered_projections[0].conf_pc > constants.SCORE_THRESHOLD)
+
+        # statistics
+        locate_snapshot.extrapolation_incidents = self.extrapolation_incidents
+
+        # contour count
+        locate_snapshot.fltrd_count = len(filtered_contour_index)
+        locate_snapshot.cont_count = len(all_contours)
+
+        timesheet.add('json snapshotted')
+
+        return pose, locate_snapshot.best_proj_conf_pc, tracked
+
     def update_excursion_log(self, pose, locate_snapshot, motivate_pose):
         try:
             if self.itinerary is not None:
                 x1_m, y1_m, x2_m, y2_m = self.itinerary.get_current_path()[:4]
 
                 # cutter stray - lateral error from path as a proportion of cutter diameter
-                stray_m = distance_to_line(
-                    pose.arena.c_x_m, pose.arena.c_y_m, x1_m, y1_m, x2_m, y2_m)
+                stray_m = self.itinerary.stray((pose.arena.c_x_m, pose.arena.c_y_m))
                 # mean
                 cutter_dia_m = self.config['mower.dimensions.cutter_dia_m']
                 cutter_stray_pc = 100 * stray_m / cutter_dia_m if cutter_dia_m > 0 else -1
@@ -2255,8 +2730,8 @@ class ProxymowServer(object):
                 msg = '{}, {}, {}, {}, {}, {:.3f}, {:.3f}, {:.0f}, {}, {:.3f}, {:.0f}, {:.2f}, {:.2f}, {:.2f}, {}, {}'.format(
                     datetime.datetime.now(timezone.utc),
                     locate_snapshot.ssid,
-                    motivate_pose.ssid if motivate_pose is not None and 'ssid' in vars(
-                        motivate_pose) else -1,
+                    motivate_pose.ssid if motivate_pose is not None and hasattr(
+                        motivate_pose, 'ssid') else -1,
                     self.itinerary.dest_ptr,  # position(),
                     '' if from_to_msg is None else from_to_msg,
                     pose.arena.c_x_m,
@@ -2278,8 +2753,8 @@ class ProxymowServer(object):
                     socket.gethostname(),
                     self.config['current.excursion'],  # excursion id
                     self.itinerary.dest_ptr,  # position(), # route id
-                    motivate_pose.ssid if motivate_pose is not None and 'ssid' in vars(
-                        motivate_pose) else -1,
+                    motivate_pose.ssid if motivate_pose is not None and hasattr(
+                        motivate_pose, 'ssid') else -1,
                     locate_snapshot.ssid,
                     'NULL' if from_to_msg is None else from_to_msg,
                     pose.arena.c_x_m,
@@ -2352,52 +2827,58 @@ class ProxymowServer(object):
                     's'[:outstanding ^ 1]
                 )
 
-    def nav_plan(self, locate_snapshot, motivate_pose, logger, timesheet=Timesheet()):
+    @stage_metrics.timed('nav_plan')
+    def nav_plan(self, ctx, locate_snapshot, motivate_pose, logger, timesheet=Timesheet()):
 
         # start of navigation planning
         pose = locate_snapshot._pose
+        current = ctx is self.mower_context
 
         try:
             if pose is not None:
 
-                self.update_drive_state()
+                if current:
+                    self.update_drive_state()
 
                 self.log('pxm nav_plan building context')
-                self.rules_engine.build_context(
-                    locate_snapshot,
-                    self.itinerary,
-                    self.config,
-                    self.telem,
-                    True
-                )
+                with stage_metrics.stage('build_context'):
+                    ctx.rules_engine.build_context(
+                        locate_snapshot,
+                        ctx.itinerary,
+                        ctx.config,
+                        ctx.telem,
+                        True
+                    )
                 timesheet.add('build rules engine context 1')
                 
                 # context might need self-dependencies, so easiest to just run twice
-                self.rules_engine.build_context(
-                    locate_snapshot,
-                    self.itinerary,
-                    self.config,
-                    self.telem,
-                    True
-                )
+                with stage_metrics.stage('build_context'):
+                    ctx.rules_engine.build_context(
+                        locate_snapshot,
+                        ctx.itinerary,
+                        ctx.config,
+                        ctx.telem,
+                        True
+                    )
                 timesheet.add('build rules engine context 2')
 
-                # update excursion log
-                self.update_excursion_log(pose, locate_snapshot, motivate_pose)
-                timesheet.add('excursion logged')
+                # update excursion log, the current mower's excursion
+                if current:
+                    self.update_excursion_log(pose, locate_snapshot, motivate_pose)
+                    timesheet.add('excursion logged')
 
             else:
                 # Robot Not Found
-                if not self.drive_cancel:
+                if current and not self.drive_cancel:
                     self.drive["state"] = ''
 
             # terms and rules
-            locate_snapshot._strategy_name = self.rules_engine.name
-            locate_snapshot._terms = copy.deepcopy(self.rules_engine.terms)
+            locate_snapshot._strategy_name = ctx.rules_engine.name
+            locate_snapshot._terms = copy.deepcopy(ctx.rules_engine.terms)
             # rules are deep copied later after selection...
 
             # post snapshot
-            self.snapshot_buffer[locate_snapshot.ssid] = locate_snapshot
+            ctx.snapshot_buffer[locate_snapshot.ssid] = locate_snapshot
 
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -2541,10 +3022,12 @@ class ProxymowServer(object):
                         # create new excursion id
                         self.config['_current.excursion'] = int(
                             self.config['current.excursion']) + 1
+                        self.flight_recorder.open_session(
+                            'excursion-{0}'.format(self.config['_current.excursion']))
                         self.log(
                             'process_instruction - Drive around route, start new logs...')
                         # initialise route start
-                        self.rules_engine.route_started_time = time.time()
+                        self.rules_engine.route_started_time = clock.time()
                         # rotate excursion log?
                         if excursion_logger.level == logging.WARNING:
                             # rotate after first run
@@ -2580,7 +3063,7 @@ class ProxymowServer(object):
 
                     self.rules_engine.last_n_commands.append(msg)
                     self.rules_engine.last_n_comp_commands.append(msg)
-                    self.cached_history_cmd = None
+                    self.mower_context.cached_history_cmd = None
 
                     # write location headings
                     trace_location(LOCATION_CSV_HEADER)
@@ -2704,26 +3187,23 @@ class ProxymowServer(object):
     def log(self, msg, incl_mem_stats=False):
         # INFO - default logging option
         if incl_mem_stats:
-            mem_stats = get_mem_stats()
-        else:
-            mem_stats = ''
-        self.pxm_logger.info(msg + mem_stats)
+            # only measured if the record is emitted
+            msg = LazyMessage('{0}{1}', msg, get_mem_stats)
+        self.pxm_logger.info(msg)
 
     def log_warning(self, msg, incl_mem_stats=False):
         # WARNING logging option
         if incl_mem_stats:
-            mem_stats = get_mem_stats()
-        else:
-            mem_stats = ''
-        self.pxm_logger.warning(msg + mem_stats)
+            # only measured if the record is emitted
+            msg = LazyMessage('{0}{1}', msg, get_mem_stats)
+        self.pxm_logger.warning(msg)
 
     def log_error(self, msg, incl_mem_stats=False):
         # ERROR logging option
         if incl_mem_stats:
-            mem_stats = get_mem_stats()
-        else:
-            mem_stats = ''
-        self.pxm_logger.error(msg + mem_stats)
+            # only measured if the record is emitted
+            msg = LazyMessage('{0}{1}', msg, get_mem_stats)
+        self.pxm_logger.error(msg)
 
     @cherrypy.expose
     def default(self, *args, **kwargs):
@@ -2731,6 +3211,11 @@ class ProxymowServer(object):
             http route that is called if no others match
         '''
         if len(args) > 0 and args[0].lower() in ['api', 'xapi']:
+            if 'initialiser' in vars(self) and not self.initialiser.ready.is_set():
+                # config changes re_init, which the background initialiser is still running
+                cherrypy.response.status = 503
+                cherrypy.response.headers['Retry-After'] = '1'
+                return None
             if args[0].lower() == 'api':
                 # rest api
                 method = getattr(self, "handle_" +
@@ -2793,8 +3278,16 @@ class ProxymowServer(object):
             tmplt_names = tmplt_utils.get_included_templates(
                 self.env, rel_tmplt_filepath)
 
-            ctx = tmplt_utils.get_model_context(
-                tmplt_names, self, args, kwargs, strict=False)
+            try:
+                ctx = tmplt_utils.get_model_context(
+                    tmplt_names, self, args, kwargs, strict=False)
+            except Exception:
+                if self.initialised:
+                    raise
+                # the page's model needs the camera, rules engine... not built yet
+                cherrypy.response.status = 503
+                cherrypy.response.headers['Retry-After'] = '1'
+                return None
 
             try:
                 tmplt = self.env.get_template(rel_tmplt_filepath)
@@ -2821,6 +3314,7 @@ class ProxymowServer(object):
             return html
 
     @cherrypy.expose
+    @requires_initialised
     def measures_json(self, **kwargs):
 
         resp = '{}'  # empty response
@@ -2902,8 +3396,7 @@ class ProxymowServer(object):
 
                     scorecard = render_contour_row(proj, self.pxm_logger)
 
-                    resp = json.dumps([scorecard]).replace("NaN", "null").replace(
-                        "-Infinity", "null").replace("Infinity", "null")
+                    resp = dumps_safe([scorecard])
                 except Exception:
                     pass
                 cherrypy.response.headers['Content-Type'] = 'application/json'
@@ -2915,13 +3408,86 @@ class ProxymowServer(object):
 
         return resp.encode('utf8')
 
-    @cherrypy.expose
-    def metadata_json(self, **kwargs):
-
-        resp = '{}'  # empty response
+    def build_snapshot_document(self, locate_snapshot, name):
+        '''
+            the contours or strategy document of a snapshot,
+            or the json of the snapshot part of the metadata document
+        '''
+        if name == 'contours':
+            # render table
+            max_row_count = constants.CONTOUR_TABLE_MAX_ROWS
+            rendered_projections = []
+            if ('_fltrd_projections' in vars(locate_snapshot) and
+                locate_snapshot._fltrd_projections is not None):
+                    for proj in locate_snapshot._fltrd_projections[-max_row_count:]:
+                        rendered_projections.append(
+                            render_contour_row(proj, self.pxm_logger))
+            return PublishedDocument.from_obj(rendered_projections)
+        elif name == 'strategy':
+            terms = []
+            rules = []
+            if '_terms' in vars(locate_snapshot) and locate_snapshot._terms is not None:
+                terms = [var_obj.render_dict(index, len(
+                    self.rules_engine.terms) - 1) for index, var_obj in enumerate(locate_snapshot._terms)]
+                cur_ssid = [
+                    t for t in locate_snapshot._terms if t.name == 'ssid'][0].result
+                if cur_ssid != locate_snapshot.ssid:
+                    self.log_debug(LazyMessage(
+                        'strategy document ssid mismatch terms ssid: {0} != snapshot ssid: {1}\n{2}',
+                        cur_ssid, locate_snapshot.ssid, lambda: str(self.snapshot_buffer)))
+
+            if '_rules' in vars(locate_snapshot) and locate_snapshot._rules is not None and len(locate_snapshot._rules) > 0:
+
+                pred_cur_succ_iter = more_itertools.windowed(
+                    [None] + locate_snapshot._rules + [None], n=3, step=1)
+                rules = [cur_obj.render_dict(pre_obj, succ_obj) for (
+                    pre_obj, cur_obj, succ_obj) in pred_cur_succ_iter]
+
+            return PublishedDocument.from_obj([
+                self.rules_engine.name if self.rules_engine is not None else None,
+                [list(term_dict.values()) for term_dict in terms],
+                [list(rule_dict.values()) for rule_dict in rules]
+            ])
+        elif name == 'metadata':
+            snapshot_meta_dict = {}
+            snapshot_meta_dict['Locator'] = locate_snapshot.as_public_dict()
+            if locate_snapshot._pose is not None:
+                snapshot_meta_dict['Pose'] = locate_snapshot._pose.as_dict()
+            else:
+                snapshot_meta_dict['Pose'] = {}
+            return dumps_safe(snapshot_meta_dict)
+        raise KeyError(name)
 
+    def publish_snapshot_documents(self, locate_snapshot):
+        '''
+            serialise the snapshot's documents once, as it is planned,
+            so requests for them are a lookup
+        '''
         try:
-            min_progress = int(kwargs['progress']
+            for name in self.SNAPSHOT_DOCUMENTS:
+                locate_snapshot._documents[name] = self.build_snapshot_document(locate_snapshot, name)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in publish_snapshot_documents: ' +
+                           str(e) + ' on line ' + str(err_line))
+
+    def snapshot_document(self, locate_snapshot, name):
+        '''
+            the published document, or one built for a snapshot still growing
+        '''
+        document = locate_snapshot._documents.get(name)
+        if document is None:
+            document = self.build_snapshot_document(locate_snapshot, name)
+        return document
+
+    @cherrypy.expose
+    @requires_initialised
+    def metadata_json(self, **kwargs):
+
+        resp = '{}'  # empty response
+
+        try:
+            min_progress = int(kwargs['progress']
                                ) if 'progress' in kwargs else 0
             req_strat = kwargs['strat'] if 'strat' in kwargs else None
             selected_snapshots = [
@@ -2929,9 +3495,9 @@ class ProxymowServer(object):
                     s._growth.value >= min_progress and
                     ((s._strategy_name == req_strat) or req_strat is None))
                     ]
-            self.log_debug('metadata_json: min progress requested: {} {}'.format(
+            self.log_debug(LazyMessage('metadata_json: min progress requested: {0} {1}',
                 min_progress,
-                [(s.ssid, s._growth.value, s._strategy_name) for s in selected_snapshots]
+                lambda: [(s.ssid, s._growth.value, s._strategy_name) for s in selected_snapshots]
                 )
             )
             if len(selected_snapshots) > 0:
@@ -2951,19 +3517,14 @@ class ProxymowServer(object):
             meta_dict['Driver']['cutter1-avail'] = self.config['mower.dimensions.cutter1_dia_m'] > 0
             meta_dict['Driver']['cutter2-avail'] = self.config['mower.dimensions.cutter2_dia_m'] > 0
 
+            snapshot_json = '{}'
             if locate_snapshot is not None:
-                meta_dict['Locator'] = locate_snapshot.as_public_dict(
-                ) if locate_snapshot is not None else {}
-                if locate_snapshot._pose is not None:
-                    meta_dict['Pose'] = locate_snapshot._pose.as_dict()
-                else:
-                    meta_dict['Pose'] = {}
                 meta_dict['Telemetry'] = self.telem if self.telem is not None else {}
+                snapshot_json = self.snapshot_document(locate_snapshot, 'metadata')
 
-            # convert to json
-            resp = json.dumps(meta_dict)
-
-            cherrypy.response.headers['Content-Type'] = 'application/json'
+            # the live state is small, the snapshot part pre-serialised
+            document = self.metadata_documents.get(dumps_safe(meta_dict), snapshot_json)
+            return document.respond(cherrypy.request.headers, cherrypy.response)
 
         except Exception as ex:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -2973,29 +3534,18 @@ class ProxymowServer(object):
         return resp.encode('utf8')
 
     @cherrypy.expose
+    @requires_initialised
     def contours_json(self, ssid=-1, **_kwargs):
 
         resp = '{}'  # empty response
 
         try:
             ss_index = int(ssid)
-            if ss_index in self.snapshot_buffer:
-                locate_snapshot = self.snapshot_buffer[ss_index]
-                # render table
-                max_row_count = constants.CONTOUR_TABLE_MAX_ROWS
-                rendered_projections = []
-                if (locate_snapshot is not None and
-                    '_fltrd_projections' in vars(locate_snapshot) and
-                    locate_snapshot._fltrd_projections is not None):
-                        for proj in locate_snapshot._fltrd_projections[-max_row_count:]:
-                            rendered_projections.append(
-                                render_contour_row(proj, self.pxm_logger))
-
-                # convert to json
-                resp = json.dumps(rendered_projections).replace("NaN", "null").replace(
-                    "-Infinity", "null").replace("Infinity", "null")
+            locate_snapshot = self.snapshot_buffer.get(ss_index)
+            if locate_snapshot is not None:
+                document = self.snapshot_document(locate_snapshot, 'contours')
+                return document.respond(cherrypy.request.headers, cherrypy.response)
             else:
-                locate_snapshot = None
                 self.log_warning(
                     'Problem in contours_json: No content Warning Http 204')
                 cherrypy.response.status = '204'  # No Content Warning
@@ -3010,53 +3560,118 @@ class ProxymowServer(object):
         return resp.encode('utf8')
 
     @cherrypy.expose
-    def strategy_json(self, ssid=-1, **_kwargs):
+    def metrics(self, **_kwargs):
+
+        resp = ''  # empty response
+
+        try:
+            resp = stage_metrics.as_prometheus()
+            cherrypy.response.headers['Content-Type'] = 'text/plain; version=0.0.4'
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in metrics: ' +
+                           str(ex) + ' on line ' + str(err_line))
+
+        return resp.encode('utf8')
+
+    @cherrypy.expose
+    def startup_json(self, **_kwargs):
 
         resp = '{}'  # empty response
 
         try:
-            terms = []
-            rules = []
-            ss_index = int(ssid)
-            if ss_index in self.snapshot_buffer:
-                locate_snapshot = self.snapshot_buffer[ss_index]
-            else:
-                locate_snapshot = None
-                cherrypy.response.status = '204'  # No Content Warning
+            startup = timeline.as_dict()
+            startup['state'] = self.initialiser.state
+            resp = json.dumps(startup)
+            cherrypy.response.headers['Content-Type'] = 'application/json'
 
-            if locate_snapshot is not None:
-                if '_terms' in vars(locate_snapshot):
-                    terms = [var_obj.render_dict(index, len(
-                        self.rules_engine.terms) - 1) for index, var_obj in enumerate(locate_snapshot._terms)]
-                    cur_ssid = [
-                        t for t in locate_snapshot._terms if t.name == 'ssid'][0].result
-                    if cur_ssid != int(ssid):
-                        self.log_debug('strategy_json ssid mismatch snapshot ssid: {0} != requested ssid: {1}\n{2}'.format(
-                            cur_ssid, ssid, str(self.snapshot_buffer)))
-                    else:
-                        self.log_debug('strategy_json ssid match snapshot ssid: {0} == requested ssid: {1}\n{2}\n\n{3}'.format(
-                            cur_ssid,
-                            ssid,
-                            str(list(self.snapshot_buffer)),
-                            None)
-                        )
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in startup_json: ' +
+                           str(ex) + ' on line ' + str(err_line))
 
-                if '_rules' in vars(locate_snapshot) and len(locate_snapshot._rules) > 0:
+        return resp.encode('utf8')
 
-                    pred_cur_succ_iter = more_itertools.windowed(
-                        [None] + locate_snapshot._rules + [None], n=3, step=1)
-                    rules = [cur_obj.render_dict(pre_obj, succ_obj) for (
-                        pre_obj, cur_obj, succ_obj) in pred_cur_succ_iter]
+    @cherrypy.expose
+    def render_json(self, **_kwargs):
 
-            tri_list = [self.rules_engine.name,
-                        [list(term_dict.values()) for term_dict in terms],
-                        [list(rule_dict.values()) for rule_dict in rules]
-                        ]
-            try:
-                resp = json.dumps(tri_list)
-            except Exception as ex3:
-                self.log_error(
-                    'Error in strategy_json converting terms and rules to json: ' + str(ex3))
+        resp = '{}'  # empty response
+
+        try:
+            resp = json.dumps(dict(self.render_scheduler.stats(), image_sink=image_sink.stats()))
+            cherrypy.response.headers['Content-Type'] = 'application/json'
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in render_json: ' +
+                           str(ex) + ' on line ' + str(err_line))
+
+        return resp.encode('utf8')
+
+    @cherrypy.expose
+    def logging_json(self, **_kwargs):
+
+        resp = '{}'  # empty response
+
+        try:
+            resp = json.dumps(self.log_pipeline.stats())
+            cherrypy.response.headers['Content-Type'] = 'application/json'
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in logging_json: ' +
+                           str(ex) + ' on line ' + str(err_line))
+
+        return resp.encode('utf8')
+
+    @cherrypy.expose
+    def metrics_json(self, **_kwargs):
+
+        resp = '{}'  # empty response
+
+        try:
+            resp = json.dumps(stage_metrics.as_dict())
+            cherrypy.response.headers['Content-Type'] = 'application/json'
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in metrics_json: ' +
+                           str(ex) + ' on line ' + str(err_line))
+
+        return resp.encode('utf8')
+
+    @cherrypy.expose
+    def sightings_json(self, **_kwargs):
+
+        resp = '[]'  # empty response
+
+        try:
+            resp = json.dumps(self.sightings_mgr.hotspots())
+            cherrypy.response.headers['Content-Type'] = 'application/json'
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in sightings_json: ' +
+                           str(ex) + ' on line ' + str(err_line))
+
+        return resp.encode('utf8')
+
+    @cherrypy.expose
+    @requires_initialised
+    def strategy_json(self, ssid=-1, **_kwargs):
+
+        resp = '{}'  # empty response
+
+        try:
+            ss_index = int(ssid)
+            locate_snapshot = self.snapshot_buffer.get(ss_index)
+            if locate_snapshot is None:
+                cherrypy.response.status = '204'  # No Content Warning
+                resp = json.dumps([self.rules_engine.name if self.rules_engine is not None else None, [], []])
+            else:
+                document = self.snapshot_document(locate_snapshot, 'strategy')
+                return document.respond(cherrypy.request.headers, cherrypy.response)
 
             cherrypy.response.headers['Content-Type'] = 'application/json'
 
@@ -3086,6 +3701,8 @@ class ProxymowServer(object):
         return logtext
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def arena_img(self, ssid=-1, **_kwargs):
         arena_stream = None
         mime_type = 'jpeg'
@@ -3125,10 +3742,8 @@ class ProxymowServer(object):
                     self.drive['state-index'] = 1
 
             ss_index = int(ssid)
-            if ss_index in self.snapshot_buffer:
-                locate_snapshot = self.snapshot_buffer[ss_index]
-            else:
-                locate_snapshot = None
+            locate_snapshot = self.snapshot_buffer.get(ss_index)
+            if locate_snapshot is None:
                 cherrypy.response.status = '204'  # No Content Warning
 
             if locate_snapshot is not None and locate_snapshot._fence_masked_img_arr is not None:
@@ -3139,72 +3754,7 @@ class ProxymowServer(object):
                 else:
                     self.log_debug('arena_img ssid match')
 
-                img_arr = locate_snapshot._fence_masked_img_arr.astype(
-                    np.uint8)
-                ssid = locate_snapshot.ssid
-                if img_arr.ndim == 3:
-                    rows, cols, _chans = img_arr.shape
-                    self.log(
-                        'arena_img, about to transform camera colour image to world arena image...')
-                else:
-                    rows, cols = img_arr.shape
-                    self.log(
-                        'arena_img, about to transform camera gray image to world arena image...')
-
-                top_arr = self.undistort_unwarp_mapper.transform_image(img_arr)
-
-                # check array shapes
-                self.log('arena_img, image array {0} top array {1}'.format(
-                    img_arr.shape, top_arr.shape))
-
-                # should be able to release img_arr here...
-                self.log('arena_img, deleting camera image array')
-                del (img_arr)
-
-                self.log(
-                    'arena_img, transform camera image to world arena image complete')
-                img_width_px, img_height_px, padding, line_height, _margin, _left_x, font = self.get_draw_metrics(
-                    top_arr)
-
-                top_img_grey = Image.fromarray(top_arr)
-                top_img = top_img_grey.convert('RGB')
-                top_img_draw = DashedImageDraw(top_img, 'RGB')
-
-                arrow_fill = (0, 0, 255)  # blue
-                extrap_arrow_fill = (127, 127, 127)  # grey
-                arrow_outline = (0, 0, 255)  # blue
-                extrap_arrow_outline = (127, 127, 127)  # grey
-                time_fill = (0, 255, 255)
-                msg_fill = (255, 0, 0)
-                route_fill = 'orange'
-                route_point = 'black'
-                cutter_indicator = 'crimson'
-                route_img = Image.new('RGB', top_img.size, 'black')
-                route_img_draw = ImageDraw.Draw(route_img, 'RGBA')
-
-                # should be able to release top_arr here...
-                self.log('arena_img, deleting top-down image array')
-                del (top_arr)
-
-                # create route image
-                # draw route image |over| arena image
-                route_pc = self.config['lawn.route_pc']
-                if len(route_pc) > 0:
-                    self.log('arena_img, about to convert {0} route percentages to pixels using {1} rows and {2} cols\n{3}'.format(
-                        len(route_pc), rows, cols, route_pc))
-                    route_px = [(int(p[0] * cols / 100), int((100 - p[1]) * rows / 100))
-                                for p in route_pc if p[0] is not None and p[1] is not None]
-                    cutter_dia_px = self.config['mower.dimensions.cutter_dia_px']
-                    if cutter_dia_px is None:
-                        cutter_dia_px = 3  # Need a width but want to highlight no cutter
-                    route_img_draw.line(
-                        route_px, fill=route_fill, width=cutter_dia_px, joint='curve')
-                    node_rad = 2
-                    for p in route_px:
-                        route_img_draw.ellipse(
-                            (p[0] - node_rad, p[1] - node_rad, p[0] + node_rad, p[1] + node_rad), fill=route_point)
-
-                # draw viewport as dotted box
+                # viewport as a box in the arena
                 if self.viewport.isnull:
                     margin_m = 0.25
                     bbox_col = '#ff0000'
@@ -3236,270 +3786,55 @@ class ProxymowServer(object):
                         (min_corners[0], min_corners[1])
                     ]
 
-                # then map arena to plan
-                x_scale = img_width_px / self.config['arena.width_m']
-                y_scale = img_height_px / self.config['arena.length_m']
-                plan_vp_corners_px = [(round(corner[0] * x_scale), round(
-                    img_height_px - (corner[1] * y_scale))) for corner in closed_outer_corners]
-                poly_lines = zip(plan_vp_corners_px, plan_vp_corners_px[1:])
-
-                for poly_line in poly_lines:
-                    top_img_draw.dashed_line(
-                        poly_line, dash=(10, 4), fill=bbox_col, width=1)
-
-                # current time
-                self.annotate(
-                    0,
-                    img_height_px,
-                    padding,
-                    line_height,
-                    font,
-                    time_fill,
-                    top_img_draw,
-                    time.strftime('%H:%M:%S'),
-                    0  # align left
-                )
-                # location time
-                self.annotate(
-                    img_width_px,
-                    img_height_px,
-                    padding,
-                    line_height,
-                    font,
-                    time_fill,
-                    top_img_draw,
-                    '{0} '.format(ssid) +
-                    time.strftime('%H:%M:%S', time.localtime(
-                        locate_snapshot._t_zero)),
-                    1  # align right
-                )
-                adr = self.config['optical.analysis_display_ratio']
+                # cutter indicators, telemetry or the last known state
+                plan = None
                 if locate_snapshot._pose is not None:
-                    tip_x_px = locate_snapshot._pose.plan.tip_x_px / adr
-                    tip_y_px = locate_snapshot._pose.plan.tip_y_px / adr
-                    tail_x_px = locate_snapshot._pose.plan.tail_x_px / adr
-                    tail_y_px = locate_snapshot._pose.plan.tail_y_px / adr
-                    left_cotter_x_px = locate_snapshot._pose.plan.left_cotter_x_px / adr
-                    left_cotter_y_px = locate_snapshot._pose.plan.left_cotter_y_px / adr
-                    right_cotter_x_px = locate_snapshot._pose.plan.right_cotter_x_px / adr
-                    right_cotter_y_px = locate_snapshot._pose.plan.right_cotter_y_px / adr
-                    annot_arrow(top_img_draw, tail_x_px, tail_y_px,
-                                tip_x_px, tip_y_px, arrow_fill, arrow_outline, 8)
-                    annot_axle(top_img_draw, left_cotter_x_px, left_cotter_y_px,
-                               right_cotter_x_px, right_cotter_y_px, arrow_fill)
-
-                    # cutter indicators
-                    cut_rad = 8
-                    cut_wdth = 4
-                    if ((self.telem is not None and
-                         isinstance(self.telem, dict) and
-                         'cutter1' in self.telem and
-                         self.telem['cutter1'] == 1) or
-                            (self.telem is not None and
-                             isinstance(self.telem, dict) and
-                             'cutter1' not in self.telem and
-                             self.cutter1_state)):
-                        self.cutter1_state = True
-                        top_img_draw.arc(
-                            (tip_x_px - cut_rad, tip_y_px - cut_rad,
-                             tip_x_px + cut_rad, tip_y_px + cut_rad),
-                            start=360 - locate_snapshot._pose.plan.t_deg + 150,
-                            end=360 - locate_snapshot._pose.plan.t_deg + 30,
-                            fill=cutter_indicator,
-                            width=cut_wdth)
-                    else:
-                        self.cutter1_state = False
-
-                    if ((self.telem is not None and
-                         isinstance(self.telem, dict) and
-                         'cutter2' in self.telem and
-                         self.telem['cutter2'] == 1) or
-                            (self.telem is not None and
-                             isinstance(self.telem, dict) and
-                             'cutter2' not in self.telem and
-                             self.cutter2_state)):
-                        self.cutter2_state = True
-                        top_img_draw.arc(
-                            (tail_x_px - cut_rad, tail_y_px - cut_rad,
-                             tail_x_px + cut_rad, tail_y_px + cut_rad),
-                            start=360 - locate_snapshot._pose.plan.t_deg + 30,
-                            end=360 - locate_snapshot._pose.plan.t_deg + 150,
-                            fill=cutter_indicator,
-                            width=cut_wdth)
+                    plan = locate_snapshot._pose.plan
+                    telem = self.telem if isinstance(self.telem, dict) else None
+                    if telem is not None:
+                        self.cutter1_state = telem['cutter1'] == 1 if 'cutter1' in telem else self.cutter1_state
+                        self.cutter2_state = telem['cutter2'] == 1 if 'cutter2' in telem else self.cutter2_state
                     else:
-                        self.cutter2_state = False
-
-                else:
-                    self.annotate(
-                        img_width_px,
-                        img_height_px,
-                        padding,
-                        line_height,
-                        font,
-                        msg_fill,
-                        top_img_draw,
-                        'Robot Not Found',
-                        2  # align centre
-                    )
+                        self.cutter1_state = self.cutter2_state = False
 
                 latest_extrap_pose = self.snapshot_buffer.latest_extrap_pose()
+                extrap_plan = None
                 if latest_extrap_pose is not None and constants.OVERLAY_EXTRAPOLATED_POSE:
-                    tip_x_px = latest_extrap_pose.plan.tip_x_px / adr
-                    tip_y_px = latest_extrap_pose.plan.tip_y_px / adr
-                    tail_x_px = latest_extrap_pose.plan.tail_x_px / adr
-                    tail_y_px = latest_extrap_pose.plan.tail_y_px / adr
-                    annot_arrow(top_img_draw, tail_x_px, tail_y_px, tip_x_px,
-                                tip_y_px, extrap_arrow_fill, extrap_arrow_outline, 3)
-
-                # add graphical user-defined symbolic annotation here...
+                    extrap_plan = latest_extrap_pose.plan
 
-                # get a list of user-defined terms that have a colour specified...
+                # user-defined terms that have a colour specified...
+                graphical_terms = None
                 if self.snapshot_buffer.latest() is not None and '_terms' in vars(self.snapshot_buffer.latest()):
                     terms = self.snapshot_buffer.latest()._terms
                     graphical_terms = [
-                        t for t in terms if t.colour is not None and t.colour.lower() != 'none']
+                        (t.name, t.result, t.colour, t.units) for t in terms
+                        if t.colour is not None and t.colour.lower() != 'none']
                     self.log('Graphical Terms: {}'.format(
-                        [(gt.name, gt.result, gt.colour) for gt in graphical_terms]))
-
-                    # create a dictionary of shapes keyed by colour => [coordinates]
-                    shape_dict = {}
-                    shape_term_dict = {}
-                    for gt in graphical_terms:
-                        res = gt.result
-                        col = gt.colour
-                        # count the number of coordinates
-                        try:
-                            coord_count = 1 if isinstance(res, str) else len(res)
-                        except Exception:
-                            coord_count = 1
-                        # add to dictionaries
-                        shape_term_dict[col] = gt
-                        if col in shape_dict:
-                            if coord_count == 1:
-                                shape_dict[col] += [res]
-                            else:
-                                shape_dict[col] += list(res)
-                        else:
-                            if coord_count == 1:
-                                shape_dict[col] = [res]
-                            else:
-                                shape_dict[col] = list(res)
-
-                    self.log(
-                        'Graphical Terms shape dictionary: {}'.format(shape_dict))
-
-                    # find widest text
-                    tmplt = '{}: {} {}'
-                    widest = ''
-                    for shape_colour, coords in shape_dict.items():
-                        if len(coords) == 1:
-                            gterm = shape_term_dict[shape_colour]
-                            text = tmplt.format(
-                                gterm.name, coords[0], gterm.units)
-                            if len(text) > len(widest):
-                                widest = text
-
-                    line_height_px = int(font.size * 0.75)
-                    ann_font = ImageFont.truetype(self.font_path, line_height_px)
-                    ann_padding = 4
-                    ann_line = 1  # initialise annotation line
-                    for shape_colour, coords in shape_dict.items():
-                        if len(coords) == 1:
-                            # annotation
-                            gterm = shape_term_dict[shape_colour]
-                            position = (3 * img_width_px / 4, (2 * img_height_px /
-                                 3) + ((line_height_px + (1 * ann_padding)) * ann_line))
-                            text = tmplt.format(gterm.name, coords[0], gterm.units)
-                            bbox = list(top_img_draw.textbbox(position, widest, font=ann_font))
-                            bbox[0] -= ann_padding
-                            bbox[1] -= ann_padding
-                            bbox[2] += ann_padding
-                            bbox[3] += ann_padding
-                            top_img_draw.rectangle(bbox, fill="ivory", outline="grey")
-                            top_img_draw.text(
-                                position,
-                                text,
-                                font=ann_font,
-                                fill=shape_colour
-                            )
-                            ann_line += 1
-                        elif len(coords) == 2:
-                            try:
-                                # point or symbol
-                                x_coord = coords[0] * x_scale
-                                y_coord = img_height_px - (coords[1] * y_scale)
-                                rad = 3
-                                top_img_draw.ellipse(
-                                    [x_coord - rad, y_coord - rad, x_coord + rad, y_coord + rad], fill=shape_colour, outline=shape_colour, width=1)
-                            except Exception:
-                                pass
-                        elif len(coords) == 3:
-                            # circle
-                            try:
-                                # x, y, r
-                                x_coord = coords[0] * x_scale
-                                y_coord = img_height_px - (coords[1] * y_scale)
-                                x_rad = coords[2] * x_scale
-                                y_rad = coords[2] * y_scale
-                                
-                                # number of points proportional to circumference
-                                num_points = int(2 * np.pi * max(x_rad, y_rad))
-
-                                # generate angles
-                                theta = np.linspace(0, 2 * np.pi, num_points)
-
-                                # calculate x and y coordinates
-                                raw_x = x_coord + (x_rad * np.cos(theta))
-                                raw_y = y_coord + (y_rad * np.sin(theta))
-                                
-                                # find extremities for mandatory inclusion so polygon closure doesn't draw over surface 
-                                min_x = np.min(raw_x)
-                                max_x = np.max(raw_x)
-                                min_y = np.min(raw_y)
-                                max_y = np.max(raw_y)
-                                
-                                # assemble composite condition
-                                condition = (
-                                                (raw_x == max_x) | 
-                                                (raw_x == min_x) | 
-                                                (raw_y == min_y) | 
-                                                (raw_y == max_y) | 
-                                                ((raw_x >= 0) & (raw_x <= img_width_px) & 
-                                                 (raw_y >= 0) & (raw_y < img_height_px)
-                                                )
-                                            )
-                                # apply condition to each axis
-                                x = raw_x[condition]
-                                y = raw_y[condition]                                
-                                
-                                # zip to flat list for plotting
-                                flat_points = list(np.vstack((x, y)).reshape((-1,),order='F').astype(int))
-                                
-                                # draw polygon
-                                top_img_draw.polygon(flat_points, fill=None, outline=shape_colour, width=1)
-                                
-                            except Exception:
-                                pass
-                        elif len(coords) == 4:
-                            try:
-                                # line
-                                x1_coord = coords[0] * x_scale
-                                y1_coord = img_height_px - \
-                                    (coords[1] * y_scale)
-                                x2_coord = coords[2] * x_scale
-                                y2_coord = img_height_px - \
-                                    (coords[3] * y_scale)
-                                top_img_draw.dashed_line([(x1_coord, y1_coord), (x2_coord, y2_coord)], dash=(
-                                    2, 6), fill=shape_colour, width=1)
-                            except Exception:
-                                pass
-                # end graphical user-defined symbolic annotation
-
-                # combine images
-                img = Image.blend(top_img, route_img, 0.1)
-                buffer = io.BytesIO()
-                img.save(buffer, mime_type)
-                arena_stream = buffer.getvalue()
+                        [(gt[0], gt[1], gt[2]) for gt in graphical_terms]))
+
+                # undistorted, unwarped and drawn in a render process
+                arena_stream = self.process_render(
+                    ('arena_img', locate_snapshot.ssid),
+                    render_lib.render_arena,
+                    locate_snapshot._fence_masked_img_arr,
+                    self.undistort_unwarp_mapper._map,
+                    locate_snapshot.ssid,
+                    locate_snapshot._t_zero,
+                    self.config['lawn.route_pc'],
+                    self.config['mower.dimensions.cutter_dia_px'],
+                    closed_outer_corners,
+                    bbox_col,
+                    self.config['arena.width_m'],
+                    self.config['arena.length_m'],
+                    self.config['optical.analysis_display_ratio'],
+                    plan,
+                    (self.cutter1_state, self.cutter2_state),
+                    extrap_plan,
+                    graphical_terms,
+                    self.font_path,
+                    mime_type=mime_type,
+                    logger=self.pxm_logger
+                )
 
         except Exception as ex:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -3512,16 +3847,15 @@ class ProxymowServer(object):
         return arena_stream
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def contour_img(self, ssid=-1, **_kwargs):
         contour_stream = None
-        timesheet = Timesheet('Contour Image')
         try:
             if ssid is not None and int(ssid) >= 0:
                 ss_index = int(ssid)
-                if ss_index in self.snapshot_buffer:
-                    locate_snapshot = self.snapshot_buffer[ss_index]
-                else:
-                    locate_snapshot = None
+                locate_snapshot = self.snapshot_buffer.get(ss_index)
+                if locate_snapshot is None:
                     cherrypy.response.status = '204'  # No Content Warning
             else:
                 # just return latest
@@ -3531,112 +3865,32 @@ class ProxymowServer(object):
                 '_source_img_arr' in vars(locate_snapshot) and
                 locate_snapshot._source_img_arr is not None):
 
-                img_height_px = self.config['optical.height']
-                img_width_px = self.config['optical.width']
-                img_arr = locate_snapshot._source_img_arr.astype(np.uint8)
-
-                cont_img_grey = Image.fromarray(img_arr)
-                cont_img = cont_img_grey.convert('RGB')
-                cont_img_draw = DashedImageDraw(cont_img, 'RGB')
-                timesheet.add('draw canvas obtained')
-
-                # current time
-                img_width_px, img_height_px, padding, line_height, _margin, _left_x, font = self.get_draw_metrics(
-                    img_arr)
-                sm_font = ImageFont.truetype(self.font_path, 12)
-
-                self.annotate(
-                    0,
-                    img_height_px,
-                    padding,
-                    line_height,
-                    font,
-                    'yellow',
-                    cont_img_draw,
-                    time.strftime('%H:%M:%S'),
-                    0  # align left
-                )
-                # location time
-                self.annotate(
-                    img_width_px,
-                    img_height_px,
-                    padding,
-                    line_height,
-                    font,
-                    'yellow',
-                    cont_img_draw,
-                    '{0} '.format(ssid) +
-                    time.strftime('%H:%M:%S', time.localtime(
-                        locate_snapshot._t_zero)),
-                    1  # align right
-                )
-                timesheet.add('location time overlaid')
-
-                # overlay all raw contours
-                adr = self.config['optical.analysis_display_ratio']
-
-                fill_col = 'yellow'
-                if '_contours' in vars(locate_snapshot) and locate_snapshot._contours is not None:
-                    for n, contour in enumerate(locate_snapshot._contours):
-
-                        # convert to flat list for plotting
-                        flat_points = list(
-                            np.flip(np.array(contour / [adr, adr]).flatten().astype(int)))
-
-                        # sketch outline
-                        cont_img_draw.line(flat_points, fill=fill_col, width=1)
-
-                    # overlay filtered body contours
-                    fill_col = 'orange'
-                    if '_fltrd_contour_index' in vars(locate_snapshot) and locate_snapshot._fltrd_contour_index is not None:
-                        for n, contour in enumerate(locate_snapshot._contours):
-
-                            if n in locate_snapshot._fltrd_contour_index.keys():
-
-                                # convert to flat list for plotting
-                                fltrd_flat_points = list(
-                                    np.flip(np.array(contour / [adr, adr]).flatten().astype(int)))
-
-                                # sketch outline
-                                cont_img_draw.line(
-                                    fltrd_flat_points, fill=fill_col, width=1)
-                                cont_img_draw.text((max(fltrd_flat_points[::2]) + random.randint(10, 100), max(fltrd_flat_points[1::2]) + random.randint(10, 100)), '{0}:{1}'.format(
-                                    n, locate_snapshot._fltrd_contour_index[n]), fill=fill_col, font=sm_font)
-                timesheet.add('contours overlaid')
-
-                if locate_snapshot._pose is None:
-                    self.annotate(
-                        img_width_px,
-                        img_height_px // 1,
-                        padding,
-                        line_height,
-                        font,
-                        'red',
-                        cont_img_draw,
-                        'Robot Not Found',
-                        2  # align centre
-                    )
-                timesheet.add('pose overlaid')
-
-                # draw viewport as dotted box
-                poly_lines = self.viewport.xyxy_polylines(img_arr.shape)
-                for poly_line in poly_lines:
-                    p_line = [(p[0], p[1]) for p in poly_line]
-                    cont_img_draw.dashed_line(
-                        p_line, dash=(4, 4), fill='white', width=1)
-                timesheet.add('viewport overlaid')
-
+                img_arr = locate_snapshot._source_img_arr
+                contours = locate_snapshot._contours if '_contours' in vars(locate_snapshot) else None
+                fltrd_contour_index = locate_snapshot._fltrd_contour_index if '_fltrd_contour_index' in vars(
+                    locate_snapshot) else None
+                save_path = None
                 if constants.DEBUG_SAVE_IMAGE_LEVEL > 0:
-                    cont_img.save(self.tmp_folder_path + 'contours.jpg',
-                                  optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                    save_path = self.tmp_folder_path + 'contours.jpg'
 
-                buffer = io.BytesIO()
-                cont_img.save(buffer, 'JPEG')
-                contour_stream = buffer.getvalue()
+                # overlaid and encoded in a render process
+                contour_stream = self.process_render(
+                    ('contour_img', locate_snapshot.ssid),
+                    render_lib.render_contours,
+                    img_arr,
+                    ssid,
+                    locate_snapshot._t_zero,
+                    contours,
+                    fltrd_contour_index,
+                    locate_snapshot._pose is not None,
+                    list(self.viewport.xyxy_polylines(img_arr.shape)),
+                    self.config['optical.analysis_display_ratio'],
+                    self.font_path,
+                    save_path=save_path,
+                    logger=self.pxm_logger
+                )
 
             cherrypy.response.headers['Content-Type'] = "image/jpg"
-            timesheet.add('response complete')
-            self.log_debug(timesheet)
 
         except Exception as ex:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -3646,25 +3900,44 @@ class ProxymowServer(object):
         return contour_stream
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def projection_analysis_img(self, **kwargs):
         img_stream = None
         try:
             prj_idx = int(kwargs['projidx']) if 'projidx' in kwargs else 0
             try:
                 entry = self.contours_buffer[prj_idx]
-                img_buf = plot_contour_entry_as_projection(
-                    self, entry, False, self.pxm_logger)
-                img_stream = img_buf.getvalue()
             except IndexError:
-                err_image = Image.new("RGBA", (240, 360))
-                err_draw = ImageDraw.Draw(err_image)
-                err_font = ImageFont.truetype(self.font_path, 12)
-                err_draw.text((10, 10), "No Contours Available",
-                              fill='grey', font=err_font)
-                img_stream = io.BytesIO()
+                entry = None
+            if entry is not None:
+                # contour mapped back to display pixels here, with the server's mapper
+                cont_px = None
+                try:
+                    cont_data = render_lib.contour_entry_data(entry)
+                    cont_px_xarr_yarr = np.round(self.data_mapper.reverse_coordinates(
+                        cont_data[:, 0], cont_data[:, 1])).astype(int)
+                    cont_px = np.dstack(np.flip(cont_px_xarr_yarr))[0] - (
+                        self.viewport.origin[0] * self.config['optical.height'] / 100,
+                        self.viewport.origin[1] * self.config['optical.width'] / 100
+                    )
+                except Exception as ex0:
+                    err_line = sys.exc_info()[-1].tb_lineno
+                    self.log_error('Error mapping contour: ' +
+                                   str(ex0) + ' on line ' + str(err_line))
+                img_stream = self.process_render(
+                    ('projection_analysis_img', entry),
+                    render_lib.render_contour_entry,
+                    entry,
+                    self.score_props,
+                    cont_px,
+                    False,
+                    logger=self.pxm_logger
+                )
+            else:
                 # need transparent background
-                err_image.save(img_stream, 'png')
-                img_stream.seek(0)
+                img_stream = render_lib.message_png(
+                    "No Contours Available", self.font_path, 'grey')
             cherrypy.response.headers['Content-Type'] = "image/jpg"
 
         except Exception as ex1:
@@ -3675,6 +3948,8 @@ class ProxymowServer(object):
         return img_stream
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def target_analysis_img(self, **kwargs):
 
         img_stream = None
@@ -3695,27 +3970,21 @@ class ProxymowServer(object):
                 except Exception:
                     src_img_arr = None
                     disp_img_arr = None
-                img_buf = io.BytesIO()
-                plot_projection_img(
+                # assessed here, plotted in a render process
+                img_stream = self.process_render(
+                    ('target_analysis_img', proj.ssid),
+                    render_lib.render_projection,
                     proj,
                     datetime.datetime.fromtimestamp(
                         proj.start_time_secs).strftime("%Y-%m-%d %H:%M:%S"),
                     src_img_arr,
                     disp_img_arr,
-                    img_buf,
                     logger=self.pxm_logger
                 )
-                img_stream = img_buf.getvalue()
             else:
-                err_image = Image.new("RGBA", (240, 360))
-                err_draw = ImageDraw.Draw(err_image)
-                err_font = ImageFont.truetype(self.font_path, 12)
-                err_draw.text((10, 10), "No Contours Available",
-                              fill='black', font=err_font)
-                img_stream = io.BytesIO()
                 # need transparent background
-                err_image.save(img_stream, 'png')
-                img_stream.seek(0)
+                img_stream = render_lib.message_png(
+                    "No Contours Available", self.font_path, 'black')
             cherrypy.response.headers['Content-Type'] = "image/jpg"
 
         except Exception as ex1:
@@ -3726,6 +3995,8 @@ class ProxymowServer(object):
         return img_stream
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def stage_img(self, **kwargs):
 
         srid = int(kwargs['srid']) if 'srid' in kwargs else 1
@@ -3738,14 +4009,19 @@ class ProxymowServer(object):
         excursion_log_handler = excursion_logger.handlers[0]
         log_file_path = excursion_log_handler.baseFilename
         if log_file_path is not None:
-            img_buf = plot_excursion(
-                log_file_path, srid, erid, crid, arrow_length_m, logger=self.pxm_logger, annotate=False)
-            cherrypy.response.headers['Content-Type'] = "image/jpg"
-            return img_buf.getvalue()
+            # plotted from the log file alone, so in a render process
+            img_stream = self.process_render(
+                ('stage_img', srid, erid, crid), diagram_lib.plot_excursion, log_file_path, srid, erid, crid,
+                arrow_length_m, logger=self.pxm_logger, annotate=False)
+            if img_stream is not None:
+                cherrypy.response.headers['Content-Type'] = "image/jpg"
+            return img_stream
         else:
             return None
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def tracking_img(self, **_kwargs):
         '''
             assemble tracking image
@@ -3755,67 +4031,26 @@ class ProxymowServer(object):
             rows = self.config['optical.height']
             cols = self.config['optical.width']
             self.log_debug('tracking_img: {}x{}'.format(rows, cols))
-            track_img = Image.new('RGB', (cols, rows), color='black')
-            track_img_draw = ImageDraw.Draw(track_img, 'RGBA')
-    
-            # draw route over image
-            route_pc = self.config['lawn.route_pc']
-            if len(route_pc) > 0:
-                radius = 12
-                for pt in route_pc:
-                    xy = (int(pt[0] * cols / 100) - radius, int((100 - pt[1]) * rows / 100) - radius,
-                          int(pt[0] * cols / 100) + radius, int((100 - pt[1]) * rows / 100) + radius)
-                    track_img_draw.ellipse(xy, fill='orange')
-    
-                route_px = [(int(p[0] * cols / 100), int((100 - p[1]) * rows / 100))
-                            for p in route_pc if p[0] is not None and p[1] is not None]
-                track_img_draw.line(route_px, fill='orange',
-                                    width=10, joint='curve')
-                self.log_debug('tracking_img route: {}'.format(xy))
-    
-            # next we add the mower pose from excursion log
-            # get filename
+
+            # get excursion log filename
             excursion_logger = logging.getLogger('excursion')
             excursion_log_handler = excursion_logger.handlers[0]
             excursion_log_file_path = excursion_log_handler.baseFilename
             self.log_debug('tracking_img excursion_log_file_path: {}'.format(excursion_log_file_path))
-    
-            if excursion_log_file_path is not None:
-                with open(excursion_log_file_path, 'r') as f:
-                    locations = f.readlines()
-                line_count = len(locations)
-                self.log_debug('tracking_img excursion line count: {}'.format(line_count))
-                
-                for line_index in range(line_count):
-                    line = locations[line_index]
-                    cells = line.split(",")
-                    try:
-                        x_m = float(cells[8])
-                        y_m = float(cells[9])
-                        t_deg = float(cells[10])
-                        t_rad = radians(t_deg)
-                        p = poses.Pose(x_m, y_m, t_rad)
-                        radius = 2
-                        xy = p.plan.c_x_px - radius, p.plan.c_y_px - \
-                            radius, p.plan.c_x_px + radius, p.plan.c_y_px + radius
-                        track_img_draw.ellipse(xy, fill='blue')
-                        annot_arrow(track_img_draw, p.plan.tail_x_px, p.plan.tail_y_px,
-                                         p.plan.tip_x_px, p.plan.tip_y_px, outline='blue', fill='cyan')
-                        self.log_debug('tracking_img: {} ({}, {})'.format(line_index, x_m, y_m))
-    
-                    except ValueError:
-                        pass  # over headings
-                    except Exception as ex0:
-                        err_line = sys.exc_info()[-1].tb_lineno
-                        self.log_error('Error in tracking_img: ' +
-                           str(ex0) + ' on line ' + str(err_line))
-            else:
-                self.log_error('tracking_img: No excursion log found')
+
+            # the log read, poses constructed and drawn in a render process
+            track_stream = self.process_render(
+                ('tracking_img', rows, cols),
+                render_lib.render_tracking,
+                rows,
+                cols,
+                self.config['lawn.route_pc'],
+                excursion_log_file_path,
+                poses.Pose.geometry(),
+                logger=self.pxm_logger
+            )
             # Send the result
             cherrypy.response.headers['Content-Type'] = "image/jpg"
-            buffer = io.BytesIO()
-            track_img.save(buffer, 'JPEG')
-            track_stream = buffer.getvalue()
 
         except Exception as ex1:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -3823,7 +4058,77 @@ class ProxymowServer(object):
                            str(ex1) + ' on line ' + str(err_line))
         return track_stream
 
+    def strategy_heatmap(self, heading_deg, step_m, dest, scope):
+        '''
+            what-if evaluation of the strategy over a grid of poses covering the arena, all with the
+            same heading, on the current path - or the path to destination dest - of the itinerary
+        '''
+        itinerary = self.itinerary
+        if itinerary is None:
+            itinerary = Itinerary(None, self.config['lawn.route'], plan_only=True)
+        if dest is not None:
+            itinerary = copy.copy(itinerary)
+            itinerary.dest_ptr = int(dest)
+        step_m = float(step_m) if step_m is not None else constants.STRATEGY_HEATMAP_STEP_M
+        grid, grid_shape = strategy_batch.grid_poses(
+            self.config['arena.width_m'], self.config['arena.length_m'], step_m, radians(float(heading_deg)))
+        rule_scope = RuleScope.IN_FLIGHT if scope == 'in_flight' else RuleScope.STATIONARY
+        result = self.rules_engine.evaluate_batch(grid, itinerary, self.config, self.telem, rule_scope)
+        return result, grid_shape, itinerary
+
+    @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
+    @scheduled_render('strategy_heatmap_img')
+    def strategy_heatmap_img(self, heading_deg=0, step_m=None, dest=None, scope='stationary', **_kwargs):
+        '''
+            heat-map of the rule the strategy would select at each pose over the arena
+        '''
+        heatmap_stream = None
+        try:
+            result, grid_shape, itinerary = self.strategy_heatmap(heading_deg, step_m, dest, scope)
+            heatmap_img = strategy_batch.heatmap_image(
+                result,
+                grid_shape,
+                (self.config['optical.width'], self.config['optical.height']),
+                self.config['arena.width_m'],
+                self.config['arena.length_m'],
+                itinerary
+            )
+            self.log_debug('strategy_heatmap_img: {} poses in {:.3f}s {}'.format(
+                len(result), result.secs, result.counts()))
+            cherrypy.response.headers['Content-Type'] = 'image/png'
+            buffer = io.BytesIO()
+            heatmap_img.save(buffer, 'PNG')
+            heatmap_stream = buffer.getvalue()
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in strategy_heatmap_img: ' +
+                           str(ex) + ' on line ' + str(err_line))
+        return heatmap_stream
+
     @cherrypy.expose
+    @requires_initialised
+    def strategy_heatmap_json(self, heading_deg=0, step_m=None, dest=None, scope='stationary', **_kwargs):
+
+        resp = '{}'  # empty response
+
+        try:
+            result, grid_shape, _itinerary = self.strategy_heatmap(heading_deg, step_m, dest, scope)
+            resp = json.dumps(dict(result.as_dict(), grid_shape=grid_shape))
+            cherrypy.response.headers['Content-Type'] = 'application/json'
+
+        except Exception as ex:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.log_error('Error in strategy_heatmap_json: ' +
+                           str(ex) + ' on line ' + str(err_line))
+
+        return resp.encode('utf8')
+
+    @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def vision_img(self, **_kwargs):
         timesheet = Timesheet('Vision Image')
         qs = urllib.parse.unquote(cherrypy.request.query_string)
@@ -3927,6 +4232,7 @@ class ProxymowServer(object):
             return img_stream
 
     @cherrypy.expose
+    @requires_initialised
     def calib_img_stack(self, src=None, **_kwargs):
         '''
             return a stack of images, one for each mode!
@@ -3957,73 +4263,35 @@ class ProxymowServer(object):
             strength=strength,
             zoom=zoom
         )
-        undist_arr = self.undistort_mapper.transform_image(img_arr)
-        undist_img = Image.fromarray(undist_arr)
-        undist_img_draw = ImageDraw.Draw(undist_img)
-        undist_img_draw.text((5, 5), 'Live', font_size=24)
-
         self.unwarp_mapper.populate(
             ["transform"],
             display_cols,  # img_arr_cols,
             display_rows,  # img_arr_rows
             matrix=self.config['calib.img_matrix']
         )
-        arena_arr = self.unwarp_mapper.transform_image(undist_arr)
-        arena_img = Image.fromarray(arena_arr)
 
         # find latest archive image
+        latest_file = None
         list_of_files = glob.glob(self.calib_folder_path_name + os.sep + '*.jpg')
         if len(list_of_files) > 0:
             latest_file = max(list_of_files, key=os.path.getctime)
-            arc_img = Image.open(latest_file)
-            arc_img_draw = ImageDraw.Draw(arc_img)
-            text_width = arc_img_draw.textlength(latest_file)
-            arc_img_draw.text((display_cols - (text_width * 24 / arc_img_draw.font.size), 5), '{}'.format(latest_file), font_size=24)
             self.log(
                 'pxm calib_imgs archive view latest file: {}'.format(latest_file))
-        else:
-            # create a blank image to pad payload
-            arc_img = Image.new('RGB', undist_img.size, 'brown')
-            arc_img_draw = ImageDraw.Draw(arc_img)
-            arc_img_draw.text((50, 5), 'No Archive Images Available - use capture...', font_size=24)
-
-        # blended archive with live view
-        self.log('pxm calib_imgs live blended with archive view')
-        try:
-            blend_img = Image.blend(undist_img.convert("RGBA"), arc_img.convert(
-                "RGBA"), 0.5).convert('RGB')
-
-        except Exception as e:
-            self.log_error('Error blending images: ' + str(e) +
-                           ' sizes: ' + str(undist_img.size) + ' ' + str(arc_img.size))
-
-        # stack images?
-        if src is None:
-            images = [undist_img, arc_img, blend_img, arena_img]
-        elif src == '0':
-            images = [undist_img]
-        elif src == '1':
-            images = [arc_img]
-        elif src == '2':
-            images = [blend_img]
-        elif src == '3':
-            images = [arena_img]
-
-        widths, heights = zip(*(i.size for i in images))
 
-        max_width = max(widths)
-        total_height = sum(heights)
-
-        stack_img = Image.new('RGB', (max_width, total_height))
-
-        y_offset = 0
-        for img in images:
-            stack_img.paste(img, (0, y_offset))
-            y_offset += img.size[1]
-
-        buffer = io.BytesIO()
-        stack_img.save(buffer, 'JPEG')
-        img_stream = buffer.getvalue()
+        # warped, blended and stacked in a render process
+        img_stream = self.process_render(
+            ('calib_img_stack', src),
+            render_lib.render_calib_stack,
+            img_arr,
+            self.undistort_mapper._map,
+            self.unwarp_mapper._map,
+            latest_file,
+            display_cols,
+            src=src,
+            logger=self.pxm_logger
+        )
+        if img_stream is None:
+            return None
 
         cherrypy.response.headers['Content-Type'] = "image/{0}".format(
             mime_type)
@@ -4042,6 +4310,8 @@ class ProxymowServer(object):
         return img_stream
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def fence_img(self, **_kwargs):
 
         qs = cherrypy.request.query_string
@@ -4082,6 +4352,8 @@ class ProxymowServer(object):
         return img_stream
 
     @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
     def raw_img(self, **kwargs):
 
         timesheet = Timesheet('Raw Img')
@@ -4100,16 +4372,45 @@ class ProxymowServer(object):
         # calls get_raw_image(cam_settings)
         self.camera_request_queue.put(cam_settings)
         self.log('pxm raw_img getting image from queue (blocks)...')
-        img_arr = self.camera_raw_queue.get(timeout=15)
+        img_arr, capture_time = self.camera_raw_queue.get(timeout=15)
         timesheet.add('image returned from raw camera queue')
-        self.log('pxm raw_img mean intensity: {:.3f}'.format(np.mean(img_arr)))
-        
+
         if img_arr is not None:
             if mime_type == 'raw':
                 self.log('raw_img format: ' + mime_type)
                 img_stream = img_arr.astype(np.uint8).tobytes()  # io.BytesIO()
                 self.log('raw_img streaming raw array: ' + str(img_arr.shape))
                 timesheet.add('byte stream created')
+            elif mime_type == 'frame':
+                # framed array with header, optionally compressed and cropped
+                codec = kwargs.get('codec', 'raw')
+                if 'roi' in kwargs:
+                    row_slice, col_slice = roi_from_qs(kwargs['roi'], img_arr.shape)
+                    frames = [
+                        encode_frame(
+                            img_arr[row_slice, col_slice],
+                            codec,
+                            capture_time,
+                            origin=(row_slice.start, col_slice.start),
+                            full_shape=img_arr.shape
+                        )
+                    ]
+                    lores_factor = int(kwargs.get('lores', constants.REMOTE_FRAME_LORES_FACTOR))
+                    if lores_factor > 0:
+                        frames.append(
+                            encode_frame(
+                                reduce_frame(img_arr, lores_factor),
+                                codec,
+                                capture_time,
+                                full_shape=img_arr.shape,
+                                scale=lores_factor
+                            )
+                        )
+                    img_stream = encode_frames(frames)
+                else:
+                    img_stream = encode_frame(img_arr, codec, capture_time)
+                self.log('raw_img streaming {0} frame: {1} bytes'.format(codec, len(img_stream)))
+                timesheet.add('frame stream created')
             else:
                 img = Image.fromarray(img_arr)
                 buffer = io.BytesIO()
@@ -4118,8 +4419,11 @@ class ProxymowServer(object):
                 timesheet.add('image stream created')
         else:
             img_stream = None
-        cherrypy.response.headers['Content-Type'] = "image/{0}".format(
-            mime_type)
+        if mime_type == 'frame':
+            cherrypy.response.headers['Content-Type'] = 'application/octet-stream'
+        else:
+            cherrypy.response.headers['Content-Type'] = "image/{0}".format(
+                mime_type)
         cherrypy.response.headers['Content-Info-Revision'] = self.camera.revision
         try:
             cherrypy.response.headers['Content-Info-Iso'] = str(
@@ -4135,48 +4439,130 @@ class ProxymowServer(object):
         self.log_debug(str(timesheet))
         return img_stream
 
-    def annotate(self, img_width_px, img_height_px, padding, line_height, draw_font, draw_col, draw_on, time_str, align=0, bg_col=None):
-        text_width = draw_on.textlength(time_str, font=draw_font)
-        if align == 0:  # align left
-            left_x = padding
-            right_x = padding + text_width + padding
-        elif align == 1:  # align right
-            left_x = img_width_px - (padding + text_width + padding)
-            right_x = img_width_px - padding
-        else:  # align centre
-            left_x = (img_width_px // 2) - (padding + (text_width // 2))
-            right_x = padding + left_x + text_width + padding
-        if bg_col is not None:
-            draw_on.rectangle(
-                (left_x, img_height_px - line_height, right_x, img_height_px), fill=bg_col)
-        draw_on.text((left_x + padding, img_height_px - (line_height - 2)),
-                     time_str, font=draw_font, fill=draw_col)
-
-    def get_draw_metrics(self, image):
-        # image can be PIL or numpy array
-        img_width_px = img_height_px = padding = line_height = margin = left_x = -1
-        font = None
-        try:
-            if type(image) is np.ndarray:
-                if image.ndim == 2:
-                    img_height_px, img_width_px = image.shape
-                elif image.ndim == 3:
-                    img_height_px, img_width_px, _img_chans = image.shape
+    @cherrypy.expose
+    @requires_initialised
+    @stage_metrics.timed('render')
+    def edge_prospects(self, **kwargs):
+        '''
+            camera node side of edge prospecting
+            captures and prospects the lo-res frame, then returns the full-res
+            prospect sub-arrays followed by a lo-res copy of the whole frame
+        '''
+        timesheet = Timesheet('Edge Prospects')
 
+        qs = cherrypy.request.query_string
+        self.log('pxm edge_prospects: ' + qs)
+        cam_settings = self.camera.settings.clone(qs)
+        cam_settings['queue'] = 'raw'
+        self.camera_request_queue.put(cam_settings)
+        img_arr, capture_time = self.camera_raw_queue.get(timeout=15)
+        timesheet.add('image returned from raw camera queue')
+
+        img_stream = None
+        vp_specs = []
+        if img_arr is not None:
+            codec = kwargs.get('codec', 'raw')
+            if img_arr.ndim == 3:
+                analysis_arr = np.array(Image.fromarray(img_arr).convert('L'))
             else:
-                img_width_px, img_height_px = image.size
-            font_size = 96 * img_width_px // constants.RESOLUTIONS[0][0]
-            padding = img_width_px // 100
-            line_height = padding + font_size + padding
-            margin = 10 * img_width_px // 100
-            left_x = margin - padding
-            font = ImageFont.truetype(self.font_path, font_size)
-        except Exception as e:
-            err_line = sys.exc_info()[-1].tb_lineno
-            msg = 'Error in get_draw_metrics: ' + \
-                str(e) + ' on line ' + str(err_line)
-            self.log_error(msg)
-        return img_width_px, img_height_px, padding, line_height, margin, left_x, font
+                analysis_arr = img_arr
+            if 'viewport' in kwargs:
+                viewport = Viewport.from_corners(*viewport_from_qs(kwargs['viewport']))
+            else:
+                viewport = Viewport()  # Null Viewport
+
+            if kwargs.get('prospect', '1') == '1':
+                fence_masks = None
+                if 'fence' in kwargs:
+                    fence_masks = self.get_edge_fence_masks(kwargs['fence'], analysis_arr.shape)
+                with stage_metrics.stage('prospect'):
+                    prospect_vps = get_prospect_list(
+                        self,
+                        analysis_arr,
+                        int(kwargs.get('zoom', 4)),
+                        viewport,
+                        0,
+                        0,
+                        self.pxm_logger,
+                        'edge',
+                        fence_masks=fence_masks
+                    ) or []
+                timesheet.add('prospects found')
+            else:
+                prospect_vps = [viewport]
+
+            frames = []
+            for vp in prospect_vps:
+                row_slice, col_slice = vp.slicer(analysis_arr.shape)
+                frames.append(
+                    encode_frame(
+                        analysis_arr[row_slice, col_slice],
+                        codec,
+                        capture_time,
+                        origin=(row_slice.start, col_slice.start),
+                        full_shape=analysis_arr.shape
+                    )
+                )
+                top, left = vp.origin
+                bottom, right = vp.bottom_right
+                vp_specs.append([float(top), float(left), float(bottom), float(right)])
+            lores_factor = int(kwargs.get('lores', constants.REMOTE_FRAME_LORES_FACTOR))
+            frames.append(
+                encode_frame(
+                    reduce_frame(img_arr, lores_factor),
+                    codec,
+                    capture_time,
+                    full_shape=img_arr.shape,
+                    scale=lores_factor
+                )
+            )
+            img_stream = encode_frames(frames)
+            timesheet.add('frame stream created')
+            self.log('edge_prospects streaming {0} prospect(s) and lores frame: {1} bytes'.format(
+                len(prospect_vps), len(img_stream)))
+
+        cherrypy.response.headers['Content-Type'] = 'application/octet-stream'
+        cherrypy.response.headers['Content-Info-Revision'] = self.camera.revision
+        cherrypy.response.headers['Content-Info-Viewports'] = json.dumps(vp_specs)
+
+        self.log_debug(str(timesheet))
+        return img_stream
+
+    def get_edge_fence_masks(self, fence_qs, shape):
+        '''
+            fence masks from the polygon supplied by the server, cached until it changes
+        '''
+        cache_key = (fence_qs, shape)
+        fence_masks = self.edge_fence_masks.get(cache_key)
+        if fence_masks is None:
+            polygon_px = [int(v) for v in fence_qs.split(',')]
+            fence_mask_img = get_fence_mask_surface(
+                shape[1],
+                shape[0],
+                polygon_px,
+                ImageFont.truetype(self.font_path, 20),
+                like_arr=None,
+                debug=False,
+                logger=self.pxm_logger
+            )
+            fence_masks = FenceMasks(np.asarray(fence_mask_img, bool))
+            self.edge_fence_masks[cache_key] = fence_masks
+        return fence_masks
+
+    def process_render(self, key, fn, *args, **kwargs):
+        '''
+            fn called with picklable args in one of the render scheduler's worker processes
+            a render shed with no earlier render to serve is refused with 503
+        '''
+        if not constants.RENDER_SCHEDULER_ENABLED:
+            return call_render(fn, args, kwargs)
+        try:
+            return self.render_scheduler.render(key, fn, *args, process=True, **kwargs)
+        except RenderShed as e:
+            self.log_warning('{0}: {1}'.format(key[0], e))
+            cherrypy.response.status = 503
+            cherrypy.response.headers['Retry-After'] = '1'
+            return None
 
     def draw_grid(
         self,
@@ -4184,92 +4570,25 @@ class ProxymowServer(object):
         lawn_width_m,
         lawn_length_m,
         border_m,
-        arena_matrix,
-        raw_draw,
+        raw_img,
         timesheet=None,
-        data_mapper=None,
         just_periphery=True
     ):
-        # create on-the-fly mapper and matrix?
+        # composite the cached, pre-rasterised grid layer
         try:
-
-            img_width_px = int(cam_settings['resolution'].split('x')[0])
-            img_height_px = int(cam_settings['resolution'].split('x')[1])
-
-            # need a fresh arena matrix
-            calib_width_m = self.config['calib.width_m']
-            calib_length_m = self.config['calib.length_m']
-            calib_offset_x_m = self.config['calib.offset_x_m']
-            calib_offset_y_m = self.config['calib.offset_y_m']
-            lawn_border_m = self.config['lawn.border_m']
-            calib_percent_points = self.config['lawn.calib']
-            calib_pc_points = [[p.x, p.y] for p in calib_percent_points]
-            _M, _N, L, _K = matrices_from_quad_points(
-                calib_pc_points,
-                calib_width_m,
-                calib_length_m,
-                calib_offset_x_m,
-                calib_offset_y_m,
+            layer = self.grid_overlay.get_layer(
+                self.config,
+                cam_settings,
                 lawn_width_m,
                 lawn_length_m,
-                lawn_border_m,
-                img_height_px,
-                img_width_px,
-                logger=self.pxm_logger,
-                debug=True
+                border_m,
+                just_periphery=just_periphery,
+                timesheet=timesheet
             )
-
-            arena_matrix = L
-
-            if data_mapper is None:
-                # need new dynamic mapper to follow vision query string...
-                data_mapper = DataMapper(
-                    ["unbarrel_inv", "transform"],
-                    img_width_px,
-                    img_height_px,
-                    matrix=arena_matrix,
-                    strength=cam_settings['undistort_strength'],
-                    zoom=cam_settings['undistort_zoom'],
-                    logger=self.pxm_logger
-                )
-                if timesheet is not None:
-                    timesheet.add('data mapper created')
-            else:
-                data_mapper.populate(
-                    ["unbarrel_inv", "transform"],
-                    img_width_px,
-                    img_height_px,
-                    matrix=arena_matrix,
-                    strength=cam_settings['undistort_strength'],
-                    zoom=cam_settings['undistort_zoom']
-                )
-                self.log_debug(
-                    'draw grid populated data grid mapper: key ' + data_mapper.cache_key)
-                if timesheet is not None:
-                    timesheet.add('data mapper populated')
-
-            # obtain grid intersection coordinates
-            cam_c_px = grid_intersections_camera(
-                lawn_width_m, lawn_length_m, border_m, data_mapper, logger=self.pxm_logger, debug=False)
-            if timesheet is not None:
-                timesheet.add('grid intersections calculated')
-
             fill_col = 'white' if cam_settings['display_colour'] else 'black'
-            dash_spec = (8, 8)
-            # draw horizontals
-            for row in [cam_c_px[0], cam_c_px[-1]] if just_periphery else cam_c_px:
-                raw_draw.dashed_line(row, dash=dash_spec,
-                                     fill=fill_col, width=1)
-            if timesheet is not None:
-                timesheet.add('horizontals drawn')
-
-            # draw verticals
-            cam_c_px_tp = np.transpose(cam_c_px, (1, 0, 2))
-            for row in [cam_c_px_tp[0], cam_c_px_tp[-1]] if just_periphery else cam_c_px_tp:
-                raw_draw.dashed_line(row, dash=dash_spec,
-                                     fill=fill_col, width=1)
+            self.grid_overlay.apply(raw_img, layer, fill_col)
             if timesheet is not None:
-                timesheet.add('verticals drawn')
+                timesheet.add('grid layer composited')
 
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
@@ -4296,7 +4615,6 @@ class ProxymowServer(object):
             _arena_length_m = self.config['arena.length_m']
             _img_width_px = self.config['optical.width']
             _img_height_px = self.config['optical.height']
-            arena_matrix = self.config['calib.arena_matrix']
             img_arr = self.camera.snap(
                 'yuv' if analysis_chan == 'gray' and display_chan == 'gray' else 'rgb')
             if img_arr is not None:
@@ -4349,10 +4667,8 @@ class ProxymowServer(object):
                                 lawn_width_m,
                                 lawn_length_m,
                                 border_m,
-                                arena_matrix,
-                                raw_draw,
+                                raw_img,
                                 timesheet,
-                                data_mapper=self.grid_data_mapper,
                                 just_periphery=True
                             )
                         else:
@@ -4361,10 +4677,8 @@ class ProxymowServer(object):
                                 lawn_width_m,
                                 lawn_length_m,
                                 border_m,
-                                arena_matrix,
-                                raw_draw,
+                                raw_img,
                                 timesheet,
-                                data_mapper=self.grid_data_mapper,
                                 just_periphery=False
                             )
                         self.log('get_raw_image - grid complete')
@@ -4677,12 +4991,9 @@ class ProxymowServer(object):
                 grid_ovl_img = Image.fromarray(disp_chan_array)
                 if grid:
                     timesheet.add('grid image from array')
-                    grid_ovl_draw = DashedImageDraw(grid_ovl_img)
-                    timesheet.add('grid draw from img')
                     lawn_width_m = self.config['lawn.width_m']
                     lawn_length_m = self.config['lawn.length_m']
                     border_m = self.config['lawn.border_m']
-                    arena_matrix = self.config['calib.arena_matrix']
     
                     if cam_settings['client'] == 'vision':
                         self.draw_grid(
@@ -4690,10 +5001,8 @@ class ProxymowServer(object):
                             lawn_width_m,
                             lawn_length_m,
                             border_m,
-                            arena_matrix,
-                            grid_ovl_draw,
+                            grid_ovl_img,
                             timesheet=timesheet,
-                            data_mapper=self.grid_data_mapper,
                             just_periphery=True
                         )
                     elif cam_settings['client'] == 'locate':
@@ -4702,10 +5011,8 @@ class ProxymowServer(object):
                             lawn_width_m,
                             lawn_length_m,
                             border_m,
-                            arena_matrix,
-                            grid_ovl_draw,
+                            grid_ovl_img,
                             timesheet=timesheet,
-                            data_mapper=self.data_mapper,
                             just_periphery=False
                         )
                     elif cam_settings['client'] != 'calib':
@@ -4714,10 +5021,8 @@ class ProxymowServer(object):
                             lawn_width_m,
                             lawn_length_m,
                             border_m,
-                            arena_matrix,
-                            grid_ovl_draw,
+                            grid_ovl_img,
                             timesheet=timesheet,
-                            data_mapper=self.data_mapper,
                             just_periphery=False
                         )
     
@@ -4837,4 +5142,5 @@ if __name__ == '__main__':
     )
     cherrypy.tree.mount(ProxymowServer(args), '/', cherrypy_svrconf_file_name)
     cherrypy.engine.start()
+    timeline.mark('web interface serving')
     cherrypy.engine.block()
@@ -0,0 +1,762 @@
+import io
+import os
+import random
+import sys
+import time
+from math import radians
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import constants
+import poses
+from dashed_image_draw import DashedImageDraw
+from geom_lib import annot_arrow, annot_axle
+from mapper import ImageMapper
+from startup import deferred_import
+
+# imported on first use, off the startup path
+diagram_lib = deferred_import('diagram_lib')
+
+'''
+    Web interface image renders
+
+    Each render here takes only picklable inputs - arrays, numbers, strings and
+    plain records - gathered from the server's state by the request, so that the
+    render scheduler can run it in a worker process, drawing and encoding
+    outside the server's interpreter lock. Each returns the encoded image bytes.
+'''
+
+
+def draw_metrics(image, font_path, logger=None):
+    '''
+        text metrics and font scaled to the image, which can be PIL or numpy array
+    '''
+    img_width_px = img_height_px = padding = line_height = margin = left_x = -1
+    font = None
+    try:
+        if type(image) is np.ndarray:
+            if image.ndim == 2:
+                img_height_px, img_width_px = image.shape
+            elif image.ndim == 3:
+                img_height_px, img_width_px, _img_chans = image.shape
+
+        else:
+            img_width_px, img_height_px = image.size
+        font_size = 96 * img_width_px // constants.RESOLUTIONS[0][0]
+        padding = img_width_px // 100
+        line_height = padding + font_size + padding
+        margin = 10 * img_width_px // 100
+        left_x = margin - padding
+        font = ImageFont.truetype(font_path, font_size)
+    except Exception as e:
+        err_line = sys.exc_info()[-1].tb_lineno
+        msg = 'Error in draw_metrics: ' + \
+            str(e) + ' on line ' + str(err_line)
+        if logger:
+            logger.error(msg)
+        else:
+            print(msg)
+    return img_width_px, img_height_px, padding, line_height, margin, left_x, font
+
+
+def annotate(img_width_px, img_height_px, padding, line_height, draw_font, draw_col, draw_on, time_str, align=0, bg_col=None):
+    text_width = draw_on.textlength(time_str, font=draw_font)
+    if align == 0:  # align left
+        left_x = padding
+        right_x = padding + text_width + padding
+    elif align == 1:  # align right
+        left_x = img_width_px - (padding + text_width + padding)
+        right_x = img_width_px - padding
+    else:  # align centre
+        left_x = (img_width_px // 2) - (padding + (text_width // 2))
+        right_x = padding + left_x + text_width + padding
+    if bg_col is not None:
+        draw_on.rectangle(
+            (left_x, img_height_px - line_height, right_x, img_height_px), fill=bg_col)
+    draw_on.text((left_x + padding, img_height_px - (line_height - 2)),
+                 time_str, font=draw_font, fill=draw_col)
+
+
+def encode(img, image_format='JPEG'):
+    buffer = io.BytesIO()
+    img.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def message_png(text, font_path, fill, size=(240, 360)):
+    '''
+        text on a transparent background
+    '''
+    msg_image = Image.new('RGBA', size)
+    msg_draw = ImageDraw.Draw(msg_image)
+    msg_font = ImageFont.truetype(font_path, 12)
+    msg_draw.text((10, 10), text, fill=fill, font=msg_font)
+    return encode(msg_image, 'png')
+
+
+def render_arena(
+    img_arr,
+    coord_map,
+    ssid,
+    t_zero,
+    route_pc,
+    cutter_dia_px,
+    closed_outer_corners,
+    bbox_col,
+    arena_width_m,
+    arena_length_m,
+    adr,
+    plan,
+    cutters,
+    extrap_plan,
+    graphical_terms,
+    font_path,
+    mime_type='jpeg',
+    logger=None
+):
+    '''
+        the located snapshot's image undistorted and unwarped to a plan of the arena, with
+        the route, viewport, pose, cutters and user-defined graphical terms overlaid
+        plan and extrap_plan are pose plan perspectives, or None
+        cutters the (front, rear) cutter states
+        graphical_terms (name, result, colour, units) of the terms with a colour
+    '''
+    arena_stream = None
+    try:
+        img_arr = img_arr.astype(np.uint8)
+        if img_arr.ndim == 3:
+            rows, cols, _chans = img_arr.shape
+        else:
+            rows, cols = img_arr.shape
+
+        top_arr = ImageMapper.warp_colour(img_arr, coord_map)
+        del (img_arr)
+
+        img_width_px, img_height_px, padding, line_height, _margin, _left_x, font = draw_metrics(
+            top_arr, font_path, logger)
+
+        top_img_grey = Image.fromarray(top_arr)
+        top_img = top_img_grey.convert('RGB')
+        top_img_draw = DashedImageDraw(top_img, 'RGB')
+        del (top_arr)
+
+        arrow_fill = (0, 0, 255)  # blue
+        extrap_arrow_fill = (127, 127, 127)  # grey
+        arrow_outline = (0, 0, 255)  # blue
+        extrap_arrow_outline = (127, 127, 127)  # grey
+        time_fill = (0, 255, 255)
+        msg_fill = (255, 0, 0)
+        route_fill = 'orange'
+        route_point = 'black'
+        cutter_indicator = 'crimson'
+        route_img = Image.new('RGB', top_img.size, 'black')
+        route_img_draw = ImageDraw.Draw(route_img, 'RGBA')
+
+        # create route image
+        # draw route image |over| arena image
+        if len(route_pc) > 0:
+            route_px = [(int(p[0] * cols / 100), int((100 - p[1]) * rows / 100))
+                        for p in route_pc if p[0] is not None and p[1] is not None]
+            if cutter_dia_px is None:
+                cutter_dia_px = 3  # Need a width but want to highlight no cutter
+            route_img_draw.line(
+                route_px, fill=route_fill, width=cutter_dia_px, joint='curve')
+            node_rad = 2
+            for p in route_px:
+                route_img_draw.ellipse(
+                    (p[0] - node_rad, p[1] - node_rad, p[0] + node_rad, p[1] + node_rad), fill=route_point)
+
+        # draw viewport as dotted box, mapping arena to plan
+        x_scale = img_width_px / arena_width_m
+        y_scale = img_height_px / arena_length_m
+        plan_vp_corners_px = [(round(corner[0] * x_scale), round(
+            img_height_px - (corner[1] * y_scale))) for corner in closed_outer_corners]
+        poly_lines = zip(plan_vp_corners_px, plan_vp_corners_px[1:])
+
+        for poly_line in poly_lines:
+            top_img_draw.dashed_line(
+                poly_line, dash=(10, 4), fill=bbox_col, width=1)
+
+        # current time
+        annotate(
+            0,
+            img_height_px,
+            padding,
+            line_height,
+            font,
+            time_fill,
+            top_img_draw,
+            time.strftime('%H:%M:%S'),
+            0  # align left
+        )
+        # location time
+        annotate(
+            img_width_px,
+            img_height_px,
+            padding,
+            line_height,
+            font,
+            time_fill,
+            top_img_draw,
+            '{0} '.format(ssid) +
+            time.strftime('%H:%M:%S', time.localtime(t_zero)),
+            1  # align right
+        )
+        if plan is not None:
+            tip_x_px = plan.tip_x_px / adr
+            tip_y_px = plan.tip_y_px / adr
+            tail_x_px = plan.tail_x_px / adr
+            tail_y_px = plan.tail_y_px / adr
+            left_cotter_x_px = plan.left_cotter_x_px / adr
+            left_cotter_y_px = plan.left_cotter_y_px / adr
+            right_cotter_x_px = plan.right_cotter_x_px / adr
+            right_cotter_y_px = plan.right_cotter_y_px / adr
+            annot_arrow(top_img_draw, tail_x_px, tail_y_px,
+                        tip_x_px, tip_y_px, arrow_fill, arrow_outline, 8)
+            annot_axle(top_img_draw, left_cotter_x_px, left_cotter_y_px,
+                       right_cotter_x_px, right_cotter_y_px, arrow_fill)
+
+            # cutter indicators
+            cut_rad = 8
+            cut_wdth = 4
+            if cutters[0]:
+                top_img_draw.arc(
+                    (tip_x_px - cut_rad, tip_y_px - cut_rad,
+                     tip_x_px + cut_rad, tip_y_px + cut_rad),
+                    start=360 - plan.t_deg + 150,
+                    end=360 - plan.t_deg + 30,
+                    fill=cutter_indicator,
+                    width=cut_wdth)
+            if cutters[1]:
+                top_img_draw.arc(
+                    (tail_x_px - cut_rad, tail_y_px - cut_rad,
+                     tail_x_px + cut_rad, tail_y_px + cut_rad),
+                    start=360 - plan.t_deg + 30,
+                    end=360 - plan.t_deg + 150,
+                    fill=cutter_indicator,
+                    width=cut_wdth)
+        else:
+            annotate(
+                img_width_px,
+                img_height_px,
+                padding,
+                line_height,
+                font,
+                msg_fill,
+                top_img_draw,
+                'Robot Not Found',
+                2  # align centre
+            )
+
+        if extrap_plan is not None:
+            tip_x_px = extrap_plan.tip_x_px / adr
+            tip_y_px = extrap_plan.tip_y_px / adr
+            tail_x_px = extrap_plan.tail_x_px / adr
+            tail_y_px = extrap_plan.tail_y_px / adr
+            annot_arrow(top_img_draw, tail_x_px, tail_y_px, tip_x_px,
+                        tip_y_px, extrap_arrow_fill, extrap_arrow_outline, 3)
+
+        # graphical user-defined symbolic annotation
+        if graphical_terms is not None:
+            # create a dictionary of shapes keyed by colour => [coordinates]
+            shape_dict = {}
+            shape_term_dict = {}
+            for term in graphical_terms:
+                _name, res, col, _units = term
+                # count the number of coordinates
+                try:
+                    coord_count = 1 if isinstance(res, str) else len(res)
+                except Exception:
+                    coord_count = 1
+                # add to dictionaries
+                shape_term_dict[col] = term
+                if col in shape_dict:
+                    if coord_count == 1:
+                        shape_dict[col] += [res]
+                    else:
+                        shape_dict[col] += list(res)
+                else:
+                    if coord_count == 1:
+                        shape_dict[col] = [res]
+                    else:
+                        shape_dict[col] = list(res)
+
+            # find widest text
+            tmplt = '{}: {} {}'
+            widest = ''
+            for shape_colour, coords in shape_dict.items():
+                if len(coords) == 1:
+                    gterm = shape_term_dict[shape_colour]
+                    text = tmplt.format(gterm[0], coords[0], gterm[3])
+                    if len(text) > len(widest):
+                        widest = text
+
+            line_height_px = int(font.size * 0.75)
+            ann_font = ImageFont.truetype(font_path, line_height_px)
+            ann_padding = 4
+            ann_line = 1  # initialise annotation line
+            for shape_colour, coords in shape_dict.items():
+                if len(coords) == 1:
+                    # annotation
+                    gterm = shape_term_dict[shape_colour]
+                    position = (3 * img_width_px / 4, (2 * img_height_px /
+                                3) + ((line_height_px + (1 * ann_padding)) * ann_line))
+                    text = tmplt.format(gterm[0], coords[0], gterm[3])
+                    bbox = list(top_img_draw.textbbox(position, widest, font=ann_font))
+                    bbox[0] -= ann_padding
+                    bbox[1] -= ann_padding
+                    bbox[2] += ann_padding
+                    bbox[3] += ann_padding
+                    top_img_draw.rectangle(bbox, fill="ivory", outline="grey")
+                    top_img_draw.text(
+                        position,
+                        text,
+                        font=ann_font,
+                        fill=shape_colour
+                    )
+                    ann_line += 1
+                elif len(coords) == 2:
+                    try:
+                        # point or symbol
+                        x_coord = coords[0] * x_scale
+                        y_coord = img_height_px - (coords[1] * y_scale)
+                        rad = 3
+                        top_img_draw.ellipse(
+                            [x_coord - rad, y_coord - rad, x_coord + rad, y_coord + rad], fill=shape_colour, outline=shape_colour, width=1)
+                    except Exception:
+                        pass
+                elif len(coords) == 3:
+                    # circle
+                    try:
+                        # x, y, r
+                        x_coord = coords[0] * x_scale
+                        y_coord = img_height_px - (coords[1] * y_scale)
+                        x_rad = coords[2] * x_scale
+                        y_rad = coords[2] * y_scale
+
+                        # number of points proportional to circumference
+                        num_points = int(2 * np.pi * max(x_rad, y_rad))
+
+                        # generate angles
+                        theta = np.linspace(0, 2 * np.pi, num_points)
+
+                        # calculate x and y coordinates
+                        raw_x = x_coord + (x_rad * np.cos(theta))
+                        raw_y = y_coord + (y_rad * np.sin(theta))
+
+                        # find extremities for mandatory inclusion so polygon closure doesn't draw over surface
+                        min_x = np.min(raw_x)
+                        max_x = np.max(raw_x)
+                        min_y = np.min(raw_y)
+                        max_y = np.max(raw_y)
+
+                        # assemble composite condition
+                        condition = (
+                                        (raw_x == max_x) |
+                                        (raw_x == min_x) |
+                                        (raw_y == min_y) |
+                                        (raw_y == max_y) |
+                                        ((raw_x >= 0) & (raw_x <= img_width_px) &
+                                         (raw_y >= 0) & (raw_y < img_height_px)
+                                        )
+                                    )
+                        # apply condition to each axis
+                        x = raw_x[condition]
+                        y = raw_y[condition]
+
+                        # zip to flat list for plotting
+                        flat_points = list(np.vstack((x, y)).reshape((-1,), order='F').astype(int))
+
+                        # draw polygon
+                        top_img_draw.polygon(flat_points, fill=None, outline=shape_colour, width=1)
+
+                    except Exception:
+                        pass
+                elif len(coords) == 4:
+                    try:
+                        # line
+                        x1_coord = coords[0] * x_scale
+                        y1_coord = img_height_px - \
+                            (coords[1] * y_scale)
+                        x2_coord = coords[2] * x_scale
+                        y2_coord = img_height_px - \
+                            (coords[3] * y_scale)
+                        top_img_draw.dashed_line([(x1_coord, y1_coord), (x2_coord, y2_coord)], dash=(
+                            2, 6), fill=shape_colour, width=1)
+                    except Exception:
+                        pass
+        # end graphical user-defined symbolic annotation
+
+        # combine images
+        img = Image.blend(top_img, route_img, 0.1)
+        arena_stream = encode(img, mime_type)
+
+    except Exception as ex:
+        err_line = sys.exc_info()[-1].tb_lineno
+        msg = 'Error in render_arena: ' + str(ex) + ' on line ' + str(err_line)
+        if logger:
+            logger.error(msg)
+        else:
+            print(msg)
+
+    return arena_stream
+
+
+def render_contours(
+    img_arr,
+    ssid,
+    t_zero,
+    contours,
+    fltrd_contour_index,
+    pose_found,
+    viewport_polylines,
+    adr,
+    font_path,
+    save_path=None,
+    logger=None
+):
+    '''
+        the located snapshot's source image with its raw and filtered body contours,
+        the viewport and the location time overlaid
+    '''
+    contour_stream = None
+    try:
+        img_arr = img_arr.astype(np.uint8)
+        cont_img_grey = Image.fromarray(img_arr)
+        cont_img = cont_img_grey.convert('RGB')
+        cont_img_draw = DashedImageDraw(cont_img, 'RGB')
+
+        # current time
+        img_width_px, img_height_px, padding, line_height, _margin, _left_x, font = draw_metrics(
+            img_arr, font_path, logger)
+        sm_font = ImageFont.truetype(font_path, 12)
+
+        annotate(
+            0,
+            img_height_px,
+            padding,
+            line_height,
+            font,
+            'yellow',
+            cont_img_draw,
+            time.strftime('%H:%M:%S'),
+            0  # align left
+        )
+        # location time
+        annotate(
+            img_width_px,
+            img_height_px,
+            padding,
+            line_height,
+            font,
+            'yellow',
+            cont_img_draw,
+            '{0} '.format(ssid) +
+            time.strftime('%H:%M:%S', time.localtime(t_zero)),
+            1  # align right
+        )
+
+        # overlay all raw contours
+        fill_col = 'yellow'
+        if contours is not None:
+            for n, contour in enumerate(contours):
+
+                # convert to flat list for plotting
+                flat_points = list(
+                    np.flip(np.array(contour / [adr, adr]).flatten().astype(int)))
+
+                # sketch outline
+                cont_img_draw.line(flat_points, fill=fill_col, width=1)
+
+            # overlay filtered body contours
+            fill_col = 'orange'
+            if fltrd_contour_index is not None:
+                for n, contour in enumerate(contours):
+
+                    if n in fltrd_contour_index.keys():
+
+                        # convert to flat list for plotting
+                        fltrd_flat_points = list(
+                            np.flip(np.array(contour / [adr, adr]).flatten().astype(int)))
+
+                        # sketch outline
+                        cont_img_draw.line(
+                            fltrd_flat_points, fill=fill_col, width=1)
+                        cont_img_draw.text((max(fltrd_flat_points[::2]) + random.randint(10, 100), max(fltrd_flat_points[1::2]) + random.randint(10, 100)), '{0}:{1}'.format(
+                            n, fltrd_contour_index[n]), fill=fill_col, font=sm_font)
+
+        if not pose_found:
+            annotate(
+                img_width_px,
+                img_height_px // 1,
+                padding,
+                line_height,
+                font,
+                'red',
+                cont_img_draw,
+                'Robot Not Found',
+                2  # align centre
+            )
+
+        # draw viewport as dotted box
+        for poly_line in viewport_polylines:
+            p_line = [(p[0], p[1]) for p in poly_line]
+            cont_img_draw.dashed_line(
+                p_line, dash=(4, 4), fill='white', width=1)
+
+        if save_path is not None:
+            cont_img.save(save_path, optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+
+        contour_stream = encode(cont_img)
+
+    except Exception as ex:
+        err_line = sys.exc_info()[-1].tb_lineno
+        msg = 'Error in render_contours: ' + str(ex) + ' on line ' + str(err_line)
+        if logger:
+            logger.error(msg)
+        else:
+            print(msg)
+
+    return contour_stream
+
+
+def contour_entry_data(entry):
+    '''
+        the arena contour [m] of a contours buffer entry
+    '''
+    cont_data_line = entry.split('|')[3]
+    return np.array(eval(cont_data_line))
+
+
+def render_contour_entry(entry, score_props, cont_px, hide_conf, logger=None):
+    '''
+        a contours buffer entry plotted as a projection,
+        cont_px its contour in display pixels, mapped by the request
+    '''
+    return diagram_lib.plot_contour_entry_as_projection(
+        entry, score_props, cont_px, hide_conf, logger).getvalue()
+
+
+def render_projection(proj, capture_datetime, src_img_arr, disp_img_arr, logger=None):
+    '''
+        an assessed projection plotted with its analysis and display images
+    '''
+    img_buf = io.BytesIO()
+    diagram_lib.plot_projection_img(
+        proj,
+        capture_datetime,
+        src_img_arr,
+        disp_img_arr,
+        img_buf,
+        logger=logger
+    )
+    return img_buf.getvalue()
+
+
+def render_tracking(rows, cols, route_pc, excursion_log_file_path, pose_geometry, logger=None):
+    '''
+        the route and every pose of the excursion log, on a plan of the arena
+        pose_geometry the Pose class dimensions, to plot the poses with
+    '''
+    track_stream = None
+    try:
+        poses.Pose.init_geometry(pose_geometry)
+        track_img = Image.new('RGB', (cols, rows), color='black')
+        track_img_draw = ImageDraw.Draw(track_img, 'RGBA')
+
+        # draw route over image
+        if len(route_pc) > 0:
+            radius = 12
+            for pt in route_pc:
+                xy = (int(pt[0] * cols / 100) - radius, int((100 - pt[1]) * rows / 100) - radius,
+                      int(pt[0] * cols / 100) + radius, int((100 - pt[1]) * rows / 100) + radius)
+                track_img_draw.ellipse(xy, fill='orange')
+
+            route_px = [(int(p[0] * cols / 100), int((100 - p[1]) * rows / 100))
+                        for p in route_pc if p[0] is not None and p[1] is not None]
+            track_img_draw.line(route_px, fill='orange',
+                                width=10, joint='curve')
+
+        # next we add the mower pose from excursion log
+        if excursion_log_file_path is not None and os.path.isfile(excursion_log_file_path):
+            with open(excursion_log_file_path, 'r') as f:
+                locations = f.readlines()
+
+            pose_specs = []
+            for line in locations:
+                cells = line.split(",")
+                try:
+                    x_m = float(cells[8])
+                    y_m = float(cells[9])
+                    t_deg = float(cells[10])
+                    pose_specs.append((x_m, y_m, radians(t_deg)))
+                except ValueError:
+                    pass  # over headings
+                except Exception as ex0:
+                    err_line = sys.exc_info()[-1].tb_lineno
+                    if logger:
+                        logger.error('Error in render_tracking: ' + str(ex0) + ' on line ' + str(err_line))
+
+            # construct all poses together - plan perspective only
+            for p in poses.Pose.from_batch(pose_specs):
+                radius = 2
+                xy = p.plan.c_x_px - radius, p.plan.c_y_px - \
+                    radius, p.plan.c_x_px + radius, p.plan.c_y_px + radius
+                track_img_draw.ellipse(xy, fill='blue')
+                annot_arrow(track_img_draw, p.plan.tail_x_px, p.plan.tail_y_px,
+                            p.plan.tip_x_px, p.plan.tip_y_px, outline='blue', fill='cyan')
+            if logger:
+                logger.debug('render_tracking: {} poses drawn'.format(len(pose_specs)))
+        elif logger:
+            logger.error('render_tracking: No excursion log found')
+
+        track_stream = encode(track_img)
+
+    except Exception as ex:
+        err_line = sys.exc_info()[-1].tb_lineno
+        msg = 'Error in render_tracking: ' + str(ex) + ' on line ' + str(err_line)
+        if logger:
+            logger.error(msg)
+        else:
+            print(msg)
+
+    return track_stream
+
+
+def render_calib_stack(img_arr, undistort_map, unwarp_map, archive_file_path, display_cols, src=None, logger=None):
+    '''
+        the live image undistorted, the latest archive image, the two blended,
+        and the live image unwarped to the arena - stacked, or the one selected by src
+    '''
+    undist_arr = ImageMapper.warp_colour(img_arr, undistort_map)
+    undist_img = Image.fromarray(undist_arr)
+    undist_img_draw = ImageDraw.Draw(undist_img)
+    undist_img_draw.text((5, 5), 'Live', font_size=24)
+
+    arena_arr = ImageMapper.warp_colour(undist_arr, unwarp_map)
+    arena_img = Image.fromarray(arena_arr)
+
+    if archive_file_path is not None:
+        arc_img = Image.open(archive_file_path)
+        arc_img_draw = ImageDraw.Draw(arc_img)
+        text_width = arc_img_draw.textlength(archive_file_path)
+        arc_img_draw.text((display_cols - (text_width * 24 / arc_img_draw.font.size), 5),
+                          '{}'.format(archive_file_path), font_size=24)
+    else:
+        # create a blank image to pad payload
+        arc_img = Image.new('RGB', undist_img.size, 'brown')
+        arc_img_draw = ImageDraw.Draw(arc_img)
+        arc_img_draw.text((50, 5), 'No Archive Images Available - use capture...', font_size=24)
+
+    # blended archive with live view
+    blend_img = None
+    try:
+        blend_img = Image.blend(undist_img.convert("RGBA"), arc_img.convert(
+            "RGBA"), 0.5).convert('RGB')
+
+    except Exception as e:
+        if logger:
+            logger.error('Error blending images: ' + str(e) +
+                         ' sizes: ' + str(undist_img.size) + ' ' + str(arc_img.size))
+
+    # stack images?
+    if src is None:
+        images = [undist_img, arc_img, blend_img, arena_img]
+    elif src == '0':
+        images = [undist_img]
+    elif src == '1':
+        images = [arc_img]
+    elif src == '2':
+        images = [blend_img]
+    elif src == '3':
+        images = [arena_img]
+    images = [img for img in images if img is not None]
+
+    widths, heights = zip(*(i.size for i in images))
+
+    max_width = max(widths)
+    total_height = sum(heights)
+
+    stack_img = Image.new('RGB', (max_width, total_height))
+
+    y_offset = 0
+    for img in images:
+        stack_img.paste(img, (0, y_offset))
+        y_offset += img.size[1]
+
+    return encode(stack_img)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import pickle
+    import tempfile
+    from matplotlib.font_manager import findfont, FontProperties
+
+    from infill_sharpener import Projection
+    from render_scheduler import RenderScheduler
+
+    font_path = str(findfont(FontProperties(family=['sans-serif'])))
+    rows, cols = 480, 640
+    rng = np.random.default_rng(1)
+    img_arr = rng.integers(0, 255, (rows, cols, 3), dtype=np.uint8)
+    route_pc = [(10, 10), (90, 10), (90, 90), (10, 90)]
+
+    # plan perspectives as the server would pass them, from the class geometry alone
+    poses.Pose.init_geometry(dict(
+        target_width_m=0.2, target_length_m=0.3, target_radius_m=0.1, target_offset_pc=50, axle_track_m=0.25,
+        tip_offset_ym=0.15, tail_offset_ym=0.15, body_width_m=0.4, body_length_m=0.5,
+        arena_width_m=8.0, arena_length_m=6.0, image_width_px=cols, image_height_px=rows))
+    pose_geometry = poses.Pose.geometry()
+    plan = poses.Pose(4.0, 3.0, radians(45), camera=False).plan
+    assert pickle.loads(pickle.dumps(plan)).tip_x_px == plan.tip_x_px
+
+    # a target projection, assessed as the request does, survives the trip to a worker process
+    score_props = {'span': (0.1, 0.23, 0.1, 20), 'area': (0.05, 0.017, 0.05, 20), 'isoscelicity': (0.35, 1.0, 0.0, 20),
+                   'solidity': (0.35, 1.0, 0.0, 20), 'fitness': (0.35, 1.0, 0.0, 20)}
+    triangle = np.array([[0, 0], [0.15, 0], [0.075, 0.23]]) + [2, 2]
+    contour = np.concatenate([triangle[i] + np.outer(np.linspace(0, 1, 40, endpoint=False), triangle[(i + 1) % 3] - triangle[i])
+                              for i in range(3)]) + rng.normal(0, 0.002, (120, 2))
+    proj = Projection('1-0', 0, contour)
+    proj.assess(score_props)
+    assert pickle.loads(pickle.dumps(proj)).conf_pc == proj.conf_pc
+
+    excursion_log = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+    excursion_log.write('heading,,,,,,,,x_m,y_m,t_deg\n')
+    for n in range(50):
+        excursion_log.write('{0},,,,,,,,{1},{2},{3}\n'.format(n, 1 + n * 0.1, 1 + n * 0.05, n * 7))
+    excursion_log.close()
+
+    entry = '2024-01-01 12:00:00,1,0|{0}|{1}|{2}'.format(
+        np.zeros((60, 60), np.uint8).tolist(), np.zeros((60, 60), np.uint8).tolist(), contour.tolist())
+
+    renders = {
+        'arena': (render_arena, (img_arr, None, 1, time.time(), route_pc, 5,
+                                 [(0.25, 0.25), (7.75, 0.25), (7.75, 5.75), (0.25, 5.75), (0.25, 0.25)],
+                                 '#7cf96b', 8.0, 6.0, 1, plan, (True, False), plan,
+                                 [('point', (2.0, 2.0), 'red', 'm'), ('speed', 0.5, 'blue', 'm/s')], font_path)),
+        'contours': (render_contours, (img_arr, 1, time.time(), [np.array([[100, 100], [100, 200], [200, 150]])], {0: 0.9}, True,
+                                       [[(10, 10), (630, 10)], [(630, 10), (630, 470)]], 1, font_path)),
+        'contour_entry': (render_contour_entry, (entry, score_props, np.array([[10, 10], [10, 50], [50, 30]]), False)),
+        'projection': (render_projection, (proj, '2024-01-01 12:00:00', img_arr[:, :, 0], img_arr)),
+        'tracking': (render_tracking, (rows, cols, route_pc, excursion_log.name, pose_geometry)),
+        'calib_stack': (render_calib_stack, (img_arr, None, None, None, cols)),
+    }
+    jpeg = b'\xff\xd8'
+
+    # each in a worker process, as the server renders them
+    scheduler = RenderScheduler(max_pending=len(renders), deadline_secs=60)
+    for name, (fn, args) in renders.items():
+        start = time.perf_counter()
+        result = scheduler.render(name, fn, *args, process=True)
+        print('{0:<14} {1:7d} bytes {2:6.3f}s'.format(name, len(result), time.perf_counter() - start))
+        assert isinstance(result, bytes) and result.startswith(jpeg), name
+    assert scheduler.counts['completed'] == len(renders)
+    scheduler.stop()
+
+    assert message_png('No Contours Available', font_path, 'grey').startswith(b'\x89PNG')
+    os.remove(excursion_log.name)
+    print('render_lib tests passed')
@@ -0,0 +1,339 @@
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import constants
+from fixed_length_dict import FixedLengthDict
+from metrics import registry as stage_metrics
+
+'''
+    Render scheduler
+
+    The web interface's image renders run here rather than on the web server's
+    threads, so that however many pages are open they cannot crowd out the
+    governor, camera worker and mower comms, which keep the interpreter to
+    themselves between renders:
+
+    - renders that only need picklable inputs, e.g. matplotlib plots of a log
+      file, run in a worker process, outside the interpreter lock altogether
+    - renders that need the server's state run on a small pool of threads, so
+      only that many compete with the control loop at once
+    - render workers run at a lower operating system priority
+    - a render that cannot start because too many are pending, or that misses
+      its deadline, is shed and the last render of the same request served instead,
+      or, with none to serve, RenderShed raised for the request to be refused,
+      so however many requests arrive at most max_pending renders are queued or running
+
+    Renders on the threads still take the interpreter lock in turn with the
+    control loop: bounding them to few threads limits how much of it they
+    take, it does not remove them from it. Only the process renders do that.
+
+    A jitter probe, a thread waking at a fixed period as the control loop does,
+    measures how late it wakes with and without renders in progress.
+'''
+
+
+class RenderShed(Exception):
+    '''
+        a render refused, too many pending or past its deadline, with no earlier render to serve
+    '''
+
+
+def lower_thread_priority(nice):
+    '''
+        raise the calling thread's niceness, linux applies it per thread
+    '''
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError):
+        pass  # not supported here
+
+
+def lower_process_priority(nice):
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+
+
+def call_render(fn, args, kwargs):
+    '''
+        worker process entry, renders returning a buffer come back as bytes
+    '''
+    result = fn(*args, **kwargs)
+    return result.getvalue() if hasattr(result, 'getvalue') else result
+
+
+class JitterProbe(threading.Thread):
+    '''
+        wakes every period and records how late it woke, split by whether renders were in progress
+    '''
+
+    def __init__(self, scheduler, period_secs=constants.RENDER_JITTER_PROBE_PERIOD_SECS, history=1000):
+        super().__init__(name='jitter-probe', daemon=True)
+        self.scheduler = scheduler
+        self.period_secs = period_secs
+        self.samples = {'idle': deque([], history), 'rendering': deque([], history)}
+        self.running = True
+
+    def run(self):
+        while self.running:
+            rendering = self.scheduler.active > 0
+            start = time.perf_counter()
+            time.sleep(self.period_secs)
+            late_secs = max(time.perf_counter() - start - self.period_secs, 0.0)
+            mode = 'rendering' if rendering and self.scheduler.active > 0 else 'idle'
+            self.samples[mode].append(late_secs)
+            stage_metrics.observe('jitter_' + mode, late_secs)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        result = {}
+        for mode, samples in self.samples.items():
+            late_ms = np.array(samples) * 1000
+            result[mode] = {
+                'count': int(late_ms.size),
+                'mean_ms': round(float(np.mean(late_ms)), 3) if late_ms.size > 0 else None,
+                'p95_ms': round(float(np.percentile(late_ms, 95)), 3) if late_ms.size > 0 else None,
+                'max_ms': round(float(np.max(late_ms)), 3) if late_ms.size > 0 else None
+            }
+        return result
+
+
+class RenderScheduler():
+    '''
+        runs renders on a bounded thread pool or process pool,
+        keeping the last render of each key to serve when a render is shed
+    '''
+
+    def __init__(
+        self,
+        threads=constants.RENDER_THREADS,
+        processes=constants.RENDER_PROCESSES,
+        max_pending=constants.RENDER_MAX_PENDING,
+        deadline_secs=constants.RENDER_DEADLINE_SECS,
+        nice=constants.RENDER_NICE,
+        cache_size=constants.RENDER_CACHE_SIZE,
+        logger=None
+    ):
+        self.processes = processes
+        self.max_pending = max_pending
+        self.deadline_secs = deadline_secs
+        self.nice = nice
+        self.logger = logger if logger is not None else logging.getLogger('pxm')
+        self.thread_pool = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='render', initializer=lower_thread_priority, initargs=(nice,))
+        self.process_pool = None
+        self.cache = FixedLengthDict(cache_size)  # key: last result
+        self._lock = threading.Lock()
+        self.active = 0  # submitted and not yet complete
+        self.counts = {'submitted': 0, 'completed': 0, 'failed': 0, 'shed_pending': 0, 'shed_deadline': 0}
+        self.probe = None
+
+    def start_probe(self):
+        if self.probe is None:
+            self.probe = JitterProbe(self)
+            self.probe.start()
+
+    def get_process_pool(self):
+        if self.process_pool is None:
+            # a forked copy of a threaded server could inherit a held lock
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context(method),
+                initializer=lower_process_priority, initargs=(self.nice,))
+        return self.process_pool
+
+    def submit(self, fn, args, kwargs, process):
+        if process and self.processes > 0:
+            try:
+                return self.get_process_pool().submit(call_render, fn, args, kwargs)
+            except BrokenProcessPool:
+                # a worker died, start afresh
+                self.process_pool = None
+                return self.get_process_pool().submit(call_render, fn, args, kwargs)
+        return self.thread_pool.submit(fn, *args, **kwargs)
+
+    def completed(self, key, future):
+        with self._lock:
+            self.active -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.counts['failed'] += 1
+            else:
+                self.counts['completed'] += 1
+                self.cache[key] = future.result()
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error('Error in RenderScheduler {0}: {1}'.format(key[0], future.exception()))
+
+    def render(self, key, fn, *args, process=False, deadline_secs=None, **kwargs):
+        '''
+            result of fn(*args, **kwargs) or, when shed, the last result for key
+            process renders need fn and its arguments to be picklable
+            with no earlier result to fall back on, raises RenderShed when max_pending
+            renders are already pending or the deadline passes
+        '''
+        deadline_secs = self.deadline_secs if deadline_secs is None else deadline_secs
+        with self._lock:
+            cached = self.cache.get(key)
+            if self.active >= self.max_pending:
+                self.counts['shed_pending'] += 1
+                if cached is None:
+                    raise RenderShed('{0} not started, {1} renders pending'.format(key[0], self.active))
+                return cached
+            self.active += 1
+            self.counts['submitted'] += 1
+        try:
+            future = self.submit(fn, args, kwargs, process)
+        except Exception:
+            with self._lock:
+                self.active -= 1
+            raise
+        future.add_done_callback(lambda f: self.completed(key, f))
+        try:
+            return future.result(timeout=deadline_secs)
+        except FutureTimeoutError:
+            # the render carries on and refreshes the cache for the next request
+            with self._lock:
+                self.counts['shed_deadline'] += 1
+            if cached is None:
+                raise RenderShed('{0} not rendered within {1}s'.format(key[0], deadline_secs))
+            return cached
+
+    def stats(self):
+        with self._lock:
+            result = dict(self.counts, active=self.active, cached=len(self.cache))
+        if self.probe is not None:
+            result['jitter'] = self.probe.stats()
+        return result
+
+    def stop(self):
+        if self.probe is not None:
+            self.probe.stop()
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    # sum over a range holds the interpreter lock throughout, as a long render's C calls can
+    render_args = (range(20000000),)
+
+    def jitter_during(label, render_all):
+        scheduler = RenderScheduler(max_pending=8, deadline_secs=30)
+        scheduler.start_probe()
+        time.sleep(0.3)
+        start = time.perf_counter()
+        render_all(scheduler)
+        secs = time.perf_counter() - start
+        time.sleep(0.1)
+        scheduler.probe.stop()
+        jitter = scheduler.probe.stats()
+        print('{0:<28} renders {1:6.2f}s  probe lateness idle p95 {2}ms, rendering p95 {3}ms max {4}ms'.format(
+            label, secs, jitter['idle']['p95_ms'], jitter['rendering']['p95_ms'], jitter['rendering']['max_ms']))
+        scheduler.stop()
+        return scheduler
+
+    def on_web_threads(scheduler):
+        # as the web server's threads render now, all at once
+        with scheduler._lock:
+            scheduler.active += 1
+        threads = [threading.Thread(target=sum, args=render_args) for _n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with scheduler._lock:
+            scheduler.active -= 1
+
+    def python_render(n):
+        # a render in bytecode, which yields the interpreter lock every switch interval
+        total = 0
+        for i in range(n):
+            total += i
+        return total
+
+    def on_render_threads(scheduler, fn=sum, args=render_args):
+        # renders needing the server's state, bounded to the render threads but still in this interpreter
+        threads = [threading.Thread(target=scheduler.render, args=(('render', n), fn) + args)
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def in_process(scheduler):
+        threads = [threading.Thread(target=scheduler.render, args=(('sum', n), sum) + render_args,
+                                    kwargs={'process': True}) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    jitter_during('web server threads', on_web_threads)
+    jitter_during('render threads', on_render_threads)
+    jitter_during('render threads, bytecode', lambda scheduler: on_render_threads(
+        scheduler, python_render, (5000000,)))
+    process_scheduler = jitter_during('render worker process', in_process)
+    assert process_scheduler.counts['completed'] == 4
+
+    # shedding: pending renders are refused, and late ones served from the cache
+    # sequenced by events, a render misses its deadline only by waiting on one not yet set
+    scheduler = RenderScheduler(threads=1, processes=0, max_pending=1, deadline_secs=5)
+
+    def wait_idle():
+        # the pending count drops in the future's callback, just after its result is returned
+        give_up = time.perf_counter() + 5
+        while scheduler.active > 0 and time.perf_counter() < give_up:
+            time.sleep(0.001)
+        assert scheduler.active == 0
+
+    assert scheduler.render('img', lambda: b'first') == b'first'
+    started = threading.Event()
+    blocker = threading.Event()
+    other = threading.Thread(target=scheduler.render, args=('other', lambda: started.set() or blocker.wait(5)))
+    other.start()
+    started.wait(5)
+    assert scheduler.render('img', lambda: b'second') == b'first'  # shed, one pending already
+    blocker.set()
+    other.join()
+    wait_idle()
+    gate = threading.Event()
+    assert scheduler.render('img', lambda: gate.wait(5) and b'third', deadline_secs=0.05) == b'first'  # missed its deadline
+    gate.set()
+    wait_idle()
+    assert scheduler.render('img', lambda: b'fourth') == b'fourth'
+    # a stuck render with nothing cached is refused at the deadline rather than waited on
+    stuck = threading.Event()
+    start = time.perf_counter()
+    try:
+        scheduler.render('stuck', stuck.wait, 5, deadline_secs=0.05)
+        assert False, 'stuck render returned'
+    except RenderShed:
+        assert time.perf_counter() - start < 1.0
+    # while it is stuck, a request with nothing cached is refused at once rather than queued behind it
+    start = time.perf_counter()
+    try:
+        scheduler.render('queued', lambda: b'never')
+        assert False, 'queued behind a stuck render'
+    except RenderShed:
+        assert time.perf_counter() - start < 0.5
+    assert scheduler.render('img', lambda: b'fifth') == b'fourth'
+    stuck.set()
+    wait_idle()
+    print(scheduler.stats())
+    assert scheduler.counts['shed_pending'] == 3 and scheduler.counts['shed_deadline'] == 2
+    assert scheduler.counts['submitted'] == 5
+    scheduler.stop()
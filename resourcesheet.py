@@ -1,4 +1,4 @@
-import time
+from time import perf_counter
 
 from utilities import get_mem_usage
 
@@ -16,7 +16,7 @@ class Timesheet():
         if self.setname is not None:
             self.checkpoints = {}
             self.memcheckpoints = {}
-            self.start_time = time.time()
+            self.start_time = perf_counter()
             self.start_mem_mb, _ = get_mem_usage()
 
     def add(self, name):
@@ -24,7 +24,7 @@ class Timesheet():
             add an entry
         '''
         if self.setname is not None:
-            self.checkpoints[name] = time.time()
+            self.checkpoints[name] = perf_counter()
             self.memcheckpoints[name], _ = get_mem_usage() 
 
     def __repr__(self):
@@ -32,25 +32,26 @@ class Timesheet():
             result = 'Empty Resourcesheet'
         else:
             '''
-                Add printed entry and...
+                Add printed entry (to copies) and...
                 loop through entries calculating relative time & memory cost
             '''
-            self.add('self.printed')
+            checkpoints = dict(self.checkpoints)
+            memcheckpoints = dict(self.memcheckpoints)
+            checkpoints['self.printed'] = perf_counter()
+            memcheckpoints['self.printed'], _ = get_mem_usage()
+            times = [self.start_time] + list(checkpoints.values())
+            mems = [self.start_mem_mb] + list(memcheckpoints.values())
             tmplt = '{}: {:.3f}s {:>3.0f}% {:>3.3f}Mb\n'
             extra_chars = 21
-            total = list(self.checkpoints.values())[-1] - self.start_time
-            total_mem = list(self.memcheckpoints.values())[-1] - self.start_mem_mb
-            widest = max([len(k) for k in self.checkpoints])
+            total = times[-1] - self.start_time
+            total_mem = mems[-1] - self.start_mem_mb
+            widest = max([len(k) for k in checkpoints])
             result = '\n' + (widest + extra_chars) * '-'
             result += '\n' + self.setname.center(widest + extra_chars, ' ')
             result += '\n' + (widest + extra_chars) * '-' + '\n'
-            for i, (k, v) in enumerate(self.checkpoints.items()):
-                if i == 0:
-                    elapsed = v - self.start_time
-                    used_mem = list(self.memcheckpoints.values())[i] - self.start_mem_mb
-                else:
-                    elapsed = v - list(self.checkpoints.values())[i - 1]
-                    used_mem = list(self.memcheckpoints.values())[i] - list(self.memcheckpoints.values())[i-1]
+            for i, k in enumerate(checkpoints):
+                elapsed = times[i + 1] - times[i]
+                used_mem = mems[i + 1] - mems[i]
                 result += tmplt.format(k.rjust(widest, ' '),
                                        elapsed, 
                                        100 * elapsed / (total + 0.000001),
@@ -60,4 +61,4 @@ class Timesheet():
             result += (widest + extra_chars) * '=' + '\n'
             result += tmplt.format('Total'.rjust(widest, ' '), total, 100, total_mem)
 
-        return result
\ No newline at end of file
+        return result
@@ -0,0 +1,287 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import constants
+from fixed_length_dict import FixedLengthDict
+from utilities import route_pc_to_metres
+
+'''
+    Route planning service
+
+    Routes are calculated by the pattern plug-ins in patterns/ and cached,
+    keyed by the pattern module and a hash of its source (and of the sibling
+    patterns it builds on), the fence, the arena size, the cutter diameter and
+    any pattern parameters. When the fence changes every pattern can be planned
+    in the background, so choosing a pattern or driving its route finds the
+    route already calculated. A request for a route being planned waits for it
+    rather than planning it twice.
+'''
+
+PATTERNS_PATH = (Path(__file__).parent / 'patterns').resolve()
+
+
+class PlannedRoute():
+    '''
+        a pattern's route in arena percentages and metres,
+        or the exception raised calculating it
+    '''
+
+    def __init__(self, route_pc, route_m, exception='', secs=0.0):
+        self.route_pc = route_pc
+        self.route_m = route_m
+        self.exception = exception
+        self.secs = secs
+
+    def __repr__(self):
+        return '{0} nodes in {1:.1f}ms {2}'.format(len(self.route_m), self.secs * 1000, self.exception)
+
+
+class RoutePlanner():
+
+    def __init__(self, patterns_path=PATTERNS_PATH, cache_size=constants.ROUTE_CACHE_SIZE, logger=None):
+        self.patterns_path = Path(patterns_path)
+        self.logger = logger if logger is not None else logging.getLogger('mow-patterns')
+        self.routes = FixedLengthDict(cache_size)  # key: Future of PlannedRoute
+        self.modules = {}  # module name: (source hash, module)
+        self.sources = {}  # module name: (file stamp, source digest, sibling module names)
+        self._lock = threading.RLock()
+        self.background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route-planner')
+        self.precompute_key = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def module_name(pattern_name):
+        '''
+            plug-in module name from a pattern name e.g. Lane Stripes => lane_stripes
+        '''
+        return pattern_name.replace(' ', '_').lower()
+
+    def pattern_names(self):
+        return sorted(p.stem for p in self.patterns_path.glob('*.py') if p.stem != 'template')
+
+    def source_digest(self, module_name):
+        '''
+            digest of the module's own source and the patterns it imports,
+            read again only when the file's modification time or size changes
+        '''
+        file_path = self.patterns_path / (module_name + '.py')
+        file_stat = file_path.stat()
+        stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+        with self._lock:
+            cached = self.sources.get(module_name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+        with open(file_path, 'rb') as source_file:
+            source = source_file.read()
+        digest = hashlib.blake2b(source, digest_size=16).digest()
+        siblings = [sibling.decode() for sibling in sorted(set(re.findall(rb'from\s+patterns\s+import\s+(\w+)', source)))]
+        with self._lock:
+            self.sources[module_name] = (stamp, digest, siblings)
+        return digest, siblings
+
+    def source_hash(self, module_name, seen=None):
+        '''
+            hash of the module's source and of the patterns it imports
+        '''
+        seen = set() if seen is None else seen
+        seen.add(module_name)
+        source_digest, siblings = self.source_digest(module_name)
+        digest = hashlib.blake2b(source_digest, digest_size=16)
+        for sibling in siblings:
+            if sibling not in seen and (self.patterns_path / (sibling + '.py')).exists():
+                digest.update(self.source_hash(sibling, seen).encode())
+        return digest.hexdigest()
+
+    def load_module(self, module_name, source_hash):
+        '''
+            the plug-in module, executed again only when its source changes
+        '''
+        with self._lock:
+            loaded = self.modules.get(module_name)
+            if loaded is not None and loaded[0] == source_hash:
+                return loaded[1]
+            file_path = os.path.join(self.patterns_path, module_name) + '.py'
+            spec = importlib.util.spec_from_file_location(module_name, file_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.modules[module_name] = (source_hash, module)
+            return module
+
+    @staticmethod
+    def route_key(module_name, source_hash, fence_points, arena_width_m, arena_length_m, cutter_dia_m, params):
+        return (
+            module_name,
+            source_hash,
+            tuple((float(p.x), float(p.y)) for p in fence_points),
+            float(arena_width_m),
+            float(arena_length_m),
+            float(cutter_dia_m),
+            constants.MINIMUM_INTER_NODE_DISTANCE_M,
+            tuple(sorted(params.items()))
+        )
+
+    def calculate(self, module_name, source_hash, fence_points, arena_width_m, arena_length_m, cutter_dia_m,
+                  debug, params):
+        start = time.perf_counter()
+        try:
+            module = self.load_module(module_name, source_hash)
+            route_pc = module.calculate_route(
+                fence_points, arena_width_m, arena_length_m, cutter_dia_m, self.logger, debug, **params)
+            route_m = route_pc_to_metres(
+                arena_width_m, arena_length_m, route_pc, min_internode_dist_m=constants.MINIMUM_INTER_NODE_DISTANCE_M)
+            return PlannedRoute(route_pc, route_m, secs=time.perf_counter() - start)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.logger.error('Error in RoutePlanner calculating {0}: {1} on line {2}'.format(
+                module_name, e, err_line))
+            return PlannedRoute([], [], str(e), time.perf_counter() - start)
+
+    def forget_failure(self, key, future):
+        '''
+            a route that raised is not kept, so asking again calculates it again
+        '''
+        if future.result().exception:
+            with self._lock:
+                if self.routes.get(key) is future:
+                    self.routes.pop(key)
+
+    def submit(self, pattern_name, fence_points, arena_width_m, arena_length_m, cutter_dia_m,
+               debug=False, background=False, **params):
+        '''
+            Future of the pattern's PlannedRoute, from the cache if planned or being planned
+            planned here unless background, when the planner's thread plans it
+        '''
+        module_name = self.module_name(pattern_name)
+        source_hash = self.source_hash(module_name)
+        key = self.route_key(module_name, source_hash, fence_points, arena_width_m, arena_length_m,
+                             cutter_dia_m, params)
+        args = (module_name, source_hash, list(fence_points), arena_width_m, arena_length_m, cutter_dia_m,
+                debug, params)
+        with self._lock:
+            future = self.routes.get(key)
+            if future is not None:
+                self.hits += 1
+                return future
+            self.misses += 1
+            if background:
+                future = self.background.submit(self.calculate, *args)
+            else:
+                future = Future()
+            self.routes[key] = future
+            future.add_done_callback(lambda done: self.forget_failure(key, done))
+            if background:
+                return future
+        future.set_result(self.calculate(*args))
+        return future
+
+    def plan(self, pattern_name, fence_points, arena_width_m, arena_length_m, cutter_dia_m, debug=False, **params):
+        '''
+            the pattern's PlannedRoute, waiting if it is being planned in the background
+        '''
+        return self.submit(pattern_name, fence_points, arena_width_m, arena_length_m, cutter_dia_m,
+                           debug, **params).result()
+
+    def precompute(self, fence_points, arena_width_m, arena_length_m, cutter_dia_m, pattern_names=None):
+        '''
+            plan every pattern in the background, once per fence, arena and cutter
+        '''
+        precompute_key = (tuple((float(p.x), float(p.y)) for p in fence_points),
+                          arena_width_m, arena_length_m, cutter_dia_m)
+        with self._lock:
+            if precompute_key == self.precompute_key:
+                return []
+            self.precompute_key = precompute_key
+        if pattern_names is None:
+            pattern_names = self.pattern_names()
+        return [self.submit(pattern_name, fence_points, arena_width_m, arena_length_m, cutter_dia_m,
+                            background=True) for pattern_name in pattern_names]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cached': len(self.routes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'modules': len(self.modules)
+            }
+
+
+# process-wide planner
+planner = RoutePlanner()
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    from math import cos, sin, pi
+    from forms.point import Point
+
+    logging.basicConfig(level=logging.ERROR)
+
+    def fence(n, radius_pc=35):
+        # irregular polygon about the arena centre
+        return [Point(i, round(50 + radius_pc * (1 + 0.2 * sin(3 * i)) * cos(2 * pi * i / n), 3),
+                      round(50 + radius_pc * (1 + 0.2 * sin(3 * i)) * sin(2 * pi * i / n), 3)) for i in range(n)]
+
+    test_planner = RoutePlanner()
+    for fence_points in (fence(4, 25), fence(60)):
+        print('fence of {0} points'.format(len(fence_points)))
+        for pattern_name in test_planner.pattern_names():
+            cold = test_planner.plan(pattern_name, fence_points, 6.2, 6.2, 0.1)
+            start = time.perf_counter()
+            warm = test_planner.plan(pattern_name, fence_points, 6.2, 6.2, 0.1)
+            warm_secs = time.perf_counter() - start
+            # a route that raised is not cached
+            assert (warm is cold) != bool(cold.exception)
+            print('    {0:<24} {1:>6} nodes cold {2:8.1f}ms cached {3:6.3f}ms {4}'.format(
+                pattern_name, len(cold.route_m), cold.secs * 1000, warm_secs * 1000, cold.exception))
+
+    # a new fence is planned in the background, the route asked for waits on it rather than planning again
+    new_fence = fence(80, 30)
+    start = time.perf_counter()
+    futures = test_planner.precompute(new_fence, 6.2, 6.2, 0.1)
+    submitted_secs = time.perf_counter() - start
+    misses = test_planner.misses
+    route = test_planner.plan('Lane Stripes', new_fence, 6.2, 6.2, 0.1)
+    assert test_planner.misses == misses
+    for future in futures:
+        future.result()
+    print('background precompute of {0} patterns submitted in {1:.2f}ms, stats {2}'.format(
+        len(futures), submitted_secs * 1000, test_planner.stats()))
+    assert test_planner.precompute(new_fence, 6.2, 6.2, 0.1) == []
+
+    # a route that raised is calculated again when asked again
+    misses = test_planner.misses
+    failed = test_planner.plan('Lane Stripes', new_fence, 6.2, 6.2, 0.1, no_such_param=1)
+    assert failed.exception and test_planner.misses == misses + 1
+    test_planner.plan('Lane Stripes', new_fence, 6.2, 6.2, 0.1, no_such_param=1)
+    assert test_planner.misses == misses + 2
+
+    # sources are read again only when they change
+    import shutil
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_patterns_path = Path(tmp_folder) / 'patterns'
+        shutil.copytree(PATTERNS_PATH, tmp_patterns_path)
+        tmp_planner = RoutePlanner(tmp_patterns_path)
+        module_name = tmp_planner.pattern_names()[0]
+        before = tmp_planner.source_hash(module_name)
+        start = time.perf_counter()
+        for _i in range(1000):
+            assert tmp_planner.source_hash(module_name) == before
+        # 1000 calls, so seconds read as milliseconds per call
+        print('cached source hash {0:.3f}ms per call'.format(time.perf_counter() - start))
+        pattern_path = tmp_patterns_path / (module_name + '.py')
+        with open(pattern_path, 'a') as pattern_file:
+            pattern_file.write('\n# changed\n')
+        assert tmp_planner.source_hash(module_name) != before
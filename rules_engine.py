@@ -13,6 +13,8 @@ from odometry import MovementCode
 from forms.rule import RuleScope
 import geom_lib
 from destination import Attitude
+from itinerary import RouteProgress
+from strategy_batch import BatchEvaluator
 import constants
 
 class RulesEngine():
@@ -76,6 +78,40 @@ class RulesEngine():
         self.rules = rules
         self.rules.sort(key=lambda rule: rule.priority)
 
+    def config_context(self, config, telem):
+        '''
+            the terms that come from the configuration and telemetry
+        '''
+        context = {}
+        context['v'] = config['mower.velocity_full_speed_mps']
+        context['w'] = config['mower.axle_track_m']
+        context['n'] = config['mower.motion.set_rotation_speed_percent']
+        context['s'] = config['mower.motion.set_drive_speed_percent']
+        
+        # some will come from telemetry - if available...
+        try:
+            num_sensors = len(config['mower.sens_factor_list'].split(','))
+        except:
+            num_sensors = 0
+        if telem is not None and telem != {}:
+            try:
+                cutter1_state = telem['cutter1']
+                cutter2_state = telem['cutter2']
+            except Exception:
+                cutter1_state = cutter2_state = False
+            context['cut1'] = int(cutter1_state)
+            context['cut2'] = int(cutter2_state)
+            try:
+                scaled_sensors = list(telem['sensors'].values())
+            except Exception:
+                scaled_sensors = [-1] * num_sensors
+            context['sens'] = scaled_sensors
+        else:
+            context['cut1'] = -1
+            context['cut2'] = -1
+            context['sens'] = [-1] * num_sensors
+        return context
+
     def build_context(
         self,
         snapshot,
@@ -137,38 +173,9 @@ class RulesEngine():
                 prev_dest = None
                 tgt_dest = None
 
-            # some will come from the configuration
-            velocity_full_speed_mps = config['mower.velocity_full_speed_mps']
-            self.context['v'] = velocity_full_speed_mps
-            axle_track_m = config['mower.axle_track_m']
-            self.context['w'] = axle_track_m
-            n = config['mower.motion.set_rotation_speed_percent']
-            self.context['n'] = n
-            s = config['mower.motion.set_drive_speed_percent']
-            self.context['s'] = s
-            
-            # some will come from telemetry - if available...
-            try:
-                num_sensors = len(config['mower.sens_factor_list'].split(','))
-            except:
-                num_sensors = 0
-            if telem is not None and telem != {}:
-                try:
-                    cutter1_state = telem['cutter1']
-                    cutter2_state = telem['cutter2']
-                except Exception:
-                    cutter1_state = cutter2_state = False
-                self.context['cut1'] = int(cutter1_state)
-                self.context['cut2'] = int(cutter2_state)
-                try:
-                    scaled_sensors = list(telem['sensors'].values())
-                except Exception:
-                    scaled_sensors = [-1] * num_sensors
-                self.context['sens'] = scaled_sensors
-            else:
-                self.context['cut1'] = -1
-                self.context['cut2'] = -1
-                self.context['sens'] = [-1] * num_sensors
+            # some will come from the configuration and telemetry
+            self.context.update(self.config_context(config, telem))
+            axle_track_m = self.context['w']
             
             # some will come from the current pose and might be undesirable numpy float types!
             if pose is not None:
@@ -191,6 +198,15 @@ class RulesEngine():
             self.context['c'] = c
             self.context['rc'] = rc
 
+            # whole route progress, from the itinerary's precomputed path geometry
+            if itinerary is not None and x is not None and y is not None:
+                route_progress = itinerary.route_progress((x, y), t_zero)
+            else:
+                route_progress = RouteProgress()
+            self.context['rp'] = route_progress.completed_pc
+            self.context['rm'] = route_progress.remaining_m
+            self.context['eta'] = route_progress.eta_secs
+
             # some will come from the previous destination
             if prev_dest is not None:
                 if trace:
@@ -236,7 +252,7 @@ class RulesEngine():
                     if trace:
                         self.logger.debug(
                             'build_context using x1, y1..x2, y2 for path heading')
-                        path_heading = get_angle_between_cartesian_points(x1, y1, x2, y2)
+                    path_heading = get_angle_between_cartesian_points(x1, y1, x2, y2)
                 else:
                     self.logger.debug('build_context NO path heading')
                     path_heading = 0
@@ -559,3 +575,10 @@ class RulesEngine():
             just parse the supplied rule using our context and safe functions
         '''
         rule.parse(self.context, self.safe_functions, self.terms_units, trace=trace)
+
+    def evaluate_batch(self, poses, itinerary, config, telem, scope=RuleScope.STATIONARY):
+        '''
+            what-if: the rule this engine would select, and its command, at each of an (n, 3) array of
+            hypothetical poses - x_m, y_m, heading_rad - leaving its own context and rules untouched
+        '''
+        return BatchEvaluator(self).evaluate(poses, itinerary, config, telem, scope)
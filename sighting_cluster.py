@@ -1,45 +1,108 @@
-import numpy as np
+import time
+from collections import deque
+from math import sin, cos, atan2, radians, degrees, hypot, sqrt
+
+import constants
+
 
 class SightingCluster():
     '''
         Represents a cluster of sightings in the same place
+        means are maintained incrementally (Welford),
+        heading as a circular mean of unit vectors
     '''
-    
 
-    def __init__(self, threshold):
+
+    def __init__(self, threshold, max_history=constants.SIGHTING_HISTORY_LENGTH):
         '''
             constructor
         '''
         self.threshold = threshold
-        self.pose_tuples = []
+        self.pose_tuples = deque([], max_history)
+        self.count = 0
         self.mean_pose_x = None
         self.mean_pose_y = None
-        
-    def add(self, p):
-        self.pose_tuples.append((round(p[0], 3), round(p[1], 3), int(p[2])))
-        (self.mean_pose_x, self.mean_pose_y, _) = np.mean(self.pose_tuples, axis=0)
-        
-    def accept(self, p):
+        self._m2_x = 0.0
+        self._m2_y = 0.0
+        self._mean_sin = 0.0
+        self._mean_cos = 0.0
+        self.first_seen = None
+        self.last_seen = None
+        self._weight = 0.0
+
+    def add(self, p, t=None):
+        if t is None:
+            t = time.time()
+        heading_deg = int(p[2]) if len(p) > 2 else 0
+        self.pose_tuples.append((round(p[0], 3), round(p[1], 3), heading_deg))
+        self.count += 1
+        if self.mean_pose_x is None:
+            self.mean_pose_x = float(p[0])
+            self.mean_pose_y = float(p[1])
+            self.first_seen = t
+        else:
+            delta_x = p[0] - self.mean_pose_x
+            delta_y = p[1] - self.mean_pose_y
+            self.mean_pose_x += delta_x / self.count
+            self.mean_pose_y += delta_y / self.count
+            self._m2_x += delta_x * (p[0] - self.mean_pose_x)
+            self._m2_y += delta_y * (p[1] - self.mean_pose_y)
+        heading_rad = radians(heading_deg)
+        self._mean_sin += (sin(heading_rad) - self._mean_sin) / self.count
+        self._mean_cos += (cos(heading_rad) - self._mean_cos) / self.count
+        self._weight = self.weight(t) + 1.0
+        self.last_seen = t
+
+    def accept(self, p, t=None):
         result = False
         if self.mean_pose_x is None:
-            self.add(p)
-            result = True            
-        elif np.hypot(p[0] - self.mean_pose_x, p[1] - self.mean_pose_y) <= self.threshold:
-            self.add(p)
+            self.add(p, t)
+            result = True
+        elif self.distance(p) <= self.threshold:
+            self.add(p, t)
             result = True
         return result
-    
+
+    def distance(self, p):
+        return hypot(p[0] - self.mean_pose_x, p[1] - self.mean_pose_y)
+
+    def weight(self, t=None, half_life_secs=constants.SIGHTING_HALF_LIFE_SECS):
+        '''
+            sighting count decayed exponentially by age
+        '''
+        if self.last_seen is None:
+            return 0.0
+        if t is None:
+            t = time.time()
+        age_secs = max(t - self.last_seen, 0)
+        return self._weight * 0.5 ** (age_secs / half_life_secs)
+
+    @property
+    def mean_heading_deg(self):
+        return degrees(atan2(self._mean_sin, self._mean_cos)) % 360
+
     @property
-    def count(self):
-        return len(self.pose_tuples)
-            
-        
+    def heading_consistency(self):
+        '''
+            mean resultant length 0..1, 1 when all headings agree
+        '''
+        return hypot(self._mean_sin, self._mean_cos)
+
+    @property
+    def spread_m(self):
+        return sqrt((self._m2_x + self._m2_y) / self.count) if self.count > 0 else 0.0
+
+    @property
+    def span_secs(self):
+        return self.last_seen - self.first_seen if self.count > 0 else 0.0
+
     def __repr__(self):
-        return 'Num Entries: {} {}, ({:.2f}, {:.2f})'.format(
-            self.count, 
-            self.pose_tuples if self.count < 10 else '[...]', 
-            self.mean_pose_x, 
-            self.mean_pose_y
+        return 'Num Entries: {} {}, ({:.2f}, {:.2f}) {:.0f} deg'.format(
+            self.count,
+            list(self.pose_tuples) if self.count < 10 else '[...]',
+            self.mean_pose_x,
+            self.mean_pose_y,
+            self.mean_heading_deg
             )
 
 if __name__ == '__main__':
@@ -49,12 +112,12 @@ if __name__ == '__main__':
     threshold = 0.1 # m
     pc = SightingCluster(threshold)
     sighting_cluster_list = [pc]
-    p1 = (3.1, 2.1)
-    p2 = (3.15, 2.15)
-    p3 = (3.0, 2.0)
-    p4 = (3.125, 2.125)
+    p1 = (3.1, 2.1, 350)
+    p2 = (3.15, 2.15, 10)
+    p3 = (3.0, 2.0, 0)
+    p4 = (3.125, 2.125, 20)
     poses = [p1, p2, p3, p4]
-    
+
     for p in poses:
         print('adding', p)
         for pc in sighting_cluster_list:
@@ -69,4 +132,6 @@ if __name__ == '__main__':
                 pc.add(p)
                 print(pc)
             break
-    print(sighting_cluster_list)
\ No newline at end of file
+    print(sighting_cluster_list)
+    print('heading consistency: {:.2f} spread: {:.3f}m'.format(
+        sighting_cluster_list[0].heading_consistency, sighting_cluster_list[0].spread_m))
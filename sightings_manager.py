@@ -1,46 +1,149 @@
+import time
+import threading
+from math import floor
+
+import constants
 from sighting_cluster import SightingCluster
 
 class SightingsManager():
     '''
-        Represents a list of sighting_cluster(s)
+        Represents a grid-hashed index of sighting_cluster(s)
+        cells are threshold sized, so neighbours lie in the surrounding 3x3 cells
     '''
-    
 
-    def __init__(self, threshold):
+
+    def __init__(
+        self,
+        threshold,
+        max_age_secs=constants.SIGHTING_MAX_AGE_SECS,
+        half_life_secs=constants.SIGHTING_HALF_LIFE_SECS
+    ):
         '''
             constructor
         '''
         self.threshold = threshold
-        self.sighting_clusters = []
-        
-    def add(self, p):
-        if len(self.sighting_clusters) == 0:
-            acc = False
-        for sc in self.sighting_clusters:
-            acc = sc.accept(p)
-            if acc:
-                # print('accepted')
-                # print(sc)
-                break
-        if not(acc):
-            # print('new cluster')
-            sc = SightingCluster(self.threshold)
-            self.sighting_clusters.append(sc)
-            sc.add(p)
-            # print(sc)
-        
+        self.max_age_secs = max_age_secs
+        self.half_life_secs = half_life_secs
+        self.cells = {}
+        self.num_sightings = 0
+        self.evicted = 0
+        self._last_eviction = None
+        self._lock = threading.Lock()
+
+    def cell_key(self, x, y):
+        return (floor(x / self.threshold), floor(y / self.threshold))
+
+    def nearest(self, p):
+        '''
+            nearest cluster within threshold, or None
+        '''
+        cx, cy = self.cell_key(p[0], p[1])
+        best = None
+        best_dist = self.threshold
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for sc in self.cells.get((i, j), ()):
+                    dist = sc.distance(p)
+                    if dist <= best_dist:
+                        best = sc
+                        best_dist = dist
+        return best
+
+    def add(self, p, t=None):
+        if t is None:
+            t = time.time()
+        with self._lock:
+            sc = self.nearest(p)
+            if sc is None:
+                sc = SightingCluster(self.threshold)
+                sc.add(p, t)
+                self.cells.setdefault(self.cell_key(p[0], p[1]), []).append(sc)
+            else:
+                old_key = self.cell_key(sc.mean_pose_x, sc.mean_pose_y)
+                sc.add(p, t)
+                new_key = self.cell_key(sc.mean_pose_x, sc.mean_pose_y)
+                if new_key != old_key:
+                    # mean has drifted across a cell boundary
+                    self._remove(old_key, sc)
+                    self.cells.setdefault(new_key, []).append(sc)
+            self.num_sightings += 1
+            if self._last_eviction is None:
+                self._last_eviction = t
+            elif t - self._last_eviction > self.max_age_secs / 10:
+                self._evict(t)
+        return sc
+
+    def _remove(self, key, sc):
+        cell = self.cells.get(key)
+        if cell is not None:
+            cell.remove(sc)
+            if len(cell) == 0:
+                del self.cells[key]
+
+    def _evict(self, t):
+        for key in list(self.cells):
+            stale = [sc for sc in self.cells[key]
+                     if t - sc.last_seen > self.max_age_secs]
+            for sc in stale:
+                self._remove(key, sc)
+            self.evicted += len(stale)
+        self._last_eviction = t
+
+    def evict(self, t=None):
+        '''
+            discard clusters not seen within max_age_secs
+        '''
+        with self._lock:
+            self._evict(time.time() if t is None else t)
+
+    def hotspots(
+        self,
+        min_count=constants.SIGHTING_HOTSPOT_MIN_COUNT,
+        min_span_secs=constants.SIGHTING_HOTSPOT_MIN_SPAN_SECS,
+        t=None
+    ):
+        '''
+            persistent clusters, i.e. likely false-positives
+            as dictionaries, heaviest first
+        '''
+        if t is None:
+            t = time.time()
+        with self._lock:
+            spots = [
+                {
+                    'x_m': round(sc.mean_pose_x, 3),
+                    'y_m': round(sc.mean_pose_y, 3),
+                    'heading_deg': round(sc.mean_heading_deg),
+                    'heading_consistency': round(sc.heading_consistency, 2),
+                    'spread_m': round(sc.spread_m, 3),
+                    'count': sc.count,
+                    'span_secs': round(sc.span_secs),
+                    'weight': round(sc.weight(t, self.half_life_secs), 2)
+                }
+                for sc in self.sighting_clusters
+                if sc.count >= min_count and sc.span_secs >= min_span_secs
+            ]
+        return sorted(spots, key=lambda s: s['weight'], reverse=True)
+
+    @property
+    def sighting_clusters(self):
+        return [sc for cell in self.cells.values() for sc in cell]
+
     @property
     def count(self):
-        return len(self.sighting_clusters)
-            
-        
+        return sum(len(cell) for cell in self.cells.values())
+
+
     def __repr__(self):
-        return 'Num Sightings: {} {}'.format(self.count, self.sighting_clusters)
+        heaviest = sorted(self.sighting_clusters, key=lambda sc: sc.count, reverse=True)[:5]
+        return 'Num Sightings: {} Clusters: {} Evicted: {} {}'.format(
+            self.num_sightings, self.count, self.evicted, heaviest)
 
 if __name__ == '__main__':
     '''
         Class Tests
     '''
+    import random
     threshold = 0.1 # m
     mgr = SightingsManager(threshold)
     p1 = (3.1, 2.1, 0)
@@ -50,8 +153,20 @@ if __name__ == '__main__':
     p5 = (4.0, 5.0, 180)
     p6 = (3.1, 2.1, 270)
     poses = [p1, p2, p3, p4, p5, p6]
-    
+
     for p in poses:
         print('adding', p)
         mgr.add(p)
-    print(mgr)
\ No newline at end of file
+    print(mgr)
+
+    # simulated long mow - moving mower plus a static false-positive
+    mgr = SightingsManager(threshold, max_age_secs=600)
+    start = time.time()
+    t = 0
+    for frame in range(20000):
+        t = frame * 0.75
+        mgr.add((random.uniform(0, 10), random.uniform(0, 8), random.randint(0, 359)), t)
+        mgr.add((6.0 + random.gauss(0, 0.01), 1.5 + random.gauss(0, 0.01), 45), t)
+    print('20000 frames in {:.2f} secs'.format(time.time() - start))
+    print(mgr.count, 'clusters', mgr.evicted, 'evicted')
+    print(mgr.hotspots(t=t)[:3])
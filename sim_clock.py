@@ -0,0 +1,202 @@
+import heapq
+import threading
+import time
+from itertools import count
+
+'''
+    Shared clock for the virtual mower, virtual camera, snapshots and governor
+
+    Three modes:
+
+        wall    - time.time() and time.sleep(), the default
+        scaled  - simulated time runs rate times faster than the wall clock,
+                  threads still sleep, so the whole server can be accelerated
+        stepped - simulated time only moves when a caller sleeps or advances,
+                  due timers fire in the caller's thread in time order,
+                  so a single threaded loop runs as fast as the cpu allows
+'''
+
+WALL = 'wall'
+SCALED = 'scaled'
+STEPPED = 'stepped'
+
+
+class SimTimer():
+    '''
+        threading.Timer look-alike fired by a stepped clock
+    '''
+
+    def __init__(self, sim_clock, interval, function, args=None, kwargs=None):
+        self.sim_clock = sim_clock
+        self.interval = interval
+        self.function = function
+        self.args = args if args is not None else []
+        self.kwargs = kwargs if kwargs is not None else {}
+        self.due = None
+        self.cancelled = False
+        self.finished = False
+
+    def start(self):
+        self.due = self.sim_clock.schedule(self)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_alive(self):
+        return self.due is not None and not (self.cancelled or self.finished)
+
+    def join(self, timeout=None):
+        # fires synchronously, so nothing to wait for
+        pass
+
+    def run(self):
+        if not self.cancelled:
+            self.function(*self.args, **self.kwargs)
+        self.finished = True
+
+
+class SimClock():
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.mode = WALL
+        self.rate = 1.0
+        self._now = 0.0
+        self._real_origin = 0.0
+        self._timers = []
+        self._seq = count()
+        self.timers_fired = 0
+
+    def __repr__(self):
+        return 'SimClock {0} rate: {1} now: {2:.3f} pending timers: {3}'.format(
+            self.mode, self.rate, self.time(), len(self._timers))
+
+    @property
+    def simulated(self):
+        return self.mode != WALL
+
+    def enable(self, start_time=None, rate=None):
+        '''
+            rate None steps, otherwise scales the wall clock
+        '''
+        with self.lock:
+            self._now = time.time() if start_time is None else start_time
+            self._real_origin = time.perf_counter()
+            self._timers.clear()
+            self.timers_fired = 0
+            if rate is None:
+                self.mode = STEPPED
+                self.rate = 0.0
+            else:
+                self.mode = SCALED
+                self.rate = float(rate)
+
+    def disable(self):
+        with self.lock:
+            self.mode = WALL
+            self.rate = 1.0
+            self._timers.clear()
+
+    def time(self):
+        if self.mode == WALL:
+            return time.time()
+        elif self.mode == SCALED:
+            return self._now + (time.perf_counter() - self._real_origin) * self.rate
+        return self._now
+
+    def sleep(self, secs):
+        if self.mode == WALL:
+            time.sleep(secs)
+        elif self.mode == SCALED:
+            time.sleep(max(secs, 0) / self.rate)
+        else:
+            self.advance(secs)
+
+    def sleep_until(self, finish_time):
+        '''
+            returns the seconds slept, negative if already past
+        '''
+        delay_secs = finish_time - self.time()
+        if delay_secs > 0:
+            self.sleep(delay_secs)
+        return delay_secs
+
+    def Timer(self, interval, function, args=None, kwargs=None):
+        '''
+            a startable, cancellable timer running on this clock
+        '''
+        if self.mode == STEPPED:
+            return SimTimer(self, interval, function, args, kwargs)
+        elif self.mode == SCALED:
+            return threading.Timer(interval / self.rate, function, args, kwargs)
+        return threading.Timer(interval, function, args, kwargs)
+
+    def schedule(self, timer):
+        with self.lock:
+            due = self._now + max(timer.interval, 0)
+            heapq.heappush(self._timers, (due, next(self._seq), timer))
+        return due
+
+    def advance(self, secs):
+        '''
+            move stepped time on, firing due timers in order
+            timers may schedule further timers, which fire if due in time
+        '''
+        with self.lock:
+            target = self._now + max(secs, 0)
+        while True:
+            with self.lock:
+                if len(self._timers) == 0 or self._timers[0][0] > target:
+                    self._now = max(self._now, target)
+                    break
+                due, _seq, timer = heapq.heappop(self._timers)
+                self._now = max(self._now, due)
+            if not timer.cancelled:
+                self.timers_fired += 1
+            timer.run()
+        return self._now
+
+    def pending(self):
+        with self.lock:
+            return sum(1 for _due, _seq, timer in self._timers if not timer.cancelled)
+
+
+clock = SimClock()
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    fired = []
+
+    def chained(n, period):
+        fired.append((n, round(clock.time(), 3)))
+        if n > 1:
+            clock.Timer(period, chained, args=(n - 1, period)).start()
+
+    clock.enable(start_time=1000.0)
+    clock.Timer(0.25, chained, args=(4, 0.25)).start()
+    cancelled = clock.Timer(0.5, fired.append, args=('cancelled',))
+    cancelled.start()
+    cancelled.cancel()
+    clock.sleep(0.6)
+    print(clock, fired)
+    assert fired == [(4, 1000.25), (3, 1000.5)]
+    clock.sleep_until(1002.0)
+    print(clock, fired)
+    assert len(fired) == 4 and clock.time() == 1002.0
+
+    start = time.perf_counter()
+    for _i in range(100000):
+        clock.sleep(0.75)
+    print('100000 stepped sleeps of 0.75s: {0:.0f}s simulated in {1:.3f}s'.format(
+        clock.time() - 1002.0, time.perf_counter() - start))
+
+    clock.enable(rate=20)
+    start = time.perf_counter()
+    sim_start = clock.time()
+    clock.sleep(1.0)
+    print('scaled x20: {0:.2f}s simulated in {1:.3f}s'.format(
+        clock.time() - sim_start, time.perf_counter() - start))
+    clock.disable()
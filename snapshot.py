@@ -1,11 +1,11 @@
 import sys
-import time
 from itertools import count
 from enum import Enum
 from math import degrees, sin, cos, pi
 
 from poses import Pose, PoseOrigination
 import constants
+from sim_clock import clock
 
 
 class SnapshotGrowth(Enum):
@@ -25,7 +25,7 @@ class Snapshot():
     _ssid = count(0)
 
     def __init__(self, container=None, ssid=None, logger=None):
-        self._t_zero = time.time()
+        self._t_zero = clock.time()
         self._container = container
         if ssid is None:
             self.ssid = next(self._ssid) % constants.MAX_SNAPSHOT_ID
@@ -45,13 +45,14 @@ class Snapshot():
         self._strategy_name = None
         self._terms = None
         self._rules = None
+        self._documents = {}  # published when planned
 
         # we haven't been added yet, so latest is p2 and penultimate is p1
         p1 = self._container.penultimate_pose()
         p2 = self._container.latest_pose()
 
-        s1 = self._container[list(self._container.keys())[-2]].ssid if len(self._container.keys()) > 1 else -1
-        s2 = self._container[list(self._container.keys())[-1]].ssid if len(self._container.keys()) > 0 else -1
+        s1 = self._container.penultimate_ssid()
+        s2 = self._container.latest_ssid()
 
         # first log all the ssids
         if self._logger:
@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import json
+import math
+import zlib
+
+import numpy as np
+
+import constants
+
+'''
+    Snapshot documents
+
+    The json documents served for a snapshot - contours, strategy and the snapshot
+    part of the metadata - are serialised once, when the snapshot is planned,
+    and held with their compressed bytes and entity tag, so each request is a
+    lookup, a conditional-GET check and a write of bytes already encoded.
+'''
+
+
+def json_safe(obj):
+    '''
+        obj with NaN and infinite floats replaced by None, and numpy values by python ones
+    '''
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_safe(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return json_safe(obj.item())
+    if isinstance(obj, np.ndarray):
+        return json_safe(obj.tolist())
+    return obj
+
+
+def dumps_safe(obj):
+    '''
+        json text in which non-finite numbers are null, rather than the invalid NaN or Infinity
+    '''
+    return json.dumps(json_safe(obj), allow_nan=False)
+
+
+def accepted_encodings(accept_encoding):
+    '''
+        content codings acceptable to the client, from an Accept-Encoding header
+    '''
+    encodings = set()
+    for part in (accept_encoding or '').split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if coding == '':
+            continue
+        q_value = 1.0
+        for param in fields[1:]:
+            name, _sep, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q_value = float(value)
+                except ValueError:
+                    q_value = 0.0
+        if q_value > 0:
+            encodings.add(coding)
+    return encodings
+
+
+class PublishedDocument():
+    '''
+        a serialised document with its entity tag and gzip encoding,
+        deflate is encoded on first request
+    '''
+
+    def __init__(self, body, content_type='application/json', compress_level=constants.SNAPSHOT_DOCUMENT_COMPRESS_LEVEL):
+        self.body = body.encode('utf8') if isinstance(body, str) else body
+        self.content_type = content_type
+        self.compress_level = compress_level
+        self.etag = '"{0}"'.format(hashlib.blake2b(self.body, digest_size=8).hexdigest())
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=compress_level, mtime=0)}
+
+    @classmethod
+    def from_obj(cls, obj, **kwargs):
+        return cls(dumps_safe(obj), **kwargs)
+
+    def encode(self, coding):
+        if coding not in self.encoded:
+            self.encoded[coding] = zlib.compress(self.body, self.compress_level)
+        return self.encoded[coding]
+
+    def not_modified(self, if_none_match):
+        if if_none_match is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        # weak comparison, as a proxy may have re-encoded the body
+        return '*' in tags or self.etag in tags or 'W/' + self.etag in tags
+
+    def respond(self, request_headers, response):
+        '''
+            the bytes to return, setting status and headers on a cherrypy-like response
+        '''
+        response.headers['ETag'] = self.etag
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Content-Type'] = self.content_type
+        if self.not_modified(request_headers.get('If-None-Match')):
+            response.status = 304
+            return b''
+        encodings = accepted_encodings(request_headers.get('Accept-Encoding'))
+        for coding in ('gzip', 'deflate'):
+            if coding in encodings:
+                response.headers['Content-Encoding'] = coding
+                return self.encode(coding)
+        return self.body
+
+    @property
+    def nbytes(self):
+        return len(self.body) + sum(len(b) for b in self.encoded.values())
+
+    def __repr__(self):
+        return '{0} {1} bytes, gzip {2} bytes'.format(self.etag, len(self.body), len(self.encoded['gzip']))
+
+
+class MetadataDocuments():
+    '''
+        the metadata document, spliced from the live server state and the snapshot's
+        pre-serialised part, is published again only when either changes
+    '''
+
+    def __init__(self):
+        self.key = None
+        self.document = None
+
+    def get(self, live_json, snapshot_json):
+        key = (live_json, snapshot_json)
+        if key != self.key:
+            # both are json objects, '{}' when empty
+            if len(snapshot_json) <= 2:
+                body = live_json
+            elif len(live_json) <= 2:
+                body = snapshot_json
+            else:
+                body = live_json[:-1] + ', ' + snapshot_json[1:]
+            self.document = PublishedDocument(body)
+            self.key = key
+        return self.document
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import time
+
+    class Response():
+        def __init__(self):
+            self.headers = {}
+            self.status = 200
+
+    # a table of contour rows with the odd undefined measure
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(constants.CONTOUR_TABLE_MAX_ROWS):
+        row = {'index': i, 'thumbnail': '<div style="text-align: center;">' + 'x' * 600 + '</div>'}
+        for m in range(30):
+            row['measure{0}'.format(m)] = float(rng.normal()) if m % 7 else float('nan')
+        row['span'] = np.float32(0.25)
+        row['extent'] = float('inf') if i == 3 else 1.0
+        rows.append(row)
+
+    legacy = json.dumps([{k: (float(v) if isinstance(v, np.generic) else v) for k, v in r.items()} for r in rows])
+    legacy = legacy.replace("NaN", "null").replace("-Infinity", "null").replace("Infinity", "null")
+    doc = PublishedDocument.from_obj(rows)
+    assert json.loads(doc.body) == json.loads(legacy)
+    print('document', doc)
+
+    num_requests = 200
+    start = time.perf_counter()
+    for _n in range(num_requests):
+        body = json.dumps([{k: (float(v) if isinstance(v, np.generic) else v) for k, v in r.items()} for r in rows])
+        body = body.replace("NaN", "null").replace("-Infinity", "null").replace("Infinity", "null").encode('utf8')
+    per_request_secs = (time.perf_counter() - start) / num_requests
+    start = time.perf_counter()
+    sent = 0
+    for n in range(num_requests):
+        response = Response()
+        # half the clients already hold the current version
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if n % 2:
+            headers['If-None-Match'] = doc.etag
+        sent += len(doc.respond(headers, response))
+    published_secs = (time.perf_counter() - start) / num_requests
+    print('per request serialisation {0:.3f}ms {1} bytes, published lookup {2:.4f}ms {3:.0f} bytes on average'.format(
+        per_request_secs * 1000, len(body), published_secs * 1000, sent / num_requests))
+
+    response = Response()
+    assert doc.respond({'If-None-Match': 'W/' + doc.etag}, response) == b'' and response.status == 304
+    response = Response()
+    assert gzip.decompress(doc.respond({'Accept-Encoding': 'gzip;q=1.0, identity;q=0.5'}, response)) == doc.body
+    response = Response()
+    assert zlib.decompress(doc.respond({'Accept-Encoding': 'deflate'}, response)) == doc.body
+    response = Response()
+    assert doc.respond({'Accept-Encoding': 'gzip;q=0'}, response) == doc.body and 'Content-Encoding' not in response.headers
+
+    metadata = MetadataDocuments()
+    live = dumps_safe({'Driver': {'state': ''}})
+    snap = dumps_safe({'Locator': {'ssid': 5}, 'Pose': {}})
+    meta_doc = metadata.get(live, snap)
+    assert json.loads(meta_doc.body) == {'Driver': {'state': ''}, 'Locator': {'ssid': 5}, 'Pose': {}}
+    assert metadata.get(live, snap) is meta_doc
+    assert json.loads(metadata.get(live, '{}').body) == {'Driver': {'state': ''}}
+    print('conditional, encoded and spliced responses ok')
@@ -0,0 +1,203 @@
+import importlib
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+'''
+    Cold start
+
+    A startup timeline of import and initialisation costs, measured from the
+    creation of the process, modules whose import is deferred until they are
+    first used, and a background initialiser that builds the server's
+    artefacts - mappers, fence masks, camera, rules engine - while the web
+    interface is already answering.
+
+    The timeline is served as startup_json and written beside the logs.
+'''
+
+
+class StartupTimeline():
+    '''
+        named spans of the startup, offsets from the creation of the process
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = []
+        self.last_mark_secs = 0.0
+        try:
+            # the interpreter and imports before this module are the first span
+            self.origin = psutil.Process().create_time()
+        except Exception:
+            self.origin = time.time()
+
+    def offset_secs(self, wall_secs=None):
+        return (time.time() if wall_secs is None else wall_secs) - self.origin
+
+    def add(self, name, start_secs, secs):
+        with self._lock:
+            self.entries.append({
+                'name': name,
+                'start_secs': round(start_secs, 4),
+                'secs': round(secs, 4),
+                'thread': threading.current_thread().name
+            })
+
+    def mark(self, name):
+        '''
+            a point in the startup e.g. imports complete, its span from the previous mark
+        '''
+        now_secs = self.offset_secs()
+        self.add(name, self.last_mark_secs, now_secs - self.last_mark_secs)
+        self.last_mark_secs = now_secs
+
+    @contextmanager
+    def span(self, name):
+        start_secs = self.offset_secs()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start_secs, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self._lock:
+            entries = list(self.entries)
+        return {
+            'process_started': self.origin,
+            'elapsed_secs': round(self.offset_secs(), 3),
+            'entries': entries
+        }
+
+    def save(self, path):
+        with open(path, 'w') as timeline_file:
+            json.dump(self.as_dict(), timeline_file, indent=2)
+
+    def __str__(self):
+        lines = ['{0:>9}  {1:>8}  {2:<18} {3}'.format('start s', 'secs', 'thread', 'name')]
+        for entry in sorted(self.as_dict()['entries'], key=lambda e: e['start_secs']):
+            lines.append('{0:9.3f}  {1:8.3f}  {2:<18} {3}'.format(
+                entry['start_secs'], entry['secs'], entry['thread'][:18], entry['name']))
+        return '\n'.join(lines)
+
+
+# process-wide timeline
+timeline = StartupTimeline()
+
+
+class DeferredModule():
+    '''
+        a module imported on first attribute access, its import cost added to the timeline
+    '''
+
+    def __init__(self, module_name):
+        self._module_name = module_name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    with timeline.span('import ' + self._module_name):
+                        self._module = importlib.import_module(self._module_name)
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        return '<deferred module {0} {1}>'.format(self._module_name, 'loaded' if self.loaded else 'not loaded')
+
+
+def deferred_import(module_name):
+    return DeferredModule(module_name)
+
+
+class BackgroundInitialiser(threading.Thread):
+    '''
+        runs named initialisation steps in order, each timed on the timeline
+        ready is set when all have run, failed names the step that raised
+        the timeline is then saved to timeline_path, if given
+    '''
+
+    def __init__(self, steps, logger=None, timeline_path=None):
+        super().__init__(name='initialiser', daemon=True)
+        self.steps = steps
+        self.logger = logger
+        self.timeline_path = timeline_path
+        self.ready = threading.Event()
+        self.current = None
+        self.failed = None
+
+    def run(self):
+        for name, step in self.steps:
+            self.current = name
+            try:
+                with timeline.span(name):
+                    step()
+            except Exception as e:
+                err_line = sys.exc_info()[-1].tb_lineno
+                msg = 'Error in BackgroundInitialiser {0}: {1} on line {2}'.format(name, e, err_line)
+                self.failed = name
+                if self.logger is not None:
+                    self.logger.error(msg)
+                else:
+                    print(msg)
+                break
+        self.current = None
+        self.ready.set()
+        if self.timeline_path is not None:
+            try:
+                timeline.save(self.timeline_path)
+            except Exception as e:
+                err_line = sys.exc_info()[-1].tb_lineno
+                msg = 'Error in BackgroundInitialiser saving timeline: ' + str(e) + ' on line ' + str(err_line)
+                if self.logger is not None:
+                    self.logger.error(msg)
+                else:
+                    print(msg)
+
+    def wait(self, timeout_secs=None):
+        return self.ready.wait(timeout_secs)
+
+    @property
+    def state(self):
+        if not self.ready.is_set():
+            return 'initialising: {0}'.format(self.current)
+        return 'failed: {0}'.format(self.failed) if self.failed is not None else 'ready'
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    timeline.mark('startup imported')
+    json_module = deferred_import('json')
+    colorsys = deferred_import('colorsys')
+    assert not colorsys.loaded
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1) and colorsys.loaded
+    assert json_module.dumps([1]) == '[1]'
+
+    initialiser = BackgroundInitialiser([
+        ('build something', lambda: time.sleep(0.05)),
+        ('build something else', lambda: time.sleep(0.02))
+    ])
+    initialiser.start()
+    print(initialiser.state)
+    assert initialiser.wait(5) and initialiser.state == 'ready'
+
+    failing = BackgroundInitialiser([('raise', lambda: 1 / 0), ('never', lambda: None)])
+    failing.start()
+    failing.wait(5)
+    assert failing.state == 'failed: raise'
+    timeline.mark('tests complete')
+    print(timeline)
@@ -0,0 +1,756 @@
+import ast
+import copy
+import math
+import sys
+import time
+from functools import lru_cache, reduce
+from math import pi
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import constants
+from destination import Attitude
+from forms.rule import RuleScope
+import geom_lib
+from geom_lib import get_angle_between_cartesian_points
+from utilities import get_safe_functions
+
+'''
+    What-if strategy evaluation
+
+    Evaluates a navigation strategy - its terms, rule conditions and rule
+    commands - at a whole batch of hypothetical poses at once, for one path of
+    an itinerary and one telemetry state, without touching the rules engine's
+    live context or its rules. It answers, for every pose, which rule the
+    engine would select and what it would command, so a strategy can be tuned
+    from a heat-map of its decisions over the lawn rather than by watching the
+    mower drive.
+
+    The pose dependent terms - distance, headings, stray, look-ahead point,
+    turn circle, landing delta, route progress - are computed as arrays, as
+    build_context computes them for one pose. The strategy's own expressions
+    are then evaluated with those arrays in the context: each is rewritten so
+    that and, or, not, chained comparisons, conditional expressions and
+    min/max act element-wise, and the safe math functions are replaced by
+    their numpy equivalents. An expression that still cannot be evaluated
+    over the batch, e.g. one building a list of terms, is evaluated pose by
+    pose as the engine would, and named in the result's fallbacks.
+
+    Hypothetical poses have no history, so the route progress speed and ETA
+    are -1, and the rules are evaluated afresh rather than from their last
+    states.
+'''
+
+
+def truthy(value):
+    '''
+        Python truth of value, element-wise for arrays
+    '''
+    if isinstance(value, np.ndarray) and value.ndim > 0:
+        if value.dtype.kind in 'biufc':
+            return value != 0
+        return np.array([bool(v) for v in value.flat], dtype=bool).reshape(value.shape)
+    return bool(value)
+
+
+def vector_and(left, right):
+    test = truthy(left)
+    if isinstance(test, bool):
+        return right if test else left
+    return np.where(test, right, left)
+
+
+def vector_or(left, right):
+    test = truthy(left)
+    if isinstance(test, bool):
+        return left if test else right
+    return np.where(test, left, right)
+
+
+def vector_not(operand):
+    test = truthy(operand)
+    if isinstance(test, bool):
+        return not test
+    return ~test
+
+
+def vector_where(test, body, orelse):
+    test = truthy(test)
+    if isinstance(test, bool):
+        return body if test else orelse
+    return np.where(test, body, orelse)
+
+
+def vector_min(*args, **kwargs):
+    if len(args) < 2 or not any(isinstance(arg, np.ndarray) for arg in args):
+        return min(*args, **kwargs)
+    return reduce(np.minimum, args)
+
+
+def vector_max(*args, **kwargs):
+    if len(args) < 2 or not any(isinstance(arg, np.ndarray) for arg in args):
+        return max(*args, **kwargs)
+    return reduce(np.maximum, args)
+
+
+def vector_log(x, base=None):
+    return np.log(x) if base is None else np.log(x) / np.log(base)
+
+
+def get_vector_functions():
+    '''
+        the safe functions, with numpy equivalents where there are any, and the element-wise operators
+    '''
+    vector_functions = get_safe_functions()
+    vector_functions.update({
+        'acos': np.arccos, 'asin': np.arcsin, 'atan': np.arctan, 'atan2': np.arctan2,
+        'ceil': np.ceil, 'copysign': np.copysign, 'cos': np.cos, 'cosh': np.cosh,
+        'degrees': np.degrees, 'exp': np.exp, 'fabs': np.fabs, 'floor': np.floor,
+        'fmod': np.fmod, 'hypot': np.hypot, 'log': vector_log, 'log10': np.log10,
+        'pow': np.power, 'radians': np.radians, 'sin': np.sin, 'sinh': np.sinh,
+        'sqrt': np.sqrt, 'tan': np.tan, 'tanh': np.tanh,
+        'min': vector_min, 'max': vector_max,
+        '_v_and': vector_and, '_v_or': vector_or, '_v_not': vector_not, '_v_where': vector_where
+    })
+    return vector_functions
+
+
+class Vectoriser(ast.NodeTransformer):
+    '''
+        rewrites an expression to evaluate element-wise over arrays
+    '''
+
+    @staticmethod
+    def call(name, args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        name = '_v_and' if isinstance(node.op, ast.And) else '_v_or'
+        return reduce(lambda left, right: self.call(name, [left, right]), node.values)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self.call('_v_not', [node.operand])
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return self.call('_v_where', [node.test, node.body, node.orelse])
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # a < b < c => (a < b) and (b < c)
+        comparisons = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            comparisons.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = copy.deepcopy(right)
+        return reduce(lambda left, right: self.call('_v_and', [left, right]), comparisons)
+
+
+@lru_cache(maxsize=256)
+def scalar_code(expression):
+    return compile(expression, '<string>', 'eval')
+
+
+@lru_cache(maxsize=256)
+def vector_code(expression):
+    tree = Vectoriser().visit(ast.parse(expression, mode='eval'))
+    return compile(ast.fix_missing_locations(tree), '<vectorised>', 'eval')
+
+
+def pose_value(value, i):
+    '''
+        the i'th pose's value of a batch context value
+    '''
+    if isinstance(value, np.ndarray):
+        value = value[i]
+        return value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, tuple):
+        return tuple(pose_value(v, i) for v in value)
+    return value
+
+
+def is_varying(value, n):
+    if isinstance(value, tuple):
+        return any(is_varying(v, n) for v in value)
+    return np.shape(value) == (n,)
+
+
+def unwrap(value):
+    if isinstance(value, np.ndarray) and value.ndim == 0:
+        return value.item()
+    if isinstance(value, tuple):
+        return tuple(unwrap(v) for v in value)
+    return value
+
+
+def cartesian_angles(tail_x, tail_y, tip_x, tip_y):
+    '''
+        geom_lib.get_angle_between_cartesian_points over arrays, nan where the points coincide
+    '''
+    delta_x = tip_x - tail_x
+    delta_y = tail_y - tip_y
+    angles = np.arctan2(delta_x, delta_y) + pi
+    angles = np.where(angles < 2 * pi, angles, angles - 2 * pi)
+    return np.where((np.abs(delta_x) > 0.001) | (np.abs(delta_y) > 0.001), angles, np.nan)
+
+
+def look_ahead_points(x, y, x1, y1, x2, y2, look_ahead_distance):
+    '''
+        geom_lib.line_circle_intersection over arrays of poses and look-ahead distances
+    '''
+    if x1 is None or y1 is None:
+        return np.full_like(x, x2), np.full_like(y, y2)
+    if x1 == x2 and y1 == y2:
+        return np.full_like(x, x1), np.full_like(y, y1)
+    dx, dy = x2 - x1, y2 - y1
+    dr = math.sqrt(dx ** 2 + dy ** 2)
+    determinant = (x1 - x) * (y2 - y) - (x2 - x) * (y1 - y)
+    discriminant = (look_ahead_distance ** 2) * (dr ** 2) - determinant ** 2
+
+    # closest point on the line where the circle does not reach it
+    along = (dy * (y - y1) + dx * (x - x1)) / (dx * dx + dy * dy)
+    lax, lay = x1 + along * dx, y1 + along * dy
+
+    root = np.sqrt(np.maximum(discriminant, 0))
+    sgn_dy = 1 if dy >= 0 else -1
+    sol1_x = (determinant * dy + sgn_dy * dx * root) / dr ** 2 + x
+    sol2_x = (determinant * dy - sgn_dy * dx * root) / dr ** 2 + x
+    sol1_y = (-determinant * dx + abs(dy) * root) / dr ** 2 + y
+    sol2_y = (-determinant * dx - abs(dy) * root) / dr ** 2 + y
+    # the solution nearer the target
+    first = np.hypot(x2 - sol1_x, y2 - sol1_y) < np.hypot(x2 - sol2_x, y2 - sol2_y)
+    solved = discriminant >= 0
+    lax = np.where(solved, np.where(first, sol1_x, sol2_x), lax)
+    lay = np.where(solved, np.where(first, sol1_y, sol2_y), lay)
+    return np.round(lax, 3), np.round(lay, 3)
+
+
+def look_ahead_distances(lad, n):
+    '''
+        a look-ahead distance term as an array, zero where it is not a positive number
+    '''
+    if lad is None:
+        return None
+    lad = np.broadcast_to(np.asarray(lad), (n,))
+    if lad.dtype.kind not in 'biuf':
+        lad = np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else 0 for v in lad])
+    return np.where(lad > 0, lad, 0).astype(float)
+
+
+def pose_context(x, y, c, x1, y1, x2, y2, att2, lad, axle_track_m):
+    '''
+        the pose dependent terms of build_context over arrays of poses,
+        for the path (x1, y1)..(x2, y2), either end of which may be None
+    '''
+    n = len(x)
+    context = {'x': x, 'y': y, 'c': c, 'rc': (c + pi) % (2 * pi)}
+    if x1 is not None and y1 is not None:
+        context['k'] = np.hypot(x - x1, y - y1)
+    else:
+        context['k'] = -1
+    if x2 is None or y2 is None:
+        context.update({
+            'c2': None, 'tcx': None, 'tcy': None, 'att2': '', 'd': -1, 'k': -1, 't': 0, 'u': 0, 'a': 0,
+            'rt': 0, 'ru': 0, 'ra': 0, 'b': -1, 'f': 0, 'g': 0, 'j': 1.0, 'l': -1, 'lap': (-1, -1),
+            'st': 0, 'ph': 0, 'ld': 0
+        })
+        return context
+    context['att2'] = att2
+
+    if x1 is not None and y1 is not None:
+        path_heading = get_angle_between_cartesian_points(x1, y1, x2, y2, default=0)
+        line_length = math.hypot(x2 - x1, y2 - y1)
+        stray_m = ((x2 - x1) * (y - y1) - (x - x1) * (y2 - y1)) / line_length if line_length > 0 else 0
+    else:
+        path_heading = 0
+        stray_m = 0
+    context['ph'] = path_heading
+    d = np.hypot(x2 - x, y2 - y)
+    context['d'] = d
+    context['st'] = stray_m
+
+    # look-ahead point and target heading
+    if lad is None:
+        lad = np.zeros(n)
+    lad = np.broadcast_to(np.asarray(lad, dtype=float), (n,))
+    looking = lad > 0
+    lax, lay = look_ahead_points(x, y, x1, y1, x2, y2, np.minimum(d, lad))
+    lax, lay = np.where(looking, lax, -1), np.where(looking, lay, -1)
+    context['lap'] = (lax, lay)
+    tgt_x = np.where(looking, lax, x2)
+    tgt_y = np.where(looking, lay, y2)
+    c2 = np.where(looking | (d > constants.CLOSE_TO_HOME_RADIUS_M), cartesian_angles(x, y, tgt_x, tgt_y), c)
+    context['c2'] = c2
+    t = np.where(np.isnan(c2), 0, c2 - c)
+    rt = np.where(np.isnan(c2), 0, c2 - context['rc'])
+    context['t'], context['rt'] = t, rt
+    context['u'] = ((t + pi) % (2 * pi)) - pi
+    context['ru'] = ((rt + pi) % (2 * pi)) - pi
+    context['a'] = np.abs(context['u'])
+    context['ra'] = np.abs(context['ru'])
+
+    # turn circle to which the pose and the target are tangential, as geom_lib.get_circle_from_world_points
+    path_angle = cartesian_angles(x, y, tgt_x, tgt_y)
+    coincident = np.isnan(path_angle)
+    path_distance = np.hypot(tgt_x - x, tgt_y - y)
+    arrival_angle = 2 * path_angle - c
+    arrival_angle = np.where(arrival_angle < 0, 2 * pi + arrival_angle, arrival_angle % (2 * pi))
+    x1b, y1b = x + np.sin(c + pi / 2), y - np.cos(c + pi / 2)
+    x2b, y2b = tgt_x + np.sin(arrival_angle + pi / 2), tgt_y - np.cos(arrival_angle + pi / 2)
+    denominator = (y2b - tgt_y) * (x1b - x) - (x2b - tgt_x) * (y1b - y)
+    along = ((x2b - tgt_x) * (y - tgt_y) - (y2b - tgt_y) * (x - tgt_x)) / denominator
+    centre_x, centre_y = x + along * (x1b - x), y + along * (y1b - y)
+    radius = np.hypot(centre_x - x, centre_y - y)
+    sector_angle = np.arccos(1 - (path_distance ** 2 / (2 * radius ** 2)))
+    sector_angle = np.where(np.isfinite(sector_angle), sector_angle, 0)
+    circled = ~coincident & (denominator != 0)
+    sector_angle = np.where(circled, sector_angle, 0)
+    sector_portion = sector_angle / (2 * pi)
+    context['tcx'] = np.where(coincident, np.round(x, 3), np.where(circled, np.round(centre_x, 3), -1))
+    context['tcy'] = np.where(coincident, np.round(y, 3), np.where(circled, np.round(centre_y, 3), -1))
+    radius = np.where(coincident, 0, np.where(circled, np.round(radius, 3), -1))
+    arrival_angle = np.round(np.where(coincident, c, arrival_angle), 3)
+    context['f'] = np.round(sector_angle, 3)
+    context['g'] = sector_portion
+
+    # velocity ratio, as geom_lib.get_velocity_ratio
+    outer_tyre_distance = 2 * pi * (radius + axle_track_m / 2) * sector_portion
+    inner_tyre_distance = 2 * pi * (radius - axle_track_m / 2) * sector_portion
+    context['b'] = radius
+    context['j'] = np.where(outer_tyre_distance > 0, inner_tyre_distance / outer_tyre_distance, 1)
+    context['l'] = 2 * pi * radius * sector_portion
+
+    # how good is the landing pose?
+    cos_theta = np.abs(np.sin(path_heading) * np.sin(arrival_angle) + np.cos(path_heading) * np.cos(arrival_angle))
+    context['ld'] = np.arccos(np.minimum(cos_theta, 1))
+    return context
+
+
+class BatchResult():
+    '''
+        the rule selected, and its command, at each pose of a batch
+        rule_index is the index into rules, -1 where no rule is selected
+        speeds and durations are nan where the rule has none
+    '''
+
+    def __init__(self, poses, rules, context, varying):
+        n = len(poses)
+        self.poses = poses
+        self.rules = rules
+        self.context = context
+        self.varying = varying
+        self.rule_index = np.full(n, -1, dtype=int)
+        self.left_speed = np.full(n, np.nan)
+        self.right_speed = np.full(n, np.nan)
+        self.duration = np.full(n, np.nan)
+        self.direct_command = np.full(n, None, dtype=object)  # auxiliary rules' commands
+        self.fallbacks = []
+        self.secs = 0.0
+
+    def __len__(self):
+        return len(self.poses)
+
+    @property
+    def rule_names(self):
+        return [rule.name for rule in self.rules]
+
+    @property
+    def stage_complete(self):
+        return np.array([self.rules[r].stage_complete if r >= 0 else False for r in self.rule_index], dtype=bool)
+
+    def rule(self, i):
+        return self.rules[self.rule_index[i]] if self.rule_index[i] >= 0 else None
+
+    def command(self, i):
+        '''
+            the command the engine would send at pose i, as Rule.compile_cmd, None if not executable
+        '''
+        rule = self.rule(i)
+        if rule is None or not rule.is_executable:
+            return None
+        if rule.auxiliary:
+            return self.direct_command[i]
+        return 'sweep({}, {}, {})'.format(*[int(v) if v == v else None for v in (
+            self.left_speed[i], self.right_speed[i], self.duration[i])])
+
+    def counts(self):
+        '''
+            {rule name: number of poses selecting it}, None for no rule
+        '''
+        indices, counts = np.unique(self.rule_index, return_counts=True)
+        return {(self.rules[r].name if r >= 0 else None): int(count) for r, count in zip(indices, counts)}
+
+    def as_dict(self):
+        def listed(values):
+            return [None if v != v else int(v) for v in values.tolist()]
+        return {
+            'rules': self.rule_names,
+            'rule_index': self.rule_index.tolist(),
+            'left_speed': listed(self.left_speed),
+            'right_speed': listed(self.right_speed),
+            'duration': listed(self.duration),
+            'counts': self.counts(),
+            'fallbacks': self.fallbacks,
+            'secs': round(self.secs, 4)
+        }
+
+
+class BatchEvaluator():
+    '''
+        evaluates a rules engine's strategy over a batch of hypothetical poses
+    '''
+
+    def __init__(self, rules_engine, logger=None):
+        self.rules_engine = rules_engine
+        self.logger = logger if logger is not None else rules_engine.logger
+        self.safe_functions = get_safe_functions()
+        self.vector_functions = get_vector_functions()
+
+    def evaluate_expression(self, expression, context, varying, n, failed=None, fallbacks=None):
+        '''
+            expression over the batch, element-wise where it can be, else pose by pose
+            failed is the value of a pose whose evaluation raises
+        '''
+        try:
+            with np.errstate(all='ignore'):
+                value = eval(vector_code(expression), context, self.vector_functions)
+            values = value if isinstance(value, tuple) else (value,)
+            shapes = [np.shape(v) for v in values]
+            if all(shape in ((), (n,)) for shape in shapes):
+                # a scalar from varying terms has been reduced over the batch
+                if any(shape == (n,) for shape in shapes) or not set(scalar_code(expression).co_names) & varying:
+                    return unwrap(value)
+        except Exception:
+            pass
+
+        if fallbacks is not None:
+            fallbacks.append(expression)
+        try:
+            code = scalar_code(expression)
+        except SyntaxError:
+            return np.full(n, failed)
+        names = [name for name in code.co_names if name in varying]
+        pose_context = dict(context)
+        values = []
+        for i in range(n):
+            for name in names:
+                pose_context[name] = pose_value(context[name], i)
+            try:
+                values.append(eval(code, pose_context, self.safe_functions))
+            except Exception:
+                values.append(failed)
+        if all(isinstance(v, (bool, int, float, np.number, np.bool_)) for v in values):
+            return np.array(values)
+        result = np.empty(n, dtype=object)
+        result[:] = values
+        return result
+
+    def build_context(self, poses, itinerary, config, telem):
+        '''
+            the batch context and the names of its pose dependent terms
+        '''
+        engine = self.rules_engine
+        n = len(poses)
+        context = dict(engine.context)  # terms not rebuilt carry over, as for the engine
+        context['np'] = np
+        context['gl'] = geom_lib
+        context['ssid'] = -1
+        context['lt'] = time.strftime('%H:%M:%S', time.localtime())
+        context['m'] = engine.last_command
+        context['p'] = engine.last_command_code
+        context['z'] = engine.in_flight
+        robot_attitude = engine.robot_attitude
+        if engine.last_command_code == 'FWD':
+            robot_attitude = Attitude.FWD_DRIVE.name
+        elif engine.last_command_code == 'REV':
+            robot_attitude = Attitude.REV_DRIVE.name
+        context['rat'] = robot_attitude
+        context.update(engine.config_context(config, telem))
+
+        x1 = y1 = x2 = y2 = None
+        att2 = Attitude.DEFAULT
+        if itinerary is not None:
+            context['i'] = itinerary.dest_ptr + 1
+            prev_dest, tgt_dest = itinerary.get_path_ends()
+            x1, y1 = prev_dest.target_x, prev_dest.target_y
+            x2, y2 = tgt_dest.target_x, tgt_dest.target_y
+            if tgt_dest.attitude is not None:
+                att2 = tgt_dest.attitude.name
+        else:
+            context['i'] = -1
+        context['x1'], context['y1'], context['x2'], context['y2'] = x1, y1, x2, y2
+
+        if itinerary is not None:
+            total_m = itinerary.route_length_m
+            completed_m = itinerary.completed_distances(poses[:, :2])
+            context['rp'] = np.round(completed_m * 100 / total_m, 1) if total_m > 0 else -1
+            context['rm'] = total_m - completed_m
+        else:
+            context['rp'] = context['rm'] = -1
+        context['eta'] = -1
+
+        x, y, c = poses[:, 0], poses[:, 1], poses[:, 2]
+        varying = {name for name in ('rp', 'rm') if is_varying(context[name], n)}
+        terms = [term for term in engine.terms if term.__class__.__name__ == 'Hybrid'] + \
+            [term for term in engine.terms if term.__class__.__name__ == 'Term']
+        # as the engine's context is built twice, so terms like the look-ahead distance take effect
+        lad = context.get('lad')
+        for _pass in range(2):
+            with np.errstate(all='ignore'):
+                geometry = pose_context(x, y, c, x1, y1, x2, y2, att2, look_ahead_distances(lad, n), context['w'])
+            context.update(geometry)
+            varying |= {name for name, value in geometry.items() if is_varying(value, n)}
+            for term in terms:
+                if term.expression is not None and term.expression != '':
+                    value = self.evaluate_expression(str(term.expression), context, varying, n, failed=-1)
+                else:
+                    value = None
+                context[term.name] = value
+                if is_varying(value, n):
+                    varying.add(term.name)
+                else:
+                    varying.discard(term.name)
+            lad = context.get('lad')
+        return context, varying
+
+    def evaluate(self, poses, itinerary, config, telem, scope=RuleScope.STATIONARY):
+        '''
+            the rule selected, and its command, at each of an (n, 3) array of poses: x_m, y_m, heading_rad
+        '''
+        start = time.perf_counter()
+        poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+        n = len(poses)
+        rules = list(self.rules_engine.rules)
+        context, varying = self.build_context(poses, itinerary, config, telem)
+        result = BatchResult(poses, rules, context, varying)
+        try:
+            # first rule in priority order whose condition holds
+            undecided = np.ones(n, dtype=bool)
+            for index, rule in enumerate(rules):
+                if not np.any(undecided):
+                    break
+                if not rule.in_scope(scope) or rule.condition is None or rule.condition.strip() == '':
+                    continue
+                state = self.evaluate_expression(rule.condition, context, varying, n, failed=False,
+                                                 fallbacks=result.fallbacks)
+                chosen = undecided & np.broadcast_to(truthy(np.asarray(state)), (n,))
+                result.rule_index[chosen] = index
+                undecided &= ~chosen
+
+            # and its command, evaluated for just the poses selecting it
+            for index in np.unique(result.rule_index[result.rule_index >= 0]):
+                self.parse(rules[index], result, result.rule_index == index, varying)
+        except Exception as e:
+            err_line = sys.exc_info()[-1].tb_lineno
+            self.logger.error('Error in BatchEvaluator evaluate: ' + str(e) + ' on line ' + str(err_line))
+        result.secs = time.perf_counter() - start
+        return result
+
+    def parse(self, rule, result, chosen, varying):
+        '''
+            rule's command at the chosen poses, as Rule.parse
+        '''
+        n = int(np.count_nonzero(chosen))
+        context = {name: value for name, value in result.context.items()}
+        for name in varying:
+            value = context[name]
+            context[name] = tuple(v[chosen] if np.shape(v) == (len(chosen),) else v for v in value) \
+                if isinstance(value, tuple) else value[chosen]
+
+        def numeric(expression):
+            if expression is None or expression.strip() == '':
+                return np.full(n, np.nan)
+            value = self.evaluate_expression(expression, context, varying, n, failed=np.nan,
+                                             fallbacks=result.fallbacks)
+            try:
+                value = np.broadcast_to(np.asarray(value, dtype=float), (n,))
+            except (TypeError, ValueError):
+                return np.full(n, np.nan)
+            with np.errstate(all='ignore'):
+                return np.where(np.isfinite(value), np.round(value), np.nan)
+
+        if rule.auxiliary:
+            command = self.evaluate_expression(rule.duration, context, varying, n, failed=None,
+                                               fallbacks=result.fallbacks)
+            result.direct_command[chosen] = command if np.ndim(command) == 0 else list(command)
+            return
+        left_speed, right_speed, duration = numeric(rule.left_speed), numeric(rule.right_speed), numeric(rule.duration)
+        if (constants.ESCALATION_ENABLED and rule.scope == RuleScope.STATIONARY.value and
+                not rule.stage_complete):
+            # the first rung of the escalation matrix commanded, as Rule.parse builds it
+            valid = np.isfinite(left_speed) & np.isfinite(right_speed) & np.isfinite(duration) & (duration > 0)
+            driving = left_speed * right_speed >= 0
+            duration = np.where(driving & (duration < 100), 100, duration)
+            left_speed, right_speed, duration = [np.where(valid, v, np.nan) for v in (left_speed, right_speed, duration)]
+        result.left_speed[chosen] = left_speed
+        result.right_speed[chosen] = right_speed
+        result.duration[chosen] = duration
+
+
+def grid_poses(width_m, length_m, step_m, heading_rad):
+    '''
+        poses at the centre of each cell of a grid over the arena, all with the same heading,
+        rows from the far edge as an image is, and the grid's (rows, columns)
+    '''
+    xs = np.arange(step_m / 2, width_m, step_m)
+    ys = np.arange(length_m - step_m / 2, 0, -step_m)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    poses = np.column_stack((grid_x.ravel(), grid_y.ravel(), np.full(grid_x.size, heading_rad)))
+    return poses, grid_x.shape
+
+
+# rule colours, in priority order, no rule is dark grey
+HEATMAP_COLOURS = [
+    (31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+    (140, 86, 75), (227, 119, 194), (188, 189, 34), (23, 190, 207), (127, 127, 127)
+]
+
+
+def heatmap_image(result, grid_shape, size, width_m, length_m, itinerary=None):
+    '''
+        the rule selected over a grid of poses, coloured by rule, as a plan of the arena size (cols, rows)
+        with the itinerary's current path and a legend
+    '''
+    colours = np.array(HEATMAP_COLOURS + [(48, 48, 48)], dtype=np.uint8)
+    cells = colours[np.where(result.rule_index >= 0, result.rule_index % len(HEATMAP_COLOURS), -1)]
+    img = Image.fromarray(cells.reshape(grid_shape + (3,))).resize(size, Image.NEAREST)
+    draw = ImageDraw.Draw(img, 'RGBA')
+    cols, rows = size
+
+    def to_px(x_m, y_m):
+        return x_m * cols / width_m, (1 - y_m / length_m) * rows
+
+    if itinerary is not None:
+        start, finish = itinerary.get_path_ends()
+        if finish.target_x is not None:
+            if start.target_x is not None:
+                draw.line([to_px(start.target_x, start.target_y), to_px(finish.target_x, finish.target_y)],
+                          fill='white', width=3)
+            fx, fy = to_px(finish.target_x, finish.target_y)
+            draw.ellipse((fx - 8, fy - 8, fx + 8, fy + 8), outline='white', width=3)
+
+    # legend
+    counts = result.counts()
+    lines = [(rule.name, HEATMAP_COLOURS[r % len(HEATMAP_COLOURS)], counts[rule.name])
+             for r, rule in enumerate(result.rules) if rule.name in counts]
+    if None in counts:
+        lines.append(('no rule', tuple(colours[-1]), counts[None]))
+    heading_deg = math.degrees(result.poses[0, 2]) if len(result) > 0 else 0
+    draw.rectangle((4, 4, 240, 26 + 16 * len(lines)), fill=(0, 0, 0, 160))
+    draw.text((10, 8), 'heading {0:.0f} deg, {1} poses, {2:.0f}ms'.format(
+        heading_deg, len(result), result.secs * 1000), fill='white')
+    for line, (name, colour, count) in enumerate(lines):
+        top = 24 + 16 * line
+        draw.rectangle((10, top + 2, 20, top + 12), fill=tuple(int(v) for v in colour))
+        draw.text((26, top), '{0} ({1})'.format(name, count), fill='white')
+    return img
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
+    '''
+    import logging
+    import os
+    import tempfile
+    from types import SimpleNamespace
+
+    import configurations
+    from forms.rule import Rule
+    from forms.term import Term
+    from forms.hybrid import Hybrid
+    from itinerary import Itinerary
+    from rules_engine import RulesEngine
+
+    logging.basicConfig(level=logging.ERROR)
+    configurations.Config.SAVE_PERIOD_SECS = 0
+    config = configurations.Config('configs/settings.yml', 'configs/config.xml', readonly=True)
+    width_m, length_m = config['arena.width_m'], config['arena.length_m']
+    launch = SimpleNamespace(arena=SimpleNamespace(c_x_m=width_m / 2, c_y_m=length_m / 2))
+    telem = {'cutter1': 0, 'cutter2': 1, 'sensors': {}}
+
+    def live(engine, itinerary, pose, scope):
+        '''
+            what the engine itself selects and commands at pose
+        '''
+        snapshot = SimpleNamespace(ssid=1, _t_zero=time.time(), _pose=SimpleNamespace(
+            arena=SimpleNamespace(c_x_m=pose[0], c_y_m=pose[1], t_rad=pose[2])))
+        for rule in engine.rules:
+            rule.cleardown()
+        for _pass in range(2):
+            engine.build_context(snapshot, itinerary, config, telem)
+        rule = engine.select(scope=scope)
+        if rule is None:
+            return None, None
+        return rule.name, rule.compile_cmd() if rule.is_executable else None
+
+    def compare(engine, itinerary, num_poses, scope=RuleScope.STATIONARY, seed=5):
+        rng = np.random.default_rng(seed)
+        test_poses = np.column_stack((rng.uniform(0, width_m, num_poses), rng.uniform(0, length_m, num_poses),
+                                      rng.uniform(0, 2 * pi, num_poses)))
+        result = BatchEvaluator(engine).evaluate(test_poses, itinerary, config, telem, scope)
+        start = time.perf_counter()
+        expected = [live(engine, itinerary, pose, scope) for pose in test_poses]
+        live_secs = (time.perf_counter() - start) / num_poses
+        mismatches = [(i, expected[i], (result.rule(i).name if result.rule(i) else None, result.command(i)))
+                      for i in range(num_poses)
+                      if expected[i] != (result.rule(i).name if result.rule(i) else None, result.command(i))]
+        return result, live_secs, mismatches
+
+    # the configured strategy, along each path of the route
+    route = config['lawn.route']
+    engine = RulesEngine(config['current.strategy'], config['strategy.rules'], config['strategy.terms'], None, None)
+    for dest_ptr in range(0, len(route) + 1, max(len(route) // 4, 1)):
+        itinerary = Itinerary(launch, route)
+        itinerary.dest_ptr = dest_ptr
+        result, live_secs, mismatches = compare(engine, itinerary, 300)
+        print('{0} path {1}: {2}, fallbacks {3}, mismatches {4}'.format(
+            config['current.strategy'], dest_ptr, result.counts(), result.fallbacks, mismatches[:3]))
+        assert len(mismatches) == 0
+
+    # a strategy with attitudes, direct commands, chained comparisons, min, and a list of terms
+    terms = [
+        Term(None, 'hs', 'heading sector', 'radians(12)', 'rad'),
+        Term(None, 'hr', 'home radius', '0.075', 'm'),
+        Hybrid(None, 'lad', 'look-ahead distance', '0.275 if abs(st) > 0.1 else 0.5', 'm')
+    ]
+    rules = [
+        Rule(None, '0', 'Stage Terminator', '', 0, '0 <= d <= hr', '', '', '', True, 0),
+        Rule(None, '0', 'Cutter Two On', '', 1, 'd > 0 and \'REV\' in rat and cut2 == 0', '', '',
+             "'>cutter(2,-1)'", False, 0),
+        Rule(None, '0', 'Rotate Either Way', '', 2, 'd > 0 and min(a, ra) > hs',
+             '((((a < ra) ^ (u >= 0))) * 2 - 1) * n', '((((a < ra) ^ (u >= 0))) * 2 - 1) * -n',
+             '1.1 * min(a, ra) * w * 50000 / (v * n)', False, 0),
+        Rule(None, '0', 'Forward Attitude', '', 3, 'd > hr and att2[:3] in [\'DEF\', \'FWD\'] and -hs <= u <= hs',
+             '((-1) ** (a >= hs)) * s * np.mean([j ** ((-1) ** (u >= 0)), 1])',
+             '((-1) ** (a >= hs)) * s * np.mean([j ** ((-1) ** (u < 0)), 1])',
+             's and l * 100000 * 1.0 / (v * s) or 1', False, 0),
+        Rule(None, '0', 'Reverse Veer', '', 4, 'd > hr and not abs(ru) > hs', '-s * j', '-s',
+             'l * 100000 / (v * s)', False, 0)
+    ]
+    engine = RulesEngine('What If', rules, terms, None, None)
+    engine.robot_attitude = Attitude.REV_DRIVE.name
+    itinerary = Itinerary(launch, route)
+    itinerary.dest_ptr = 1
+    result, live_secs, mismatches = compare(engine, itinerary, 300, seed=7)
+    print('what if: {0}, fallbacks {1}, mismatches {2}'.format(result.counts(), result.fallbacks, mismatches[:3]))
+    assert len(mismatches) == 0 and len(result.fallbacks) > 0
+
+    # a heat-map over the whole lawn
+    engine = RulesEngine(config['current.strategy'], config['strategy.rules'], config['strategy.terms'], None, None)
+    grid, grid_shape = grid_poses(width_m, length_m, constants.STRATEGY_HEATMAP_STEP_M, pi / 2)
+    evaluator = BatchEvaluator(engine)
+    result = evaluator.evaluate(grid, itinerary, config, telem)
+    print('heat-map of {0} poses {1:.1f}ms, {2:.0f}x the engine pose by pose at {3:.3f}ms per pose'.format(
+        len(result), result.secs * 1000, live_secs * len(result) / result.secs, live_secs * 1000))
+    img = heatmap_image(result, grid_shape, (640, int(640 * length_m / width_m)), width_m, length_m, itinerary)
+    img_path = os.path.join(tempfile.gettempdir(), 'strategy-heatmap.png')
+    img.save(img_path)
+    print('heat-map saved to {0}'.format(img_path))
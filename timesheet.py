@@ -1,5 +1,5 @@
 import sys
-import time
+from time import perf_counter
 
 
 class Timesheet():
@@ -15,36 +15,35 @@ class Timesheet():
         self.setname = setname
         if self.setname is not None:
             self.checkpoints = {}
-            self.start_time = time.time()
+            self.start_time = perf_counter()
 
     def add(self, name):
         '''
             add an entry
         '''
         if self.setname is not None:
-            self.checkpoints[name] = time.time()
+            self.checkpoints[name] = perf_counter()
 
     def __repr__(self):
         if self.setname is None:
             result = 'Empty Timesheet'
         else:
             '''
-                Add printed entry and...
+                Add printed entry (to a copy) and...
                 loop through entries calculating relative time cost
             '''
-            self.add('self.printed')
+            checkpoints = dict(self.checkpoints)
+            checkpoints['self.printed'] = perf_counter()
+            times = [self.start_time] + list(checkpoints.values())
             tmplt = '{0}: {1:.3f}s {2:>3.0f}%\n'
             extra_chars = 14
-            total = list(self.checkpoints.values())[-1] - self.start_time
-            widest = max([len(k) for k in self.checkpoints])
+            total = times[-1] - self.start_time
+            widest = max([len(k) for k in checkpoints])
             result = '\n' + (widest + extra_chars) * '-'
             result += '\n' + self.setname.center(widest + extra_chars, ' ')
             result += '\n' + (widest + extra_chars) * '-' + '\n'
-            for i, (k, v) in enumerate(self.checkpoints.items()):
-                if i == 0:
-                    elapsed = v - self.start_time
-                else:
-                    elapsed = v - list(self.checkpoints.values())[i - 1]
+            for i, k in enumerate(checkpoints):
+                elapsed = times[i + 1] - times[i]
                 result += tmplt.format(k.rjust(widest, ' '),
                                        elapsed, 100 * elapsed / (total + 0.000001))
 
@@ -67,16 +66,16 @@ class Timesheet2():
         self.setname = setname
         if self.setname is not None:
             self.checkpoints = {}
-            self.start_times = [time.time()]
+            self.start_times = [perf_counter()]
 
     def restart(self):
         '''
             add new start time
         '''
         if len(self.checkpoints) == 0:
-            self.start_times[0] = time.time()  # just refresh
+            self.start_times[0] = perf_counter()  # just refresh
         else:
-            self.start_times.append(time.time())
+            self.start_times.append(perf_counter())
 
     def add(self, name):
         '''
@@ -84,13 +83,13 @@ class Timesheet2():
         '''
         if self.setname is not None:
             if name in self.checkpoints:
-                self.checkpoints[name].append(time.time())
+                self.checkpoints[name].append(perf_counter())
                 # if this is the first entry, and we haven't restarted, auto-restart
                 if (list(self.checkpoints.keys()).index(name) == 0 and
                         len(self.start_times) < len(self.checkpoints[name])):
                     self.restart()
             else:
-                self.checkpoints[name] = [time.time()]
+                self.checkpoints[name] = [perf_counter()]
 
     def __repr__(self):
         if self.setname is None or len(self.checkpoints) == 0:
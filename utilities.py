@@ -13,6 +13,8 @@ from types import ModuleType, FunctionType
 from gc import get_referents
 
 from destination import Attitude
+import metrics
+from sim_clock import clock
 
 np.seterr(all='raise')
 
@@ -80,48 +82,45 @@ def make_contour_entry(
 
 def route_pc_to_metres(arena_width_m, arena_length_m, route_pc, min_internode_dist_m=0.1, debug=False):
     patt_logger = logging.getLogger('mow-patterns')
-    j = 0
     route_m = []
-    inter_node_dist = min_internode_dist_m
-    for i in range(len(route_pc)):
-        x_pc = route_pc[i][0]
-        y_pc = route_pc[i][1]
-        att = route_pc[i][2] if len(route_pc[i]) > 2 else Attitude.DEFAULT
-        if debug:
-            patt_logger.debug('{}: ({:.2f}%, {:.2f}%)'.format(i, x_pc, y_pc))
-        if x_pc is not None and y_pc is not None:
-            x_m = round(x_pc * arena_width_m / 100, 3)
-            y_m = round(y_pc * arena_length_m / 100, 3)
-            if debug:
-                patt_logger.debug('{}: ({:.2f}m, {:.2f}m)'.format(i, x_m, y_m))
-            if j > 0:
-                # beyond first so we can calculate distance between points
-                inter_node_dist = np.hypot(
-                    x_m - route_m[j - 1][0], y_m - route_m[j - 1][1])
-                if debug:
-                    patt_logger.debug(
-                        'i: {0} j: {1} inter node distance: {2}'.format(i, j, inter_node_dist))
-            if inter_node_dist >= min_internode_dist_m:
-                route_m.append((x_m, y_m, att))
-                if debug:
-                    patt_logger.debug(
-                        'including node ({:.2f}m, {:.2f}m) whose inter-node-distance: {:.3f} >= {:.3f}'.format(
-                            x_m,
-                            y_m,
-                            inter_node_dist,
-                            min_internode_dist_m
-                            )
-                        )
-                j += 1
-            else:
-                patt_logger.warning(
-                    'skipping node ({:.2f}m, {:.2f}m) whose inter-node-distance: {:.3f} < {:.3f}'.format(
-                        x_m,
-                        y_m,
-                        inter_node_dist,
-                        min_internode_dist_m
-                        )
+    if len(route_pc) == 0:
+        return route_m
+    # all nodes scaled at once, undefined nodes as nan
+    xy_pc = np.array([(p[0], p[1]) if p[0] is not None and p[1] is not None else (np.nan, np.nan)
+                      for p in route_pc], dtype=float)
+    valid = ~np.isnan(xy_pc[:, 0])
+    xy_m = np.full_like(xy_pc, np.nan)
+    # round as python does, to the nearest decimal rather than np.round's scaled binary
+    xy_m[valid] = [[round(x_m, 3), round(y_m, 3)] for x_m, y_m in (
+        xy_pc[valid] * (arena_width_m, arena_length_m) / 100).tolist()]
+    atts = [p[2] if len(p) > 2 else Attitude.DEFAULT for p in route_pc]
+    if debug:
+        for i in range(len(route_pc)):
+            patt_logger.debug('{}: ({}%, {}%) => ({}m, {}m)'.format(i, *xy_pc[i], *xy_m[i]))
+
+    kept_xy_m = xy_m[valid]
+    kept_atts = [att for att, v in zip(atts, valid) if v]
+    steps_m = np.hypot(*np.diff(kept_xy_m, axis=0).T)
+    if np.all(steps_m >= min_internode_dist_m):
+        # no node too close to its predecessor, the usual case
+        return [(x_m, y_m, att) for (x_m, y_m), att in zip(kept_xy_m.tolist(), kept_atts)]
+
+    # the distance is from the last node kept, so walk the nodes
+    last_x_m, last_y_m = None, None
+    for (x_m, y_m), att in zip(kept_xy_m.tolist(), kept_atts):
+        inter_node_dist = min_internode_dist_m if last_x_m is None else math.hypot(x_m - last_x_m, y_m - last_y_m)
+        if inter_node_dist >= min_internode_dist_m:
+            route_m.append((x_m, y_m, att))
+            last_x_m, last_y_m = x_m, y_m
+        else:
+            patt_logger.warning(
+                'skipping node ({:.2f}m, {:.2f}m) whose inter-node-distance: {:.3f} < {:.3f}'.format(
+                    x_m,
+                    y_m,
+                    inter_node_dist,
+                    min_internode_dist_m
                     )
+                )
     return route_m
 
 
@@ -138,6 +137,38 @@ def get_mem_usage():
     return memory_usage, memory_avail
 
 
+def get_score_props(config):
+    '''
+        projection scoring properties from the configuration
+        span and area limits are scaled by the configured target measurements
+    '''
+    score_props = {}
+    scaled_names = ['span', 'area']
+    scaled_property_names = ['lower', 'scale', 'upper', 'maxscore']
+    measure_names = ['isoscelicity', 'solidity', 'fitness']
+    meas_property_names = ['lower', 'setpoint', 'upper', 'maxscore']
+    for name in scaled_names:
+        prop_list = []
+        for propname in scaled_property_names:
+            if propname == 'scale':
+                # scale appropriate real-world measurement from config
+                scale_factor = config['{}.{}'.format(name, propname)]
+                if name == 'span':
+                    configured_val = config['mower.target_length_m']
+                elif name == 'area':
+                    configured_val = config['mower.target_area_m2']
+                prop_list.append(configured_val * scale_factor)
+            else:
+                prop_list.append(config['{}.{}'.format(name, propname)])
+        score_props[name] = tuple(prop_list)
+    for name in measure_names:
+        prop_list = []
+        for propname in meas_property_names:
+            prop_list.append(config['{}.{}'.format(name, propname)])
+        score_props[name] = tuple(prop_list)
+    return score_props
+
+
 def get_mem_stats():
     memory_usage, memory_avail = get_mem_usage()
     mem_stats = (' Mem Used: {0:.1f} MB Available: {1:.1f} MB'.format(
@@ -156,10 +187,11 @@ def get_safe_functions():
 def await_elapsed(start_time, finish_time):
     extra_delay_secs = finish_time - start_time
     if extra_delay_secs > 0:
-        time.sleep(extra_delay_secs)
+        clock.sleep(extra_delay_secs)
     return extra_delay_secs
 
 
+@metrics.timed('despatch')
 def despatch_to_mower_udp(cmd, udp_socket, host, port, await_response=True, max_attempts=3):
 
     resp = None
@@ -231,6 +263,48 @@ def rssi_category(rssi):
     return cat
 
 
+def decode_telemetry(config, telem_json, logger):
+    '''
+        mower telemetry json => dict with named, scaled sensors
+    '''
+    telem = {}
+    try:
+        telem = json.loads(telem_json)
+        # analogue sensors
+        # unpack raw values and match to names/factors if available
+        channel_names = config['mower.sens_name_list'].split(',')
+        channel_factors = config['mower.sens_factor_list'].split(',')
+        sensors = {}
+        for i, raw_adc in enumerate(telem['analogs']):
+            try:
+                ch_name = channel_names[i].strip()
+                if ch_name == '':
+                    raise Exception()
+            except:
+                ch_name = f'Channel {i+1}'
+            try:
+                ch_factor = channel_factors[i]
+                if ch_factor.strip() == '':
+                    raise Exception()
+            except:
+                ch_factor = 1.0
+            sensors[ch_name] = round(raw_adc * float(ch_factor), 3)
+
+        telem['sensors'] = sensors
+        wifi_rssi = telem['rssi']  # dbm
+        if wifi_rssi is not None:
+            wifi_quality = rssi_category(wifi_rssi)
+            telem['wifi_quality'] = wifi_quality
+        # add last-fetch time here...
+        telem['last-fetch'] = clock.time()
+    except Exception as e1:
+        err_line = sys.exc_info()[-1].tb_lineno
+        logger.error('Error in fetch telemetry Json decoding: [{0}] {1}'.format(
+            telem_json, e1) + ' on line ' + str(err_line))
+        telem['wifi_quality'] = 0
+    return telem
+
+
 def fetch_telemetry(config, udp_socket):
 
     try:
@@ -249,40 +323,7 @@ def fetch_telemetry(config, udp_socket):
             logger.debug(
                 'telemetry json: {}'.format(telem_json))
             if telem_json is not None and telem_json != '':
-                try:
-                    telem = json.loads(telem_json)
-                    # analogue sensors
-                    # unpack raw values and match to names/factors if available
-                    channel_names = config['mower.sens_name_list'].split(',')
-                    channel_factors = config['mower.sens_factor_list'].split(',')
-                    sensors = {}
-                    for i, raw_adc in enumerate(telem['analogs']):
-                        try:
-                            ch_name = channel_names[i].strip()
-                            if ch_name == '':
-                                raise Exception()
-                        except:
-                            ch_name = f'Channel {i+1}'
-                        try:
-                            ch_factor = channel_factors[i]
-                            if ch_factor.strip() == '':
-                                raise Exception()
-                        except:
-                            ch_factor = 1.0
-                        sensors[ch_name] = round(raw_adc * float(ch_factor), 3)
-                        
-                    telem['sensors'] = sensors
-                    wifi_rssi = telem['rssi']  # dbm
-                    if wifi_rssi is not None:
-                        wifi_quality = rssi_category(wifi_rssi)
-                        telem['wifi_quality'] = wifi_quality
-                    # add last-fetch time here...
-                    telem['last-fetch'] = time.time()
-                except Exception as e1:
-                    err_line = sys.exc_info()[-1].tb_lineno
-                    logger.error('Error in fetch telemetry Json decoding: [{0}] {1}'.format(
-                        telem_json, e1) + ' on line ' + str(err_line))
-                    telem['wifi_quality'] = 0
+                telem = decode_telemetry(config, telem_json, logger)
             else:
                 pass
                 logger.warn('utilities fetch_telemetry - Mower Offline!')
@@ -1,10 +1,16 @@
 import sys
 import numpy as np
 import re
-from skimage.measure import find_contours
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 import constants
+from contour_candidates import find_candidate_contours, contour_margins
 from utilities import get_mem_stats
+from log_pipeline import LazyMessage
+from startup import deferred_import
+
+shapely = deferred_import('shapely')
 
 class Viewport():
     '''
@@ -271,18 +277,21 @@ class Viewport():
             print('Error in viewport scale:' + 
                   str(e) + ' on line ' + str(err_line))
 
-    def find_contours(self, array, logger=None):
+    def find_contours(self, array, logger=None, min_pt_count=0):
+        '''
+            contours at half the maximum intensity, with their margins and edginess
+            min_pt_count lets the components backend skip those too small to keep
+        '''
         margins = []
         edginess = []
         local_contours = []
         try:
             if logger is not None:
-                logger.info(
-                    'About to Find Contours - {} {}'.format(
-                        array.shape,
-                        get_mem_stats()
-                    )
-                )
+                logger.info(LazyMessage(
+                    'About to Find Contours - {0} {1}',
+                    array.shape,
+                    get_mem_stats
+                ))
 
             if array is not None and len(array.shape) >= 2 and array.shape[0] > 4 and array.shape[1] > 4:
                 # if no threshold is specified, skimage is going to use (max(image) + min(image)) / 2
@@ -313,7 +322,7 @@ class Viewport():
                 else:
 
                     # find local contours at a constant value of threshold
-                    local_contours = find_contours(array, threshold)
+                    local_contours = find_candidate_contours(array, threshold, min_pt_count)
     
                     if logger is not None:
                         logger.info(
@@ -329,20 +338,7 @@ class Viewport():
                         )
                         
                     # calculate margins
-                    for c_arr in local_contours:
-                        top_margin, left_margin = np.min(c_arr, axis=0)
-                        bottom_margin, right_margin = array.shape - \
-                            np.max(c_arr, axis=0)
-                        margins.append(
-                            (top_margin, left_margin, bottom_margin, right_margin))
-                        arr_height, arr_width = array.shape
-                        left_edginess = left_margin / arr_width
-                        right_edginess = right_margin / arr_width
-                        top_edginess = top_margin / arr_height
-                        bottom_edginess = bottom_margin / arr_height
-                        min_edginess_pc = min(
-                            [left_edginess, right_edginess, top_edginess, bottom_edginess]) * 100
-                        edginess.append(min_edginess_pc)
+                    margins, edginess = contour_margins(local_contours, array.shape)
         except Exception as e:
             err_line = sys.exc_info()[-1].tb_lineno
             print('Error in viewport find contours: ' + 
@@ -448,21 +444,166 @@ class Viewport():
         return result
 
 
-def merge_adjacent_viewports(vps, idx=0):
+def adjacent_pairs(centres, diagonals):
+    '''
+        index pairs (i < j) whose centres are closer than the sum of their diagonals,
+        as proximity_ratio > 1 decides, found with an r-tree of the centres
+    '''
+    if len(centres) < 2:
+        return np.empty((0, 2), dtype=int)
+    tree = shapely.STRtree(shapely.points(centres))
+    # an adjacent pair lies within twice the larger diagonal of the larger one's centre,
+    # so each centre need only reach that far, then the exact test per candidate
+    query_idx, tree_idx = tree.query(
+        shapely.points(centres), predicate='dwithin', distance=2 * diagonals)
+    candidates = query_idx != tree_idx
+    pairs = np.unique(np.sort(np.column_stack([query_idx[candidates], tree_idx[candidates]]), axis=1), axis=0)
+    query_idx, tree_idx = pairs[:, 0], pairs[:, 1]
+    distances = np.linalg.norm(centres[query_idx] - centres[tree_idx], axis=1)
+    adjacent = (diagonals[query_idx] + diagonals[tree_idx]) / (distances + 0.00001) > 1
+    return np.column_stack([query_idx[adjacent], tree_idx[adjacent]])
+
+
+def merge_adjacent_viewports(vps):
+    '''
+        merge, in place, every group of transitively adjacent viewports into its first member
+        adjacency is of the viewports as given, in one pass: merged viewports are not
+        merged again with the neighbours their growth reaches, which on a cluttered frame
+        would snowball them into one covering the whole frame
+        order independent and stable, the survivors keep their list order
+    '''
+    if len(vps) < 2:
+        return vps
+    live = [n for n, vp in enumerate(vps) if not vp.isnull]
+    # centre, origin and bottom right as the properties compute them, for all at once
+    corners = np.array([list(vps[n].corners) for n in live], dtype=float).reshape(-1, 4, 2)
+    centres = corners.mean(axis=1).clip(0)
+    diagonals = np.linalg.norm(corners.max(axis=1) - corners.min(axis=1).clip(0), axis=1)
+    pairs = adjacent_pairs(centres, diagonals)
+    if len(pairs) == 0:
+        return vps
+    adjacency = coo_matrix(
+        (np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])), shape=(len(live), len(live)))
+    num_groups, group_ids = connected_components(adjacency, directed=False)
+    # each group's extent, as absorbing its members one by one would leave it
+    group_mins = np.full((num_groups, 2), np.inf)
+    group_maxs = np.full((num_groups, 2), -np.inf)
+    np.minimum.at(group_mins, group_ids, corners.min(axis=1).clip(0))
+    np.maximum.at(group_maxs, group_ids, corners.max(axis=1))
+    group_sizes = np.bincount(group_ids, minlength=num_groups)
+    merged_groups = set()
+    for n, group_id in zip(live, group_ids):
+        if group_sizes[group_id] == 1:
+            continue
+        if group_id in merged_groups:
+            vps[n] = None
+        else:
+            merged_groups.add(group_id)
+            (top, left), (bottom, right) = group_mins[group_id], group_maxs[group_id]
+            vps[n].corners = set([(top, left), (bottom, left), (bottom, right), (top, right)])
+    vps[:] = [vp for vp in vps if vp is not None]
+    return vps
+
+
+if __name__ == '__main__':
+    '''
+        Class Tests
 
-    if idx >= len(vps) - 1:
-        # finished
-        return
-    else:
-        first = vps[idx]
-        second = vps[idx + 1]
-        prox_ratio = first.proximity_ratio(second)
-        adjacent = prox_ratio > 1
-        if adjacent:
-            first.absorb(second)
+        stress merging and de-duplication with synthetic lo-res clutter
+    '''
+    import random
+    import time
+    import contour_lib as cl
+
+    def legacy_merge(vps, idx=0):
+        # the recursive neighbour pass as it was
+        if idx >= len(vps) - 1:
+            return
+        if vps[idx].proximity_ratio(vps[idx + 1]) > 1:
+            vps[idx].absorb(vps[idx + 1])
             vps.pop(idx + 1)
-            # keep same pointer
         else:
-            # advance pointer
             idx += 1
-        merge_adjacent_viewports(vps, idx)
+        legacy_merge(vps, idx)
+
+    def legacy_dedupe(cnts, idx=0):
+        # the recursive neighbour pass as it was
+        if idx >= len(cnts) - 1:
+            return
+        bbox_min, bbox_max = np.min(cnts[idx], axis=0), np.max(cnts[idx], axis=0)
+        inner_centroid = np.mean(cnts[idx + 1], axis=0)
+        if np.all((bbox_min < inner_centroid) & (inner_centroid < bbox_max)):
+            cnts.pop(idx + 1)
+        else:
+            idx += 1
+        legacy_dedupe(cnts, idx)
+
+    def clutter(count, seed):
+        # small speckle viewports, with a few tight clusters like a mower's edges
+        rng = random.Random(seed)
+        vps = []
+        for n in range(count):
+            if n % 10 == 0:
+                centre_row, centre_col = rng.uniform(20, 80), rng.uniform(20, 80)
+            if n % 10 < 4:
+                row, col = centre_row + rng.uniform(-0.3, 0.3), centre_col + rng.uniform(-0.3, 0.3)
+            else:
+                row, col = rng.uniform(0, 99), rng.uniform(0, 99)
+            vps.append(Viewport.from_corners((row, col), (row + 0.1, col + 0.1), index=n))
+        return vps
+
+    def boxes(vps):
+        return sorted((round(vp.origin[0], 6), round(vp.origin[1], 6),
+                       round(vp.bottom_right[0], 6), round(vp.bottom_right[1], 6)) for vp in vps)
+
+    for count in (100, 500, 2000):
+        vps = clutter(count, count)
+        start = time.perf_counter()
+        merge_adjacent_viewports(vps)
+        sweep_ms = (time.perf_counter() - start) * 1000
+        shuffled = clutter(count, count)
+        random.Random(1).shuffle(shuffled)
+        merge_adjacent_viewports(shuffled)
+        # clutter is not snowballed into a few frame-sized viewports
+        assert len(vps) > count // 2
+        assert max((vp.bottom_right[0] - vp.origin[0]) * (vp.bottom_right[1] - vp.origin[1]) for vp in vps) < 1
+        legacy_vps = clutter(count, count)
+        start = time.perf_counter()
+        try:
+            legacy_merge(legacy_vps)
+            legacy = '{0:7.1f}ms -> {1}'.format((time.perf_counter() - start) * 1000, len(legacy_vps))
+        except RecursionError:
+            legacy = 'RecursionError'
+        print('merge {0:>5} viewports: r-tree {1:7.1f}ms -> {2} order independent: {3}  recursive: {4}'.format(
+            count, sweep_ms, len(vps), boxes(vps) == boxes(shuffled), legacy))
+        assert boxes(vps) == boxes(shuffled)
+
+    # rings give outer and inner contours, plus isolated speckle
+    theta = np.linspace(0, 2 * np.pi, 40)
+    for count in (100, 500, 2000):
+        rng = np.random.default_rng(count)
+        cnts = []
+        for n in range(count // 2):
+            centre = rng.uniform(0, 1000, 2)
+            radius = rng.uniform(2, 8)
+            cnts.append(centre + radius * np.column_stack([np.sin(theta), np.cos(theta)]))
+            if n % 2 == 0:
+                cnts.append(centre + radius * 0.6 * np.column_stack([np.sin(theta), np.cos(theta)]))
+            else:
+                cnts.append(rng.uniform(0, 1000, 2) + np.column_stack([np.sin(theta), np.cos(theta)]))
+        expected = len(cnts) - (count // 2 + 1) // 2
+        start = time.perf_counter()
+        deduped = cl.dedupe_contour_list(list(cnts), debug=False)
+        dedupe_ms = (time.perf_counter() - start) * 1000
+        legacy_cnts = list(cnts)
+        try:
+            legacy_dedupe(legacy_cnts)
+            legacy = len(legacy_cnts)
+        except RecursionError:
+            legacy = 'RecursionError'
+        print('dedupe {0:>5} contours: iterative {1:7.1f}ms -> {2} (expected about {3}) recursive: {4}'.format(
+            len(cnts), dedupe_ms, len(deduped), expected, legacy))
+        if legacy != 'RecursionError':
+            assert [c.sum() for c in deduped] == [c.sum() for c in legacy_cnts]
+        # every ring's inner follows its outer, so only the odd speckle is caught besides
+        assert abs(len(deduped) - expected) <= len(cnts) // 100
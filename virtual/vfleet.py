@@ -0,0 +1,102 @@
+import importlib.util
+import os
+import sys
+import threading
+from pathlib import Path
+
+import virtual.vmotion_lib
+import virtual.vlogs
+from virtual import vmower
+from virtual.vlogs import trace_virtual
+from sim_clock import clock
+
+'''
+    Virtual mower fleet
+
+    vmotion_lib keeps a mower's state in module globals, so each further
+    mower runs its own copy of the module, loaded afresh from the same file.
+    The first mower is the vmotion_lib module itself, so a fleet of one
+    behaves exactly as the single virtual mower does.
+
+    Mowers listen on consecutive udp ports from the base port, to load
+    a server with N simulated mowers:
+
+    python -m virtual.vfleet --count 4 [--base-port 5005] [--work-folder .]
+'''
+
+VMOTION_LIB_PATH = Path(virtual.vmotion_lib.__file__)
+
+
+def new_motion(index):
+    '''
+        an independent instance of the motion library
+    '''
+    if index == 0:
+        return virtual.vmotion_lib
+    module_name = 'virtual.vmotion_lib_{0}'.format(index)
+    spec = importlib.util.spec_from_file_location(module_name, VMOTION_LIB_PATH)
+    motion = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(motion)
+    return motion
+
+
+class VirtualFleet():
+    '''
+        N virtual mowers, each with its own pose, timers and cutter state
+    '''
+
+    def __init__(self, count):
+        self.motions = [new_motion(i) for i in range(count)]
+
+    def __len__(self):
+        return len(self.motions)
+
+    def init(self):
+        for motion in self.motions:
+            motion.init()
+
+    def process_cmd(self, index, cmd):
+        return vmower.process_cmd(cmd, self.motions[index])
+
+    def serve(self, base_port=5005):
+        '''
+            one listening thread per mower, returns the threads
+        '''
+        threads = []
+        for i, motion in enumerate(self.motions):
+            thread = threading.Thread(
+                target=vmower.serve, args=(base_port + i, motion), name='vmower-{0}'.format(i), daemon=True)
+            thread.start()
+            trace_virtual('virtual mower {0} serving on port {1}'.format(i, base_port + i))
+            threads.append(thread)
+        return threads
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Proxymow virtual mower fleet')
+    parser.add_argument('--count', type=int, default=2)
+    parser.add_argument('--base-port', type=int, default=5005)
+    parser.add_argument('--work-folder', default=os.getcwd())
+    parser.add_argument('--check', action='store_true', help='drive each mower in-process and exit')
+    args = parser.parse_args()
+
+    fleet = VirtualFleet(args.count)
+    if args.check:
+        # each mower moves independently of the others
+        fleet.init()
+        for i in range(len(fleet)):
+            fleet.process_cmd(i, 'set_pose({0},1,0,0.15,0.2)'.format(i + 1.0))
+        # on the stepped clock, the sweep's timers run as the clock sleeps
+        clock.enable()
+        fleet.process_cmd(0, 'sweep(100,100,1000)')
+        clock.sleep(2)
+        clock.disable()
+        print([fleet.process_cmd(i, 'get_pose()') for i in range(len(fleet))])
+        sys.exit(0)
+
+    (Path(args.work_folder) / 'logs').mkdir(exist_ok=True)
+    virtual.vlogs.init(Path(args.work_folder))
+    for fleet_thread in fleet.serve(args.base_port):
+        fleet_thread.join()
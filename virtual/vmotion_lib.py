@@ -1,13 +1,12 @@
-import time
-import threading
 import random
 import virtual.vmachine as vmachine
 from time import sleep
 from math import radians, degrees, floor
 from virtual.shared_utils import calc_new_pose
 from virtual.vlogs import trace_virtual
+from sim_clock import clock
 
-start_time = time.time()
+start_time = clock.time()
 
 # define IO Mapping
 # name             board label
@@ -82,7 +81,7 @@ def init():
     adc = vmachine.ADC(0)
 
     # create timers
-    act_timer = threading.Timer(0, None)  # sweep timer
+    act_timer = clock.Timer(0, None)  # sweep timer
     trace_virtual('timers created')
 
     # turn off cutters
@@ -227,7 +226,7 @@ def activate(pwms, speeds_percent, duration_ms, axle_track_m, velocity_full_spee
         trace_virtual('Activate Timer Starting... {} {} {}'.format(
             speed_left_percent, speed_right_percent, partial_dur_s*1000))
 
-        act_timer = threading.Timer(
+        act_timer = clock.Timer(
             partial_dur_s,
             task,
             args=(
@@ -289,7 +288,7 @@ def task(
             trace_virtual('Task Intermediate {0} ({1}%, {2}%)'.format(
                 step_count, speed_left_percent, speed_right_percent))
 
-        act_timer = threading.Timer(
+        act_timer = clock.Timer(
             partial_dur_s,
             task,
             args=(
@@ -406,7 +405,7 @@ def partial_action(duration_ms, axle_track_m, velocity_full_speed_mps, speed_lef
 
         if blockage_occured_at > 0:
             # back moving?
-            if (time.time() - blockage_occured_at) > BLOCKAGE_DURATION_SECS:
+            if (clock.time() - blockage_occured_at) > BLOCKAGE_DURATION_SECS:
                 msg = '*** Realism - blockage, zero both speeds cancelled'
                 if debug:
                     trace_virtual('\t' + msg)
@@ -421,7 +420,7 @@ def partial_action(duration_ms, axle_track_m, velocity_full_speed_mps, speed_lef
             msg = '*** Realism - blockage, zero both speeds triggered'
             if debug:
                 trace_virtual('\t' + msg)
-            blockage_occured_at = time.time()
+            blockage_occured_at = clock.time()
 
     if do_action:
         # calculate change in pose due to each wheel's speed and duration
@@ -536,9 +535,9 @@ def get_telemetry():
         5,
         'null',
         'null',
-        int(((time.time() - start_time) * 1000) - 10000),
+        int(((clock.time() - start_time) * 1000) - 10000),
         100,
-        int((time.time() - start_time) * 1000)
+        int((clock.time() - start_time) * 1000)
     )
 
 def cutter(addr_in, mode):
@@ -1,9 +1,9 @@
-import time
 import socket
 import virtual.vmotion_lib
 from virtual.vmotion_lib import init, likely
 import virtual.vlogs
 from virtual.vlogs import trace_virtual
+from sim_clock import clock
 
 COMMS_REALISM_ENABLED = False  # True | False
 COMMS_FAIL_LIKELIHOOD_PC = 0  # 100 = certainty, 0 = never, 2 = reasonable
@@ -14,19 +14,22 @@ def log(msg):
     trace_virtual(msg)
 
 
-def process_cmd(multi_cmd):
+def process_cmd(multi_cmd, motion=None):
+    '''
+        motion is the vmotion_lib instance to drive, the module itself by default
+    '''
     result = ''
     try:
         cmds = multi_cmd.split('!')
         for cmd in cmds:
-            res = process(cmd)
+            res = process(cmd, motion)
             result += str(res) + '!'
     except Exception as e:
         result = str(e)
     return result.rstrip('!')
 
 
-def process(cmd):
+def process(cmd, motion=None):
     # determine instruction and make call
     msg = 'Processing: ' + cmd
     log(msg)
@@ -49,22 +52,35 @@ def process(cmd):
         else:
             log('No parameters...')
 
-        result = getattr(virtual.vmotion_lib, instr)(*params)
+        if motion is None:
+            motion = virtual.vmotion_lib
+        result = getattr(motion, instr)(*params)
         log('Result: ' + str(result))
     return result
 
 
-def main(work_folder_path):
+def main(work_folder_path, port=5005, motion=None):
 
     # initialise log
     virtual.vlogs.init(work_folder_path)
 
+    serve(port, motion)
+
+
+def serve(port=5005, motion=None):
+    '''
+        answer commands on the udp port, driving motion, the vmotion_lib module by default
+    '''
+
     # initialise motion lib
-    init()
+    if motion is None:
+        init()
+    else:
+        motion.init()
 
     # initialise socket
     HOST = '0.0.0.0'  # Standard loopback interface address (localhost)
-    PORT = 5005        # Port to listen on (non-privileged ports are > 1023)
+    PORT = port        # Port to listen on (non-privileged ports are > 1023)
     ACK = 'ACK'
 
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -82,12 +98,12 @@ def main(work_folder_path):
                 # Comms realism
                 if comms_went_offline > 0:
                     # back online?
-                    if time.time() - comms_went_offline > COMMS_FAIL_DURATION_SECS:
+                    if clock.time() - comms_went_offline > COMMS_FAIL_DURATION_SECS:
                         comms_went_offline = -1
                 else:
                     comms_fail_likely = likely(COMMS_FAIL_LIKELIHOOD_PC)
                     if comms_fail_likely:
-                        comms_went_offline = time.time()
+                        comms_went_offline = clock.time()
 
                 if cmd[0] == '>':
                     # Synchronous Request - process before replying
@@ -97,7 +113,7 @@ def main(work_folder_path):
                     else:
                         cmd = cmd[1:]
                         log('Incoming synchronous request: ' + cmd)
-                        result = process_cmd(cmd)
+                        result = process_cmd(cmd, motion)
                         log('Processed result: ' + str(result))
                         response = str(result).encode()
                         log('Sending response...')
@@ -115,7 +131,7 @@ def main(work_folder_path):
                         log('Sending acknowledgement...')
                         sent_bytes = s.sendto(ACK.encode(), addr)
                         log('Sent acknowledgement: {}'.format(sent_bytes))
-                        result = process_cmd(cmd)
+                        result = process_cmd(cmd, motion)
                         log('Processed result: ' + str(result))
             else:
                 log('Incoming request breaking!')
@@ -8,20 +8,30 @@ from PIL import Image, ImageDraw, ImageFont
 from skimage import transform as tf
 from skimage import filters
 from skimage.morphology import closing
-from skimage.measure import find_contours
-from shapely.geometry.polygon import Polygon
 from copy import deepcopy
 
 import geom_lib
 import contour_lib as cl
 import utilities
+import metrics
 from infill_sharpener import Projection
 import constants
 import poses
 from viewport import Viewport, merge_adjacent_viewports
-from diagram_lib import plot_projection_img
+from fence_masks import filter_margin_px, padded_crop
+from edge_pipeline import EdgePipeline
+from contour_candidates import find_candidate_contours
 from dashed_image_draw import DashedImageDraw
 from timesheet import Timesheet, Timesheet2
+from startup import deferred_import
+from image_sink import sink as image_sink, scale_to_bytes
+
+# imported on first use, off the startup path
+diagram_lib = deferred_import('diagram_lib')
+shapely_geometry = deferred_import('shapely.geometry')
+
+# scratch buffers are per thread, so one pipeline serves all analysis threads
+edge_pipeline = EdgePipeline()
 
 
 def matrices_from_quad_points(
@@ -200,7 +210,7 @@ def get_polygons_from_pc(
         polygon_pts_m = [(pt.x * arena_width_m / 100, pt.y *
                           arena_length_m / 100) for pt in polygon_pts_pc]
         # create shapely polygon
-        polygon_m = Polygon(polygon_pts_m)
+        polygon_m = shapely_geometry.Polygon(polygon_pts_m)
         # grow polygon by factor
         growth_factor = growth_factor_pc / 100
         growth_dist_m = growth_factor * arena_width_m
@@ -420,7 +430,7 @@ def render_contour_row(proj, logger):
 def get_contour_source_array(
     index,
     img_arr,
-    fence_mask_array,
+    fence_masks,
     vp,
     zoom_scale_factor,
     debug_image_level,
@@ -431,6 +441,7 @@ def get_contour_source_array(
 ):
     '''
         determine best binary array for mining contours
+        only the part within the fence is filtered, the rest is zero
     '''
     try:
         if logger is not None:
@@ -442,99 +453,81 @@ def get_contour_source_array(
         else:
 
             if debug_image_level >= 4 or abs(debug_image_level) == 4:
-                pre_img = Image.fromarray(img_arr)
-                pre_img.convert('RGB').save(tmp_folder_path + '{0}-filters-incoming.jpg'.format(
-                    index), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                image_sink.save(tmp_folder_path + '{0}-filters-incoming.jpg'.format(
+                    index), img_arr, optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+
+            # restrict filtering to the fence, padded so the filters see the same neighbourhood
+            fence_mask_arr = fence_box = None
+            if constants.FENCE_MASKING and fence_masks is not None:
+                fence_mask_arr, fence_box = fence_masks.region(vp, zoom_scale_factor, img_arr.shape)
+                if fence_mask_arr is None:
+                    if logger is not None:
+                        logger.warning(
+                            'get_contour_source_array fence masking NOT applied {0}'.format(img_arr.shape))
+                elif fence_box is None:
+                    if logger is not None:
+                        logger.debug('get_contour_source_array {0} wholly outside fence'.format(index))
+                    return np.zeros(img_arr.shape)
+            if fence_box is not None:
+                crop, inner = padded_crop(
+                    fence_box, img_arr.shape, filter_margin_px(pre_filter, post_close))
+                filter_arr = img_arr[crop]
+                if logger is not None:
+                    logger.debug('get_contour_source_array filtering fence crop {0} of {1}'.format(
+                        filter_arr.shape, img_arr.shape))
+            else:
+                filter_arr = img_arr
 
-            if pre_filter and constants.BLUR_SIGMA > 0:
-                blurred_arr = filters.gaussian(
-                    img_arr, sigma=constants.BLUR_SIGMA, preserve_range=True).astype(np.uint8)
+            if constants.EDGE_PIPELINE == 'float32' and not (debug_image_level >= 4 or abs(debug_image_level) == 4):
+                # blur, sobel and closing fused in float32 over reused scratch buffers
+                contour_source_arr = edge_pipeline.run(filter_arr, pre_filter, post_close)
                 if logger is not None:
-                    logger.info(
-                        'get_contour_source_array blur pre-filter complete')
-                if debug_image_level >= 4 or abs(debug_image_level) == 4:
-                    post_img = Image.fromarray(blurred_arr)
-                    post_img.convert('RGB').save(tmp_folder_path + '{0}-post-blur.jpg'.format(
-                        index), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                    logger.info('get_contour_source_array fused edge pipeline complete')
             else:
-                blurred_arr = img_arr
+                if pre_filter and constants.BLUR_SIGMA > 0:
+                    blurred_arr = filters.gaussian(
+                        filter_arr, sigma=constants.BLUR_SIGMA, preserve_range=True).astype(np.uint8)
+                    if logger is not None:
+                        logger.info(
+                            'get_contour_source_array blur pre-filter complete')
+                    if debug_image_level >= 4 or abs(debug_image_level) == 4:
+                        image_sink.save(tmp_folder_path + '{0}-post-blur.jpg'.format(
+                            index), blurred_arr, optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                else:
+                    blurred_arr = filter_arr
 
-            # sobel edge filter
-            edge_filtered_arr = filters.sobel(blurred_arr)  # blurred_arr
-            if logger is not None:
-                logger.info(
-                    'get_contour_source_array sobel edge detection complete')
-            if debug_image_level >= 4 or abs(debug_image_level) == 4:
-                post_img = Image.fromarray(
-                    (edge_filtered_arr * 255).astype(np.uint8))
-                post_img.save(tmp_folder_path + '{0}-sobel-edge-detect.jpg'.format(
-                    index), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                # sobel edge filter
+                edge_filtered_arr = filters.sobel(blurred_arr)  # blurred_arr
+                if logger is not None:
+                    logger.info(
+                        'get_contour_source_array sobel edge detection complete')
+                if debug_image_level >= 4 or abs(debug_image_level) == 4:
+                    image_sink.save(tmp_folder_path + '{0}-sobel-edge-detect.jpg'.format(
+                        index), edge_filtered_arr, prepare=scale_to_bytes,
+                        optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
 
-            contour_source_arr = edge_filtered_arr
+                contour_source_arr = edge_filtered_arr
 
-            if post_close and constants.CLOSING_FOOTPRINT is not None:
-                fp = constants.CLOSING_FOOTPRINT
-                closed_edge_filtered_arr = closing(contour_source_arr, fp)
-                contour_source_arr = closed_edge_filtered_arr
-                if debug_image_level >= 4 or abs(debug_image_level) == 4:
-                    post_img = Image.fromarray(
-                        (closed_edge_filtered_arr * 255).astype(np.uint8))
-                    post_img.save(tmp_folder_path + '{0}-closed-edge-detect.jpg'.format(
-                        index), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
+                if post_close and constants.CLOSING_FOOTPRINT is not None:
+                    fp = constants.CLOSING_FOOTPRINT
+                    closed_edge_filtered_arr = closing(contour_source_arr, fp)
+                    contour_source_arr = closed_edge_filtered_arr
+                    if debug_image_level >= 4 or abs(debug_image_level) == 4:
+                        image_sink.save(tmp_folder_path + '{0}-closed-edge-detect.jpg'.format(
+                            index), closed_edge_filtered_arr, prepare=scale_to_bytes,
+                            optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
 
             if logger is not None:
                 logger.info('get_contour_source_array gray image filtered')
 
-            # mask beyond fence?
-            if constants.FENCE_MASKING:
-                try:
-                    if vp.isnull:
-                        if logger is not None:
-                            logger.debug('get_contour_source_array fence masking zoom_scale_factor: {}'.format(
-                                zoom_scale_factor)
-                            )
-                        if zoom_scale_factor > 1:
-                            sub_samp_fence_arr = fence_mask_array[::
-                                                                  zoom_scale_factor, ::zoom_scale_factor]
-                            if logger is not None:
-                                logger.debug('get_contour_source_array fence masking contour_source_arr.shape: {0} sub_samp_fence_arr: {1}'.format(
-                                    contour_source_arr.shape,
-                                    sub_samp_fence_arr.shape)
-                                )
-                            fence_masked_arr = contour_source_arr * sub_samp_fence_arr
-                            if debug_image_level >= 4 or abs(debug_image_level) == 4:
-                                sub_samp_fence_img = Image.fromarray(
-                                    sub_samp_fence_arr)
-                                sub_samp_fence_img.save(tmp_folder_path + '{0}-sub_samp_fence.jpg'.format(
-                                    index), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
-                        else:
-                            fence_masked_arr = contour_source_arr * fence_mask_array  # full size
-                    else:
-                        fma = fence_mask_array[vp.slicer(fence_mask_array.shape)]
-                        if logger is not None:
-                            logger.debug('get_contour_source_array fence masking fence_mask_array: {} {}'.format(
-                                contour_source_arr.shape, fma.shape)
-                            )
-                        fence_masked_arr = contour_source_arr * fma
-                except ValueError:
-                    err_line = sys.exc_info()[-1].tb_lineno
-                    fence_masked_arr = contour_source_arr  # not needed
-                    if logger is not None:
-                        logger.warning(
-                            'get_contour_source_array fence masking NOT applied {}'.format(err_line)
-                        )
-
-                except Exception as ex1:
-                    fence_masked_arr = contour_source_arr  # error
-                    if logger is not None:
-                        err_line = sys.exc_info()[-1].tb_lineno
-                        logger.error(
-                            'get_contour_source_array fence masking error: {} on line {}'.format(
-                                ex1,
-                                err_line
-                            )
-                        )
-
+            # mask beyond fence, placing the crop back in the whole array
+            if fence_box is not None:
+                fence_masked_arr = np.zeros(img_arr.shape, contour_source_arr.dtype)
+                edge_pipeline.apply_mask(
+                    contour_source_arr[inner], fence_mask_arr[fence_box], fence_masked_arr[fence_box])
+                if debug_image_level >= 4 or abs(debug_image_level) == 4:
+                    image_sink.save(tmp_folder_path + '{0}-fence-mask.jpg'.format(
+                        index), fence_mask_arr, optimize=True, quality=constants.DEBUG_IMAGE_QUALITY)
                 if logger is not None:
                     logger.info('get_contour_source_array fence_masked_arr shape {0} after fence masking'.format(
                         fence_masked_arr.shape
@@ -543,15 +536,16 @@ def get_contour_source_array(
             else:
                 fence_masked_arr = contour_source_arr
 
-            try:
-                fence_masked_img = Image.fromarray(
-                    (fence_masked_arr * 255).astype(np.uint8), 'L')
-                if debug_image_level >= 1 or abs(debug_image_level) == 1:
-                    fence_masked_img.save(
-                        tmp_folder_path + '{0}-pipeline-output.jpg'.format(index), optimize=True, quality=constants.DEBUG_IMAGE_QUALITY
+            if debug_image_level >= 1 or abs(debug_image_level) == 1:
+                try:
+                    # unmasked, the fused pipeline's output is a scratch buffer it reuses
+                    image_sink.save(
+                        tmp_folder_path + '{0}-pipeline-output.jpg'.format(index),
+                        fence_masked_arr if fence_box is not None else fence_masked_arr.copy(),
+                        prepare=scale_to_bytes, optimize=True, quality=constants.DEBUG_IMAGE_QUALITY
                     )
-            except Exception:
-                pass
+                except Exception:
+                    pass
 
     except Exception as ex2:
         err_line = sys.exc_info()[-1].tb_lineno
@@ -642,16 +636,19 @@ def get_prospect_list(
     debug_image_level,
     debug_level,
     logger,
-    sid
+    sid,
+    fence_masks=None
 ):
     '''
         get list of lo-res prospect viewports
+        fence_masks overrides the host fence masks, e.g. on a camera node
     '''
     try:
 
         # find contours
         timesheet = Timesheet('Get Prospect List')
-        fence_mask_arr = np.asarray(host.fence_mask_img, bool)
+        if fence_masks is None:
+            fence_masks = host.fence_masks
 
         # Full Scene zoom in
         sub_shape = (int(img_arr.shape[0] / zoom_scale_factor),
@@ -661,8 +658,9 @@ def get_prospect_list(
                      int(img_arr.shape[1] / dbg_ratio))
 
         # down-sample using scikit
-        raw_img_arr = tf.resize(
-            img_arr, sub_shape, preserve_range=True, anti_aliasing=True).astype(np.uint8)
+        with metrics.stage('pyramid'):
+            raw_img_arr = tf.resize(
+                img_arr, sub_shape, preserve_range=True, anti_aliasing=True).astype(np.uint8)
         if debug_image_level >= 1 or abs(debug_image_level) == 1:
             dbg_img_arr = tf.resize(
                 img_arr, dbg_shape, preserve_range=True, anti_aliasing=True)
@@ -674,7 +672,7 @@ def get_prospect_list(
         prep_img_arr = get_contour_source_array(
             sid,
             raw_img_arr,
-            fence_mask_arr,
+            fence_masks,
             viewport,
             zoom_scale_factor,
             debug_image_level,
@@ -687,7 +685,7 @@ def get_prospect_list(
 
         # find multiple contours in array
         prospect_cnts, margins, _edginess = viewport.find_contours(
-            prep_img_arr, logger)
+            prep_img_arr, logger, constants.LORES_CONTOUR_MINIMUM_POINT_COUNT)
         if logger and debug_level > 0:
             logger.debug('Number of raw prospect contours: {0}'.format(
                 len(prospect_cnts)))
@@ -787,7 +785,7 @@ def get_prospect_list(
             # overlay filtered prospects
             overlay_viewports(prospect_vps, lores_draw,
                               dbg_shape, 'yellow', sm_font)
-            lores_img.save(host.tmp_folder_path + '{0}-lores.jpg'.format(sid))
+            image_sink.save(host.tmp_folder_path + '{0}-lores.jpg'.format(sid), lores_img)
 
         timesheet.add('lores prospect debug annotations')
         if logger and debug_level > 2:
@@ -812,26 +810,41 @@ def probe_prospect_list(
     img_arr,
     debug_image_level,
     debug_level,
-    logger
+    logger,
+    full_shape=None
 ):
     '''
         loop through the incoming list of prospect viewports
         and find contours in the hi-res image
+        if img_arr is None, each viewport carries its own sub_array,
+        as returned by edge prospecting, and full_shape is required
     '''
     timesheet = Timesheet2('Probe Prospect List')
     try:
-        fence_mask_arr = np.asarray(host.fence_mask_img, bool)
+        img_shape = img_arr.shape if img_arr is not None else full_shape
         prospect_viewports = []
         for _pid, vp in enumerate(vp_prospect_list):
             timesheet.restart()
-            sub_array = img_arr[vp.slicer(img_arr.shape)]
+            if constants.FENCE_MASKING and host.fence_masks is not None and host.fence_masks.outside(vp):
+                # nothing within the fence to find
+                vp.local_contours = []
+                vp.local_margins = []
+                vp.local_edginess = []
+                vp.local_projections = []
+                if logger and debug_level > 0:
+                    logger.debug('probe: {0} skipped, wholly outside fence'.format(vp.index))
+                continue
+            if img_arr is None:
+                sub_array = vp.sub_array
+            else:
+                sub_array = img_arr[vp.slicer(img_shape)]
             vp.display_sub_array = sub_array
 
             # filter and closing
             prep_img_arr = get_contour_source_array(
                 '{0}'.format(vp.index),
                 sub_array,
-                fence_mask_arr,
+                host.fence_masks,
                 vp,
                 1,
                 debug_image_level,
@@ -844,7 +857,7 @@ def probe_prospect_list(
             timesheet.add('contour source')
 
             local_contours, local_margins, local_edginess = vp.find_contours(
-                prep_img_arr, logger)
+                prep_img_arr, logger, constants.HIRES_CONTOUR_MINIMUM_POINT_COUNT)
             timesheet.add('find contours')
 
             if logger and debug_level > 0:
@@ -881,10 +894,10 @@ def probe_prospect_list(
                     vp.index, len(filtered_local_contours), [len(c) for c in filtered_local_contours]))
 
             # global contour offset
-            offset = np.array(vp.origin) * np.array(img_arr.shape) / 100
+            offset = np.array(vp.origin) * np.array(img_shape) / 100
 
             # annotate
-            if debug_image_level >= 2 or abs(debug_image_level) == 2:
+            if img_arr is not None and (debug_image_level >= 2 or abs(debug_image_level) == 2):
                 hires_img = Image.fromarray(img_arr).convert('RGB')
                 hires_draw = ImageDraw.Draw(hires_img)
                 sm_font = ImageFont.truetype(host.font_path, 12)
@@ -892,8 +905,8 @@ def probe_prospect_list(
                 global_contours = [c + offset for c in local_contours]
                 cl.overlay_contours(
                     global_contours, hires_draw, (1, 1), 'orange', sm_font)
-                hires_img.save(host.tmp_folder_path +
-                               '{0}-hires.jpg'.format(vp.index))
+                image_sink.save(host.tmp_folder_path +
+                                '{0}-hires.jpg'.format(vp.index), hires_img)
 
             vp.local_projections = []
             for j, cont in enumerate(vp.local_contours):
@@ -926,7 +939,7 @@ def probe_prospect_list(
                             '{0}'.format(vp.index),
                             j,
                             vp,
-                            img_arr.shape,
+                            img_shape,
                             True
                         )
                         if debug_level > 3:
@@ -940,15 +953,16 @@ def probe_prospect_list(
                         # add to buffer
                         host.contours_buffer.append(msg)
 
-                    tgt = Projection(
-                        '{0}-{1}'.format(vp.index, j),
-                        j,
-                        c_unwarped_undistorted,
-                        hide_confidence=False,
-                        logger=logger,
-                        debug=(debug_level > 3)
-                    )
-                    tgt.assess(host.score_props)
+                    with metrics.stage('projection'):
+                        tgt = Projection(
+                            '{0}-{1}'.format(vp.index, j),
+                            j,
+                            c_unwarped_undistorted,
+                            hide_confidence=False,
+                            logger=logger,
+                            debug=(debug_level > 3)
+                        )
+                        tgt.assess(host.score_props)
 
                     # track thumbnails for contour analysis, and viewport for coarse location
                     tgt.cont_img_arr = sub_array
@@ -969,22 +983,21 @@ def probe_prospect_list(
                     if ((debug_image_level >= 5 or abs(debug_image_level) == 5) or
                             ((debug_image_level >= 6 or abs(debug_image_level) == 6) and tgt.conf_pc > constants.SCORE_THRESHOLD)):
 
-                        # initialise response
-                        img_buf = io.BytesIO()
-
                         # overlay contour
                         disp_img = Image.fromarray(sub_array).convert('RGB')
                         disp_draw = ImageDraw.Draw(disp_img)
                         cl.overlay_contours(
                             [cont], disp_draw, (1, 1), 'orange', None)
 
-                        plot_projection_img(
-                            tgt, vp.index, prep_img_arr, disp_img, img_buf, logger)
+                        def plot_projection(tgt=tgt, vp_index=vp.index, prep_img_arr=prep_img_arr, disp_img=disp_img):
+                            img_buf = io.BytesIO()
+                            diagram_lib.plot_projection_img(
+                                tgt, vp_index, prep_img_arr, disp_img, img_buf, logger)
+                            return img_buf
 
-                        # save debug plot image
-                        plot_img = Image.open(img_buf)
-                        plot_img.save(host.tmp_folder_path +
-                                      '{0}-{1}-proj.jpg'.format(vp.index, j))
+                        # plotted and saved by the image sink
+                        image_sink.save(host.tmp_folder_path +
+                                        '{0}-{1}-proj.jpg'.format(vp.index, j), plot_projection)
 
             prospect_viewports.append(deepcopy(vp))
 
@@ -1026,8 +1039,10 @@ def probe_prospect_list(
         if best_projection is not None and best_projection.valid:
 
             # let Pose apply offsetting
+            # in the perspective of the camera that saw it
             pose = poses.Pose.from_tip_tail(
-                best_projection.v1, best_projection.tail, best_projection.heading, ssid=sid)
+                best_projection.v1, best_projection.tail, best_projection.heading, ssid=sid,
+                mapper=host.data_mapper)
             if logger and debug_level > 0:
                 logger.debug('Best projection: {0}'.format(best_projection))
             if logger and debug_level > 0:
@@ -1090,7 +1105,7 @@ def lores_contours(analysis_array, zoom_scale_factor=4, min_pt_count=10, debug=F
         )
         )
     else:
-        conts = find_contours(sobel_zarr, threshold)
+        conts = find_candidate_contours(sobel_zarr, threshold, min_pt_count)
         if debug and logger:
             logger.debug(
                 'count all lo-res contours: {} - {}'.format(len(conts), [len(c) for c in conts]))